@@ -16,6 +16,7 @@ import yaml
 
 from .interface import ZMQDealer
 from .interface.database import DbAccess
+from .interface.pool import DbAccessPool
 from .design import ModuleDB, SchInstance
 from .layout.routing import RoutingGrid
 from .layout.template import TemplateDB
@@ -125,7 +126,8 @@ class Testbench(object):
     sim : :class:`bag.interface.simulator.SimAccess`
         The SimAccess instance used to issue simulation commands.
     db : :class:`bag.interface.database.DbAccess`
-        The DbAccess instance used to update testbench schematic.
+        The DbAccess instance used to update testbench schematic.  Usually the
+        :class:`~bag.interface.pool.LibDbAccess` of the testbench library.
     lib : str
         testbench library.
     cell : str
@@ -466,6 +468,11 @@ class BagProject(object):
         the BAG configuration parameters dictionary.
     tech_info : bag.layout.core.TechInfo
         the BAG process technology class.
+    impl_db : Optional[DbAccess]
+        the database access object of the primary BAG server.
+    impl_db_pool : Optional[DbAccessPool]
+        the pool of all BAG servers.  Library operations are dispatched to the server
+        the library is assigned to.
     """
 
     def __init__(self, bag_config_path=None, port=None):
@@ -490,6 +497,7 @@ class BagProject(object):
         dealer_kwargs = {}
         dealer_kwargs.update(self.bag_config['socket'])
         del dealer_kwargs['port_file']
+        pool_list = dealer_kwargs.pop('pool', [])
 
         # create TechInfo instance
         self.tech_info = create_tech_info(bag_config_path=bag_config_path)
@@ -503,13 +511,23 @@ class BagProject(object):
         self.dsn_db = ModuleDB(lib_defs_file, self.tech_info, sch_exc_libs, prj=self)
 
         if port is not None:
-            # make DbAccess instance.
-            dealer = ZMQDealer(port, **dealer_kwargs)
+            # make DbAccess instances, one for each BAG server.
+            port_list = [port]
+            for pool_port in pool_list:
+                if isinstance(pool_port, str):
+                    pool_port, msg = _get_port_number(pool_port)
+                    if msg:
+                        raise ValueError('Cannot get BAG server pool port: %s' % msg)
+                port_list.append(pool_port)
             db_cls = _import_class_from_str(self.bag_config['database']['class'])
-            self.impl_db = db_cls(dealer, bag_tmp_dir, self.bag_config['database'])
+            db_list = [db_cls(ZMQDealer(cur_port, **dealer_kwargs), bag_tmp_dir,
+                              self.bag_config['database']) for cur_port in port_list]
+            self.impl_db = db_list[0]
+            self.impl_db_pool = DbAccessPool(db_list)  # type: Optional[DbAccessPool]
             self._default_lib_path = self.impl_db.default_lib_path
         else:
             self.impl_db = None  # type: Optional[DbAccess]
+            self.impl_db_pool = None
             self._default_lib_path = DbAccess.get_default_lib_path(self.bag_config['database'])
 
         # make SimAccess instance.
@@ -523,11 +541,39 @@ class BagProject(object):
 
     def close_bag_server(self):
         # type: () -> None
-        """Close the BAG database server."""
-        if self.impl_db is not None:
-            self.impl_db.close()
+        """Close all BAG database servers."""
+        if self.impl_db_pool is not None:
+            self.impl_db_pool.close()
+            self.impl_db_pool = None
             self.impl_db = None
 
+    def _lib_call(self, lib_name, fun_name, *args, **kwargs):
+        # type: (str, str, *Any, **Any) -> Any
+        """Call the given DbAccess method on the BAG server the given library is assigned to."""
+        if self.impl_db_pool is None:
+            raise Exception('BAG Server is not set up.')
+        return self.impl_db_pool.call(lib_name, fun_name, *args, **kwargs)
+
+    def parallel_cad(self):
+        """Returns a context manager in which CAD database modifications run in parallel.
+
+        Inside the block, methods that modify the CAD database, like batch_layout() and
+        batch_schematic(), return as soon as the request is dispatched to the BAG server
+        of the library, so work on libraries assigned to different servers in the BAG
+        server pool runs in parallel, and CAD work overlaps with Python work.  All
+        modifications are waited for when the block exits, and the first error is raised.
+
+        Inside the block, only access the CAD database through BagProject methods.
+
+        Returns
+        -------
+        context : ContextManager
+            the context manager.
+        """
+        if self.impl_db_pool is None:
+            raise Exception('BAG Server is not set up.')
+        return self.impl_db_pool.parallel()
+
     def close_sim_server(self):
         # type: () -> None
         """Close the BAG simulation server."""
@@ -548,7 +594,7 @@ class BagProject(object):
             raise Exception('BAG Server is not set up.')
 
         new_lib_path = self.bag_config['new_lib_path']
-        self.impl_db.import_design_library(lib_name, self.dsn_db, new_lib_path)
+        self._lib_call(lib_name, 'import_design_library', lib_name, self.dsn_db, new_lib_path)
 
     def get_cells_in_library(self, lib_name):
         # type: (str) -> Sequence[str]
@@ -569,7 +615,7 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        return self.impl_db.get_cells_in_library(lib_name)
+        return self._lib_call(lib_name, 'get_cells_in_library', lib_name)
 
     def make_template_db(self, impl_lib, grid_specs, use_cybagoa=True, gds_lay_file='',
                          cache_dir=''):
@@ -742,7 +788,7 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        return self.impl_db.create_library(lib_name, lib_path=lib_path)
+        return self._lib_call(lib_name, 'create_library', lib_name, lib_path=lib_path)
 
     # noinspection PyUnusedLocal
     def create_design_module(self, lib_name, cell_name, **kwargs):
@@ -807,8 +853,8 @@ class BagProject(object):
         """Reset schematic database."""
         self.dsn_db.clear()
 
-    def instantiate_schematic(self, lib_name, content_list, lib_path=''):
-        # type: (str, Sequence[Any], str) -> None
+    def instantiate_schematic(self, lib_name, content_list, lib_path='', force=False):
+        # type: (str, Sequence[Any], str, bool) -> None
         """Create the given schematic contents in CAD database.
 
         NOTE: this is BAG's internal method.  TO create schematics, call batch_schematic() instead.
@@ -821,11 +867,33 @@ class BagProject(object):
             list of schematics to create.
         lib_path : str
             the path to create the library in.  If empty, use default location.
+        force : bool
+            True to implement all schematics, even if they have not changed since they were
+            last implemented.
         """
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        self.impl_db.instantiate_schematic(lib_name, content_list, lib_path=lib_path)
+        self._lib_call(lib_name, 'instantiate_schematic', lib_name, content_list,
+                       lib_path=lib_path, force=force)
+
+    def clear_schematic_fingerprints(self, lib_name=None):
+        # type: (Optional[str]) -> None
+        """Forget the implemented schematic fingerprints, so all schematics are implemented again.
+
+        Use this if schematics were modified outside of BAG.  Fingerprints are cleared on
+        all BAG servers in the pool.
+
+        Parameters
+        ----------
+        lib_name : Optional[str]
+            the library name.  If None, fingerprints of all libraries are cleared.
+        """
+        if self.impl_db_pool is None:
+            raise Exception('BAG Server is not set up.')
+
+        for db in self.impl_db_pool.db_list:
+            db.clear_schematic_fingerprints(lib_name)
 
     def batch_schematic(self,  # type: BagProject
                         lib_name,  # type: str
@@ -835,6 +903,7 @@ class BagProject(object):
                         suffix='',  # type: str
                         debug=False,  # type: bool
                         rename_dict=None,  # type: Optional[Dict[str, str]]
+                        force=False,  # type: bool
                         ):
         # type: (...) -> None
         """create all the given schematics in CAD database.
@@ -855,13 +924,16 @@ class BagProject(object):
             True to print debugging messages
         rename_dict : Optional[Dict[str, str]]
             optional master cell renaming dictionary.
+        force : bool
+            True to implement all schematics, even if they have not changed since they were
+            last implemented.
         """
         master_list = [inst.master for inst in sch_inst_list]
 
         self.dsn_db.cell_prefix = prefix
         self.dsn_db.cell_suffix = suffix
         self.dsn_db.instantiate_masters(master_list, name_list=name_list, lib_name=lib_name,
-                                        debug=debug, rename_dict=rename_dict)
+                                        debug=debug, rename_dict=rename_dict, force=force)
 
     def configure_testbench(self, tb_lib, tb_cell):
         # type: (str, str) -> Testbench
@@ -887,8 +959,9 @@ class BagProject(object):
         if self.sim is None:
             raise Exception('SimAccess is not set up.')
 
-        c, clist, params, outputs = self.impl_db.configure_testbench(tb_lib, tb_cell)
-        return Testbench(self.sim, self.impl_db, tb_lib, tb_cell, params, clist, [c], outputs)
+        c, clist, params, outputs = self._lib_call(tb_lib, 'configure_testbench', tb_lib, tb_cell)
+        tb_db = self.impl_db_pool.get_lib_db(tb_lib)
+        return Testbench(self.sim, tb_db, tb_lib, tb_cell, params, clist, [c], outputs)
 
     def load_testbench(self, tb_lib, tb_cell):
         # type: (str, str) -> Testbench
@@ -911,9 +984,10 @@ class BagProject(object):
         if self.sim is None:
             raise Exception('SimAccess is not set up.')
 
-        cur_envs, all_envs, params, outputs = self.impl_db.get_testbench_info(tb_lib, tb_cell)
-        return Testbench(self.sim, self.impl_db, tb_lib, tb_cell, params, all_envs,
-                         cur_envs, outputs)
+        cur_envs, all_envs, params, outputs = self._lib_call(tb_lib, 'get_testbench_info',
+                                                             tb_lib, tb_cell)
+        tb_db = self.impl_db_pool.get_lib_db(tb_lib)
+        return Testbench(self.sim, tb_db, tb_lib, tb_cell, params, all_envs, cur_envs, outputs)
 
     def instantiate_layout_pcell(self, lib_name, cell_name, inst_lib, inst_cell, params,
                                  pin_mapping=None, view_name='layout'):
@@ -941,8 +1015,8 @@ class BagProject(object):
             raise Exception('BAG Server is not set up.')
 
         pin_mapping = pin_mapping or {}
-        self.impl_db.instantiate_layout_pcell(lib_name, cell_name, view_name,
-                                              inst_lib, inst_cell, params, pin_mapping)
+        self._lib_call(lib_name, 'instantiate_layout_pcell', lib_name, cell_name, view_name,
+                       inst_lib, inst_cell, params, pin_mapping)
 
     def instantiate_layout(self, lib_name, view_name, via_tech, layout_list):
         # type: (str, str, str, Sequence[Any]) -> None
@@ -962,7 +1036,8 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        self.impl_db.instantiate_layout(lib_name, view_name, via_tech, layout_list)
+        self._lib_call(lib_name, 'instantiate_layout', lib_name, view_name, via_tech,
+                       layout_list)
 
     def release_write_locks(self, lib_name, cell_view_list):
         # type: (str, Sequence[Tuple[str, str]]) -> None
@@ -978,7 +1053,7 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        self.impl_db.release_write_locks(lib_name, cell_view_list)
+        self._lib_call(lib_name, 'release_write_locks', lib_name, cell_view_list)
 
     def run_lvs(self,  # type: BagProject
                 lib_name,  # type: str
@@ -1055,7 +1130,7 @@ class BagProject(object):
 
         create_schematic = kwargs.get('create_schematic', True)
 
-        coro = self.impl_db.async_run_rcx(lib_name, cell_name, **kwargs)
+        coro = self.async_run_rcx(lib_name, cell_name, **kwargs)
         results = batch_async_task([coro])
         if results is None or isinstance(results[0], Exception):
             if create_schematic:
@@ -1192,7 +1267,14 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        return await self.impl_db.async_run_rcx(lib_name, cell_name, **kwargs)
+        create_schematic = kwargs.pop('create_schematic', True)
+        rcx_db = self.impl_db_pool.get_db(lib_name)
+        netlist, log_fname = await rcx_db.async_run_rcx(lib_name, cell_name,
+                                                        create_schematic=False, **kwargs)
+        # create the extracted schematic on the BAG server of the library
+        return await self.impl_db_pool.async_call(lib_name, '_process_rcx_output', netlist,
+                                                  log_fname, lib_name, cell_name,
+                                                  create_schematic)
 
     def create_schematic_from_netlist(self, netlist, lib_name, cell_name,
                                       sch_view=None, **kwargs):
@@ -1217,8 +1299,8 @@ class BagProject(object):
         if self.impl_db is None:
             raise Exception('BAG Server is not set up.')
 
-        return self.impl_db.create_schematic_from_netlist(netlist, lib_name, cell_name,
-                                                          sch_view=sch_view, **kwargs)
+        return self._lib_call(lib_name, 'create_schematic_from_netlist', netlist, lib_name,
+                              cell_name, sch_view=sch_view, **kwargs)
 
     def create_verilog_view(self, verilog_file, lib_name, cell_name, **kwargs):
         # type: (str, str, str, **Any) -> None
@@ -1242,4 +1324,5 @@ class BagProject(object):
         if not os.path.isfile(verilog_file):
             raise ValueError('%s is not a file.' % verilog_file)
 
-        return self.impl_db.create_verilog_view(verilog_file, lib_name, cell_name, **kwargs)
+        return self._lib_call(lib_name, 'create_verilog_view', verilog_file, lib_name,
+                              cell_name, **kwargs)
@@ -9,8 +9,9 @@ from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Any, Type, Set, S
     Callable, Union
 
 from bag import float_to_si_string
-from bag.io import read_yaml
 from bag.util.cache import DesignMaster, MasterDB
+from .netlist_info import get_netlist_info
+from .netlist import NetlistWriter
 
 if TYPE_CHECKING:
     from bag.core import BagProject
@@ -83,8 +84,8 @@ class ModuleDB(MasterDB):
         # noinspection PyTypeChecker
         return gen_cls(self, **kwargs)
 
-    def create_masters_in_db(self, lib_name, content_list, debug=False):
-        # type: (str, Sequence[Any], bool) -> None
+    def create_masters_in_db(self, lib_name, content_list, debug=False, force=False):
+        # type: (str, Sequence[Any], bool, bool) -> None
         """Create the masters in the design database.
 
         Parameters
@@ -95,11 +96,14 @@ class ModuleDB(MasterDB):
             a list of the master contents.  Must be created in this order.
         debug : bool
             True to print debug messages
+        force : bool
+            True to implement all schematics, even if they have not changed.
         """
         if self._prj is None:
             raise ValueError('BagProject is not defined.')
 
-        self._prj.instantiate_schematic(lib_name, content_list, lib_path=self.lib_path)
+        self._prj.instantiate_schematic(lib_name, content_list, lib_path=self.lib_path,
+                                        force=force)
 
     @property
     def tech_info(self):
@@ -107,6 +111,39 @@ class ModuleDB(MasterDB):
         """the :class:`~bag.layout.core.TechInfo` instance."""
         return self._tech_info
 
+    def write_netlist(self,  # type: ModuleDB
+                      master_list,  # type: Sequence[Module]
+                      fname,  # type: str
+                      name_list=None,  # type: Optional[Sequence[Optional[str]]]
+                      fmt='cdl',  # type: str
+                      prim_table=None,  # type: Optional[Dict[str, Dict[str, Any]]]
+                      ):
+        # type: (...) -> None
+        """Write a hierarchical netlist of the given masters without using the CAD database.
+
+        Subcircuit names are the cell names instantiate_masters() would create.
+
+        Parameters
+        ----------
+        master_list : Sequence[Module]
+            list of masters to netlist.
+        fname : str
+            the netlist file name.
+        name_list : Optional[Sequence[Optional[str]]]
+            list of master cell names.  If not given, default names will be used.
+        fmt : str
+            the netlist format.  Either 'cdl' or 'spectre'.
+        prim_table : Optional[Dict[str, Dict[str, Any]]]
+            primitive device information.  See :class:`~bag.design.netlist.NetlistWriter`.
+        """
+        prefix, suffix = self.cell_prefix, self.cell_suffix
+
+        def rename_fun(cell_name):
+            return '%s%s%s' % (prefix, cell_name, suffix)
+
+        writer = NetlistWriter(fmt=fmt, prim_table=prim_table, rename_fun=rename_fun)
+        writer.write_file(fname, master_list, name_list=name_list)
+
     def is_lib_excluded(self, lib_name):
         # type: (str) -> bool
         """Returns true if the given schematic library does not contain generators.
@@ -331,6 +368,7 @@ class SchInstance(object):
 
         debug = kwargs.get('debug', False)
         rename_dict = kwargs.get('rename_dict', None)
+        force = kwargs.get('force', False)
 
         if not top_cell_name:
             top_cell_name = None
@@ -340,7 +378,36 @@ class SchInstance(object):
         self._db.cell_prefix = prefix
         self._db.cell_suffix = suffix
         self._db.instantiate_masters([self._master], [top_cell_name], lib_name=lib_name,
-                                     debug=debug, rename_dict=rename_dict)
+                                     debug=debug, rename_dict=rename_dict, force=force)
+
+    def write_netlist(self, fname, top_cell_name='', prefix='', suffix='', fmt='cdl',
+                      prim_table=None):
+        # type: (str, str, str, str, str, Optional[Dict[str, Dict[str, Any]]]) -> None
+        """Write a hierarchical netlist of this design without using the CAD database.
+
+        Parameters
+        ----------
+        fname : str
+            the netlist file name.
+        top_cell_name : str
+            the cell name of the top level design.
+        prefix : str
+            prefix to add to cell names.
+        suffix : str
+            suffix to add to cell names.
+        fmt : str
+            the netlist format.  Either 'cdl' or 'spectre'.
+        prim_table : Optional[Dict[str, Dict[str, Any]]]
+            primitive device information.  See :class:`~bag.design.netlist.NetlistWriter`.
+        """
+        if self._master is None:
+            raise ValueError('Instance %s has no master.  '
+                             'Did you forget to call design()?' % self._name)
+
+        self._db.cell_prefix = prefix
+        self._db.cell_suffix = suffix
+        self._db.write_netlist([self._master], fname, name_list=[top_cell_name or None],
+                               fmt=fmt, prim_table=prim_table)
 
     def get_layout_params(self, **kwargs):
         # type: (Any) -> Dict[str, Any]
@@ -391,23 +458,22 @@ class Module(DesignMaster, metaclass=abc.ABCMeta):
         self._pin_list = None
 
         self._yaml_fname = os.path.abspath(yaml_fname)
-        self.sch_info = read_yaml(self._yaml_fname)
+        netlist_info = get_netlist_info(self._yaml_fname)
+        self.sch_info = netlist_info.content
 
-        self._orig_lib_name = self.sch_info['lib_name']
-        self._orig_cell_name = self.sch_info['cell_name']
+        self._orig_lib_name = netlist_info.lib_name
+        self._orig_cell_name = netlist_info.cell_name
         self._design_fun = design_fun
         self._design_args = design_args
 
         # create initial instances and populate instance map
-        for inst_name, inst_attr in self.sch_info['instances'].items():
-            lib_name = inst_attr['lib_name']
-            cell_name = inst_attr['cell_name']
-            static = database.is_lib_excluded(lib_name)
-            self.instances[inst_name] = SchInstance(database, lib_name, cell_name, inst_name,
-                                                    static=static)
+        for inst_name, inst_lib_name, inst_cell_name in netlist_info.instances:
+            static = database.is_lib_excluded(inst_lib_name)
+            self.instances[inst_name] = SchInstance(database, inst_lib_name, inst_cell_name,
+                                                    inst_name, static=static)
 
         # fill in pin map
-        for pin in self.sch_info['pins']:
+        for pin in netlist_info.pins:
             self.pin_map[pin] = pin
 
         # initialize schematic master
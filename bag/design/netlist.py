@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""This module writes CDL/Spectre netlists of schematic generator hierarchies.
+
+Netlists are generated directly from finalized :class:`~bag.design.module.Module` objects,
+so no CAD database round trip is needed.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Sequence, Callable, IO, Iterable
+
+import re
+from collections import OrderedDict
+
+if TYPE_CHECKING:
+    from .module import Module, SchInstance
+
+# matches one bit range, like <3:0>, <2:10:2>, or <5>
+_range_re = re.compile(r'^(.*)<(\d+)(?::(\d+)(?::(\d+))?)?>$')
+# matches the repetition prefix, like <*4>
+_rep_re = re.compile(r'^<\*(\d+)>(.*)$')
+
+# netlist format -> (subcircuit header, subcircuit footer, comment characters)
+_format_info = {
+    'cdl': ('.SUBCKT %s', '.ENDS', '*'),
+    'spectre': ('subckt %s', 'ends %s', '//'),
+}
+
+
+def expand_bus_name(name):
+    # type: (str) -> List[str]
+    """Expand the given net/terminal/instance name in bus notation to a list of bit names.
+
+    Comma separated lists, bit ranges (like ``a<3:0>`` or ``a<0:6:2>``), and repetitions
+    (like ``<*2>a``) are supported.
+
+    Parameters
+    ----------
+    name : str
+        the name in bus notation.
+
+    Returns
+    -------
+    bit_list : List[str]
+        list of names of each bit.
+    """
+    ans = []
+    for item in name.split(','):
+        item = item.strip()
+        num_rep = 1
+        match = _rep_re.match(item)
+        if match:
+            num_rep = int(match.group(1))
+            item = match.group(2)
+        match = _range_re.match(item)
+        if match is None or match.group(3) is None:
+            bits = [item]
+        else:
+            base, start, stop, step = match.groups()
+            start, stop = int(start), int(stop)
+            step = 1 if step is None else int(step)
+            if step <= 0:
+                raise ValueError('Invalid bus step: %s' % item)
+            if start <= stop:
+                bits = ['%s<%d>' % (base, idx) for idx in range(start, stop + 1, step)]
+            else:
+                bits = ['%s<%d>' % (base, idx) for idx in range(start, stop - 1, -step)]
+        ans.extend(bits * num_rep)
+    return ans
+
+
+def _get_default_prim_info(cell_name):
+    # type: (str) -> Optional[Dict[str, Any]]
+    """Returns the primitive device information of BAG transistor primitives."""
+    if cell_name.startswith('nmos4_') or cell_name.startswith('pmos4_'):
+        return dict(prefix='M', terms=['D', 'G', 'S', 'B'], model=cell_name)
+    return None
+
+
+class NetlistWriter(object):
+    """Writes a hierarchical CDL or Spectre netlist of finalized schematic generators.
+
+    Each unique schematic master is written once as a subcircuit, with children before
+    parents.  Connections of each instance are taken from the netlist information of the
+    schematic template, updated with the terminal connections modified by the generator.
+
+    BAG transistor primitives are written as MOSFET devices.  Other primitives and static
+    instances are written as subcircuit instances with terminals in the schematic template
+    order, unless specified in prim_table.
+
+    Parameters
+    ----------
+    fmt : str
+        the netlist format.  Either 'cdl' or 'spectre'.
+    prim_table : Optional[Dict[str, Dict[str, Any]]]
+        a dictionary from primitive cell name to device information.  Device information is
+        a dictionary with optional entries 'prefix' (the CDL device prefix, defaults to 'X'),
+        'terms' (list of terminal names in netlist order), and 'model' (the device model
+        name, defaults to the cell name).
+    rename_fun : Optional[Callable[[str], str]]
+        function that maps master cell names to subcircuit names.
+    line_width : int
+        maximum line width before a line is continued.
+    """
+
+    def __init__(self,
+                 fmt='cdl',  # type: str
+                 prim_table=None,  # type: Optional[Dict[str, Dict[str, Any]]]
+                 rename_fun=None,  # type: Optional[Callable[[str], str]]
+                 line_width=80,  # type: int
+                 ):
+        # type: (...) -> None
+        if fmt not in _format_info:
+            raise ValueError('Unsupported netlist format: %s' % fmt)
+        self._fmt = fmt
+        self._prim_table = {} if prim_table is None else prim_table
+        self._rename_fun = rename_fun
+        self._line_width = line_width
+
+    def _get_name(self, name):
+        # type: (str) -> str
+        """Escape the given name for the netlist format."""
+        if self._fmt == 'spectre':
+            return re.sub(r'([<>\[\]:,*])', r'\\\1', name)
+        return name
+
+    def _write_line(self, stream, tokens):
+        # type: (IO, Sequence[str]) -> None
+        """Write the given tokens as a netlist line, continuing the line if it is too long."""
+        cur_len = 0
+        line_start = True
+        for tok in tokens:
+            if line_start:
+                line_start = False
+            elif cur_len + 1 + len(tok) > self._line_width:
+                if self._fmt == 'cdl':
+                    stream.write('\n+')
+                    cur_len = 1
+                else:
+                    stream.write(' \\\n   ')
+                    cur_len = 3
+                stream.write(' ')
+                cur_len += 1
+            else:
+                stream.write(' ')
+                cur_len += 1
+            stream.write(tok)
+            cur_len += len(tok)
+        stream.write('\n')
+
+    def write(self, stream, master_list, name_list=None):
+        # type: (IO, Sequence[Module], Optional[Sequence[Optional[str]]]) -> None
+        """Write the netlist of the given schematic masters to the given stream.
+
+        Parameters
+        ----------
+        stream : IO
+            the output text stream.
+        master_list : Sequence[Module]
+            list of top level schematic masters.
+        name_list : Optional[Sequence[Optional[str]]]
+            list of top level subcircuit names.  If not given, default names will be used.
+        """
+        if name_list is not None:
+            if len(name_list) != len(master_list):
+                raise ValueError('Master list and name list length mismatch.')
+            top_rename = {master.cell_name: name for master, name in zip(master_list, name_list)
+                          if name}
+        else:
+            top_rename = {}
+
+        rename_fun = self._rename_fun
+
+        def get_cell_name(cell_name):
+            cell_name = top_rename.get(cell_name, cell_name)
+            return cell_name if rename_fun is None else rename_fun(cell_name)
+
+        comment = _format_info[self._fmt][2]
+        stream.write('%s Generated by BAG\n' % comment)
+        if self._fmt == 'spectre':
+            stream.write('simulator lang=spectre\n')
+
+        # order masters so that children are written before parents.
+        master_dict = OrderedDict()  # type: Dict[Any, Module]
+        for master in master_list:
+            self._get_masters(master, master_dict)
+        for master in master_dict.values():
+            stream.write('\n')
+            self._write_master(stream, master, get_cell_name)
+
+    def write_file(self, fname, master_list, name_list=None):
+        # type: (str, Sequence[Module], Optional[Sequence[Optional[str]]]) -> None
+        """Write the netlist of the given schematic masters to the given file.
+
+        Parameters
+        ----------
+        fname : str
+            the netlist file name.
+        master_list : Sequence[Module]
+            list of top level schematic masters.
+        name_list : Optional[Sequence[Optional[str]]]
+            list of top level subcircuit names.  If not given, default names will be used.
+        """
+        with open(fname, 'w') as f:
+            self.write(f, master_list, name_list=name_list)
+
+    @classmethod
+    def _get_masters(cls, master, master_dict):
+        # type: (Module, Dict[Any, Module]) -> None
+        """Add the given master and all its children to the given dictionary, children first."""
+        if master.key in master_dict or master.is_primitive():
+            return
+        for inst in _inst_iter(master):
+            if inst.master is not None and not inst.is_primitive:
+                cls._get_masters(inst.master, master_dict)
+        master_dict[master.key] = master
+
+    def _write_master(self, stream, master, get_cell_name):
+        # type: (IO, Module, Callable[[str], str]) -> None
+        """Write the subcircuit of the given master."""
+        header, footer = _format_info[self._fmt][:2]
+        cell_name = self._get_name(get_cell_name(master.cell_name))
+        pins = [self._get_name(bit) for pin in master.pin_list for bit in expand_bus_name(pin)]
+        if self._fmt == 'cdl':
+            self._write_line(stream, [header % cell_name] + pins)
+        else:
+            self._write_line(stream, [header % cell_name, '('] + pins + [')'])
+
+        inst_info = master.sch_info['instances']
+        for inst_name, inst_list in master.instances.items():
+            if not isinstance(inst_list, list):
+                inst_list = [inst_list]
+            orig_pins = inst_info[inst_name].get('instpins', {}) if inst_name in inst_info else {}
+            orig_conn = {term: info['net_name'] for term, info in orig_pins.items()}
+            for inst in inst_list:
+                if not inst.should_delete:
+                    self._write_instance(stream, master, inst, orig_conn, get_cell_name)
+
+        if self._fmt == 'cdl':
+            stream.write('%s\n' % footer)
+        else:
+            stream.write('%s\n' % (footer % cell_name))
+
+    def _write_instance(self, stream, parent, inst, orig_conn, get_cell_name):
+        # type: (IO, Module, SchInstance, Dict[str, str], Callable[[str], str]) -> None
+        """Write the given instance."""
+        inst_master = inst.master
+        if inst.is_primitive:
+            cell_name = inst.master_cell_name
+            prim_info = self._prim_table.get(cell_name, None)
+            if prim_info is None:
+                prim_info = _get_default_prim_info(cell_name) or {}
+            prefix = prim_info.get('prefix', 'X')
+            model = prim_info.get('model', cell_name)
+            terms = prim_info.get('terms', None)
+            if terms is None:
+                terms = list(orig_conn.keys())
+                terms.extend((term for term in inst.connections if term not in orig_conn))
+            params = inst.parameters
+        else:
+            prefix = 'X'
+            model = get_cell_name(inst_master.cell_name)
+            terms = inst_master.pin_list
+            params = {}
+
+        inst_bits = expand_bus_name(inst.name)
+        num_inst = len(inst_bits)
+        conn_list = [[] for _ in range(num_inst)]  # type: List[List[str]]
+        for term in terms:
+            net = inst.connections.get(term, None)
+            if net is None:
+                net = orig_conn.get(term, None)
+                if net is None:
+                    raise ValueError('Terminal %s of instance %s in %s is not connected.' %
+                                     (term, inst.name, parent.cell_name))
+            term_bits = expand_bus_name(term)
+            net_bits = expand_bus_name(net)
+            num_term = len(term_bits)
+            if len(net_bits) == num_term:
+                for conn in conn_list:
+                    conn.extend(net_bits)
+            elif len(net_bits) == num_term * num_inst:
+                for idx, conn in enumerate(conn_list):
+                    conn.extend(net_bits[idx * num_term:(idx + 1) * num_term])
+            else:
+                raise ValueError('Terminal %s of instance %s in %s has %d bits, but net %s '
+                                 'has %d bits.' % (term, inst.name, parent.cell_name,
+                                                   num_term * num_inst, net, len(net_bits)))
+
+        model = self._get_name(model)
+        param_list = ['%s=%s' % (key, val) for key, val in params.items()]
+        for name, conn in zip(inst_bits, conn_list):
+            conn = [self._get_name(net) for net in conn]
+            if self._fmt == 'cdl':
+                if not name.upper().startswith(prefix):
+                    name = prefix + name
+                if prefix == 'X':
+                    tokens = [name] + conn + ['/', model] + param_list
+                else:
+                    tokens = [name] + conn + [model] + param_list
+            else:
+                tokens = [self._get_name(name), '('] + conn + [')', model] + param_list
+            self._write_line(stream, tokens)
+
+
+def _inst_iter(master):
+    # type: (Module) -> Iterable[SchInstance]
+    """Iterate over all schematic instances of the given master."""
+    for inst_list in master.instances.values():
+        if isinstance(inst_list, list):
+            for inst in inst_list:
+                if not inst.should_delete:
+                    yield inst
+        elif not inst_list.should_delete:
+            yield inst_list
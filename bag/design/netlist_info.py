@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""This module defines a process-wide cache of parsed schematic netlist information files.
+"""
+
+from typing import Dict, Any, Optional, Tuple, List
+
+import os
+import pickle
+
+from bag.io import read_yaml
+
+
+def _get_file_stamp(fname):
+    # type: (str) -> Tuple[int, int]
+    stat = os.stat(fname)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class NetlistInfo(object):
+    """The parsed content of a netlist information file, with instances and pins indexed.
+
+    Parameters
+    ----------
+    content : Dict[str, Any]
+        the netlist information dictionary.
+    stamp : Optional[Tuple[int, int]]
+        the modification time and size of the netlist information file.
+
+    Attributes
+    ----------
+    content : Dict[str, Any]
+        the netlist information dictionary.  This dictionary is shared by all modules
+        of the same schematic template, so it should not be modified.
+    instances : List[Tuple[str, str, str]]
+        list of (instance name, library name, cell name) of all instances.
+    pins : List[str]
+        list of pin names.
+    """
+
+    version = 1
+
+    def __init__(self, content, stamp=None):
+        # type: (Dict[str, Any], Optional[Tuple[int, int]]) -> None
+        self.content = content
+        self.stamp = stamp
+        self.instances = [(inst_name, attr['lib_name'], attr['cell_name'])
+                          for inst_name, attr in content['instances'].items()]
+        self.pins = list(content['pins'])  # type: List[str]
+
+    @property
+    def lib_name(self):
+        # type: () -> str
+        return self.content['lib_name']
+
+    @property
+    def cell_name(self):
+        # type: () -> str
+        return self.content['cell_name']
+
+    @classmethod
+    def load(cls, fname, stamp=None):
+        # type: (str, Optional[Tuple[int, int]]) -> Optional[NetlistInfo]
+        """Load a saved NetlistInfo object.
+
+        Parameters
+        ----------
+        fname : str
+            the saved file name.
+        stamp : Optional[Tuple[int, int]]
+            if given, the modification time and size of the netlist information file
+            the saved object must be parsed from.
+
+        Returns
+        -------
+        info : Optional[NetlistInfo]
+            the saved NetlistInfo object.  None if the file cannot be read, was saved by
+            a different version, or is out of date.
+        """
+        # this is a best-effort cache, so treat any error, such as a truncated file or
+        # a class that was renamed or moved, as a cache miss.
+        # noinspection PyBroadException
+        try:
+            with open(fname, 'rb') as f:
+                version, info = pickle.load(f)
+        except Exception:
+            return None
+        if version != cls.version or not isinstance(info, cls):
+            return None
+        if stamp is not None and info.stamp != stamp:
+            return None
+        return info
+
+    def save(self, fname):
+        # type: (str) -> None
+        """Save this object to the given file.
+
+        Parameters
+        ----------
+        fname : str
+            the file name.
+        """
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        tmp_fname = '%s.%d.tmp' % (fname, os.getpid())
+        with open(tmp_fname, 'wb') as f:
+            pickle.dump((self.version, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, fname)
+
+
+# absolute file name -> parsed netlist information
+_info_cache = {}  # type: Dict[str, NetlistInfo]
+
+
+def get_sidecar_fname(yaml_fname):
+    # type: (str) -> str
+    """Returns the binary sidecar file name of the given netlist information file.
+
+    Sidecar files are saved in the __pycache__ directory next to the netlist information file.
+    """
+    dir_name, base_name = os.path.split(os.path.abspath(yaml_fname))
+    return os.path.join(dir_name, '__pycache__', base_name + '.pickle')
+
+
+def get_netlist_info(yaml_fname, use_sidecar=True):
+    # type: (str, bool) -> NetlistInfo
+    """Returns the parsed content of the given netlist information file.
+
+    Parsed files are cached for the lifetime of the process, and are parsed again only if
+    the file modification time or size changes.
+
+    Parameters
+    ----------
+    yaml_fname : str
+        the netlist information file name.
+    use_sidecar : bool
+        True to load the parsed content from the binary sidecar file if it is up to date,
+        and write the sidecar file otherwise.  Failing to write the sidecar file is not
+        an error.
+
+    Returns
+    -------
+    info : NetlistInfo
+        the parsed netlist information.
+    """
+    yaml_fname = os.path.abspath(yaml_fname)
+    stamp = _get_file_stamp(yaml_fname)
+    info = _info_cache.get(yaml_fname, None)
+    if info is not None and info.stamp == stamp:
+        return info
+
+    sidecar_fname = get_sidecar_fname(yaml_fname)
+    info = NetlistInfo.load(sidecar_fname, stamp=stamp) if use_sidecar else None
+    if info is None:
+        info = NetlistInfo(read_yaml(yaml_fname), stamp=stamp)
+        if use_sidecar:
+            try:
+                info.save(sidecar_fname)
+            except OSError:
+                pass
+    _info_cache[yaml_fname] = info
+    return info
+
+
+def clear_netlist_info_cache():
+    # type: () -> None
+    """Clear the netlist information cache of this process."""
+    _info_cache.clear()
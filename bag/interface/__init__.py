@@ -4,6 +4,6 @@
 """
 
 from .server import SkillServer
-from .zmqwrapper import ZMQRouter, ZMQDealer
+from .zmqwrapper import ZMQRouter, ZMQDealer, AsyncZMQDealer
 
-__all__ = ['SkillServer', 'ZMQRouter', 'ZMQDealer', ]
+__all__ = ['SkillServer', 'ZMQRouter', 'ZMQDealer', 'AsyncZMQDealer', ]
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""This module defines the wire codecs used to send Python objects over ZMQ sockets.
+
+A codec is a serializer (yaml, pickle, or msgpack) followed by an optional compressor
+(zlib or lz4), and is specified by a string like ``'msgpack+lz4'`` or ``'pickle'``.
+
+Messages encoded with the legacy ``'yaml+zlib'`` codec have no header, so they are
+compatible with older BAG servers and clients.  Messages encoded with any other codec
+start with a header that names the codec, so the receiving end can always decode a
+message, and replies with the same codec the request used.
+"""
+
+from typing import Any, Dict, Tuple, Callable, Optional
+
+import zlib
+import pickle
+
+import yaml
+
+import bag.io
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# all codec headers start with this byte.  Legacy zlib streams never start with it.
+_header_start = b'\x00'
+_legacy_codec = 'yaml+zlib'
+
+
+def _yaml_dumps(obj):
+    # type: (Any) -> bytes
+    return bag.io.to_bytes(yaml.dump(obj))
+
+
+def _yaml_loads(data):
+    # type: (bytes) -> Any
+    return yaml.load(bag.io.fix_string(data), Loader=yaml.Loader)
+
+
+def _pickle_dumps(obj):
+    # type: (Any) -> bytes
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _msgpack_default(obj):
+    # type: (Any) -> Any
+    """Convert numpy objects and other sequences to types msgpack understands."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError('Cannot serialize object of type %s' % type(obj))
+
+
+def _msgpack_dumps(obj):
+    # type: (Any) -> bytes
+    return msgpack.packb(obj, use_bin_type=True, default=_msgpack_default)
+
+
+def _msgpack_loads(data):
+    # type: (bytes) -> Any
+    return msgpack.unpackb(data, raw=False)
+
+
+def _get_serializers():
+    # type: () -> Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]
+    ans = dict(
+        yaml=(_yaml_dumps, _yaml_loads),
+        pickle=(_pickle_dumps, pickle.loads),
+    )
+    if msgpack is not None:
+        ans['msgpack'] = (_msgpack_dumps, _msgpack_loads)
+    return ans
+
+
+def _get_compressors():
+    # type: () -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]
+    ans = dict(
+        zlib=(zlib.compress, zlib.decompress),
+    )
+    if lz4_frame is not None:
+        ans['lz4'] = (lz4_frame.compress, lz4_frame.decompress)
+    return ans
+
+
+_serializers = _get_serializers()
+_compressors = _get_compressors()
+
+
+class WireCodec(object):
+    """A serializer and an optional compressor that encodes Python objects to bytes.
+
+    Parameters
+    ----------
+    name : str
+        the codec name, in the form ``<serializer>[+<compressor>]``.  Valid serializers
+        are 'yaml', 'pickle', and 'msgpack'.  Valid compressors are 'zlib' and 'lz4'.
+        msgpack and lz4 are only available if the corresponding packages are installed.
+    """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        parts = name.split('+')
+        if len(parts) > 2:
+            raise ValueError('Invalid codec name: %s' % name)
+        ser_name = parts[0]
+        comp_name = parts[1] if len(parts) == 2 else ''
+        if ser_name not in _serializers:
+            raise ValueError('Unsupported serializer %s.  Available serializers: %s' %
+                             (ser_name, sorted(_serializers.keys())))
+        if comp_name and comp_name not in _compressors:
+            raise ValueError('Unsupported compressor %s.  Available compressors: %s' %
+                             (comp_name, sorted(_compressors.keys())))
+
+        self._name = '%s+%s' % (ser_name, comp_name) if comp_name else ser_name
+        self._dumps, self._loads = _serializers[ser_name]
+        if comp_name:
+            self._compress, self._decompress = _compressors[comp_name]
+        else:
+            self._compress = self._decompress = None
+        if self._name == _legacy_codec:
+            self._header = b''
+        else:
+            name_bytes = self._name.encode('ascii')
+            self._header = _header_start + bytes([len(name_bytes)]) + name_bytes
+
+    @property
+    def name(self):
+        # type: () -> str
+        """The codec name."""
+        return self._name
+
+    def encode(self, obj):
+        # type: (Any) -> bytes
+        """Encode the given object, including the codec header.
+
+        Parameters
+        ----------
+        obj : Any
+            the object to encode.
+
+        Returns
+        -------
+        data : bytes
+            the encoded message.
+        """
+        data = self._dumps(obj)
+        if self._compress is not None:
+            data = self._compress(data)
+        return self._header + data
+
+    def decode_payload(self, data):
+        # type: (bytes) -> Any
+        """Decode the given message payload, without the codec header.
+
+        Parameters
+        ----------
+        data : bytes
+            the message payload.
+
+        Returns
+        -------
+        obj : Any
+            the decoded object.
+        """
+        if self._decompress is not None:
+            data = self._decompress(data)
+        return self._loads(data)
+
+
+# codec name -> codec object
+_codec_cache = {}  # type: Dict[str, WireCodec]
+
+
+def get_codec(name):
+    # type: (Optional[str]) -> WireCodec
+    """Returns the wire codec with the given name.
+
+    Parameters
+    ----------
+    name : Optional[str]
+        the codec name.  If None or empty, the legacy 'yaml+zlib' codec is returned.
+
+    Returns
+    -------
+    codec : WireCodec
+        the wire codec.
+    """
+    name = name or _legacy_codec
+    codec = _codec_cache.get(name, None)
+    if codec is None:
+        codec = _codec_cache[name] = WireCodec(name)
+    return codec
+
+
+def decode_message(data):
+    # type: (bytes) -> Tuple[Any, WireCodec]
+    """Decode the given message with the codec named in its header.
+
+    Parameters
+    ----------
+    data : bytes
+        the encoded message.
+
+    Returns
+    -------
+    obj : Any
+        the decoded object.
+    codec : WireCodec
+        the codec used to encode the message.
+    """
+    if data[:1] == _header_start:
+        name_len = data[1]
+        codec = get_codec(data[2:2 + name_len].decode('ascii'))
+        return codec.decode_payload(data[2 + name_len:]), codec
+    codec = get_codec(_legacy_codec)
+    return codec.decode_payload(data), codec
+
+
+def get_available_codecs():
+    # type: () -> Tuple[str, ...]
+    """Returns the names of all codecs available in this Python environment."""
+    ans = []
+    for ser_name in sorted(_serializers.keys()):
+        ans.append(ser_name)
+        ans.extend(('%s+%s' % (ser_name, comp_name) for comp_name in sorted(_compressors.keys())))
+    return tuple(ans)
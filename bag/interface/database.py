@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, List, Dict, Tuple, Optional, Sequence, Any, Un
 
 import os
 import abc
+import hashlib
 import traceback
 
 import yaml
@@ -60,6 +61,34 @@ def format_inst_map(inst_map):
     return ans
 
 
+def _to_canonical(val):
+    # type: (Any) -> Any
+    """Convert the given schematic content to a canonical form with sorted dictionaries."""
+    if isinstance(val, dict):
+        return tuple(((k, _to_canonical(val[k])) for k in sorted(val.keys())))
+    if isinstance(val, (list, tuple)):
+        return tuple((_to_canonical(item) for item in val))
+    return val
+
+
+def get_schematic_fingerprint(content):
+    # type: (Any) -> str
+    """Returns the fingerprint of the given schematic content.
+
+    Parameters
+    ----------
+    content : Any
+        the schematic content tuple returned by Module.get_content().
+
+    Returns
+    -------
+    fingerprint : str
+        a hash string that only depends on the schematic content.
+    """
+    content_str = repr(_to_canonical(content)).encode('utf-8')
+    return hashlib.sha1(content_str).hexdigest()
+
+
 class DbAccess(InterfaceBase, abc.ABC):
     """A class that manipulates the CAD database.
 
@@ -91,6 +120,8 @@ class DbAccess(InterfaceBase, abc.ABC):
 
         # set default lib path
         self._default_lib_path = self.get_default_lib_path(db_config)
+        # library name -> cell name -> fingerprint of the implemented schematic content
+        self._sch_fingerprints = {}  # type: Dict[str, Dict[str, str]]
 
     @classmethod
     def get_default_lib_path(cls, db_config):
@@ -417,6 +448,28 @@ class DbAccess(InterfaceBase, abc.ABC):
         else:
             return netlist, log_fname
 
+    async def async_call(self, fun, *args, **kwargs):
+        """Call the given function that accesses the CAD database in an asyncio event loop.
+
+        The default implementation simply calls the function, blocking the event loop.
+        Subclasses can override this method to run the function without blocking.
+
+        Parameters
+        ----------
+        fun : Callable[..., Any]
+            the function to call.
+        *args : Any
+            positional arguments.
+        **kwargs : Any
+            keyword arguments.
+
+        Returns
+        -------
+        result : Any
+            the function return value.
+        """
+        return fun(*args, **kwargs)
+
     async def async_run_lvs(self, lib_name: str, cell_name: str, **kwargs: Any) -> Tuple[bool, str]:
         """A coroutine for running LVS.
 
@@ -579,9 +632,12 @@ class DbAccess(InterfaceBase, abc.ABC):
                 self._import_design(inst_lib_name, inst_cell_name, imported_cells, dsn_db,
                                     new_lib_path)
 
-    def instantiate_schematic(self, lib_name, content_list, lib_path=''):
+    def instantiate_schematic(self, lib_name, content_list, lib_path='', force=False):
         """Create the given schematics in CAD database.
 
+        The fingerprint of each implemented schematic is recorded, and schematics with
+        the same content as the last implementation in the same library are skipped.
+
         Parameters
         ----------
         lib_name : str
@@ -590,12 +646,20 @@ class DbAccess(InterfaceBase, abc.ABC):
             list of schematics to create.
         lib_path : str
             the path to create the library in.  If empty, use default location.
+        force : bool
+            True to implement all schematics, even if they did not change.
         """
-        template_list, change_list = [], []
+        lib_fingerprints = self._sch_fingerprints.get(lib_name, {})
+        template_list, change_list, new_fingerprints = [], [], []
         for content in content_list:
             if content is not None:
                 master_lib, master_cell, impl_cell, pin_map, inst_map, new_pins = content
 
+                fingerprint = get_schematic_fingerprint(content)
+                if not force and lib_fingerprints.get(impl_cell, None) == fingerprint:
+                    continue
+                new_fingerprints.append((impl_cell, fingerprint))
+
                 # add to template list
                 template_list.append([master_lib, master_cell, impl_cell])
 
@@ -608,4 +672,29 @@ class DbAccess(InterfaceBase, abc.ABC):
                 )
                 change_list.append(change)
 
+        if not change_list and lib_name in self._sch_fingerprints:
+            # nothing changed since the last implementation
+            return
+
+        # forget old fingerprints in case implementation fails
+        for impl_cell, _ in new_fingerprints:
+            lib_fingerprints.pop(impl_cell, None)
+        self._sch_fingerprints[lib_name] = lib_fingerprints
         self.create_implementation(lib_name, template_list, change_list, lib_path=lib_path)
+        lib_fingerprints.update(new_fingerprints)
+
+    def clear_schematic_fingerprints(self, lib_name=None):
+        # type: (Optional[str]) -> None
+        """Forget the implemented schematic fingerprints, so all schematics are implemented again.
+
+        Call this method if implemented schematics are modified or deleted outside of BAG.
+
+        Parameters
+        ----------
+        lib_name : Optional[str]
+            the library name.  If None, fingerprints of all libraries are cleared.
+        """
+        if lib_name is None:
+            self._sch_fingerprints.clear()
+        else:
+            self._sch_fingerprints.pop(lib_name, None)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""This module defines DbAccessPool, which shards CAD database operations across servers.
+"""
+
+from typing import TYPE_CHECKING, List, Dict, Any, Sequence
+
+import asyncio
+import functools
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, Future
+
+if TYPE_CHECKING:
+    from .database import DbAccess
+
+
+class DbAccessPool(object):
+    """A pool of CAD database servers, with operations dispatched by library.
+
+    Each library is assigned to one server the first time it is used, so all operations on
+    a library are performed by the same server in the order they are issued, which respects
+    library write locks.  New libraries are assigned to the server with the fewest
+    libraries.  Each server is driven by its own worker thread, so operations on libraries
+    assigned to different servers can run in parallel.
+
+    By default, every operation waits for its result.  Inside a :meth:`parallel` block,
+    operations that modify the database return immediately without waiting, and all of them
+    are waited for at the end of the block.
+
+    Parameters
+    ----------
+    db_list : Sequence[DbAccess]
+        the database access objects, one per server.  The first one is the primary server.
+    """
+
+    # methods that modify the database and have no useful return value
+    deferred_methods = frozenset(['create_library', 'create_implementation',
+                                  'instantiate_schematic', 'instantiate_layout',
+                                  'instantiate_layout_pcell', 'release_write_locks',
+                                  'create_schematic_from_netlist', 'create_verilog_view'])
+
+    def __init__(self, db_list):
+        # type: (Sequence[DbAccess]) -> None
+        if not db_list:
+            raise ValueError('Database server pool cannot be empty.')
+        self._db_list = list(db_list)
+        self._executors = [ThreadPoolExecutor(max_workers=1) for _ in self._db_list]
+        self._lib_table = {}  # type: Dict[str, int]
+        self._num_libs = [0] * len(self._db_list)
+        self._lock = threading.Lock()
+        self._parallel_depth = 0
+        self._pending = []  # type: List[Future]
+
+    @property
+    def num_servers(self):
+        # type: () -> int
+        """Number of servers in this pool."""
+        return len(self._db_list)
+
+    @property
+    def db_list(self):
+        # type: () -> List[DbAccess]
+        """List of database access objects of all servers."""
+        return self._db_list
+
+    def get_server_index(self, lib_name):
+        # type: (str) -> int
+        """Returns the index of the server the given library is assigned to.
+
+        Parameters
+        ----------
+        lib_name : str
+            the library name.
+
+        Returns
+        -------
+        idx : int
+            the server index.
+        """
+        with self._lock:
+            idx = self._lib_table.get(lib_name, None)
+            if idx is None:
+                num_libs = self._num_libs
+                idx = min(range(len(num_libs)), key=num_libs.__getitem__)
+                num_libs[idx] += 1
+                self._lib_table[lib_name] = idx
+            return idx
+
+    def get_db(self, lib_name):
+        # type: (str) -> DbAccess
+        """Returns the database access object of the server the given library is assigned to."""
+        return self._db_list[self.get_server_index(lib_name)]
+
+    def get_lib_db(self, lib_name):
+        # type: (str) -> LibDbAccess
+        """Returns a database access object that runs all methods on the given library's server.
+
+        Unlike get_db(), methods of the returned object are dispatched like call(), so they
+        are ordered with all other operations on the library, and are safe to use inside a
+        :meth:`parallel` block.
+
+        Parameters
+        ----------
+        lib_name : str
+            the library name.
+
+        Returns
+        -------
+        db : LibDbAccess
+            the database access object.
+        """
+        return LibDbAccess(self, lib_name)
+
+    def submit(self, lib_name, fun_name, *args, **kwargs):
+        # type: (str, str, *Any, **Any) -> Future
+        """Schedule the given database method on the server of the given library.
+
+        Parameters
+        ----------
+        lib_name : str
+            the library name.
+        fun_name : str
+            the DbAccess method name.
+        *args : Any
+            method positional arguments.
+        **kwargs : Any
+            method keyword arguments.
+
+        Returns
+        -------
+        future : Future
+            the Future object of the method result.
+        """
+        idx = self.get_server_index(lib_name)
+        fun = getattr(self._db_list[idx], fun_name)
+        return self._executors[idx].submit(fun, *args, **kwargs)
+
+    def call(self, lib_name, fun_name, *args, **kwargs):
+        # type: (str, str, *Any, **Any) -> Any
+        """Call the given database method on the server of the given library.
+
+        Inside a :meth:`parallel` block, methods in deferred_methods return None
+        immediately instead of waiting for the result.
+
+        Parameters
+        ----------
+        lib_name : str
+            the library name.
+        fun_name : str
+            the DbAccess method name.
+        *args : Any
+            method positional arguments.
+        **kwargs : Any
+            method keyword arguments.
+
+        Returns
+        -------
+        result : Any
+            the method return value.
+        """
+        future = self.submit(lib_name, fun_name, *args, **kwargs)
+        if self._parallel_depth > 0 and fun_name in self.deferred_methods:
+            self._pending.append(future)
+            return None
+        return future.result()
+
+    async def async_call(self, lib_name, fun_name, *args, **kwargs):
+        # type: (str, str, *Any, **Any) -> Any
+        """Coroutine version of :meth:`call`, which waits without blocking the event loop.
+
+        Parameters
+        ----------
+        lib_name : str
+            the library name.
+        fun_name : str
+            the DbAccess method name.
+        *args : Any
+            method positional arguments.
+        **kwargs : Any
+            method keyword arguments.
+
+        Returns
+        -------
+        result : Any
+            the method return value.
+        """
+        return await asyncio.wrap_future(self.submit(lib_name, fun_name, *args, **kwargs))
+
+    def wait(self):
+        # type: () -> None
+        """Wait for all deferred operations to finish.
+
+        Raises
+        ------
+        Exception :
+            the first exception raised by the deferred operations, after all of them
+            finish.
+        """
+        pending = self._pending
+        self._pending = []
+        error = None
+        for future in pending:
+            ex = future.exception()
+            if ex is not None and error is None:
+                error = ex
+        if error is not None:
+            raise error
+
+    @contextlib.contextmanager
+    def parallel(self):
+        """A context manager in which database modifications do not wait for results.
+
+        All deferred operations are waited for when the outermost block exits.
+        """
+        self._parallel_depth += 1
+        try:
+            yield self
+        finally:
+            self._parallel_depth -= 1
+            if self._parallel_depth == 0:
+                self.wait()
+
+    def close(self):
+        # type: () -> None
+        """Wait for all operations to finish, then close all servers."""
+        try:
+            self.wait()
+        finally:
+            for executor in self._executors:
+                executor.shutdown()
+            for db in self._db_list:
+                db.close()
+
+
+class LibDbAccess(object):
+    """A DbAccess wrapper that calls methods on the pool server assigned to a library.
+
+    Regular methods are dispatched with :meth:`DbAccessPool.call`.  Coroutine methods and
+    attributes are returned from the DbAccess object of the server directly.
+
+    Parameters
+    ----------
+    pool : DbAccessPool
+        the database server pool.
+    lib_name : str
+        the library name.
+    """
+
+    def __init__(self, pool, lib_name):
+        # type: (DbAccessPool, str) -> None
+        self._pool = pool
+        self._lib_name = lib_name
+
+    @property
+    def lib_name(self):
+        # type: () -> str
+        """The library name."""
+        return self._lib_name
+
+    def __getattr__(self, name):
+        # type: (str) -> Any
+        attr = getattr(self._pool.get_db(self._lib_name), name)
+        if not callable(attr) or asyncio.iscoroutinefunction(attr):
+            return attr
+        return functools.partial(self._pool.call, self._lib_name, name)
@@ -11,7 +11,9 @@ Client-side communication:
 
 the client will always send a request object, which is a python dictionary.
 This script processes the request and sends the appropriate commands to
-Virtuoso.
+Virtuoso.  A batch request contains a list of skill requests, which are all
+evaluated before a single reply containing the list of all results is sent back,
+saving a socket round trip for each expression.
 
 Virtuoso side communication:
 
@@ -20,55 +22,55 @@ will print a single line of integer indicating the number of bytes to read.
 Then, virtuoso will print out exactly that many bytes of data, followed by
 a newline (to flush the standard input).  This script handles that protcol
 and will strip the newline before sending result back to client.
+
+Large arguments and results are passed to Virtuoso through files.  By default the
+same few files are reused for every request, and they are removed when the server
+closes.  Small arguments can instead be inlined in the skill expression.
 """
 
+import os
+import shutil
 import traceback
 
 import bag.io
 
 
-def _object_to_skill_file_helper(py_obj, file_obj):
-    """Recursive helper function for object_to_skill_file
+# number of strings to buffer before writing to file
+_skill_file_buffer_size = 16384
+
+
+def _write_homogeneous_list(py_obj, parts):
+    """Write the given list if all elements are floats or all elements are integers.
 
     Parameters
     ----------
-    py_obj : any
-        the object to convert.
-    file_obj : file
-        the file object to write to.  Must be created with bag.io
-        package so that encodings are handled correctly.
+    py_obj : Union[list, tuple]
+        the list to write.
+    parts : list[str]
+        the output string list.
+
+    Returns
+    -------
+    success : bool
+        True if the given list is written.
     """
-    # fix potential raw bytes
-    py_obj = bag.io.fix_string(py_obj)
-    if isinstance(py_obj, str):
-        # string
-        file_obj.write(py_obj)
-    elif isinstance(py_obj, float):
-        # prepend type flag
-        file_obj.write('#float {:f}'.format(py_obj))
-    elif isinstance(py_obj, bool):
-        bool_val = 1 if py_obj else 0
-        file_obj.write('#bool {:d}'.format(bool_val))
-    elif isinstance(py_obj, int):
-        # prepend type flag
-        file_obj.write('#int {:d}'.format(py_obj))
-    elif isinstance(py_obj, list) or isinstance(py_obj, tuple):
-        # a list of other objects.
-        file_obj.write('#list\n')
-        for val in py_obj:
-            _object_to_skill_file_helper(val, file_obj)
-            file_obj.write('\n')
-        file_obj.write('#end')
-    elif isinstance(py_obj, dict):
-        # disembodied property lists
-        file_obj.write('#prop_list\n')
-        for key, val in py_obj.items():
-            file_obj.write('{}\n'.format(key))
-            _object_to_skill_file_helper(val, file_obj)
-            file_obj.write('\n')
-        file_obj.write('#end')
+    if not py_obj:
+        return False
+    val_type = type(py_obj[0])
+    if val_type is float:
+        fmt = '#float %f\n'
+    elif val_type is int:
+        fmt = '#int %d\n'
     else:
-        raise Exception('Unsupported python data type: %s' % type(py_obj))
+        return False
+    for val in py_obj:
+        if type(val) is not val_type:
+            return False
+
+    parts.append('#list\n')
+    parts.append(''.join([fmt % val for val in py_obj]))
+    parts.append('#end\n')
+    return True
 
 
 def object_to_skill_file(py_obj, file_obj):
@@ -78,6 +80,9 @@ def object_to_skill_file(py_obj, file_obj):
     skill object by Virtuoso.  Currently only strings, lists, and dictionaries
     are supported.
 
+    The object is traversed iteratively, so deeply nested objects are supported, and
+    the output is written in large chunks.
+
     Parameters
     ----------
     py_obj : any
@@ -86,8 +91,108 @@ def object_to_skill_file(py_obj, file_obj):
         the file object to write to.  Must be created with bag.io
         package so that encodings are handled correctly.
     """
-    _object_to_skill_file_helper(py_obj, file_obj)
-    file_obj.write('\n')
+    parts = []
+    append = parts.append
+    # each entry is an iterator over list values, or over dictionary (key, value) pairs
+    stack = [(iter((py_obj,)), False)]
+    while stack:
+        cur_iter, is_dict = stack[-1]
+        for val in cur_iter:
+            if is_dict:
+                key, val = val
+                append('{}\n'.format(key))
+            # fix potential raw bytes
+            val = bag.io.fix_string(val)
+            if isinstance(val, str):
+                append(val)
+                append('\n')
+            elif isinstance(val, float):
+                # prepend type flag
+                append('#float {:f}\n'.format(val))
+            elif isinstance(val, bool):
+                append('#bool 1\n' if val else '#bool 0\n')
+            elif isinstance(val, int):
+                # prepend type flag
+                append('#int {:d}\n'.format(val))
+            elif isinstance(val, list) or isinstance(val, tuple):
+                # a list of other objects.
+                if not _write_homogeneous_list(val, parts):
+                    append('#list\n')
+                    stack.append((iter(val), False))
+                    break
+            elif isinstance(val, dict):
+                # disembodied property lists
+                append('#prop_list\n')
+                stack.append((iter(val.items()), True))
+                break
+            else:
+                raise Exception('Unsupported python data type: %s' % type(val))
+
+            if len(parts) > _skill_file_buffer_size:
+                file_obj.write(''.join(parts))
+                del parts[:]
+        else:
+            # all values written
+            stack.pop()
+            if stack:
+                append('#end\n')
+
+    file_obj.write(''.join(parts))
+
+
+def to_skill_str(val):
+    """Returns the given string as a skill string literal.
+
+    Parameters
+    ----------
+    val : str
+        the string.
+
+    Returns
+    -------
+    skill_str : str
+        the double quoted skill string literal.
+    """
+    val = val.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '"%s"' % val
+
+
+# prefix of inlined skill file contents.  parse_data_from_file() in start_bag.il reads
+# arguments starting with this prefix as file contents instead of file names.
+inline_prefix = '#inline\n'
+
+
+class _SpillBuffer(object):
+    """A write buffer that moves its content to a file once it exceeds the given size.
+
+    Parameters
+    ----------
+    threshold : int
+        maximum number of characters kept in memory.
+    open_fun : callable
+        a function that returns the file object to write to.
+    """
+
+    def __init__(self, threshold, open_fun):
+        self._threshold = threshold
+        self._open_fun = open_fun
+        self._parts = []
+        self._size = 0
+        self.file_obj = None
+
+    def write(self, data):
+        if self.file_obj is not None:
+            self.file_obj.write(data)
+        else:
+            self._parts.append(data)
+            self._size += len(data)
+            if self._size > self._threshold:
+                self.file_obj = self._open_fun()
+                self.file_obj.write(''.join(self._parts))
+                self._parts = None
+
+    def getvalue(self):
+        return ''.join(self._parts)
 
 
 bag_proc_prompt = 'BAG_PROMPT>>> '
@@ -111,15 +216,27 @@ class SkillServer(object):
         the virtuoso output file.  Must be created with bag.io
         package so that encodings are handled correctly.
     tmpdir : str or None
-        if given, will save all temporary files to this folder.
+        if given, will save all temporary files to this folder.  Use a RAM-backed
+        directory such as /dev/shm to avoid disk I/O.
+    inline_threshold : int
+        input files whose content is at most this many characters are inlined in the
+        skill expression instead.  0 to disable.  Requires the parse_data_from_file()
+        function in start_bag.il that supports inlined content.
+    reuse_files : bool
+        True to reuse the same files for every request, and remove them when this server
+        closes.  False to create new files for every request and keep them, which is
+        useful for debugging.
     """
 
-    def __init__(self, router, virt_in, virt_out, tmpdir=None):
+    def __init__(self, router, virt_in, virt_out, tmpdir=None, inline_threshold=0,
+                 reuse_files=True):
         """Create a new SkillOceanServer instance.
         """
         self.handler = router
         self.virt_in = virt_in
         self.virt_out = virt_out
+        self.inline_threshold = inline_threshold
+        self.reuse_files = reuse_files
 
         # create a directory for all temporary files
         self.dtmp = bag.io.make_temp_dir('skillTmp', parent_dir=tmpdir)
@@ -135,12 +252,9 @@ class SkillServer(object):
                     if req['type'] == 'exit':
                         self.close()
                     elif req['type'] == 'skill':
-                        expr, out_file = self.process_skill_request(req)
-                        if expr is not None:
-                            # send expression to virtuoso
-                            self.send_skill(expr)
-                            msg = self.recv_skill()
-                            self.process_skill_result(msg, out_file)
+                        self.handler.send_obj(self.eval_skill_request(req))
+                    elif req['type'] == 'skill_batch':
+                        self.handler.send_obj(self.eval_skill_batch(req))
                     else:
                         msg = '*Error* bag server error: bag request:\n%s' % str(req)
                         self.handler.send_obj(dict(type='error', data=msg))
@@ -148,6 +262,64 @@ class SkillServer(object):
                     msg = '*Error* bag server error: bag request:\n%s' % str(req)
                     self.handler.send_obj(dict(type='error', data=msg))
 
+    def eval_skill_request(self, request):
+        """Evaluate the given skill request in Virtuoso.
+
+        Parameters
+        ----------
+        request : dict
+            the skill request object.
+
+        Returns
+        -------
+        reply : dict
+            the reply object.
+        """
+        expr, out_file, reply = self._get_skill_expr(request)
+        if expr is None:
+            return reply
+        # send expression to virtuoso
+        self.send_skill(expr)
+        msg = self.recv_skill()
+        return self._get_skill_reply(msg, out_file)
+
+    def eval_skill_batch(self, request):
+        """Evaluate all skill requests in the given batch request in Virtuoso.
+
+        Parameters
+        ----------
+        request : dict
+            the batch request object.  The 'requests' entry is the list of skill requests.
+            If the 'stop_on_error' entry is True, requests after the first error are not
+            evaluated.
+
+        Returns
+        -------
+        reply : dict
+            the reply object.  The 'data' entry is the list of reply objects of each skill
+            request, and the 'id' entry is the batch ID given in the request.
+        """
+        batch_id = request.get('id', None)
+        try:
+            req_list = request['requests']
+        except KeyError as e:
+            msg = '*Error* bag server error: %s' % str(e)
+            return dict(type='error', id=batch_id, data=msg)
+
+        stop_on_error = request.get('stop_on_error', False)
+        reply_list = []
+        error = False
+        for req in req_list:
+            if error and stop_on_error:
+                msg = '*Error* skipped because of previous error.'
+                reply_list.append(dict(type='error', data=msg))
+            else:
+                reply = self.eval_skill_request(req)
+                error = error or reply['type'] == 'error'
+                reply_list.append(reply)
+
+        return dict(type='batch', id=batch_id, data=reply_list)
+
     def send_skill(self, expr):
         """Sends expr to virtuoso for evaluation.
 
@@ -170,6 +342,8 @@ class SkillServer(object):
     def close(self):
         """Close this server."""
         self.handler.close()
+        if self.reuse_files:
+            shutil.rmtree(self.dtmp, ignore_errors=True)
 
     def process_skill_request(self, request):
         """Process the given skill request.
@@ -191,38 +365,77 @@ class SkillServer(object):
         out_file : str or None
             if not None, the result will be written to this file.
         """
+        expr, out_file, reply = self._get_skill_expr(request)
+        if expr is None:
+            self.handler.send_obj(reply)
+        return expr, out_file
+
+    def _get_skill_expr(self, request):
+        """Returns the skill expression and output file, or the error reply object."""
         try:
             expr = request['expr']
             input_files = request['input_files'] or {}
             out_file = request['out_file']
         except KeyError as e:
             msg = '*Error* bag server error: %s' % str(e)
-            self.handler.send_obj(dict(type='error', data=msg))
-            return None, None
+            return None, None, dict(type='error', data=msg)
 
         fname_dict = {}
         # write input parameters to files
         for key, val in input_files.items():
-            with bag.io.open_temp(prefix=key, delete=False, dir=self.dtmp) as file_obj:
-                fname_dict[key] = '"%s"' % file_obj.name
-                # noinspection PyBroadException
-                try:
-                    object_to_skill_file(val, file_obj)
-                except Exception:
-                    stack_trace = traceback.format_exc()
-                    msg = '*Error* bag server error: \n%s' % stack_trace
-                    self.handler.send_obj(dict(type='error', data=msg))
-                    return None, None
+            # noinspection PyBroadException
+            try:
+                fname_dict[key] = self._write_input_file(key, val)
+            except Exception:
+                stack_trace = traceback.format_exc()
+                msg = '*Error* bag server error: \n%s' % stack_trace
+                return None, None, dict(type='error', data=msg)
 
         # generate output file
         if out_file:
-            with bag.io.open_temp(prefix=out_file, delete=False, dir=self.dtmp) as file_obj:
+            with self._open_file('out_' + out_file) as file_obj:
                 fname_dict[out_file] = '"%s"' % file_obj.name
                 out_file = file_obj.name
 
         # fill in parameters to expression
         expr = expr.format(**fname_dict)
-        return expr, out_file
+        return expr, out_file, None
+
+    def _open_file(self, name):
+        """Open a new file with the given name in the temporary directory for writing."""
+        if self.reuse_files:
+            return bag.io.open_file(os.path.join(self.dtmp, name), 'w')
+        return bag.io.open_temp(prefix=name, delete=False, dir=self.dtmp)
+
+    def _write_input_file(self, key, val):
+        """Write the given input object, and returns the skill argument that refers to it.
+
+        Parameters
+        ----------
+        key : str
+            the input file key.
+        val : any
+            the input object.
+
+        Returns
+        -------
+        arg : str
+            the quoted file name, or the inlined file content.
+        """
+        if self.inline_threshold <= 0:
+            with self._open_file('in_' + key) as file_obj:
+                object_to_skill_file(val, file_obj)
+            return '"%s"' % file_obj.name
+
+        buf = _SpillBuffer(self.inline_threshold, lambda: self._open_file('in_' + key))
+        try:
+            object_to_skill_file(val, buf)
+        finally:
+            if buf.file_obj is not None:
+                buf.file_obj.close()
+        if buf.file_obj is None:
+            return to_skill_str(inline_prefix + buf.getvalue())
+        return '"%s"' % buf.file_obj.name
 
     def process_skill_result(self, msg, out_file=None):
         """Process the given skill output, then send result to socket.
@@ -234,20 +447,24 @@ class SkillServer(object):
         out_file : str or None
             if not None, read result from this file.
         """
+        self.handler.send_obj(self._get_skill_reply(msg, out_file))
+
+    @classmethod
+    def _get_skill_reply(cls, msg, out_file):
+        """Returns the reply object of the given skill output."""
         # read file if needed, and only if there are no errors.
         if msg.startswith('*Error*'):
             # an error occurred, forward error message directly
-            self.handler.send_obj(dict(type='error', data=msg))
+            return dict(type='error', data=msg)
         elif out_file:
             # read result from file.
             try:
                 msg = bag.io.read_file(out_file)
-                data = dict(type='str', data=msg)
+                return dict(type='str', data=msg)
             except IOError:
                 stack_trace = traceback.format_exc()
                 msg = '*Error* error reading file:\n%s' % stack_trace
-                data = dict(type='error', data=msg)
-            self.handler.send_obj(data)
+                return dict(type='error', data=msg)
         else:
             # return output from virtuoso directly
-            self.handler.send_obj(dict(type='str', data=msg))
+            return dict(type='str', data=msg)
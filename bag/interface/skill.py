@@ -3,10 +3,13 @@
 """This module implements all CAD database manipulations using skill commands.
 """
 
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Tuple, Sequence, Union
 
 import os
 import shutil
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
 
@@ -14,6 +17,7 @@ import bag
 from ..io.common import get_encoding, fix_string
 from ..io.file import open_temp
 from .database import DbAccess
+from .zmqwrapper import AsyncZMQDealer
 
 try:
     import cybagoa
@@ -87,6 +91,22 @@ def _handle_reply(reply):
         raise Exception('Unknown reply format: %s' % reply)
 
 
+def _is_batch_reply(reply):
+    """Returns True if the given reply is the reply of a batch request."""
+    return isinstance(reply, dict) and 'id' in reply
+
+
+def _make_skill_request(expr, input_files=None, out_file=None):
+    # type: (str, Optional[Dict[str, Any]], Optional[str]) -> Dict[str, Any]
+    """Returns the request object that evaluates the given skill expression."""
+    return dict(
+        type='skill',
+        expr=expr,
+        input_files=input_files,
+        out_file=out_file,
+    )
+
+
 class VirtuosoException(Exception):
     """Exception raised when Virtuoso returns an error."""
 
@@ -117,6 +137,10 @@ class SkillInterface(DbAccess):
         DbAccess.__init__(self, tmp_dir, db_config)
         self.handler = dealer
         self._rcx_jobs = {}
+        self._batch_count = 0
+        # batch ID -> batch reply received while waiting for other replies
+        self._batch_replies = {}  # type: Dict[int, Dict[str, Any]]
+        self._pending_batches = set()
 
     def close(self):
         """Terminate the database server gracefully.
@@ -166,17 +190,120 @@ class SkillInterface(DbAccess):
         :class: `.VirtuosoException` :
             if virtuoso encounters errors while evaluating the expression.
         """
-        request = dict(
-            type='skill',
-            expr=expr,
-            input_files=input_files,
-            out_file=out_file,
-        )
-
-        self.handler.send_obj(request)
-        reply = self.handler.recv_obj()
+        self.handler.send_obj(_make_skill_request(expr, input_files=input_files,
+                                                  out_file=out_file))
+        reply = self._recv_reply()
+        while _is_batch_reply(reply):
+            # reply of a pending batch request
+            self._batch_replies[reply['id']] = reply
+            reply = self._recv_reply()
         return _handle_reply(reply)
 
+    def _recv_reply(self):
+        # type: () -> Any
+        """Receive a reply from the server."""
+        return self.handler.recv_obj()
+
+    def send_skill_batch(self, request_list, stop_on_error=False):
+        # type: (Sequence[Union[str, Dict[str, Any]]], bool) -> int
+        """Send a request to evaluate a batch of skill expressions without waiting for results.
+
+        All expressions are sent in a single message, and evaluated by the server before a
+        single reply is sent back, so the socket round trip latency is paid once per batch.
+        Several batches can be in flight at the same time.  Use recv_skill_batch() to get
+        the results.
+
+        Parameters
+        ----------
+        request_list : Sequence[Union[str, Dict[str, Any]]]
+            list of skill expressions to evaluate, in order.  Each entry is either the
+            expression string, or a dictionary of _eval_skill() keyword arguments, with
+            keys 'expr', and optionally 'input_files' and 'out_file'.
+        stop_on_error : bool
+            True to not evaluate the remaining expressions after the first error.
+
+        Returns
+        -------
+        batch_id : int
+            the batch ID.
+        """
+        req_list = [_make_skill_request(req) if isinstance(req, str) else
+                    _make_skill_request(**req) for req in request_list]
+        batch_id = self._batch_count
+        self._batch_count += 1
+        self.handler.send_obj(dict(type='skill_batch', id=batch_id, requests=req_list,
+                                   stop_on_error=stop_on_error))
+        self._pending_batches.add(batch_id)
+        return batch_id
+
+    def recv_skill_batch(self, batch_id, return_exceptions=False):
+        # type: (int, bool) -> List[Any]
+        """Wait for and returns the results of the given batch request.
+
+        Parameters
+        ----------
+        batch_id : int
+            the batch ID returned by send_skill_batch().
+        return_exceptions : bool
+            True to return the :class:`.VirtuosoException` of each failed expression in the
+            result list.  Otherwise, the first error is raised.
+
+        Returns
+        -------
+        results : List[Any]
+            the string representation of the result of each expression.
+
+        Raises
+        ------
+        :class: `.VirtuosoException` :
+            if virtuoso encounters errors while evaluating an expression, and
+            return_exceptions is False.
+        """
+        if batch_id not in self._pending_batches:
+            raise ValueError('Batch %d is not pending.' % batch_id)
+        while batch_id not in self._batch_replies:
+            reply = self._recv_reply()
+            if not _is_batch_reply(reply):
+                raise Exception('Unknown reply format: %s' % reply)
+            self._batch_replies[reply['id']] = reply
+        self._pending_batches.remove(batch_id)
+        reply = self._batch_replies.pop(batch_id)
+        if reply.get('type') != 'batch':
+            # the batch request itself failed
+            return [_handle_reply(reply)]
+
+        results = []
+        for item in reply['data']:
+            try:
+                results.append(_handle_reply(item))
+            except VirtuosoException as ex:
+                if not return_exceptions:
+                    raise
+                results.append(ex)
+        return results
+
+    def eval_skill_batch(self, request_list, stop_on_error=False, return_exceptions=False):
+        # type: (Sequence[Union[str, Dict[str, Any]]], bool, bool) -> List[Any]
+        """Evaluate a batch of skill expressions with a single server round trip.
+
+        Parameters
+        ----------
+        request_list : Sequence[Union[str, Dict[str, Any]]]
+            list of skill expressions to evaluate.  See send_skill_batch() for details.
+        stop_on_error : bool
+            True to not evaluate the remaining expressions after the first error.
+        return_exceptions : bool
+            True to return the :class:`.VirtuosoException` of each failed expression in the
+            result list.  Otherwise, the first error is raised.
+
+        Returns
+        -------
+        results : List[Any]
+            the string representation of the result of each expression.
+        """
+        batch_id = self.send_skill_batch(request_list, stop_on_error=stop_on_error)
+        return self.recv_skill_batch(batch_id, return_exceptions=return_exceptions)
+
     def parse_schematic_template(self, lib_name, cell_name):
         """Parse the given schematic template.
 
@@ -213,6 +340,26 @@ class SkillInterface(DbAccess):
         cmd = 'get_cells_in_library_file( "%s" {cell_file} )' % lib_name
         return self._eval_skill(cmd, out_file='cell_file').split()
 
+    def get_cells_in_libraries(self, lib_list):
+        # type: (Sequence[str]) -> Dict[str, List[str]]
+        """Get the cells in each of the given libraries with a single server round trip.
+
+        Parameters
+        ----------
+        lib_list : Sequence[str]
+            list of library names.
+
+        Returns
+        -------
+        cell_table : Dict[str, List[str]]
+            a dictionary from library name to the list of cells in that library.  The list
+            is empty if the library does not exist.
+        """
+        req_list = [dict(expr='get_cells_in_library_file( "%s" {cell_file} )' % lib_name,
+                         out_file='cell_file') for lib_name in lib_list]
+        results = self.eval_skill_batch(req_list)
+        return {lib_name: result.split() for lib_name, result in zip(lib_list, results)}
+
     def create_library(self, lib_name, lib_path=''):
         """Create a new library if one does not exist yet.
 
@@ -326,7 +473,7 @@ class SkillInterface(DbAccess):
                          def_files=to_skill_list_str(tb_config['def_files']),
                          tech_lib=self.db_config['schematic']['tech_lib'],
                          result_file='{result_file}')
-        output = yaml.load(self._eval_skill(cmd, out_file='result_file'))
+        output = yaml.load(self._eval_skill(cmd, out_file='result_file'), Loader=yaml.Loader)
         return tb_config['default_env'], output['corners'], output['parameters'], output['outputs']
 
     def get_testbench_info(self, tb_lib, tb_cell):
@@ -354,7 +501,7 @@ class SkillInterface(DbAccess):
         cmd = cmd.format(tb_lib=tb_lib,
                          tb_cell=tb_cell,
                          result_file='{result_file}')
-        output = yaml.load(self._eval_skill(cmd, out_file='result_file'))
+        output = yaml.load(self._eval_skill(cmd, out_file='result_file'), Loader=yaml.Loader)
         return output['enabled_corners'], output['corners'], output['parameters'], output['outputs']
 
     def update_testbench(self,
@@ -520,12 +667,10 @@ class SkillInterface(DbAccess):
                 fname = f.name
                 f.write(content)
 
-            # delete old calibre view
-            cmd = 'delete_cellview( "%s" "%s" "%s" )' % (lib_name, cell_name, sch_view)
-            self._eval_skill(cmd)
-            # make extracted schematic
-            cmd = 'mgc_rve_load_setup_file( "%s" )' % fname
-            self._eval_skill(cmd)
+            # delete old calibre view, then make extracted schematic
+            cmd_list = ['delete_cellview( "%s" "%s" "%s" )' % (lib_name, cell_name, sch_view),
+                        'mgc_rve_load_setup_file( "%s" )' % fname]
+            self.eval_skill_batch(cmd_list, stop_on_error=True)
         else:
             # get netlists to copy
             netlist_dir = os.path.dirname(netlist)
@@ -586,8 +731,189 @@ class SkillInterface(DbAccess):
         **kwargs : Any
             additional implementation-dependent arguments.
         """
-        # delete old verilog view
-        cmd = 'delete_cellview( "%s" "%s" "verilog" )' % (lib_name, cell_name)
-        self._eval_skill(cmd)
-        cmd = 'schInstallHDL("%s" "%s" "verilog" "%s" t)' % (lib_name, cell_name, verilog_file)
-        self._eval_skill(cmd)
+        # delete old verilog view, then create the new one
+        cmd_list = ['delete_cellview( "%s" "%s" "verilog" )' % (lib_name, cell_name),
+                    'schInstallHDL("%s" "%s" "verilog" "%s" t)' % (lib_name, cell_name,
+                                                                   verilog_file)]
+        self.eval_skill_batch(cmd_list, stop_on_error=True)
+
+
+def _make_async_method(name):
+    """Returns a coroutine version of the given SkillInterface method."""
+
+    async def async_method(self, *args, **kwargs):
+        return await self.async_call(getattr(self, name), *args, **kwargs)
+
+    async_method.__name__ = 'async_' + name
+    async_method.__doc__ = 'Coroutine version of :meth:`SkillInterface.%s`.' % name
+    return async_method
+
+
+class AsyncSkillInterface(SkillInterface):
+    """A SkillInterface that can also be used from asyncio event loops.
+
+    All synchronous methods work as in :class:`SkillInterface`.  In addition, each
+    database method has a coroutine version with the ``async_`` prefix, so CAD database
+    operations can overlap with simulations, LVS, and RCX in the same event loop.
+
+    Coroutine versions run the synchronous method in a dedicated worker thread, and the
+    skill expressions the method evaluates are sent from the event loop with an
+    :class:`~bag.interface.AsyncZMQDealer`.  Concurrent requests are pipelined on that
+    socket.  Because there is only one worker thread, database methods never run
+    concurrently with each other, so the design and layout databases they access need
+    not be thread-safe.
+
+    Parameters
+    ----------
+    dealer : :class:`bag.interface.ZMQDealer`
+        the socket used to communicate with :class:`~bag.interface.SkillOceanServer`.
+    tmp_dir : string
+        temporary file directory for DbAccess.
+    db_config : dict[str, any]
+        the database configuration dictionary.
+    """
+
+    def __init__(self, dealer, tmp_dir, db_config):
+        SkillInterface.__init__(self, dealer, tmp_dir, db_config)
+        self._async_handler = None  # type: Optional[AsyncZMQDealer]
+        self._async_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._async_lock = None  # type: Optional[asyncio.Lock]
+        # batch ID -> reply received on the asyncio socket
+        self._async_replies = {}  # type: Dict[int, Dict[str, Any]]
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # the event loop of the coroutine method running in the worker thread
+        self._thread_info = threading.local()
+
+    def close(self):
+        """Terminate the database server gracefully.
+        """
+        self._executor.shutdown()
+        if self._async_handler is not None:
+            self._async_handler.close()
+        SkillInterface.close(self)
+
+    def _get_async_handler(self):
+        # type: () -> AsyncZMQDealer
+        if self._async_handler is None:
+            dealer = self.handler
+            self._async_handler = AsyncZMQDealer(dealer.port, pipeline=dealer.pipeline,
+                                                 host=dealer.host, codec=dealer.codec_name)
+        loop = asyncio.get_event_loop()
+        if self._async_loop is not loop:
+            # asyncio locks cannot be shared between event loops
+            self._async_loop = loop
+            self._async_lock = asyncio.Lock()
+        return self._async_handler
+
+    async def _async_recv_batch(self, batch_id):
+        # type: (int) -> Dict[str, Any]
+        """Wait for the reply of the given batch.  Replies of other batches are saved."""
+        while batch_id not in self._async_replies:
+            async with self._async_lock:
+                if batch_id in self._async_replies:
+                    break
+                reply = await self._async_handler.recv_obj()
+                if not _is_batch_reply(reply):
+                    raise Exception('Unknown reply format: %s' % reply)
+                self._async_replies[reply['id']] = reply
+        return self._async_replies.pop(batch_id)
+
+    async def async_eval_skill_batch(self, request_list, stop_on_error=False,
+                                     return_exceptions=False):
+        # type: (Sequence[Union[str, Dict[str, Any]]], bool, bool) -> List[Any]
+        """Coroutine version of :meth:`SkillInterface.eval_skill_batch`."""
+        handler = self._get_async_handler()
+        req_list = [_make_skill_request(req) if isinstance(req, str) else
+                    _make_skill_request(**req) for req in request_list]
+        batch_id = self._batch_count
+        self._batch_count += 1
+        await handler.send_obj(dict(type='skill_batch', id=batch_id, requests=req_list,
+                                    stop_on_error=stop_on_error))
+        reply = await self._async_recv_batch(batch_id)
+        if reply.get('type') != 'batch':
+            return [_handle_reply(reply)]
+
+        results = []
+        for item in reply['data']:
+            try:
+                results.append(_handle_reply(item))
+            except VirtuosoException as ex:
+                if not return_exceptions:
+                    raise
+                results.append(ex)
+        return results
+
+    async def async_eval_skill(self, expr, input_files=None, out_file=None):
+        # type: (str, Optional[Dict[str, Any]], Optional[str]) -> str
+        """Coroutine version of :meth:`SkillInterface._eval_skill`."""
+        req = dict(expr=expr, input_files=input_files, out_file=out_file)
+        return (await self.async_eval_skill_batch([req]))[0]
+
+    def _eval_skill(self, expr, input_files=None, out_file=None):
+        # type: (str, Optional[Dict[str, Any]], Optional[str]) -> str
+        loop = getattr(self._thread_info, 'loop', None)
+        if loop is None:
+            return SkillInterface._eval_skill(self, expr, input_files=input_files,
+                                              out_file=out_file)
+        # running in the worker thread, send request from the event loop.
+        coro = self.async_eval_skill(expr, input_files=input_files, out_file=out_file)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def eval_skill_batch(self, request_list, stop_on_error=False, return_exceptions=False):
+        # type: (Sequence[Union[str, Dict[str, Any]]], bool, bool) -> List[Any]
+        loop = getattr(self._thread_info, 'loop', None)
+        if loop is None:
+            return SkillInterface.eval_skill_batch(self, request_list,
+                                                   stop_on_error=stop_on_error,
+                                                   return_exceptions=return_exceptions)
+        coro = self.async_eval_skill_batch(request_list, stop_on_error=stop_on_error,
+                                           return_exceptions=return_exceptions)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def async_call(self, fun, *args, **kwargs):
+        """Call the given function that accesses the CAD database without blocking the event loop.
+
+        The function runs in the worker thread of this interface, and all skill expressions
+        it evaluates through this interface are sent from the event loop.
+
+        Parameters
+        ----------
+        fun : Callable[..., Any]
+            the function to call.
+        *args : Any
+            positional arguments.
+        **kwargs : Any
+            keyword arguments.
+
+        Returns
+        -------
+        result : Any
+            the function return value.
+        """
+        loop = asyncio.get_event_loop()
+        self._get_async_handler()
+
+        def thread_fun():
+            self._thread_info.loop = loop
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                self._thread_info.loop = None
+
+        return await loop.run_in_executor(self._executor, thread_fun)
+
+    async_parse_schematic_template = _make_async_method('parse_schematic_template')
+    async_get_cells_in_library = _make_async_method('get_cells_in_library')
+    async_get_cells_in_libraries = _make_async_method('get_cells_in_libraries')
+    async_create_library = _make_async_method('create_library')
+    async_create_implementation = _make_async_method('create_implementation')
+    async_instantiate_schematic = _make_async_method('instantiate_schematic')
+    async_configure_testbench = _make_async_method('configure_testbench')
+    async_get_testbench_info = _make_async_method('get_testbench_info')
+    async_update_testbench = _make_async_method('update_testbench')
+    async_instantiate_layout_pcell = _make_async_method('instantiate_layout_pcell')
+    async_instantiate_layout = _make_async_method('instantiate_layout')
+    async_release_write_locks = _make_async_method('release_write_locks')
+    async_create_schematic_from_netlist = _make_async_method('create_schematic_from_netlist')
+    async_get_cell_directory = _make_async_method('get_cell_directory')
+    async_create_verilog_view = _make_async_method('create_verilog_view')
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""This module defines StandInVirtuoso, a local stand-in for Virtuoso.
+
+StandInVirtuoso speaks the Virtuoso side of the :class:`~bag.interface.SkillServer` pipe
+protocol: it receives skill expressions, and replies with the number of bytes of the
+result followed by the result.  Instead of evaluating expressions, it records each call,
+reads the input files like Virtuoso does, keeps track of the cells created in each library,
+and answers the queries BAG makes with plausible results, after a configurable latency.
+
+This makes it possible to exercise and benchmark :class:`~bag.interface.skill.SkillInterface`,
+:class:`~bag.interface.SkillServer`, and the ZMQ communication path without a CAD license.
+"""
+
+from typing import List, Dict, Any, Tuple, Optional
+
+import os
+import re
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+import bag.io
+from .server import inline_prefix
+
+# matches a double quoted skill string
+_str_re = re.compile(r'"((?:[^"\\]|\\.)*)"')
+# matches an escape sequence in a skill string
+_escape_re = re.compile(r'\\(.)')
+
+
+def _unescape(val):
+    # type: (str) -> str
+    """Returns the content of the given skill string literal without quotes."""
+    return _escape_re.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), val)
+
+
+def skill_file_to_object(fname):
+    # type: (str) -> Any
+    """Read the given file written by :func:`~bag.interface.server.object_to_skill_file`.
+
+    Like parse_data_from_file() in start_bag.il, if the file name starts with the inline
+    prefix, the rest of the file name is the file content.
+
+    Parameters
+    ----------
+    fname : str
+        the file name.
+
+    Returns
+    -------
+    obj : Any
+        the python object.  Tuples are read as lists.
+    """
+    if fname.startswith(inline_prefix):
+        content = fname[len(inline_prefix):]
+    else:
+        content = bag.io.read_file(fname)
+    lines = content.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+
+    # each entry is (container, is_dict, pending dictionary key)
+    stack = [([], False, None)]  # type: List[Tuple[Any, bool, Optional[str]]]
+    for line in lines:
+        container, is_dict, key = stack[-1]
+        if is_dict and key is None and line != '#end':
+            stack[-1] = (container, is_dict, line)
+            continue
+
+        if line == '#end':
+            stack.pop()
+            val = container
+        elif line == '#list':
+            stack.append(([], False, None))
+            continue
+        elif line == '#prop_list':
+            stack.append((OrderedDict(), True, None))
+            continue
+        elif line.startswith('#float '):
+            val = float(line[7:])
+        elif line.startswith('#int '):
+            val = int(line[5:])
+        elif line.startswith('#bool '):
+            val = line[6:] == '1'
+        else:
+            val = line
+
+        container, is_dict, key = stack[-1]
+        if is_dict:
+            container[key] = val
+            stack[-1] = (container, is_dict, None)
+        else:
+            container.append(val)
+
+    if len(stack) != 1 or len(stack[0][0]) != 1:
+        raise ValueError('Malformed skill file: %s' % fname)
+    return stack[0][0][0]
+
+
+class StandInVirtuoso(object):
+    """A local stand-in for Virtuoso on the pipes of a SkillServer.
+
+    Pass this object as both the virt_in and virt_out argument of
+    :class:`~bag.interface.SkillServer`.
+
+    Parameters
+    ----------
+    latency : float
+        the time in seconds each expression takes to evaluate.
+    latency_table : Optional[Dict[str, float]]
+        a dictionary from skill function name to evaluation time in seconds, overriding
+        latency for that function.
+    read_inputs : bool
+        True to read the input files of each expression, like Virtuoso does.
+    lib_root : str
+        the directory reported to contain all libraries.  Defaults to a temporary directory.
+
+    Attributes
+    ----------
+    calls : List[Tuple[str, List[str]]]
+        list of (function name, list of string arguments) of all evaluated expressions.
+    cells : Dict[str, List[str]]
+        a dictionary from library name to cells created in that library.
+    """
+
+    def __init__(self, latency=0.0, latency_table=None, read_inputs=True, lib_root=''):
+        # type: (float, Optional[Dict[str, float]], bool, str) -> None
+        self.latency = latency
+        self.latency_table = {} if latency_table is None else latency_table
+        self.read_inputs = read_inputs
+        self.lib_root = lib_root or tempfile.gettempdir()
+        self.calls = []  # type: List[Tuple[str, List[str]]]
+        self.cells = OrderedDict()  # type: Dict[str, List[str]]
+        self._out_buf = ''
+        self._cond = threading.Condition()
+
+    def write(self, expr):
+        # type: (str) -> None
+        """Receive the given skill expression from the SkillServer, then evaluate it."""
+        result = self.evaluate(expr)
+        result_str = '%s\n' % result
+        with self._cond:
+            self._out_buf += '%d\n%s' % (len(result_str), result_str)
+            self._cond.notify_all()
+
+    def flush(self):
+        # type: () -> None
+        pass
+
+    def readline(self):
+        # type: () -> str
+        """Read a line of the reply to the SkillServer."""
+        with self._cond:
+            self._cond.wait_for(lambda: '\n' in self._out_buf)
+            idx = self._out_buf.index('\n') + 1
+            ans, self._out_buf = self._out_buf[:idx], self._out_buf[idx:]
+        return ans
+
+    def read(self, num_bytes):
+        # type: (int) -> str
+        """Read the given number of characters of the reply to the SkillServer."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._out_buf) >= num_bytes)
+            ans, self._out_buf = self._out_buf[:num_bytes], self._out_buf[num_bytes:]
+        return ans
+
+    def _add_cell(self, lib_name, cell_name):
+        # type: (str, str) -> None
+        cell_list = self.cells.setdefault(lib_name, [])
+        if cell_name not in cell_list:
+            cell_list.append(cell_name)
+
+    def evaluate(self, expr):
+        # type: (str) -> str
+        """Evaluate the given skill expression.
+
+        Parameters
+        ----------
+        expr : str
+            the skill expression.
+
+        Returns
+        -------
+        result : str
+            the printed result, or an error message starting with '*Error*'.
+        """
+        fun_name = expr.split('(', 1)[0].strip()
+        args = [_unescape(arg) for arg in _str_re.findall(expr)]
+        self.calls.append((fun_name, args))
+        delay = self.latency_table.get(fun_name, self.latency)
+        if delay > 0:
+            time.sleep(delay)
+
+        # noinspection PyBroadException
+        try:
+            return self._evaluate(fun_name, args)
+        except Exception as ex:
+            return '*Error* %s: %s' % (fun_name, ex)
+
+    def _evaluate(self, fun_name, args):
+        # type: (str, List[str]) -> str
+        if fun_name == 'create_or_erase_library':
+            self.cells.setdefault(args[0], [])
+        elif fun_name == 'create_concrete_schematic':
+            self.cells.setdefault(args[0], [])
+            if self.read_inputs:
+                skill_file_to_object(args[4])
+                for _, _, impl_cell in skill_file_to_object(args[3]):
+                    self._add_cell(args[0], impl_cell)
+        elif fun_name == 'create_layout':
+            self.cells.setdefault(args[0], [])
+            if self.read_inputs:
+                for layout_info in skill_file_to_object(args[3]):
+                    self._add_cell(args[0], layout_info[0])
+        elif fun_name == 'get_cells_in_library_file':
+            bag.io.write_file(args[1], ' '.join(self.cells.get(args[0], [])), mkdir=False)
+        elif fun_name == 'get_lib_directory':
+            return '"%s"' % os.path.join(self.lib_root, args[0])
+        elif fun_name == 'parse_cad_sch':
+            content = ('lib_name: %s\ncell_name: %s\npins: []\ninstances: {}\n' %
+                       (args[0], args[1]))
+            bag.io.write_file(args[2], content, mkdir=False)
+        elif fun_name == 'instantiate_testbench':
+            bag.io.write_file(args[-1], 'corners: []\nparameters: {}\noutputs: {}\n',
+                              mkdir=False)
+        elif fun_name == 'get_testbench_info':
+            bag.io.write_file(args[-1], 'enabled_corners: []\ncorners: []\nparameters: {}\n'
+                              'outputs: {}\n', mkdir=False)
+        elif self.read_inputs:
+            # read all input files written by the SkillServer
+            for arg in args:
+                if (arg.startswith(inline_prefix) or
+                        (os.path.isfile(arg) and os.path.getsize(arg) > 0)):
+                    skill_file_to_object(arg)
+        return 't'
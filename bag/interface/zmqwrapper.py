@@ -3,13 +3,13 @@
 """This module defines various wrapper around ZMQ sockets."""
 
 import os
-import zlib
 import pprint
 
-import yaml
 import zmq
+import zmq.asyncio
 
 import bag.io
+from .codec import get_codec, decode_message
 
 
 class ZMQDealer(object):
@@ -30,18 +30,28 @@ class ZMQDealer(object):
         the host to connect to.
     log_file : str or None
         the log file.  None to disable logging.
+    codec : str
+        the wire codec name, like 'msgpack+lz4' or 'pickle+zlib'.  See
+        :mod:`bag.interface.codec` for details.  The server replies with the same codec.
     """
 
-    def __init__(self, port, pipeline=100, host='localhost', log_file=None):
+    _context_cls = zmq.Context
+    _poller_cls = zmq.Poller
+
+    def __init__(self, port, pipeline=100, host='localhost', log_file=None, codec='yaml+zlib'):
         """Create a new ZMQDealer object.
         """
-        context = zmq.Context.instance()
+        context = self._context_cls.instance()
         # noinspection PyUnresolvedReferences
         self.socket = context.socket(zmq.DEALER)
         self.socket.hwm = pipeline
         self.socket.connect('tcp://%s:%d' % (host, port))
+        self.port = port
+        self.host = host
+        self.pipeline = pipeline
         self._log_file = log_file
-        self.poller = zmq.Poller()
+        self._codec = get_codec(codec)
+        self.poller = self._poller_cls()
         # noinspection PyUnresolvedReferences
         self.poller.register(self.socket, zmq.POLLIN)
 
@@ -70,21 +80,25 @@ class ZMQDealer(object):
         """Close the underlying socket."""
         self.socket.close()
 
+    @property
+    def codec_name(self):
+        """The wire codec name."""
+        return self._codec.name
+
     def send_obj(self, obj):
-        """Sends a python object using pickle serialization and zlib compression.
+        """Sends a python object using the wire codec of this dealer.
 
         Parameters
         ----------
         obj : any
             the object to send.
         """
-        p = bag.io.to_bytes(yaml.dump(obj))
-        z = zlib.compress(p)
+        data = self._codec.encode(obj)
         self.log_obj('sending data:', obj)
-        self.socket.send(z)
+        self.socket.send(data)
 
     def recv_obj(self, timeout=None, enable_cancel=False):
-        """Receive a python object, serialized with pickle and compressed with zlib.
+        """Receive a python object, decoded with the codec in the message header.
 
         Parameters
         ----------
@@ -114,8 +128,7 @@ class ZMQDealer(object):
 
         if events:
             data = self.socket.recv()
-            z = bag.io.fix_string(zlib.decompress(data))
-            obj = yaml.load(z)
+            obj = decode_message(data)[0]
             self.log_obj('received data:', obj)
             return obj
         else:
@@ -135,6 +148,66 @@ class ZMQDealer(object):
         return data
 
 
+class AsyncZMQDealer(ZMQDealer):
+    """A ZMQ dealer socket for use in asyncio event loops.
+
+    send_obj() and recv_obj() are coroutines, so waiting for replies does not block the
+    event loop.  See :class:`ZMQDealer` for the constructor parameters.
+    """
+
+    _context_cls = zmq.asyncio.Context
+    _poller_cls = zmq.asyncio.Poller
+
+    async def send_obj(self, obj):
+        """Sends a python object using the wire codec of this dealer.
+
+        Parameters
+        ----------
+        obj : any
+            the object to send.
+        """
+        data = self._codec.encode(obj)
+        self.log_obj('sending data:', obj)
+        await self.socket.send(data)
+
+    async def recv_obj(self, timeout=None, enable_cancel=False):
+        """Receive a python object, decoded with the codec in the message header.
+
+        Parameters
+        ----------
+        timeout : int or None
+            the timeout to wait in miliseconds.  If None, wait indefinitely.
+        enable_cancel : bool
+            not used.  Cancel the waiting task instead.
+
+        Returns
+        -------
+        obj : any
+            the received object.  None if timeout reached.
+        """
+        events = await self.poller.poll(timeout=timeout)
+        if events:
+            data = await self.socket.recv()
+            obj = decode_message(data)[0]
+            self.log_obj('received data:', obj)
+            return obj
+        else:
+            self.log_msg('timeout with %d ms reached.' % timeout)
+            return None
+
+    async def recv_msg(self):
+        """Receive a string message.
+
+        Returns
+        -------
+        msg : str
+            the received object.
+        """
+        data = await self.socket.recv()
+        self.log_msg('received message:\n%s' % data)
+        return data
+
+
 class ZMQRouter(object):
     """A class that interacts with a ZMQ router socket.
 
@@ -142,6 +215,9 @@ class ZMQRouter(object):
     without needing to issue an reply.  This class encapsulates the ZMQ socket
     details and provide more convenient API to use.
 
+    Objects are sent to each client with the wire codec of the last message received
+    from that client, so the codec is chosen by the client.
+
     Parameters
     ----------
     port : int or None
@@ -172,6 +248,8 @@ class ZMQRouter(object):
             self.port = self.socket.bind_to_random_port('tcp://*', min_port=min_port, max_port=max_port)
         self.addr = None
         self._log_file = log_file
+        # client address -> codec of the last message from that client
+        self._codec_table = {}
 
         if self._log_file is not None:
             self._log_file = os.path.abspath(self._log_file)
@@ -225,7 +303,7 @@ class ZMQRouter(object):
             self.socket.send_multipart([addr, msg])
 
     def send_obj(self, obj, addr=None):
-        """Sends a python object using pickle serialization and zlib compression.
+        """Sends a python object using the wire codec of the receiver.
 
         Parameters
         ----------
@@ -239,10 +317,10 @@ class ZMQRouter(object):
             warn_msg = '*WARNING* No receiver address specified.  Message not sent:'
             self.log_obj(warn_msg, obj)
         else:
-            p = bag.io.to_bytes(yaml.dump(obj))
-            z = zlib.compress(p)
+            codec = self._codec_table.get(addr, None) or get_codec(None)
+            data = codec.encode(obj)
             self.log_obj('sending data:', obj)
-            self.socket.send_multipart([addr, z])
+            self.socket.send_multipart([addr, data])
 
     def poll_for_read(self, timeout):
         """Poll this socket for given timeout for read event.
@@ -260,7 +338,7 @@ class ZMQRouter(object):
         return self.socket.poll(timeout=timeout)
 
     def recv_obj(self):
-        """Receive a python object, serialized with pickle and compressed with zlib.
+        """Receive a python object, decoded with the codec in the message header.
 
         Returns
         -------
@@ -269,8 +347,8 @@ class ZMQRouter(object):
         """
         self.addr, data = self.socket.recv_multipart()
 
-        z = bag.io.fix_string(zlib.decompress(data))
-        obj = yaml.load(z)
+        obj, codec = decode_message(data)
+        self._codec_table[self.addr] = codec
         self.log_obj('received data:', obj)
         return obj
 
@@ -7,7 +7,9 @@ from typing import Dict, List, Iterator, Tuple, Optional, Union, Callable, Any
 
 import abc
 import math
+import heapq
 from itertools import chain
+from collections import OrderedDict
 
 import bag
 import bag.io
@@ -51,6 +53,11 @@ class TechInfo(object, metaclass=abc.ABCMeta):
         self._layout_unit = layout_unit
         self._via_tech = via_tech
         self.tech_params = process_params
+        # get_best_via_array() results, in least-recently-used order.
+        self._via_cache = OrderedDict()  # type: OrderedDict
+        self._via_cache_size = 4096
+        self._via_cache_hits = 0
+        self._via_cache_misses = 0
 
     @abc.abstractmethod
     def get_well_layers(self, sub_type):
@@ -641,6 +648,65 @@ class TechInfo(object, metaclass=abc.ABCMeta):
         w = int(round(w / res))
         h = int(round(h / res))
 
+        key = (vname, bmtype, tmtype, bot_dir, top_dir, w, h, extend)
+        result = self._via_cache.get(key, self)
+        if result is self:
+            self._via_cache_misses += 1
+            result = self._get_best_via_array_unit(vname, bmtype, tmtype, bot_dir, top_dir,
+                                                   w, h, extend)
+            if self._via_cache_size > 0:
+                self._via_cache[key] = result
+                if len(self._via_cache) > self._via_cache_size:
+                    self._via_cache.popitem(last=False)
+        else:
+            self._via_cache_hits += 1
+            self._via_cache.move_to_end(key)
+
+        if result is None:
+            return None
+        # copy metal dimension list so callers cannot modify the cached result
+        best_nxy, best_mdim_list, best_type, best_vdim, best_sp, best_adim = result
+        return best_nxy, [list(mdim) for mdim in best_mdim_list], best_type, best_vdim, best_sp, \
+            best_adim
+
+    def set_via_cache_size(self, size):
+        # type: (int) -> None
+        """Sets the maximum number of get_best_via_array() results to cache.
+
+        Parameters
+        ----------
+        size : int
+            the maximum cache size.  0 to disable caching.
+        """
+        self._via_cache_size = size
+        while len(self._via_cache) > size:
+            self._via_cache.popitem(last=False)
+
+    def clear_via_cache(self):
+        # type: () -> None
+        """Clears cached get_best_via_array() results and statistics."""
+        self._via_cache.clear()
+        self._via_cache_hits = self._via_cache_misses = 0
+
+    def get_via_cache_stats(self):
+        # type: () -> Dict[str, int]
+        """Returns get_best_via_array() cache statistics.
+
+        Returns
+        -------
+        stats : Dict[str, int]
+            a dictionary with number of cache hits/misses, current size and maximum size.
+        """
+        return dict(hits=self._via_cache_hits, misses=self._via_cache_misses,
+                    size=len(self._via_cache), maxsize=self._via_cache_size)
+
+    def _get_best_via_array_unit(self, vname, bmtype, tmtype, bot_dir, top_dir, w, h, extend):
+        # type: (str, str, str, str, str, int, int, bool) -> Optional[Tuple[Any, ...]]
+        """Maximize the number of vias in the given bounding box.
+
+        Same as get_best_via_array(), except the bounding box width/height are given in
+        resolution units, and the result is not cached.
+        """
         # Depending on the routing direction of the metal, the provided width/height of the
         # bounding box may correspond to either the x direction or y direction.
         if bot_dir == 'x':
@@ -701,100 +767,12 @@ class TechInfo(object, metaclass=abc.ABCMeta):
             nx_max = (w + spx_min - 2 * extx) // (dim[0] + spx_min)
             ny_max = (h + spy_min - 2 * exty) // (dim[1] + spy_min)
 
-            # Theoretically any combination of via array size from (1, 1) to (nx_max, ny_max) may actually
-            # work within the given bound box. Here we enumerate a list all of these possible via combinations
-            # starting from the max via number
-            nxy_list = [(a * b, a, b) for a in range(1, nx_max + 1) for b in range(1, ny_max + 1)]
-            nxy_list = sorted(nxy_list, reverse=True)
-
-            # Initialize variables that will hold the best working via array size for this via type
-            opt_nxy = None
-            opt_mdim_list = None
-            opt_adim = None
-            opt_sp = None
-
-            # This looping procedure will iterate over all possible via array configurations and select
-            # one that maximizes the number of vias while meeting all rules
-            for num, nx, ny in nxy_list:
-                # Determine whether we should be using sp/sp2/sp3 rules for the current via configuration
-                if nx == 2 and ny == 2:
-                    sp_combo = sp2_list
-                elif nx > 1 and ny > 1:
-                    sp_combo = sp3_list
-                else:
-                    sp_combo = [sp]
-
-                # DRC rules can typically be satisfied with a number of different spacing rules, so here we
-                # iterate over each to find the best one. Note that since we break out of the loop immediately upon
-                # finding a valid via configuration, this code prioritizes spacing rules that are early on in the list
-                for spx, spy in sp_combo:
-                    # Compute a bounding box for the via array without the enclosure
-                    w_arr = dim[0] if nx == 1 else nx * (spx + dim[0]) - spx
-                    h_arr = dim[1] if ny == 1 else ny * (spy + dim[1]) - spy
-                    mdim_list = [None, None]
-
-                    # Loop over all possible enclosure types and check whether this via configuration satisfies
-                    # one of them for both the bottom metal and top metal
-                    for idx, (mdir, tot_enc_list, arr_enc, arr_test) in \
-                            enumerate([(bot_dir, encb, arr_encb, arr_testb),
-                                       (top_dir, enct, arr_enct, arr_testt)]):
-                        # arr_test is a function that takes an array size as input and returns a boolean. If its
-                        # is true the array size is valid and is added to the list of valid enclosures
-                        if arr_test is not None and arr_test(ny, nx):
-                            tot_enc_list = tot_enc_list + arr_enc
-
-                        # If the routing direction is y, start by computing x-direction enclosure. ext_dim
-                        # corresponds to x-direction. Vice-versa if the routing direction is x
-                        if mdir == 'y':
-                            enc_idx = 0
-                            enc_dim = w_arr
-                            ext_dim = h_arr
-                            dim_lim = w
-                            max_ext_dim = h
-                        else:
-                            enc_idx = 1
-                            enc_dim = h_arr
-                            ext_dim = w_arr
-                            dim_lim = h
-                            max_ext_dim = w
-
-                        # Initialize variable to hold opposite direction enclosure size
-                        min_ext_dim = None
-
-                        # This loop selects the minimum opposite direction size that satisfies the enclosure
-                        # rules
-                        for enc in tot_enc_list:
-                            cur_ext_dim = ext_dim + 2 * enc[1 - enc_idx]
-                            # Check that the enclosure rule is satisfied. If extend is true, this passing enclosure
-                            # size can exceed the maximum size set by the user provided bounding box
-                            if (enc[enc_idx] * 2 + enc_dim <= dim_lim) and (extend or cur_ext_dim <= max_ext_dim):
-                                # Select the minimum of all enclosures in the non-routing direction that satisfies
-                                # the enclosure rules
-                                if min_ext_dim is None or min_ext_dim > cur_ext_dim:
-                                    min_ext_dim = cur_ext_dim
-
-                        # If none of the enclosures in the list meet the rules, the current spacing rules cannot
-                        # be used to create a valid via, so we continue on to the next set of spacing rules
-                        if min_ext_dim is None:
-                            break
-                        # Otherwise record the computed via dimensions that pass all checks
-                        else:
-                            min_ext_dim = max(min_ext_dim, max_ext_dim)
-                            mdim_list[idx] = [min_ext_dim, min_ext_dim]
-                            mdim_list[idx][enc_idx] = dim_lim
-
-                    # If we've found a valid via configuration immediately break out of the loop
-                    if mdim_list[0] is not None and mdim_list[1] is not None:
-                        # passed
-                        opt_mdim_list = mdim_list
-                        opt_nxy = (nx, ny)
-                        opt_adim = (w_arr, h_arr)
-                        opt_sp = (spx, spy)
-                        break
-
-                # If we've found a valid via array size immediately break out of the loop
-                if opt_nxy is not None:
-                    break
+            # Any combination of via array size from (1, 1) to (nx_max, ny_max) may work within the
+            # given bound box.  Search them in order of decreasing via count, and return the first
+            # one that meets all rules.
+            enc_info = [(bot_dir, encb, arr_encb, arr_testb), (top_dir, enct, arr_enct, arr_testt)]
+            opt_nxy, opt_mdim_list, opt_adim, opt_sp = _search_via_array(
+                w, h, dim, sp, sp2_list, sp3_list, enc_info, extend, nx_max, ny_max)
 
             # Select the best via out of all the passing via types. Vias are selected by choosing the
             # highest 'best_num'. This is calculated by multiplying the via array size by the via weight
@@ -1179,6 +1157,193 @@ class DummyTechInfo(TechInfo):
         return float('inf'), float('inf'), float('inf')
 
 
+def _check_via_array(nx, ny, w, h, dim, sp_combo, enc_info, extend):
+    # type: (int, int, int, int, Tuple[int, int], List[Tuple[int, int]], List[Tuple], bool) -> Any
+    """Check whether the given via array meets all spacing and enclosure rules.
+
+    Returns None if no spacing rule works, otherwise returns the tuple
+    (mdim_list, (w_arr, h_arr), (spx, spy)) of the first spacing rule that works.
+    """
+    # DRC rules can typically be satisfied with a number of different spacing rules, so here we
+    # iterate over each to find the best one. Note that since we return immediately upon
+    # finding a valid via configuration, this code prioritizes spacing rules that are early on
+    # in the list
+    for spx, spy in sp_combo:
+        # Compute a bounding box for the via array without the enclosure
+        w_arr = dim[0] if nx == 1 else nx * (spx + dim[0]) - spx
+        h_arr = dim[1] if ny == 1 else ny * (spy + dim[1]) - spy
+        mdim_list = [None, None]
+
+        # Loop over all possible enclosure types and check whether this via configuration
+        # satisfies one of them for both the bottom metal and top metal
+        for idx, (mdir, tot_enc_list, arr_enc, arr_test) in enumerate(enc_info):
+            # arr_test is a function that takes an array size as input and returns a boolean.
+            # If its is true the array size is valid and is added to the list of valid enclosures
+            if arr_test is not None and arr_test(ny, nx):
+                tot_enc_list = tot_enc_list + arr_enc
+
+            # If the routing direction is y, start by computing x-direction enclosure. ext_dim
+            # corresponds to x-direction. Vice-versa if the routing direction is x
+            if mdir == 'y':
+                enc_idx = 0
+                enc_dim = w_arr
+                ext_dim = h_arr
+                dim_lim = w
+                max_ext_dim = h
+            else:
+                enc_idx = 1
+                enc_dim = h_arr
+                ext_dim = w_arr
+                dim_lim = h
+                max_ext_dim = w
+
+            # Initialize variable to hold opposite direction enclosure size
+            min_ext_dim = None
+
+            # This loop selects the minimum opposite direction size that satisfies the
+            # enclosure rules
+            for enc in tot_enc_list:
+                cur_ext_dim = ext_dim + 2 * enc[1 - enc_idx]
+                # Check that the enclosure rule is satisfied. If extend is true, this passing
+                # enclosure size can exceed the maximum size set by the user provided bounding box
+                if (enc[enc_idx] * 2 + enc_dim <= dim_lim) and (extend or
+                                                                cur_ext_dim <= max_ext_dim):
+                    # Select the minimum of all enclosures in the non-routing direction that
+                    # satisfies the enclosure rules
+                    if min_ext_dim is None or min_ext_dim > cur_ext_dim:
+                        min_ext_dim = cur_ext_dim
+
+            # If none of the enclosures in the list meet the rules, the current spacing rules
+            # cannot be used to create a valid via, so we continue on to the next set of
+            # spacing rules
+            if min_ext_dim is None:
+                break
+            # Otherwise record the computed via dimensions that pass all checks
+            else:
+                min_ext_dim = max(min_ext_dim, max_ext_dim)
+                mdim_list[idx] = [min_ext_dim, min_ext_dim]
+                mdim_list[idx][enc_idx] = dim_lim
+
+        # If we've found a valid via configuration return immediately
+        if mdim_list[0] is not None and mdim_list[1] is not None:
+            return mdim_list, (w_arr, h_arr), (spx, spy)
+
+    return None
+
+
+def _get_via_array_ny_bounds(sp_list, w, h, dim, enc_info, extend, nx_max, ny_max):
+    # type: (List[Tuple[int, int]], int, int, Tuple[int, int], List, bool, int, int) -> List[int]
+    """Returns upper bounds on the number of via rows for each number of via columns.
+
+    An array of nx columns and ny rows with spacing (spx, spy) has width nx * (spx + dim[0]) - spx
+    and height ny * (spy + dim[1]) - spy, so each enclosure rule bounds nx and ny independently.
+    _check_via_array() uses a subset of the enclosure rules in enc_info, so an array using
+    spacing rules in sp_list with ny larger than the returned bound cannot meet all rules.
+    The bounds are non-increasing in nx.
+
+    Returns
+    -------
+    ny_bounds : List[int]
+        ny_bounds[nx - 1] is the maximum number of rows of an array with nx columns.  0 if
+        no such array is possible.
+    """
+    ny_bounds = [0] * nx_max
+    for spx, spy in sp_list:
+        # for each metal, list the (nx, ny) limits imposed by each enclosure rule.
+        lim_list = []
+        for mdir, enc_list, arr_enc, arr_test in enc_info:
+            if arr_test is not None and arr_enc:
+                enc_list = enc_list + arr_enc
+            cur_lims = []
+            for enc in enc_list:
+                nx_lim = (w - 2 * enc[0] + spx) // (spx + dim[0])
+                ny_lim = (h - 2 * enc[1] + spy) // (spy + dim[1])
+                # if extend is true, the metal can grow in the non-enclosure direction.
+                if extend:
+                    if mdir == 'y':
+                        ny_lim = ny_max
+                    else:
+                        nx_lim = nx_max
+                cur_lims.append((min(nx_lim, nx_max), min(ny_lim, ny_max)))
+            lim_list.append(cur_lims)
+
+        for nx in range(1, nx_max + 1):
+            ny_lim = ny_max
+            for cur_lims in lim_list:
+                ny_lim = min(ny_lim, max((ny for nx_lim, ny in cur_lims if nx_lim >= nx),
+                                         default=0))
+            if ny_lim <= 0:
+                break
+            ny_bounds[nx - 1] = max(ny_bounds[nx - 1], ny_lim)
+
+    return ny_bounds
+
+
+def _search_via_array(w, h, dim, sp, sp2_list, sp3_list, enc_info, extend, nx_max, ny_max):
+    # type: (...) -> Tuple[Any, Any, Any, Any]
+    """Find the via array with the most vias that meets all rules.
+
+    Via array sizes (nx, ny) are visited in decreasing order of (nx * ny, nx, ny), and the
+    first one that passes _check_via_array() is returned.  Instead of enumerating all sizes
+    up to (nx_max, ny_max), sizes are bounded using _get_via_array_ny_bounds(), and visited
+    lazily by merging the columns of the bounded region with a heap.  Because feasibility can
+    only decrease as the array grows for a given spacing rule, this visits the same sizes in the
+    same order as a brute force search, skipping only sizes that cannot meet the rules.
+
+    Returns
+    -------
+    nxy : Optional[Tuple[int, int]]
+        number of via columns/rows.  None if no via array works.
+    mdim_list : Optional[List[List[int]]]
+        the bottom/top metal dimensions.
+    adim : Optional[Tuple[int, int]]
+        the via array width/height.
+    sp : Optional[Tuple[int, int]]
+        the via spacing.
+    """
+    if nx_max <= 0 or ny_max <= 0:
+        return None, None, None, None
+
+    # single row/column arrays use sp, 2x2 arrays use sp2, and all other arrays use sp3.
+    bnd_args = (w, h, dim, enc_info, extend, nx_max, ny_max)
+    ny_bnds = _get_via_array_ny_bounds([sp], *bnd_args)
+    ny_bnds2 = _get_via_array_ny_bounds(sp2_list, *bnd_args)
+    ny_bnds3 = _get_via_array_ny_bounds(sp3_list, *bnd_args)
+    ny_bounds = [ny_bnds[0]]
+    for nx in range(2, nx_max + 1):
+        ny_cur = 1 if ny_bnds[nx - 1] > 0 else 0
+        if ny_bnds3[nx - 1] > 1:
+            ny_cur = ny_bnds3[nx - 1]
+        if nx == 2 and ny_bnds2[1] > 1:
+            ny_cur = max(ny_cur, 2)
+        ny_bounds.append(ny_cur)
+
+    # each heap entry is the largest unvisited via array size of a column.
+    heap = [(-nx * ny, -nx, -ny) for nx, ny in enumerate(ny_bounds, 1) if ny > 0]
+    heapq.heapify(heap)
+    while heap:
+        _, nx, ny = heap[0]
+        nx, ny = -nx, -ny
+        # Determine whether we should be using sp/sp2/sp3 rules for the current via configuration
+        if nx == 2 and ny == 2:
+            sp_combo = sp2_list
+        elif nx > 1 and ny > 1:
+            sp_combo = sp3_list
+        else:
+            sp_combo = [sp]
+
+        result = _check_via_array(nx, ny, w, h, dim, sp_combo, enc_info, extend)
+        if result is not None:
+            mdim_list, adim, opt_sp = result
+            return (nx, ny), mdim_list, adim, opt_sp
+        if ny > 1:
+            heapq.heapreplace(heap, (-nx * (ny - 1), -nx, 1 - ny))
+        else:
+            heapq.heappop(heap)
+
+    return None, None, None, None
+
+
 class BagLayout(object):
     """This class contains layout information of a cell.
 
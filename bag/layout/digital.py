@@ -3,19 +3,264 @@
 """This module defines layout template classes for digital standard cells.
 """
 
-from typing import Dict, Any, Set, Tuple, List, Optional
+from typing import Dict, Any, Set, Tuple, List, Optional, Iterator
 
+import os
 import abc
 
 import yaml
+import numpy as np
 
-from bag.util.interval import IntervalSet
 from .util import BBox
 from .template import TemplateDB, TemplateBase
 from .objects import Instance
 from .routing import TrackID, WireArray
 
 
+# parsed standard cell configuration files, validated by modification time.
+_std_config_cache = {}  # type: Dict[str, Tuple[int, Dict[str, Any]]]
+
+
+def _read_std_config(config_file):
+    # type: (str) -> Dict[str, Any]
+    """Returns the content of the given standard cell configuration file.
+
+    The file is only parsed again if it has been modified.  The returned dictionary is
+    shared, and should not be modified.
+    """
+    config_file = os.path.abspath(config_file)
+    mtime = os.stat(config_file).st_mtime_ns
+    info = _std_config_cache.get(config_file, None)
+    if info is None or info[0] != mtime:
+        with open(config_file, 'r') as f:
+            info = _std_config_cache[config_file] = (mtime, yaml.safe_load(f))
+    return info[1]
+
+
+class OccupancyGrid(object):
+    """A bitmap of used standard cell slots, in number of columns/rows.
+
+    The bitmap grows as blocks are added.  All overlap checks and updates of arrayed
+    blocks are done with numpy operations.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self._used = np.zeros((0, 0), dtype=bool)
+        self._num_cols = 0
+        self._num_rows = 0
+
+    @property
+    def num_cols(self):
+        # type: () -> int
+        """Number of columns spanned by the used blocks."""
+        return self._num_cols
+
+    @property
+    def num_rows(self):
+        # type: () -> int
+        """Number of rows spanned by the used blocks."""
+        return self._num_rows
+
+    def _reserve(self, num_rows, num_cols):
+        # type: (int, int) -> None
+        """Make sure the bitmap has at least the given number of rows and columns."""
+        cur_rows, cur_cols = self._used.shape
+        if num_rows > cur_rows or num_cols > cur_cols:
+            # grow geometrically so repeated additions are amortized constant time.
+            new_rows = max(num_rows, 2 * cur_rows) if num_rows > cur_rows else cur_rows
+            new_cols = max(num_cols, 2 * cur_cols) if num_cols > cur_cols else cur_cols
+            new_used = np.zeros((new_rows, new_cols), dtype=bool)
+            new_used[:cur_rows, :cur_cols] = self._used
+            self._used = new_used
+
+    def get_used(self, num_rows=None, num_cols=None):
+        # type: (Optional[int], Optional[int]) -> np.ndarray
+        """Returns a copy of the bitmap with the given size.
+
+        Parameters
+        ----------
+        num_rows : Optional[int]
+            number of rows.  Defaults to the number of rows spanned by the used blocks.
+        num_cols : Optional[int]
+            number of columns.  Defaults to the number of columns spanned by the used blocks.
+
+        Returns
+        -------
+        used : np.ndarray
+            a 2D boolean array indexed by (row, column).  True if the slot is used.
+        """
+        num_rows = self._num_rows if num_rows is None else num_rows
+        num_cols = self._num_cols if num_cols is None else num_cols
+        ans = np.zeros((num_rows, num_cols), dtype=bool)
+        nr = min(num_rows, self._used.shape[0])
+        nc = min(num_cols, self._used.shape[1])
+        ans[:nr, :nc] = self._used[:nr, :nc]
+        return ans
+
+    def get_conflict(self, loc, size, nx=1, ny=1, spx=0, spy=0):
+        # type: (Tuple[int, int], Tuple[int, int], int, int, int, int) -> Optional[Tuple[int, int]]
+        """Returns the location of the first array element that overlaps used slots.
+
+        Parameters
+        ----------
+        loc : Tuple[int, int]
+            lower-left corner of the block in number of columns/rows.
+        size : Tuple[int, int]
+            the block size in number of columns/rows.
+        nx : int
+            horizontal array count.
+        ny : int
+            vertical array count.
+        spx : int
+            horizontal pitch in number of columns.
+        spy : int
+            vertical pitch in number of rows.
+
+        Returns
+        -------
+        conflict_loc : Optional[Tuple[int, int]]
+            the lower-left corner of the first array element that overlaps used slots
+            or another element of the same array.  None if there is no overlap.
+        """
+        ncol, nrow = size
+        if loc[0] < 0 or loc[1] < 0:
+            raise ValueError('Negative standard cell location: (%d, %d)' % (loc[0], loc[1]))
+        # array elements overlap each other
+        if nx > 1 and spx < ncol:
+            return loc[0] + spx, loc[1]
+        if ny > 1 and spy < nrow:
+            return loc[0], loc[1] + spy
+
+        col_idx = (loc[0] + spx * np.arange(nx))[:, np.newaxis] + np.arange(ncol)
+        row_idx = (loc[1] + spy * np.arange(ny))[:, np.newaxis] + np.arange(nrow)
+        col_idx = col_idx.ravel()
+        row_idx = row_idx.ravel()
+        # only slots inside the bitmap can be used
+        nr, nc = self._used.shape
+        col_idx = col_idx[col_idx < nc]
+        row_idx = row_idx[row_idx < nr]
+        if col_idx.size == 0 or row_idx.size == 0:
+            return None
+        conflict = self._used[np.ix_(row_idx, col_idx)]
+        if not conflict.any():
+            return None
+        ridx, cidx = np.unravel_index(np.argmax(conflict), conflict.shape)
+        row_off = (row_idx[ridx] - loc[1]) // spy if ny > 1 else 0
+        col_off = (col_idx[cidx] - loc[0]) // spx if nx > 1 else 0
+        return loc[0] + col_off * spx, loc[1] + row_off * spy
+
+    def add(self, loc, size, nx=1, ny=1, spx=0, spy=0):
+        # type: (Tuple[int, int], Tuple[int, int], int, int, int, int) -> bool
+        """Mark the slots of the given block array as used.
+
+        Parameters
+        ----------
+        loc : Tuple[int, int]
+            lower-left corner of the block in number of columns/rows.
+        size : Tuple[int, int]
+            the block size in number of columns/rows.
+        nx : int
+            horizontal array count.
+        ny : int
+            vertical array count.
+        spx : int
+            horizontal pitch in number of columns.
+        spy : int
+            vertical pitch in number of rows.
+
+        Returns
+        -------
+        success : bool
+            True if the blocks are added.  False if they overlap used slots, in which
+            case the bitmap is not modified.
+        """
+        if self.get_conflict(loc, size, nx=nx, ny=ny, spx=spx, spy=spy) is not None:
+            return False
+
+        ncol, nrow = size
+        col_stop = loc[0] + (nx - 1) * spx + ncol
+        row_stop = loc[1] + (ny - 1) * spy + nrow
+        self._reserve(row_stop, col_stop)
+        if nx == 1 and ny == 1:
+            self._used[loc[1]:row_stop, loc[0]:col_stop] = True
+        else:
+            col_idx = ((loc[0] + spx * np.arange(nx))[:, np.newaxis] + np.arange(ncol)).ravel()
+            row_idx = ((loc[1] + spy * np.arange(ny))[:, np.newaxis] + np.arange(nrow)).ravel()
+            self._used[np.ix_(row_idx, col_idx)] = True
+        self._num_cols = max(self._num_cols, col_stop)
+        self._num_rows = max(self._num_rows, row_stop)
+        return True
+
+    def find_free(self, size, num_cols=None, num_rows=None):
+        # type: (Tuple[int, int], Optional[int], Optional[int]) -> Optional[Tuple[int, int]]
+        """Find the first location where a block of the given size fits.
+
+        Locations are searched from the bottom row up, and from left to right within a row.
+
+        Parameters
+        ----------
+        size : Tuple[int, int]
+            the block size in number of columns/rows.
+        num_cols : Optional[int]
+            the block must fit within this many columns.  If None, there is no limit.
+        num_rows : Optional[int]
+            the block must fit within this many rows.  If None, there is no limit.
+
+        Returns
+        -------
+        loc : Optional[Tuple[int, int]]
+            the lower-left corner of the first free location in number of columns/rows.
+            None if the block does not fit anywhere.
+        """
+        ncol, nrow = size
+        if num_cols is None:
+            num_cols = self._num_cols + ncol
+        if num_rows is None:
+            num_rows = self._num_rows + nrow
+        if ncol > num_cols or nrow > num_rows:
+            return None
+
+        # count used slots in every ncol x nrow window using a summed area table
+        used = self.get_used(num_rows=num_rows, num_cols=num_cols)
+        table = np.zeros((num_rows + 1, num_cols + 1), dtype=np.int64)
+        np.cumsum(np.cumsum(used, axis=0), axis=1, out=table[1:, 1:])
+        win = (table[nrow:, ncol:] - table[:-nrow, ncol:] - table[nrow:, :-ncol] +
+               table[:-nrow, :-ncol])
+        free_idx = np.flatnonzero(win == 0)
+        if free_idx.size == 0:
+            return None
+        row, col = divmod(int(free_idx[0]), win.shape[1])
+        return col, row
+
+    def free_intervals_iter(self, num_cols):
+        # type: (int) -> Iterator[Tuple[int, int, int]]
+        """Iterates over unused slots in each row.
+
+        Parameters
+        ----------
+        num_cols : int
+            the total number of columns.
+
+        Yields
+        ------
+        row : int
+            the row index.
+        start : int
+            the first column of the free interval.
+        stop : int
+            the column after the last column of the free interval.
+        """
+        free = ~self.get_used(num_cols=num_cols)
+        edges = np.zeros((free.shape[0], num_cols + 2), dtype=np.int8)
+        edges[:, 1:-1] = free
+        delta = np.diff(edges, axis=1)
+        start_rows, start_cols = np.nonzero(delta == 1)
+        stop_cols = np.nonzero(delta == -1)[1]
+        for row, start, stop in zip(start_rows.tolist(), start_cols.tolist(), stop_cols.tolist()):
+            yield row, start, stop
+
+
 class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
     """The base class of all micro templates.
 
@@ -36,8 +281,7 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
 
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
-        with open(params['config_file'], 'r') as f:
-            self._config = yaml.load(f)
+        self._config = _read_std_config(params['config_file'])
         self._tech_params = self._config['tech_params']
         self._cells = self._config['cells']
         self._spaces = self._config['spaces']
@@ -46,7 +290,7 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
         self._std_size = None  # type: Optional[Tuple[int, int]]
         self._std_size_bare = None  # type: Optional[Tuple[int, int]]
         self._draw_boundaries = False  # type: bool
-        self._used_blocks = []  # type: List[IntervalSet]
+        self._used_blocks = OccupancyGrid()
 
     @property
     def min_space_width(self):
@@ -262,18 +506,12 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
         master_std_size = master.std_size
         if master_std_size is None:
             raise ValueError("master.std_size is unset. Try calling master.set_std_size()?")
-        inst_ncol, inst_nrow = master_std_size
-        cur_nrow = loc[1] + inst_nrow + (ny - 1) * spy
-        while len(self._used_blocks) < cur_nrow:
-            self._used_blocks.append(IntervalSet())
-        for col_off in range(nx):
-            xoff = col_off * spx + loc[0]
-            for row_off in range(ny):
-                yoff = row_off * spy + loc[1]
-                for std_row_idx in range(yoff, yoff + inst_nrow):
-                    success = self._used_blocks[std_row_idx].add((xoff, xoff + inst_ncol))
-                    if not success:
-                        raise ValueError('Cannot add instance at std loc (%d, %d)' % (xoff, yoff))
+        inst_ncol = master_std_size[0]
+        conflict = self._used_blocks.get_conflict(loc, master_std_size, nx=nx, ny=ny,
+                                                  spx=spx, spy=spy)
+        if conflict is not None:
+            raise ValueError('Cannot add instance at std loc (%d, %d)' % conflict)
+        self._used_blocks.add(loc, master_std_size, nx=nx, ny=ny, spx=spx, spy=spy)
 
         col_pitch = self.std_col_width
         row_pitch = self.std_row_height
@@ -301,6 +539,29 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
         return self.add_instance(master, inst_name=inst_name, loc=(dx, dy),
                                  orient=orient, nx=nx, ny=ny, spx=spx_new, spy=spy_new)
 
+    def find_std_loc(self, std_size, num_cols=None, num_rows=None):
+        # type: (Tuple[int, int], Optional[int], Optional[int]) -> Optional[Tuple[int, int]]
+        """Find the first unused location where a block of the given size fits.
+
+        Locations are searched from the bottom row up, and from left to right within a row.
+
+        Parameters
+        ----------
+        std_size : Tuple[int, int]
+            the block size in number of standard cell columns/rows.
+        num_cols : Optional[int]
+            the block must fit within this many columns.  If None, there is no limit.
+        num_rows : Optional[int]
+            the block must fit within this many rows.  If None, there is no limit.
+
+        Returns
+        -------
+        loc : Optional[Tuple[int, int]]
+            the lower-left corner of the location in number of standard cell columns/rows,
+            which can be passed to add_std_instance().  None if the block does not fit.
+        """
+        return self._used_blocks.find_free(std_size, num_cols=num_cols, num_rows=num_rows)
+
     def draw_boundaries(self):
         # type: () -> None
         """Draw the boundary cells around this standard cell."""
@@ -371,12 +632,8 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
         std_size_bare = self._std_size_bare
         if std_size_bare is None:
             raise ValueError("std_size_bare is unset. Try calling set_std_size()?")
-        tot_intv = (0, std_size_bare[0])
-        for row_idx, intv_set in enumerate(self._used_blocks):
-            for intv in intv_set.get_complement(tot_intv).intervals():
-                loc = (intv[0], row_idx)
-                num_spaces = intv[1] - intv[0]
-                self.add_std_space(loc, num_spaces, update_used_blks=False)
+        for row_idx, start, stop in self._used_blocks.free_intervals_iter(std_size_bare[0]):
+            self.add_std_space((start, row_idx), stop - start, update_used_blks=False)
 
     def add_std_space(self, loc, num_col, update_used_blks=True):
         # type: (Tuple[int, int], int, bool) -> None
@@ -393,9 +650,7 @@ class StdCellBase(TemplateBase, metaclass=abc.ABCMeta):
         """
         if update_used_blks:
             # update self._used_blocks
-            while len(self._used_blocks) < loc[1] + 1:
-                self._used_blocks.append(IntervalSet())
-            success = self._used_blocks[loc[1]].add((loc[0], loc[0] + num_col))
+            success = self._used_blocks.add(loc, (num_col, 1))
             if not success:
                 raise ValueError('Cannot add space at std loc (%d, %d)' % (loc[0], loc[1]))
 
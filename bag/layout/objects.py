@@ -86,6 +86,12 @@ class Figure(object, metaclass=abc.ABCMeta):
         # type: () -> None
         """Destroy this instance."""
         self._destroyed = True
+        self._geometry_changed()
+
+    def _geometry_changed(self):
+        # type: () -> None
+        """Called whenever the geometry of this figure changes."""
+        pass
 
 
 # noinspection PyAbstractClass
@@ -136,6 +142,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val <= 0:
             raise ValueError('Cannot have non-positive number of columns.')
         self._nx = val
+        self._geometry_changed()
 
     @property
     def ny(self):
@@ -151,6 +158,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val <= 0:
             raise ValueError('Cannot have non-positive number of rows.')
         self._ny = val
+        self._geometry_changed()
 
     @property
     def spx(self):
@@ -166,6 +174,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val < 0:
             raise ValueError('Currently does not support negative pitches.')
         self._spx_unit = int(round(val / self.resolution))
+        self._geometry_changed()
 
     @property
     def spx_unit(self):
@@ -181,6 +190,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val < 0:
             raise ValueError('Currently does not support negative pitches.')
         self._spx_unit = val
+        self._geometry_changed()
 
     @property
     def spy(self):
@@ -196,6 +206,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val < 0:
             raise ValueError('Currently does not support negative pitches.')
         self._spy_unit = int(round(val / self.resolution))
+        self._geometry_changed()
 
     @property
     def spy_unit(self):
@@ -211,6 +222,7 @@ class Arrayable(Figure, metaclass=abc.ABCMeta):
         if val < 0:
             raise ValueError('Currently does not support negative pitches.')
         self._spy_unit = val
+        self._geometry_changed()
 
     @Figure.valid.getter
     def valid(self):
@@ -460,6 +472,29 @@ class Instance(Arrayable):
         else:
             self._loc_unit = int(round(loc[0] / res)), int(round(loc[1] / res))
         self._orient = orient
+        self._port_cache = {}  # type: Dict[Tuple[str, int, int], Port]
+        # instance change counter of the parent template
+        self._change_counter = None  # type: Optional[List[int]]
+
+    def set_change_counter(self, counter):
+        # type: (Optional[List[int]]) -> None
+        """Sets the instance change counter of the template containing this instance.
+
+        The first element of the counter is incremented every time this instance is moved,
+        rearrayed, changed, or destroyed.
+
+        Parameters
+        ----------
+        counter : Optional[List[int]]
+            the change counter.  None to disable counting.
+        """
+        self._change_counter = counter
+
+    def _geometry_changed(self):
+        # type: () -> None
+        self._port_cache.clear()
+        if self._change_counter is not None:
+            self._change_counter[0] += 1
 
     def new_master_with(self, **kwargs):
         # type: (**Any) -> None
@@ -475,6 +510,7 @@ class Instance(Arrayable):
             a dictionary of new parameter values.
         """
         self._master = self._master.new_template_with(**kwargs)
+        self._geometry_changed()
 
     def blockage_iter(self, layer_id, test_box, spx=0, spy=0):
         # type: (int, BBox, int, int) -> Generator[BBox, None, None]
@@ -512,15 +548,15 @@ class Instance(Arrayable):
                 for box in self._master.blockage_iter(layer_id, cur_box, spx=spx, spy=spy):
                     yield box.transform(loc, orient, unit_mode=True)
 
-    def all_rect_iter(self):
-        # type: () -> Generator[Tuple[BBox, int, int], None, None]
+    def all_rect_iter(self, layer_id=None):
+        # type: (Optional[int]) -> Generator[Tuple[int, BBox, int, int], None, None]
         if self.destroyed:
             return
 
         orient = self._orient
         x0, y0 = self._loc_unit
         flip = (orient == 'R90' or orient == 'R270' or orient == 'MXR90' or orient == 'MYR90')
-        for layer_id, box, sdx, sdy in self._master.all_rect_iter():
+        for layer_id, box, sdx, sdy in self._master.all_rect_iter(layer_id=layer_id):
             if flip:
                 sdx, sdy = sdy, sdx
             for row in range(self.ny):
@@ -597,6 +633,7 @@ class Instance(Arrayable):
         self.check_destroyed()
         self._loc_unit = (int(round(new_loc[0] / self.resolution)),
                           int(round(new_loc[1] / self.resolution)))
+        self._geometry_changed()
 
     @property
     def location_unit(self):
@@ -610,6 +647,7 @@ class Instance(Arrayable):
         """Sets the instance location."""
         self.check_destroyed()
         self._loc_unit = (new_loc[0], new_loc[1])
+        self._geometry_changed()
 
     @property
     def orientation(self):
@@ -625,6 +663,7 @@ class Instance(Arrayable):
         if val not in transform_table:
             raise ValueError('Unsupported orientation: %s' % val)
         self._orient = val
+        self._geometry_changed()
 
     @property
     def content(self):
@@ -704,6 +743,7 @@ class Instance(Arrayable):
             dx = int(round(dx / self.resolution))
             dy = int(round(dy / self.resolution))
         self._loc_unit = self._loc_unit[0] + dx, self._loc_unit[1] + dy
+        self._geometry_changed()
 
     def translate_master_box(self, box):
         # type: (BBox) -> BBox
@@ -776,6 +816,9 @@ class Instance(Arrayable):
         # type: (Optional[str], int, int) -> Port
         """Returns the port object of the given instance in the array.
 
+        Transformed ports are cached until this instance is moved or transformed, so
+        the returned port should not be modified.
+
         Parameters
         ----------
         name : Optional[str]
@@ -792,10 +835,15 @@ class Instance(Arrayable):
             the port object.
         """
         dx, dy = self.get_item_location(row=row, col=col, unit_mode=True)
-        xshift, yshift = self._loc_unit
-        loc = (xshift + dx, yshift + dy)
-        return self._master.get_port(name).transform(self._parent_grid, loc=loc,
-                                                     orient=self.orientation, unit_mode=True)
+        key = (name, dx, dy)
+        port = self._port_cache.get(key, None)
+        if port is None:
+            xshift, yshift = self._loc_unit
+            loc = (xshift + dx, yshift + dy)
+            port = self._master.get_port(name).transform(self._parent_grid, loc=loc,
+                                                         orient=self.orientation, unit_mode=True)
+            self._port_cache[key] = port
+        return port
 
     def get_pin(self, name='', row=0, col=0, layer=-1):
         # type: (Optional[str], int, int, int) -> Union[WireArray, BBox]
@@ -879,6 +927,84 @@ class Instance(Arrayable):
                 for warr in port.get_pins(layer):
                     yield warr
 
+    def get_port_pin_arrays(self, name='', layer=-1):
+        # type: (Optional[str], int) -> Dict[str, np.ndarray]
+        """Returns all pins of the given port in this instance array as numpy arrays.
+
+        This method only transforms the port of the first instance, then shifts it
+        to all other array positions with numpy operations.  It is much faster than
+        get_all_port_pins() for large instance arrays.
+
+        Parameters
+        ----------
+        name : Optional[str]
+            the port terminal name.  If None or empty, check if this
+            instance has only one port, then return it.
+        layer : int
+            the pin layer.  If negative, check to see if the given port has only one layer.
+            If so then use that layer.
+
+        Returns
+        -------
+        pin_arrays : Dict[str, np.ndarray]
+            a dictionary of arrays with one entry per pin, in the same order as
+            get_all_port_pins().  'row' and 'col' are the instance row/column indices.
+            For WireArray pins, 'track', 'width', 'num', 'pitch', 'lower', and 'upper'
+            describe the WireArray.  For primitive pins, 'xl', 'yb', 'xr', and 'yt' are
+            the pin bounds.  All coordinates are in resolution units.
+        """
+        pins = self.get_port(name, 0, 0).get_pins(layer)
+        nx, ny = self.nx, self.ny
+        num_inst = nx * ny
+        num_pins = len(pins)
+        inst_col = np.repeat(np.arange(nx), ny)
+        inst_row = np.tile(np.arange(ny), nx)
+        dx_arr = np.repeat(inst_col * self._spx_unit, num_pins)
+        dy_arr = np.repeat(inst_row * self._spy_unit, num_pins)
+        ans = dict(row=np.repeat(inst_row, num_pins), col=np.repeat(inst_col, num_pins))
+
+        if pins and isinstance(pins[0], BBox):
+            bnds = np.array([box.get_bounds(unit_mode=True) for box in pins], dtype=np.int64)
+            bnds = np.tile(bnds, (num_inst, 1))
+            ans['xl'] = bnds[:, 0] + dx_arr
+            ans['yb'] = bnds[:, 1] + dy_arr
+            ans['xr'] = bnds[:, 2] + dx_arr
+            ans['yt'] = bnds[:, 3] + dy_arr
+            return ans
+
+        # compute track index shift and wire coordinate shift of each instance on each layer
+        grid = self._parent_grid
+        xshift, yshift = self._loc_unit
+        shift_table = {}
+        tr_shift = np.empty((num_inst, num_pins))
+        par_shift = np.empty((num_inst, num_pins), dtype=np.int64)
+        for pidx, warr in enumerate(pins):  # type: int, WireArray
+            layer_id = warr.layer_id
+            if layer_id not in shift_table:
+                if grid.get_direction(layer_id) == 'x':
+                    coord0, sp, idx_arr, par_arr = yshift, self._spy_unit, inst_row, inst_col
+                    par_sp = self._spx_unit
+                else:
+                    coord0, sp, idx_arr, par_arr = xshift, self._spx_unit, inst_col, inst_row
+                    par_sp = self._spy_unit
+                tr0 = grid.coord_to_track(layer_id, coord0, unit_mode=True)
+                tr_table = np.array([grid.coord_to_track(layer_id, coord0 + idx * sp,
+                                                         unit_mode=True) - tr0
+                                     for idx in range(np.max(idx_arr) + 1)])
+                shift_table[layer_id] = tr_table[idx_arr], par_arr * par_sp
+            tr_shift[:, pidx], par_shift[:, pidx] = shift_table[layer_id]
+
+        tid_list = [warr.track_id for warr in pins]
+        ans['track'] = np.tile([tid.base_index for tid in tid_list], num_inst) + tr_shift.ravel()
+        ans['width'] = np.tile(np.array([tid.width for tid in tid_list], dtype=np.int64), num_inst)
+        ans['num'] = np.tile(np.array([tid.num for tid in tid_list], dtype=np.int64), num_inst)
+        ans['pitch'] = np.tile(np.array([tid.pitch for tid in tid_list], dtype=float), num_inst)
+        ans['lower'] = (np.tile(np.array([warr.lower_unit for warr in pins], dtype=np.int64),
+                                num_inst) + par_shift.ravel())
+        ans['upper'] = (np.tile(np.array([warr.upper_unit for warr in pins], dtype=np.int64),
+                                num_inst) + par_shift.ravel())
+        return ans
+
     def port_names_iter(self):
         # type: () -> Iterable[str]
         """Iterates over port names in this instance.
@@ -911,8 +1037,10 @@ class Instance(Arrayable):
             ans = self
         else:
             ans = deepcopy(self)
+            ans._change_counter = None
         ans._loc_unit = loc
         ans._orient = orient
+        ans._geometry_changed()
         return ans
 
 
@@ -1697,10 +1825,14 @@ class Via(Arrayable):
         top layer extension direction.  Can force to extend in same direction as bottom.
     unit_mode : bool
         True if array pitches are given in resolution units.
+    info : Optional[Dict[str, Any]]
+        the via information of bbox, as returned by TechInfo.get_via_info().  Computed if
+        not given.  This object takes ownership of the dictionary.
     """
 
     def __init__(self, tech, bbox, bot_layer, top_layer, bot_dir,
-                 nx=1, ny=1, spx=0, spy=0, extend=True, top_dir=None, unit_mode=False):
+                 nx=1, ny=1, spx=0, spy=0, extend=True, top_dir=None, unit_mode=False,
+                 info=None):
         if isinstance(bbox, BBoxArray):
             self._bbox = bbox.base
             Arrayable.__init__(self, tech.resolution, nx=bbox.nx, ny=bbox.ny,
@@ -1726,8 +1858,10 @@ class Via(Arrayable):
         self._bot_dir = bot_dir
         self._top_dir = top_dir
         self._extend = extend
-        self._info = self._tech.get_via_info(self._bbox, bot_layer, top_layer, bot_dir,
-                                             top_dir=top_dir, extend=extend)
+        if info is None:
+            info = self._tech.get_via_info(self._bbox, bot_layer, top_layer, bot_dir,
+                                           top_dir=top_dir, extend=extend)
+        self._info = info
         if self._info is None:
             raise ValueError('Cannot make via with bounding box %s' % self._bbox)
 
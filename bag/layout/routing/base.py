@@ -3,13 +3,17 @@
 """This module provides basic routing classes.
 """
 
-from typing import Tuple, Union, Generator, Dict, List, Sequence
+from typing import TYPE_CHECKING, Tuple, Union, Generator, Dict, List, Sequence, Optional, Any
 
 import numbers
 
 from ...util.search import BinaryIterator
 from ..util import BBox, BBoxArray
 from .grid import RoutingGrid
+from .fill import TrackIntervalIndex
+
+if TYPE_CHECKING:
+    from .fill import UsedTracks
 
 
 class TrackID(object):
@@ -941,3 +945,136 @@ class TrackManager(object):
         num_used, idx_list = bin_iter.get_last_save_info()
         delta = self._get_align_delta(tot_ntr, num_used, alignment)
         return [idx + delta for idx in idx_list]
+
+    def assign_tracks(self,  # type: TrackManager
+                      layer_id,  # type: int
+                      net_list,  # type: Sequence[Tuple[str, Union[str, int], Any, Any]]
+                      start_idx=0,  # type: Union[float, int]
+                      num_tracks=None,  # type: Optional[int]
+                      used_tracks=None,  # type: Optional[UsedTracks]
+                      sp=0,  # type: Union[float, int]
+                      sp_le=0,  # type: Union[float, int]
+                      unit_mode=False,  # type: bool
+                      **kwargs):
+        # type: (...) -> Dict[str, Union[float, int]]
+        """Assign nets to tracks in a routing channel.
+
+        Each net needs a wire spanning the given interval along the track direction.  Nets
+        whose intervals (expanded by line-end spacing) overlap must be placed on tracks
+        separated by the track spacing between their wire types.  Nets are assigned with the
+        left-edge algorithm: in order of increasing lower coordinate, each net is placed on
+        the lowest track with no conflicts.  If all nets have the same type and there are no
+        blockages, this uses the minimum number of tracks.
+
+        Parameters
+        ----------
+        layer_id : int
+            the layer of the tracks.
+        net_list : Sequence[Tuple[str, Union[str, int], Any, Any]]
+            list of (net name, wire type, lower, upper) tuples.
+        start_idx : Union[float, int]
+            the lowest track index wires can use.
+        num_tracks : Optional[int]
+            number of tracks in the channel.  If None, the channel is unbounded.
+        used_tracks : Optional[UsedTracks]
+            if given, nets will not be placed on tracks blocked by wires in this object.  A
+            TemplateBase can also be given, in which case wires in its instances are also
+            avoided.
+        sp : Union[float, int]
+            additional space to blockages.
+        sp_le : Union[float, int]
+            minimum line-end space between nets and to blockages.
+        unit_mode : bool
+            True if lower/upper/sp/sp_le are given in resolution units.
+        **kwargs:
+            optional parameters for get_space().
+
+        Returns
+        -------
+        track_table : Dict[str, Union[float, int]]
+            the center track index of each net.
+        """
+        grid = self._grid
+        if not unit_mode:
+            res = grid.resolution
+            net_list = [(name, wtype, int(round(lower / res)), int(round(upper / res)))
+                        for name, wtype, lower, upper in net_list]
+            sp = int(round(sp / res))
+            sp_le = int(round(sp_le / res))
+
+        htr0 = int(round(2 * start_idx))
+        htr_max = None if num_tracks is None else htr0 + 2 * num_tracks
+        # wire width and line-end space of each wire type
+        type_info = {}  # type: Dict[Union[str, int], Tuple[int, int]]
+        # spacing between each pair of wire types, in half-tracks
+        sp_table = {}  # type: Dict[Tuple[Union[str, int], Union[str, int]], int]
+        # blocked intervals for each wire width
+        index_table = {}  # type: Dict[int, TrackIntervalIndex]
+
+        for _, wtype, _, _ in net_list:
+            if wtype not in type_info:
+                width = self.get_width(layer_id, wtype)
+                le_sp = max(sp_le, int(grid.get_line_end_space(layer_id, width, unit_mode=True)))
+                type_info[wtype] = width, le_sp
+        le_max = max((info[1] for info in type_info.values()), default=0)
+
+        ans = {}  # type: Dict[str, Union[float, int]]
+        # assigned nets that may conflict with later nets, as (upper, htr, type, lower) tuples
+        active = []  # type: List[Tuple[int, int, Union[str, int], int]]
+        for name, wtype, lower, upper in sorted(net_list, key=lambda x: (x[2], -x[3])):
+            if name in ans:
+                raise ValueError('Net %s appears more than once.' % name)
+            width, le_sp = type_info[wtype]
+
+            # remove nets that cannot conflict with this net or later nets
+            active = [item for item in active if item[0] + le_max > lower]
+
+            # get half-track ranges blocked by assigned nets
+            conflicts = []
+            for a_upper, a_htr, a_type, a_lower in active:
+                cur_le = max(le_sp, type_info[a_type][1])
+                if a_upper + cur_le > lower and upper + cur_le > a_lower:
+                    key = (wtype, a_type)
+                    delta = sp_table.get(key, None)
+                    if delta is None:
+                        space = self.get_space(layer_id, key, **kwargs)
+                        delta = int(round(2 * space)) + width + type_info[a_type][0]
+                        sp_table[key] = sp_table[(a_type, wtype)] = delta
+                    conflicts.append((a_htr - delta + 1, a_htr + delta - 1))
+
+            if used_tracks is None:
+                track_index = None
+            else:
+                track_index = index_table.get(width, None)
+                if track_index is None:
+                    cur_sp = max(sp, int(grid.get_space(layer_id, width, unit_mode=True)))
+                    rect_iter = ((box, dx, dy) for _, box, dx, dy in
+                                 used_tracks.all_rect_iter(layer_id=layer_id))
+                    track_index = TrackIntervalIndex(grid, layer_id, width, cur_sp, le_sp,
+                                                     rect_iter)
+                    index_table[width] = track_index
+
+            # find the lowest free track
+            htr = htr0 + width - 1
+            conflicts.sort()
+            while True:
+                if htr_max is not None and htr + width + 1 > htr_max:
+                    raise ValueError('Cannot assign net %s within %d tracks.' % (name, num_tracks))
+                moved = False
+                for c_lower, c_upper in conflicts:
+                    if c_lower <= htr <= c_upper:
+                        # skip to the first track of the same parity past this conflict
+                        htr += 2 * ((c_upper - htr) // 2 + 1)
+                        moved = True
+                if moved:
+                    continue
+                tr_idx = htr // 2 if htr % 2 == 0 else htr / 2
+                if track_index is not None and track_index.is_blocked(tr_idx, lower, upper):
+                    htr += 2
+                    continue
+                break
+
+            ans[name] = tr_idx
+            active.append((upper, htr, wtype, lower))
+
+        return ans
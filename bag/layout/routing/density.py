@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""This module defines a raster metal density map used for dummy fill planning.
+"""
+
+from typing import Iterable, Union, Tuple, Optional, List
+
+import numpy as np
+
+from bag.layout.util import BBox
+
+# window size or step, either a single number or (x, y) values.
+WinType = Union[int, Tuple[int, int]]
+
+
+def _ceil_div(num, den):
+    # type: (np.ndarray, int) -> np.ndarray
+    return -((-num) // den)
+
+
+class DensityMap(object):
+    """A raster map of metal coverage on a single layer.
+
+    The given area is divided into square pixels.  A pixel is occupied if its center lies
+    inside any rectangle added to this map, so overlapping rectangles are not double counted.
+    Window densities are computed from a 2D prefix sum of the occupancy grid.
+
+    Parameters
+    ----------
+    bound_box : BBox
+        the area to rasterize.
+    pixel : int
+        the pixel size, in resolution units.
+    """
+
+    def __init__(self, bound_box, pixel):
+        # type: (BBox, int) -> None
+        if pixel <= 0:
+            raise ValueError('pixel size = %d <= 0' % pixel)
+        self._box = bound_box
+        self._pixel = pixel
+        self._x0 = bound_box.left_unit
+        self._y0 = bound_box.bottom_unit
+        self._nx = max(1, -(-bound_box.width_unit // pixel))
+        self._ny = max(1, -(-bound_box.height_unit // pixel))
+        self._diff = np.zeros((self._ny + 1, self._nx + 1), dtype=np.int32)
+        self._prefix = None  # type: Optional[np.ndarray]
+
+    @classmethod
+    def from_boxes(cls, bound_box, pixel, box_iter):
+        # type: (BBox, int, Iterable[BBox]) -> DensityMap
+        """Create a new DensityMap from the given rectangles.
+
+        Parameters
+        ----------
+        bound_box : BBox
+            the area to rasterize.
+        pixel : int
+            the pixel size, in resolution units.
+        box_iter : Iterable[BBox]
+            the rectangles to add.
+
+        Returns
+        -------
+        density_map : DensityMap
+            the new density map.
+        """
+        ans = cls(bound_box, pixel)
+        ans.add_boxes(box_iter)
+        return ans
+
+    @property
+    def bound_box(self):
+        # type: () -> BBox
+        return self._box
+
+    @property
+    def pixel(self):
+        # type: () -> int
+        return self._pixel
+
+    @property
+    def shape(self):
+        # type: () -> Tuple[int, int]
+        """The occupancy grid shape, as (num_rows, num_columns)."""
+        return self._ny, self._nx
+
+    def _to_pixel(self, coord, origin, num):
+        # type: (np.ndarray, int, int) -> np.ndarray
+        """Returns index of the first pixel with center at or above the given coordinates."""
+        idx = _ceil_div(2 * (coord - origin) - self._pixel, 2 * self._pixel)
+        return np.clip(idx, 0, num)
+
+    def add_boxes(self, box_iter):
+        # type: (Iterable[BBox]) -> None
+        """Add the given rectangles to this map.
+
+        Parameters
+        ----------
+        box_iter : Iterable[BBox]
+            the rectangles to add.
+        """
+        bnd_list = [box.get_bounds(unit_mode=True) for box in box_iter]
+        if bnd_list:
+            bnds = np.array(bnd_list, dtype=np.int64)
+            self.add_rect_arrays(bnds[:, 0], bnds[:, 1], bnds[:, 2], bnds[:, 3])
+
+    def add_rect_arrays(self, xl, yb, xr, yt):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> None
+        """Add rectangles given as coordinate arrays to this map.
+
+        Parameters
+        ----------
+        xl : np.ndarray
+            rectangle left coordinates, in resolution units.
+        yb : np.ndarray
+            rectangle bottom coordinates, in resolution units.
+        xr : np.ndarray
+            rectangle right coordinates, in resolution units.
+        yt : np.ndarray
+            rectangle top coordinates, in resolution units.
+        """
+        xi0 = self._to_pixel(np.asarray(xl, dtype=np.int64), self._x0, self._nx)
+        xi1 = self._to_pixel(np.asarray(xr, dtype=np.int64), self._x0, self._nx)
+        yi0 = self._to_pixel(np.asarray(yb, dtype=np.int64), self._y0, self._ny)
+        yi1 = self._to_pixel(np.asarray(yt, dtype=np.int64), self._y0, self._ny)
+        keep = (xi0 < xi1) & (yi0 < yi1)
+        xi0, xi1, yi0, yi1 = xi0[keep], xi1[keep], yi0[keep], yi1[keep]
+        if xi0.size:
+            np.add.at(self._diff, (yi0, xi0), 1)
+            np.add.at(self._diff, (yi0, xi1), -1)
+            np.add.at(self._diff, (yi1, xi0), -1)
+            np.add.at(self._diff, (yi1, xi1), 1)
+            self._prefix = None
+
+    def get_occupancy(self):
+        # type: () -> np.ndarray
+        """Returns the boolean occupancy grid, indexed by [row, column]."""
+        cnt = np.cumsum(np.cumsum(self._diff, axis=0), axis=1)
+        return cnt[:self._ny, :self._nx] > 0
+
+    def _get_prefix(self):
+        # type: () -> np.ndarray
+        if self._prefix is None:
+            prefix = np.zeros((self._ny + 1, self._nx + 1), dtype=np.int64)
+            np.cumsum(np.cumsum(self.get_occupancy(), axis=0), axis=1, out=prefix[1:, 1:])
+            self._prefix = prefix
+        return self._prefix
+
+    def _sum(self, yi0, xi0, yi1, xi1):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> np.ndarray
+        """Returns number of occupied pixels in the given pixel ranges."""
+        prefix = self._get_prefix()
+        return prefix[yi1, xi1] - prefix[yi0, xi1] - prefix[yi1, xi0] + prefix[yi0, xi0]
+
+    def get_density(self, box):
+        # type: (BBox) -> float
+        """Returns the metal density inside the given box.
+
+        Parameters
+        ----------
+        box : BBox
+            the area to query.
+
+        Returns
+        -------
+        density : float
+            fraction of the pixels inside the box that are occupied.  0 if the box covers
+            no pixels.
+        """
+        xi0, xi1 = self._to_pixel(np.array([box.left_unit, box.right_unit]), self._x0, self._nx)
+        yi0, yi1 = self._to_pixel(np.array([box.bottom_unit, box.top_unit]), self._y0, self._ny)
+        num_pix = (xi1 - xi0) * (yi1 - yi0)
+        if num_pix <= 0:
+            return 0.0
+        return float(self._sum(yi0, xi0, yi1, xi1)) / num_pix
+
+    def _window_starts(self, num, win, step):
+        # type: (int, int, int) -> np.ndarray
+        """Returns window start indices along one axis.  The last window abuts the edge."""
+        if win >= num:
+            return np.zeros(1, dtype=np.int64)
+        starts = np.arange(0, num - win + 1, step, dtype=np.int64)
+        if starts[-1] != num - win:
+            starts = np.append(starts, num - win)
+        return starts
+
+    def _get_windows(self, win, step):
+        # type: (WinType, Optional[WinType]) -> Tuple
+        if isinstance(win, int):
+            win = (win, win)
+        if step is None:
+            step = win
+        elif isinstance(step, int):
+            step = (step, step)
+        wx, wy = (max(1, int(round(val / self._pixel))) for val in win)
+        sx, sy = (max(1, int(round(val / self._pixel))) for val in step)
+        xi0 = self._window_starts(self._nx, wx, sx)
+        yi0 = self._window_starts(self._ny, wy, sy)
+        xi1 = np.minimum(xi0 + wx, self._nx)
+        yi1 = np.minimum(yi0 + wy, self._ny)
+        return xi0[np.newaxis, :], yi0[:, np.newaxis], xi1[np.newaxis, :], yi1[:, np.newaxis]
+
+    def get_window_boxes(self, win, step=None):
+        # type: (WinType, Optional[WinType]) -> np.ndarray
+        """Returns the window bounds used by window_density() and fill_target().
+
+        Parameters
+        ----------
+        win : WinType
+            the window size, in resolution units.  Either a single number or (width, height).
+        step : Optional[WinType]
+            the window step, in resolution units.  Defaults to the window size.
+
+        Returns
+        -------
+        bounds : np.ndarray
+            an array with shape (num_rows, num_columns, 4) of window (xl, yb, xr, yt) bounds,
+            in resolution units.
+        """
+        xi0, yi0, xi1, yi1 = self._get_windows(win, step)
+        shape = (yi0.shape[0], xi0.shape[1])
+        pix = self._pixel
+        ans = np.empty(shape + (4,), dtype=np.int64)
+        ans[:, :, 0] = self._x0 + xi0 * pix
+        ans[:, :, 1] = self._y0 + yi0 * pix
+        ans[:, :, 2] = self._x0 + xi1 * pix
+        ans[:, :, 3] = self._y0 + yi1 * pix
+        return ans
+
+    def window_density(self, win, step=None):
+        # type: (WinType, Optional[WinType]) -> np.ndarray
+        """Compute metal density in sliding windows.
+
+        Windows start at the lower-left corner of the map and advance by step.  An extra
+        window is added at the upper/right edges if necessary, so the whole map is covered.
+
+        Parameters
+        ----------
+        win : WinType
+            the window size, in resolution units.  Either a single number or (width, height).
+        step : Optional[WinType]
+            the window step, in resolution units.  Defaults to the window size.
+
+        Returns
+        -------
+        density : np.ndarray
+            a 2D array of window densities, indexed by [row, column].
+        """
+        xi0, yi0, xi1, yi1 = self._get_windows(win, step)
+        return self._sum(yi0, xi0, yi1, xi1) / ((xi1 - xi0) * (yi1 - yi0))
+
+    def fill_target(self, win, density, step=None):
+        # type: (WinType, float, Optional[WinType]) -> np.ndarray
+        """Compute the additional fill area needed in each window to meet a minimum density.
+
+        Parameters
+        ----------
+        win : WinType
+            the window size, in resolution units.  Either a single number or (width, height).
+        density : float
+            the target minimum density.
+        step : Optional[WinType]
+            the window step, in resolution units.  Defaults to the window size.
+
+        Returns
+        -------
+        fill_area : np.ndarray
+            a 2D array of additional fill area needed in each window, in resolution units
+            squared, indexed by [row, column].  0 if the window already meets the target.
+        """
+        xi0, yi0, xi1, yi1 = self._get_windows(win, step)
+        num_pix = (xi1 - xi0) * (yi1 - yi0)
+        num_need = np.ceil(density * num_pix).astype(np.int64) - self._sum(yi0, xi0, yi1, xi1)
+        return np.maximum(num_need, 0) * (self._pixel * self._pixel)
+
+    def tile_density(self, win, box=None):
+        # type: (WinType, Optional[BBox]) -> List[Tuple[BBox, float]]
+        """Divide the given box into non-overlapping windows, and compute their metal density.
+
+        Windows start at the lower-left corner of the box.  Windows at the upper/right edges
+        are clipped to the box, so the windows exactly cover the box.  Use this to fill each
+        window independently.
+
+        Parameters
+        ----------
+        win : WinType
+            the window size, in resolution units.  Either a single number or (width, height).
+        box : Optional[BBox]
+            the area to divide.  Defaults to the bounding box of this map.
+
+        Returns
+        -------
+        tile_list : List[Tuple[BBox, float]]
+            list of (window box, metal density) tuples, ordered by row, then by column.
+        """
+        if box is None:
+            box = self._box
+        if isinstance(win, int):
+            win = (win, win)
+        wx, wy = win
+        if wx <= 0 or wy <= 0:
+            raise ValueError('window size = %s must be positive' % (win, ))
+        xl, yb, xr, yt = box.get_bounds(unit_mode=True)
+        res = box.resolution
+        x_list = list(range(xl, xr, wx)) or [xl]
+        y_list = list(range(yb, yt, wy)) or [yb]
+        ans = []
+        for y0 in y_list:
+            y1 = min(y0 + wy, yt)
+            for x0 in x_list:
+                tile = BBox(x0, y0, min(x0 + wx, xr), y1, res, unit_mode=True)
+                ans.append((tile, self.get_density(tile)))
+        return ans
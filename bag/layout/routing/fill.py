@@ -3,12 +3,24 @@
 """This module defines classes that provides automatic fill utility on a grid.
 """
 
-from typing import TYPE_CHECKING, Optional, Union, List, Tuple, Any, Generator
-
+from typing import TYPE_CHECKING, Optional, Union, List, Tuple, Any, Generator, Iterable, Dict, \
+    Callable, Sequence
+
+import os
+import bisect
+import pickle
+import inspect
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from rtree.index import Index, Property
 
-from bag.layout.util import BBox
+from bag.layout.util import BBox, tuple2_to_int
+from bag.util.interval import IntervalSet
 from bag.util.search import BinaryIterator, minimize_cost_golden
+from .density import DensityMap, WinType
 
 if TYPE_CHECKING:
     from bag.layout.util import BBoxArray
@@ -74,6 +86,201 @@ class RectIndex(object):
             yield BBox(xl, yb, xr, yt, res, unit_mode=True)
 
 
+class PackedRectIndex(object):
+    """A read-only, memory-mapped spatial index of all tracks on a layer.
+
+    Rectangles are stored as rows of (xl, yb, xr, yt, dx, dy) in a sort-tile-recursive order,
+    so that every consecutive group of node_size rows forms a node of a static packed R-tree.
+    The node bounding boxes (including spacing) are stored in a separate array, and queries
+    test all node boxes at once with numpy before testing individual rectangles.
+
+    Both arrays are usually views into a numpy.memmap, so opening an index costs no copy and
+    many processes reading the same file share the same pages.  Rectangles recorded after
+    construction go into a regular in-memory RectIndex.
+
+    Parameters
+    ----------
+    resolution : float
+        the layout resolution.
+    rects : np.ndarray
+        the rectangle array, with shape (N, 6).
+    nodes : np.ndarray
+        the node bounding box array, with shape (ceil(N / node_size), 4).
+    node_size : int
+        number of rectangles per node.
+    """
+
+    def __init__(self, resolution, rects, nodes, node_size):
+        # type: (float, np.ndarray, np.ndarray, int) -> None
+        self._res = resolution
+        self._rects = rects
+        self._nodes = nodes
+        self._node_size = node_size
+        self._extra = None  # type: Optional[RectIndex]
+
+    @property
+    def bound_box(self):
+        # type: () -> BBox
+        nodes = self._nodes
+        if nodes.shape[0] == 0:
+            box = BBox.get_invalid_bbox()
+        else:
+            box = BBox(nodes[:, 0].min(), nodes[:, 1].min(), nodes[:, 2].max(),
+                       nodes[:, 3].max(), self._res, unit_mode=True)
+        if self._extra is not None:
+            box = box.merge(self._extra.bound_box)
+        return box
+
+    def close(self):
+        self._rects = self._nodes = None
+        if self._extra is not None:
+            self._extra.close()
+
+    def record_box(self, box, dx, dy):
+        # type: (BBox, int, int) -> None
+        """Record the given BBox."""
+        if self._extra is None:
+            self._extra = RectIndex(self._res)
+        self._extra.record_box(box, dx, dy)
+
+    def _get_candidates(self, xl, yb, xr, yt):
+        # type: (int, int, int, int) -> np.ndarray
+        """Returns rectangles in nodes whose bounding box touches the given box."""
+        nodes = self._nodes
+        node_idx = np.flatnonzero((nodes[:, 0] <= xr) & (nodes[:, 2] >= xl) &
+                                  (nodes[:, 1] <= yt) & (nodes[:, 3] >= yb))
+        if node_idx.size == 0:
+            return self._rects[:0]
+        rect_idx = (node_idx[:, np.newaxis] * self._node_size +
+                    np.arange(self._node_size)).ravel()
+        return self._rects[rect_idx[rect_idx < self._rects.shape[0]]]
+
+    def rect_iter(self):
+        # type: () -> Generator[Tuple[BBox, int, int], None, None]
+        res = self._res
+        for xl, yb, xr, yt, sdx, sdy in self._rects.tolist():
+            yield BBox(xl, yb, xr, yt, res, unit_mode=True), sdx, sdy
+        if self._extra is not None:
+            yield from self._extra.rect_iter()
+
+    def intersection_iter(self, box, dx=0, dy=0):
+        # type: (BBox, int, int) -> Generator[BBox, None, None]
+        """Finds all bounding box that intersects the given box."""
+        res = self._res
+        txl, tyb, txr, tyt = box.expand(dx=dx, dy=dy, unit_mode=True).get_bounds(unit_mode=True)
+        bxl, byb, bxr, byt = box.get_bounds(unit_mode=True)
+        cand = self._get_candidates(txl, tyb, txr, tyt).astype(np.int64)
+        if cand.shape[0] > 0:
+            xl, yb, xr, yt, sdx, sdy = cand.T
+            # same test as RectIndex: either the spaced rectangle overlaps the given box,
+            # or the rectangle overlaps the spaced box.
+            sp_ovl = ((np.maximum(xl - sdx, bxl) < np.minimum(xr + sdx, bxr)) &
+                      (np.maximum(yb - sdy, byb) < np.minimum(yt + sdy, byt)))
+            ovl = ((np.maximum(xl, txl) < np.minimum(xr, txr)) &
+                   (np.maximum(yb, tyb) < np.minimum(yt, tyt)))
+            cand = cand[sp_ovl | ovl]
+            ex = np.maximum(cand[:, 4], dx)
+            ey = np.maximum(cand[:, 5], dy)
+            exp_arr = np.stack((cand[:, 0] - ex, cand[:, 1] - ey, cand[:, 2] + ex,
+                                cand[:, 3] + ey), axis=1)
+            for bnds in exp_arr.tolist():
+                yield BBox(bnds[0], bnds[1], bnds[2], bnds[3], res, unit_mode=True)
+        if self._extra is not None:
+            yield from self._extra.intersection_iter(box, dx=dx, dy=dy)
+
+    def intersection_rect_iter(self, box):
+        # type: (BBox) -> Generator[BBox, None, None]
+        """Finds all bounding box that intersects the given box."""
+        res = self._res
+        bxl, byb, bxr, byt = box.get_bounds(unit_mode=True)
+        cand = self._get_candidates(bxl, byb, bxr, byt).astype(np.int64)
+        if cand.shape[0] > 0:
+            xl, yb, xr, yt, sdx, sdy = cand.T
+            keep = ((xl - sdx <= bxr) & (xr + sdx >= bxl) & (yb - sdy <= byt) & (yt + sdy >= byb))
+            for bnds in cand[keep, :4].tolist():
+                yield BBox(bnds[0], bnds[1], bnds[2], bnds[3], res, unit_mode=True)
+        if self._extra is not None:
+            yield from self._extra.intersection_rect_iter(box)
+
+
+# packed track file header: magic number, version, number of layers, node size
+_PACKED_MAGIC = 0x4B525442
+_PACKED_VERSION = 1
+_PACKED_HEADER_SIZE = 4
+_PACKED_LAYER_COLS = 5
+
+
+def _pack_rect_array(rects, node_size):
+    # type: (np.ndarray, int) -> Tuple[np.ndarray, np.ndarray]
+    """Sort the given rectangle array in sort-tile-recursive order and compute node boxes."""
+    num_rect = rects.shape[0]
+    sp_bnds = np.stack((rects[:, 0] - rects[:, 4], rects[:, 1] - rects[:, 5],
+                        rects[:, 2] + rects[:, 4], rects[:, 3] + rects[:, 5]), axis=1)
+    num_node = -(-num_rect // node_size)
+    slab_size = node_size * int(np.ceil(np.sqrt(num_node)))
+    xc = sp_bnds[:, 0] + sp_bnds[:, 2]
+    yc = sp_bnds[:, 1] + sp_bnds[:, 3]
+    slab_idx = np.empty(num_rect, dtype=np.int64)
+    slab_idx[np.argsort(xc, kind='stable')] = np.arange(num_rect) // slab_size
+    order = np.lexsort((yc, slab_idx))
+    rects = rects[order]
+    sp_bnds = sp_bnds[order]
+    starts = np.arange(0, num_rect, node_size)
+    nodes = np.stack((np.minimum.reduceat(sp_bnds[:, 0], starts),
+                      np.minimum.reduceat(sp_bnds[:, 1], starts),
+                      np.maximum.reduceat(sp_bnds[:, 2], starts),
+                      np.maximum.reduceat(sp_bnds[:, 3], starts)), axis=1)
+    return rects, nodes
+
+
+def save_packed_tracks(fname, rect_iter, node_size=16):
+    # type: (str, Iterable[Tuple[int, BBox, int, int]], int) -> None
+    """Save rectangles to a memory-mappable packed track file.
+
+    The file is a flat array of int32 values with the following sections:
+
+    1. header: magic number, version, number of layers, node size.
+    2. layer table: (layer ID, rectangle offset, number of rectangles, node offset,
+       number of nodes) for each layer.
+    3. rectangle table: (xl, yb, xr, yt, dx, dy) for each rectangle.
+    4. node table: (xl, yb, xr, yt) of each node, including spacing.
+
+    Parameters
+    ----------
+    fname : str
+        the file name.
+    rect_iter : Iterable[Tuple[int, BBox, int, int]]
+        an iterable of (layer ID, rectangle, x spacing, y spacing) tuples, in resolution units.
+    node_size : int
+        number of rectangles per spatial index node.
+    """
+    lay_table = {}  # type: Dict[int, List[Tuple[int, int, int, int, int, int]]]
+    for layer_id, box, dx, dy in rect_iter:
+        rect_list = lay_table.get(layer_id, None)
+        if rect_list is None:
+            rect_list = lay_table[layer_id] = []
+        rect_list.append((box.left_unit, box.bottom_unit, box.right_unit, box.top_unit, dx, dy))
+
+    rect_offset = node_offset = 0
+    layer_rows, rect_arrs, node_arrs = [], [], []
+    for layer_id in sorted(lay_table.keys()):
+        rects, nodes = _pack_rect_array(np.array(lay_table[layer_id], dtype=np.int64), node_size)
+        layer_rows.append((layer_id, rect_offset, rects.shape[0], node_offset, nodes.shape[0]))
+        rect_arrs.append(rects)
+        node_arrs.append(nodes)
+        rect_offset += rects.shape[0]
+        node_offset += nodes.shape[0]
+
+    data = np.concatenate([np.array([_PACKED_MAGIC, _PACKED_VERSION, len(layer_rows), node_size],
+                                    dtype=np.int64),
+                           np.array(layer_rows, dtype=np.int64).ravel()] +
+                          [arr.ravel() for arr in rect_arrs] + [arr.ravel() for arr in node_arrs])
+    info = np.iinfo(np.int32)
+    if data.size > 0 and (data.min() < info.min or data.max() > info.max):
+        raise ValueError('Coordinates in %s overflow 32-bit integers.' % fname)
+    data.astype(np.int32).tofile(fname)
+
+
 class UsedTracks(object):
     """A R-tree that stores all tracks in a template.
     """
@@ -83,10 +290,51 @@ class UsedTracks(object):
         self._idx_table = {}
         self._save_file_basename = save_file_basename
         self._overwrite = overwrite
+        self._new_records = None  # type: Optional[List[Tuple[int, BBox, int, int]]]
 
     def __iter__(self):
         return self._idx_table.keys()
 
+    @classmethod
+    def from_packed_file(cls, fname, resolution):
+        # type: (str, float) -> UsedTracks
+        """Open a packed track file created by save_packed_tracks() in read-only mode.
+
+        The file is memory-mapped, so no rectangle data is copied or parsed.
+
+        Parameters
+        ----------
+        fname : str
+            the packed track file name.
+        resolution : float
+            the layout resolution.
+
+        Returns
+        -------
+        used_tracks : UsedTracks
+            the UsedTracks object.
+        """
+        data = np.memmap(fname, dtype=np.int32, mode='r')
+        if data.size < _PACKED_HEADER_SIZE or data[0] != _PACKED_MAGIC:
+            raise ValueError('%s is not a packed track file.' % fname)
+        if data[1] != _PACKED_VERSION:
+            raise ValueError('Unsupported packed track file version: %d' % data[1])
+
+        num_layers, node_size = int(data[2]), int(data[3])
+        lay_end = _PACKED_HEADER_SIZE + num_layers * _PACKED_LAYER_COLS
+        layer_rows = data[_PACKED_HEADER_SIZE:lay_end].reshape(num_layers, _PACKED_LAYER_COLS)
+        num_rect_tot = int(layer_rows[:, 2].sum())
+        rect_arr = data[lay_end:lay_end + 6 * num_rect_tot].reshape(num_rect_tot, 6)
+        node_arr = data[lay_end + 6 * num_rect_tot:].reshape(-1, 4)
+
+        ans = cls()
+        for layer_id, rect_off, num_rect, node_off, num_node in layer_rows.tolist():
+            ans._idx_table[layer_id] = PackedRectIndex(resolution,
+                                                       rect_arr[rect_off:rect_off + num_rect],
+                                                       node_arr[node_off:node_off + num_node],
+                                                       node_size)
+        return ans
+
     def get_track_bbox(self, layer_id):
         # type: (int) -> BBox
         if layer_id not in self._idx_table:
@@ -109,6 +357,24 @@ class UsedTracks(object):
         else:
             index = self._idx_table[layer_id]
         index.record_box(box, dx, dy)
+        if self._new_records is not None:
+            self._new_records.append((layer_id, box, dx, dy))
+
+    def pop_new_records(self):
+        # type: () -> List[Tuple[int, BBox, int, int]]
+        """Returns all rectangles recorded since the last call of this method.
+
+        The first call only starts bookkeeping and returns an empty list.  This is used
+        to update TrackIntervalIndex objects incrementally.
+
+        Returns
+        -------
+        rect_list : List[Tuple[int, BBox, int, int]]
+            list of (layer ID, rectangle, x spacing, y spacing) tuples.
+        """
+        ans = [] if self._new_records is None else self._new_records
+        self._new_records = []
+        return ans
 
     def close(self):
         for index in self._idx_table.values():
@@ -157,16 +423,26 @@ class UsedTracks(object):
         if dy < 0:
             dy = dy0
 
+        new_records = self._new_records
         for box in box_arr:
             index.record_box(box, dx, dy)
+            if new_records is not None:
+                new_records.append((layer_id, box, dx, dy))
 
         return layer_id
 
-    def all_rect_iter(self):
-        # type: () -> Generator[Tuple[int, BBox, int, int], None, None]
-        for layer_id, index in self._idx_table.items():
+    def all_rect_iter(self, layer_id=None):
+        # type: (Optional[int]) -> Generator[Tuple[int, BBox, int, int], None, None]
+        """Iterates over all rectangles.  If layer_id is given, only iterate over that layer."""
+        if layer_id is None:
+            idx_iter = self._idx_table.items()
+        elif layer_id in self._idx_table:
+            idx_iter = ((layer_id, self._idx_table[layer_id]),)
+        else:
+            return
+        for lay_id, index in idx_iter:
             for box, dx, dy, in index.rect_iter():
-                yield layer_id, box, dx, dy
+                yield lay_id, box, dx, dy
 
     def intersection_rect_iter(self, layer_id, box):
         # type: (int, BBox) -> Generator[BBox, None, None]
@@ -180,6 +456,387 @@ class UsedTracks(object):
             yield from self._idx_table[layer_id].intersection_iter(test_box, dx=spx, dy=spy)
 
 
+class TrackIntervalIndex(object):
+    """An index of blocked intervals on every track of a layer.
+
+    For a given wire width and minimum spacing, this class keeps an IntervalSet of blocked
+    spans (including spacing) for each track.  All rectangles on the layer are first sorted
+    into bins of half track pitch.  The IntervalSet of a track is built from its bins on the
+    first query, so querying every track on a layer takes time roughly linear in the number
+    of rectangles and tracks, instead of one R-tree query per track.
+
+    The blocked spans are identical to those found with RectIndex.intersection_iter() on a
+    wire bounding box.  A rectangle blocks the track if either the rectangle expanded by its
+    own spacing overlaps the wire, or the rectangle overlaps the wire expanded by the
+    given spacing.  Rectangles that only block a track through the smaller of the two line-end
+    spacings are kept in a separate list, since whether they block a query depends on the query
+    interval.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the RoutingGrid object.
+    layer_id : int
+        the layer ID.
+    width : int
+        the wire width, in number of tracks.
+    sp : int
+        the minimum space to other wires, in resolution units.
+    sp_le : int
+        the minimum line-end space, in resolution units.
+    rect_iter : Iterable[Tuple[BBox, int, int]]
+        an iterable of (rectangle, x spacing, y spacing) on this layer.
+    """
+
+    def __init__(self, grid, layer_id, width, sp, sp_le, rect_iter):
+        # type: (RoutingGrid, int, int, int, int, Iterable[Tuple[BBox, int, int]]) -> None
+        self._grid = grid
+        self._layer_id = layer_id
+        self._width = width
+        self._sp = sp
+        self._sp_le = sp_le
+        self._is_horiz = grid.get_direction(layer_id) == 'x'
+        self._bin_size = max(1, grid.get_track_pitch(layer_id, unit_mode=True) // 2)
+        self._tr_w = grid.get_track_width(layer_id, width, unit_mode=True)
+
+        self._recs = np.array([self._get_record(box, dx, dy) for box, dx, dy in rect_iter],
+                              dtype=np.int64).reshape(-1, 6)
+        self._extra_recs = []  # type: List[Tuple[int, int, int, int, int, int]]
+        self._bin_keys = self._bin_recs = None  # type: Optional[np.ndarray]
+        self._build_bins()
+        # per-track data: half-track index -> (wire bounds, IntervalSet, list of gated spans)
+        self._track_table = {}  # type: Dict[int, Tuple[Tuple[int, int], IntervalSet, List]]
+        self._track_lower = []  # type: List[Tuple[int, int]]
+
+    @property
+    def layer_id(self):
+        # type: () -> int
+        return self._layer_id
+
+    def _get_record(self, box, dx, dy):
+        # type: (BBox, int, int) -> Tuple[int, int, int, int, int, int]
+        """Returns (perp lower, perp upper, long lower, long upper, perp sp, long sp)."""
+        if self._is_horiz:
+            return (box.bottom_unit, box.top_unit, box.left_unit, box.right_unit, dy, dx)
+        return (box.left_unit, box.right_unit, box.bottom_unit, box.top_unit, dx, dy)
+
+    def _build_bins(self):
+        # type: () -> None
+        """Merge extra records and sort all records into bins."""
+        if self._extra_recs:
+            self._recs = np.concatenate((self._recs, np.array(self._extra_recs, dtype=np.int64)))
+            self._extra_recs = []
+        recs = self._recs
+        bsize = self._bin_size
+        sp_perp = np.maximum(recs[:, 4], self._sp)
+        bin_lo = (recs[:, 0] - sp_perp) // bsize
+        bin_hi = -(-(recs[:, 1] + sp_perp) // bsize) - 1
+        counts = np.maximum(bin_hi - bin_lo + 1, 0)
+        num_tot = int(counts.sum())
+        rec_idx = np.repeat(np.arange(recs.shape[0]), counts)
+        bins = np.repeat(bin_lo - np.cumsum(counts) + counts, counts) + np.arange(num_tot)
+        order = np.argsort(bins, kind='stable')
+        self._bin_keys = bins[order]
+        self._bin_recs = rec_idx[order]
+
+    def _classify(self, recs, tl, tu):
+        # type: (np.ndarray, int, int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """Returns plain blocked spans, gated blocked spans, and their gate intervals."""
+        sp, sp_le = self._sp, self._sp_le
+        pl, pu, bl, bu, s_p, s_le = recs.T
+        a_ok = ((np.maximum(pl - s_p, tl) < np.minimum(pu + s_p, tu)) & (bu - bl + 2 * s_le > 0))
+        b_ok = ((np.maximum(pl, tl - sp) < np.minimum(pu, tu + sp)) & (bu > bl))
+        m_le = np.maximum(s_le, sp_le)
+        spans = np.stack((bl - m_le, bu + m_le), axis=1)
+        plain = (a_ok & b_ok) | (a_ok & (s_le >= sp_le)) | (b_ok & (s_le <= sp_le))
+        gate_a = a_ok & ~b_ok & (s_le < sp_le)
+        gate_b = b_ok & ~a_ok & (s_le > sp_le)
+        gated = gate_a | gate_b
+        gate_sp = np.where(gate_a, s_le, sp_le)[gated]
+        gates = np.stack((bl[gated] - gate_sp, bu[gated] + gate_sp), axis=1)
+        return spans[plain], spans[gated], gates
+
+    def _get_track(self, htr):
+        # type: (int) -> Tuple[Tuple[int, int], IntervalSet, List]
+        """Returns the blockage information of the given half-track index."""
+        info = self._track_table.get(htr, None)
+        if info is not None:
+            return info
+
+        if len(self._extra_recs) > max(256, self._recs.shape[0] // 4):
+            self._build_bins()
+
+        tl, tu = self._grid.get_wire_bounds(self._layer_id, (htr - 1) / 2, width=self._width,
+                                            unit_mode=True)
+        bsize = self._bin_size
+        idx0 = np.searchsorted(self._bin_keys, tl // bsize, side='left')
+        idx1 = np.searchsorted(self._bin_keys, -(-tu // bsize) - 1, side='right')
+        recs = self._recs[np.unique(self._bin_recs[idx0:idx1])]
+        if self._extra_recs:
+            recs = np.concatenate((recs, np.array(self._extra_recs, dtype=np.int64)))
+
+        spans, gated_spans, gates = self._classify(recs, tl, tu)
+        merged = []  # type: List[Tuple[int, int]]
+        for start, stop in sorted(spans.tolist()):
+            if merged and start <= merged[-1][1]:
+                if stop > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], stop)
+            else:
+                merged.append((start, stop))
+        gated_list = [(g[0], g[1], e[0], e[1]) for g, e in zip(gates.tolist(),
+                                                               gated_spans.tolist())]
+        info = self._track_table[htr] = ((tl, tu), IntervalSet(intv_list=merged), gated_list)
+        bisect.insort(self._track_lower, (tl, htr))
+        return info
+
+    def record_box(self, box, dx, dy):
+        # type: (BBox, int, int) -> None
+        """Add the given rectangle to this index."""
+        rec = self._get_record(box, dx, dy)
+        self._extra_recs.append(rec)
+        if not self._track_table:
+            return
+
+        # update all tracks that are already built
+        sp_perp = max(rec[4], self._sp)
+        cand_lo = rec[0] - sp_perp
+        cand_hi = rec[1] + sp_perp
+        rec_arr = np.array([rec], dtype=np.int64)
+        idx0 = bisect.bisect_left(self._track_lower, (cand_lo - self._tr_w - 1, ))
+        idx1 = bisect.bisect_left(self._track_lower, (cand_hi, ))
+        for _, htr in self._track_lower[idx0:idx1]:
+            (tl, tu), intv_set, gated_list = self._track_table[htr]
+            spans, gated_spans, gates = self._classify(rec_arr, tl, tu)
+            for span in spans.tolist():
+                intv_set.add((span[0], span[1]), merge=True, abut=True)
+            for g, e in zip(gates.tolist(), gated_spans.tolist()):
+                gated_list.append((g[0], g[1], e[0], e[1]))
+
+    def get_blocked_intervals(self, tr_idx, lower, upper):
+        # type: (Union[float, int], int, int) -> IntervalSet
+        """Returns the blocked intervals on the given track within [lower, upper).
+
+        Parameters
+        ----------
+        tr_idx : Union[float, int]
+            the track index.
+        lower : int
+            the lower coordinate of the query interval.
+        upper : int
+            the upper coordinate of the query interval.
+
+        Returns
+        -------
+        intv_set : IntervalSet
+            the blocked intervals, clipped to the query interval.
+        """
+        _, intv_set, gated_list = self._get_track(int(round(2 * tr_idx)) + 1)
+        ans = IntervalSet()
+        for start, stop in intv_set.overlap_intervals((lower, upper)):
+            # overlap_intervals() also returns intervals that starts at upper
+            if start < upper:
+                ans.add((max(start, lower), min(stop, upper)), merge=True, abut=True)
+        for gl, gu, start, stop in gated_list:
+            if max(gl, lower) < min(gu, upper):
+                ans.add((max(start, lower), min(stop, upper)), merge=True, abut=True)
+        return ans
+
+    def is_blocked(self, tr_idx, lower, upper):
+        # type: (Union[float, int], int, int) -> bool
+        """Returns True if the given track has any blockage within [lower, upper)."""
+        _, intv_set, gated_list = self._get_track(int(round(2 * tr_idx)) + 1)
+        if intv_set.has_overlap((lower, upper)):
+            return True
+        return any(max(gl, lower) < min(gu, upper) for gl, gu, _, _ in gated_list)
+
+
+class FillSolverCache(object):
+    """A bounded LRU cache of fill_symmetric_* solver results.
+
+    The fill solvers are pure integer functions, and the same fill regions are solved
+    repeatedly across a design.  Results (including solver failures) are memoized in a
+    single least-recently-used table shared by all solvers.
+
+    Parameters
+    ----------
+    maxsize : int
+        maximum number of cached results.  0 disables caching.
+    """
+
+    def __init__(self, maxsize=65536):
+        # type: (int) -> None
+        self._maxsize = maxsize
+        self._table = OrderedDict()  # type: OrderedDict
+        self._hits = {}  # type: Dict[str, int]
+        self._misses = {}  # type: Dict[str, int]
+
+    @property
+    def maxsize(self):
+        # type: () -> int
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, val):
+        # type: (int) -> None
+        self._maxsize = val
+        self._trim()
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._table)
+
+    def _trim(self):
+        # type: () -> None
+        while len(self._table) > self._maxsize:
+            self._table.popitem(last=False)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all cached results and reset statistics."""
+        self._table.clear()
+        self._hits.clear()
+        self._misses.clear()
+
+    def stats(self):
+        # type: () -> Dict[str, Any]
+        """Returns cache statistics.
+
+        Returns
+        -------
+        stats : Dict[str, Any]
+            a dictionary with total hits/misses, current size, maximum size, and
+            per-solver hits/misses.
+        """
+        return dict(
+            hits=sum(self._hits.values()),
+            misses=sum(self._misses.values()),
+            size=len(self._table),
+            maxsize=self._maxsize,
+            solvers={name: (self._hits.get(name, 0), self._misses.get(name, 0))
+                     for name in set(self._hits) | set(self._misses)},
+        )
+
+    def lookup(self, fun, key):
+        # type: (Callable, Tuple[Any, ...]) -> Any
+        """Returns the cached result of the given solver call, computing it if necessary.
+
+        Parameters
+        ----------
+        fun : Callable
+            the solver function.  Called with no arguments on cache miss.
+        key : Tuple[Any, ...]
+            the cache key.  The first entry is the solver name.
+
+        Returns
+        -------
+        result : Any
+            the solver result.
+        """
+        name = key[0]
+        entry = self._table.get(key, None)
+        if entry is None:
+            self._misses[name] = self._misses.get(name, 0) + 1
+            try:
+                entry = (True, fun())
+            except ValueError as ex:
+                entry = (False, (ex.__class__, ex.args))
+            if self._maxsize > 0:
+                self._table[key] = entry
+                self._trim()
+        else:
+            self._hits[name] = self._hits.get(name, 0) + 1
+            self._table.move_to_end(key)
+
+        success, val = entry
+        if success:
+            return val
+        err_cls, err_args = val
+        raise err_cls(*err_args)
+
+    def save(self, fname):
+        # type: (str) -> None
+        """Save cached results to the given file.
+
+        Parameters
+        ----------
+        fname : str
+            the file name.
+        """
+        with open(fname, 'wb') as f:
+            pickle.dump(list(self._table.items()), f, protocol=-1)
+
+    def load(self, fname):
+        # type: (str) -> bool
+        """Load cached results from the given file.
+
+        Loaded results are treated as least recently used.  Statistics are not changed.
+
+        Parameters
+        ----------
+        fname : str
+            the file name.
+
+        Returns
+        -------
+        success : bool
+            True if the file exists and is loaded.
+        """
+        if not os.path.isfile(fname):
+            return False
+        with open(fname, 'rb') as f:
+            item_list = pickle.load(f)
+        table = OrderedDict(item_list)
+        table.update(self._table)
+        self._table = table
+        self._trim()
+        return True
+
+
+fill_solver_cache = FillSolverCache()
+
+
+def _memoize_fill(shift_offset=False):
+    # type: (bool) -> Callable[[Callable], Callable]
+    """Decorator that memoizes a fill solver in fill_solver_cache.
+
+    Parameters
+    ----------
+    shift_offset : bool
+        True if the solver returns fill intervals that are shifted by the offset argument.
+        Results are then cached at zero offset and shifted, so identical regions at
+        different locations share the same cache entry.
+    """
+    def decorator(fun):
+        name = fun.__name__
+        offset_idx = list(inspect.signature(fun).parameters).index('offset') if shift_offset else -1
+
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            offset = 0
+            if shift_offset:
+                if len(args) > offset_idx:
+                    offset = args[offset_idx]
+                    args = args[:offset_idx] + args[offset_idx + 1:]
+                else:
+                    offset = kwargs.pop('offset', 0)
+                kwargs['offset'] = 0
+
+            key = (name, args, tuple(sorted(kwargs.items())))
+            ans = fill_solver_cache.lookup(lambda: fun(*args, **kwargs), key)
+
+            if shift_offset:
+                intv_list, extra = (ans, None) if isinstance(ans, list) else ans
+                intv_list = [(start + offset, stop + offset) for start, stop in intv_list]
+                return intv_list if extra is None else (intv_list, extra)
+            return ans
+
+        wrapper.uncached = fun
+        return wrapper
+
+    return decorator
+
+
+@_memoize_fill(shift_offset=True)
 def fill_symmetric_const_space(area, sp_max, n_min, n_max, offset=0):
     # type: (int, int, int, int, int) -> List[Tuple[int, int]]
     """Fill the given 1-D area given maximum space spec alone.
@@ -261,6 +918,7 @@ def fill_symmetric_const_space(area, sp_max, n_min, n_max, offset=0):
                                  invert=True, fill_on_edge=True, cyclic=False)[0]
 
 
+@_memoize_fill()
 def fill_symmetric_min_density_info(area, targ_area, n_min, n_max, sp_min,
                                     sp_max=None, fill_on_edge=True, cyclic=False):
     # type: (int, int, int, int, int, Optional[int], bool, bool) -> Tuple[Tuple[Any, ...], bool]
@@ -346,6 +1004,7 @@ def fill_symmetric_min_density_info(area, targ_area, n_min, n_max, sp_min,
     return (fill_area, nfill_opt, info[1]), invert
 
 
+@_memoize_fill()
 def fill_symmetric_max_density_info(area, targ_area, n_min, n_max, sp_min,
                                     sp_max=None, fill_on_edge=True, cyclic=False):
     # type: (int, int, int, int, int, Optional[int], bool, bool) -> Tuple[Tuple[Any, ...], bool]
@@ -536,6 +1195,7 @@ class EmptyRegionError(ValueError):
     pass
 
 
+@_memoize_fill()
 def fill_symmetric_max_num_info(tot_area, nfill, n_min, n_max, sp_min,
                                 fill_on_edge=True, cyclic=False):
     # type: (int, int, int, int, int, bool, bool) -> Tuple[Tuple[Any, ...], bool]
@@ -891,6 +1551,7 @@ def fill_symmetric_interval(tot_area, sp, num_diff_sp, sp_edge, blk0, blk1, k, m
     return ans, num_diff_sp
 
 
+@_memoize_fill(shift_offset=True)
 def fill_symmetric_helper(tot_area, num_blk_tot, sp, offset=0, inc_sp=True, invert=False,
                           fill_on_edge=True, cyclic=False):
     # type: (int, int, int, int, bool, bool, bool, bool) -> Tuple[List[Tuple[int, int]], int]
@@ -958,3 +1619,313 @@ def fill_symmetric_helper(tot_area, num_blk_tot, sp, offset=0, inc_sp=True, inve
 
     _, args = fill_info
     return fill_symmetric_interval(*args, offset=offset, invert=invert)
+
+
+def get_max_space_fill2_wires(grid,  # type: RoutingGrid
+                              blockage_iter,  # type: Callable[..., Iterable[BBox]]
+                              layer_id,  # type: int
+                              bound_box,  # type: BBox
+                              cur_density=0.0,  # type: float
+                              ):
+    # type: (...) -> np.ndarray
+    """Compute density fill wires on the given layer.
+
+    This is the geometry computation behind TemplateBase.do_max_space_fill2().  It only reads
+    blockages, so it can run on a read-only snapshot of the template.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    blockage_iter : Callable[..., Iterable[BBox]]
+        the blockage query function, with the same signature as TemplateBase.blockage_iter().
+    layer_id : int
+        the fill layer ID.
+    bound_box : BBox
+        the fill area.
+    cur_density : float
+        existing metal density in the fill area.  It counts towards the target density.
+
+    Returns
+    -------
+    wires : np.ndarray
+        an integer array of shape (N, 3).  Each row is (htr, lower, upper), where htr is
+        the wire half-track index (2 * track_index + 1), and lower/upper are the wire
+        bounds in resolution units.
+    """
+    tech_info = grid.tech_info
+
+    fill_config = tech_info.tech_params['layout']['dummy_fill'][layer_id]
+    density = fill_config['density']
+    sp_max = fill_config['sp_max']
+    sp_le_max = fill_config['sp_le_max']
+    ip_margin = fill_config['margin']
+    ip_margin_le = fill_config['margin_le']
+    sp_max2 = sp_max // 2
+    sp_le_max2 = sp_le_max // 2
+    margin = sp_max2 // 2
+    margin_le = sp_le_max2 // 2
+
+    # get tracks information
+    long_dir = grid.get_direction(layer_id)
+    if long_dir == 'y':
+        tran_dir = 'x'
+        spx = sp_max2
+        spy = sp_le_max2
+    else:
+        tran_dir = 'y'
+        spx = sp_le_max2
+        spy = sp_max2
+    dim_tran0, dim_tran1 = tuple2_to_int(bound_box.get_interval(tran_dir, unit_mode=True))
+    dim_long0, dim_long1 = tuple2_to_int(bound_box.get_interval(long_dir, unit_mode=True))
+    dim_tranl = min(dim_tran1, dim_tran0 + sp_max2)
+    dim_tranu = max(dim_tran0, dim_tran1 - sp_max2)
+    dim_longl = min(dim_long1, dim_long0 + sp_le_max2)
+    dim_longu = max(dim_long0, dim_long1 - sp_le_max2)
+    dim_tran = dim_tran1 - dim_tran0
+    dim_long = dim_long1 - dim_long0
+
+    if dim_tran <= ip_margin or dim_long <= ip_margin_le:
+        return np.empty((0, 3), dtype=np.int64)
+
+    min_len = int(grid.get_min_length(layer_id, 1, unit_mode=True))
+    htr0 = int(grid.coord_to_nearest_track(layer_id, dim_tranl, half_track=True,
+                                           mode=-1, unit_mode=True))
+    htr1 = int(grid.coord_to_nearest_track(layer_id, dim_tranu, half_track=True,
+                                           mode=1, unit_mode=True))
+    htr0 = int(round(htr0 * 2 + 1))
+    htr1 = int(round(htr1 * 2 + 1))
+    num_htr_tot = htr1 - htr0 + 1
+
+    # calculate track pitch based on density/max space
+    tr_w, tr_sp = tuple2_to_int(grid.get_track_info(layer_id, unit_mode=True))
+    sp_le = int(grid.get_line_end_space(layer_id, 1, unit_mode=True))
+    tr_pitch2 = int(grid.get_track_pitch(layer_id, unit_mode=True)) // 2
+    density = max(0.0, density - cur_density)
+    num_tracks = int(round(-(-(dim_tran * density) // tr_w)))
+    num_tracks = min(max(num_tracks, -(-num_htr_tot // ((sp_max - tr_sp) // tr_pitch2 + 2))),
+                     num_htr_tot // 2)
+
+    fill_info = None
+    invert = False
+    for _ in range(100):
+        try:
+            fill_info, invert = fill_symmetric_max_num_info(num_htr_tot, num_tracks, 1, 1, 1,
+                                                            fill_on_edge=True, cyclic=False)
+        except NoFillChoiceError:
+            num_tracks -= 1
+    if fill_info is None:
+        raise ValueError('no fill solution.')
+
+    intv_list = fill_symmetric_interval(*fill_info[1], offset=htr0, invert=invert)[0]
+
+    # create interval sets
+    intv_tran0 = IntervalSet()
+    intv_tran1 = IntervalSet()
+    htr_list = [intv[0] for intv in intv_list]
+    num_htr = len(htr_list)
+    set_long0 = set(htr_list)
+    set_long1 = set_long0.copy()
+    intv_list = [IntervalSet() for _ in range(num_htr)]
+
+    # handle blockages
+    for blk_box in blockage_iter(layer_id, bound_box, spx=spx, spy=spy):
+        b_tran0, b_tran1 = tuple2_to_int(blk_box.get_interval(tran_dir, unit_mode=True))
+        b_long0, b_long1 = tuple2_to_int(blk_box.get_interval(long_dir, unit_mode=True))
+        b_long0_lim = max(b_long0, dim_longl)
+        b_long1_lim = min(b_long1, dim_longu)
+        blk_intv = (b_long0_lim, b_long1_lim)
+        if b_long0_lim < b_long1_lim:
+            # handle lower/upper transverse edges
+            if b_tran0 <= dim_tran0 and dim_tranl <= b_tran1:
+                intv_tran0.add(blk_intv, merge=True, abut=True)
+            if b_tran0 <= dim_tranu and dim_tran1 <= b_tran1:
+                intv_tran1.add(blk_intv, merge=True, abut=True)
+        cur_htr0 = int(grid.find_next_track(layer_id, b_tran0, half_track=True, mode=1,
+                                            unit_mode=True))
+        cur_htr1 = int(grid.find_next_track(layer_id, b_tran1, half_track=True, mode=-1,
+                                            unit_mode=True))
+        cur_htr0 = max(htr0, int(round(cur_htr0 * 2 + 1)))
+        cur_htr1 = min(htr1, int(round(cur_htr1 * 2 + 1)))
+        htr_idx0 = bisect.bisect_left(htr_list, cur_htr0)
+        if htr_idx0 < num_htr and htr_list[htr_idx0] <= cur_htr1:
+            htr_idx1 = min(num_htr - 1, bisect.bisect_right(htr_list, cur_htr1, lo=htr_idx0))
+            for htr_idx in range(htr_idx0, htr_idx1 + 1):
+                htr = htr_list[htr_idx]
+                # handle lower/upper longitudinal edges
+                if b_long0 <= dim_long0 and dim_longl <= b_long1:
+                    set_long0.discard(htr)
+                if b_long0 <= dim_longu and dim_long1 <= b_long1:
+                    set_long1.discard(htr)
+                if b_long0_lim < b_long1_lim:
+                    intv_list[htr_idx].add(blk_intv, merge=True, abut=True)
+
+    wire_list = []  # type: List[Tuple[int, int, int]]
+    # add fill in edges on transverse sides
+    trl = int(grid.coord_to_nearest_track(layer_id, dim_tran0 + margin, half_track=True,
+                                          mode=-1, unit_mode=True))
+    trr = int(grid.coord_to_nearest_track(layer_id, dim_tran1 - margin, half_track=True,
+                                          mode=1, unit_mode=True))
+    if trr < trl + 1:
+        # handle cases where the given bounding box is small
+        dim_mid = (dim_tran0 + dim_tran1) // 2
+        trl = int(grid.coord_to_nearest_track(layer_id, dim_mid, half_track=True,
+                                              mode=0, unit_mode=True))
+        tran_edge_iter = ((intv_tran0, trl),)
+    else:
+        tran_edge_iter = ((intv_tran0, trl), (intv_tran1, trr))
+
+    intv_long = (dim_longl, dim_longu)
+    for intv_set, tidx in tran_edge_iter:
+        for long0, long1 in intv_set.complement_iter(intv_long):
+            if long1 - long0 < min_len:
+                long0 = (long0 + long1 - min_len) // 2
+                long1 = long0 + min_len
+            wire_list.append((2 * tidx + 1, long0, long1))
+
+    # add fill in edges on longitude sides
+    if dim_long0 + 2 * (margin_le + min_len) + sp_le > dim_long1:
+        # handle cases where the giving bounding box is small
+        long_lower = min(dim_long0 + margin_le, (dim_long0 + dim_long1 - min_len) // 2)
+        long_upper = max(dim_long1 - margin_le, long_lower + min_len)
+        long_edge_iter = ((set_long0, long_lower, long_upper),)
+    else:
+        long_lower = dim_long0 + margin_le - min_len // 2
+        long_upper = dim_long1 - margin_le + min_len // 2
+        long_edge_iter = ((set_long0, long_lower, long_lower + min_len),
+                          (set_long1, long_upper - min_len, long_upper))
+
+    for set_long_edge, lower, upper in long_edge_iter:
+        intv_mark = (max(dim_longl, lower - sp_le_max2), min(dim_longu, upper + sp_le_max2))
+        for htr in set_long_edge:
+            htr_idx = bisect.bisect_left(htr_list, htr)
+            intv_list[htr_idx].add(intv_mark, merge=True, abut=True)
+            wire_list.append((htr, lower, upper))
+
+    # add rest of fill
+    for htr, intv_set in zip(htr_list, intv_list):
+        for long0, long1 in intv_set.complement_iter(intv_long):
+            if long1 - long0 < min_len:
+                long0 = (long0 + long1 - min_len) // 2
+                long1 = long0 + min_len
+            wire_list.append((htr, long0, long1))
+
+    return np.array(wire_list, dtype=np.int64).reshape(-1, 3)
+
+
+def get_window_fill2_wires(grid,  # type: RoutingGrid
+                           blockage_iter,  # type: Callable[..., Iterable[BBox]]
+                           layer_id,  # type: int
+                           bound_box,  # type: BBox
+                           density_map=None,  # type: Optional[DensityMap]
+                           window=None,  # type: Optional[WinType]
+                           ):
+    # type: (...) -> np.ndarray
+    """Compute density fill wires on the given layer, window by window.
+
+    The fill area is divided into density windows, and each window is filled independently
+    by get_max_space_fill2_wires(), with the existing metal density of that window counting
+    towards the target density.  So sparse windows are filled up to the target density,
+    while dense windows only get the fill needed to satisfy maximum space rules.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    blockage_iter : Callable[..., Iterable[BBox]]
+        the blockage query function, with the same signature as TemplateBase.blockage_iter().
+    layer_id : int
+        the fill layer ID.
+    bound_box : BBox
+        the fill area.
+    density_map : Optional[DensityMap]
+        the existing metal density map of this layer.  If None, existing metal is ignored,
+        and the whole fill area is filled at once.
+    window : Optional[WinType]
+        the density window size, in resolution units.  Defaults to the 'density_window'
+        entry of the dummy fill configuration of this layer.  If that is not given either,
+        the whole fill area is one window.
+
+    Returns
+    -------
+    wires : np.ndarray
+        the fill wires.  See get_max_space_fill2_wires() for details.
+    """
+    if density_map is None:
+        return get_max_space_fill2_wires(grid, blockage_iter, layer_id, bound_box)
+
+    if window is None:
+        fill_config = grid.tech_info.tech_params['layout']['dummy_fill'][layer_id]
+        window = fill_config.get('density_window', None)
+    if window is None:
+        tile_list = [(bound_box, density_map.get_density(bound_box))]
+    else:
+        tile_list = density_map.tile_density(window, bound_box)
+
+    wire_list = [get_max_space_fill2_wires(grid, blockage_iter, layer_id, tile,
+                                           cur_density=cur_density)
+                 for tile, cur_density in tile_list]
+    return np.concatenate(wire_list, axis=0)
+
+
+# per-process state of max space fill workers, as (snapshot file name, read-only UsedTracks
+# snapshot).  The snapshot is loaded by the first task a worker runs, and reused by later tasks.
+_fill_worker_state = None  # type: Optional[Tuple[str, UsedTracks]]
+
+
+def _max_space_fill2_worker(grid, tracks_fname, layer_id, bound_box, density_pixel, window):
+    # type: (RoutingGrid, str, int, BBox, Optional[int], Optional[WinType]) -> np.ndarray
+    """Compute max space fill wires of one layer on the worker blockage snapshot."""
+    global _fill_worker_state
+    if _fill_worker_state is None or _fill_worker_state[0] != tracks_fname:
+        _fill_worker_state = (tracks_fname,
+                              UsedTracks.from_packed_file(tracks_fname, grid.resolution))
+    used_tracks = _fill_worker_state[1]
+    density_map = None
+    if density_pixel is not None:
+        box_iter = (box for _, box, _, _ in used_tracks.all_rect_iter(layer_id=layer_id))
+        density_map = DensityMap.from_boxes(bound_box, density_pixel, box_iter)
+    return get_window_fill2_wires(grid, used_tracks.blockage_iter, layer_id, bound_box,
+                                  density_map=density_map, window=window)
+
+
+def get_max_space_fill2_wires_parallel(grid,  # type: RoutingGrid
+                                       tracks_fname,  # type: str
+                                       layer_list,  # type: Sequence[int]
+                                       bound_box,  # type: BBox
+                                       max_workers,  # type: int
+                                       density_pixel=None,  # type: Optional[int]
+                                       window=None,  # type: Optional[WinType]
+                                       ):
+    # type: (...) -> List[np.ndarray]
+    """Compute density fill wires on several layers in worker processes.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    tracks_fname : str
+        the blockage snapshot file, created by save_packed_tracks().
+    layer_list : Sequence[int]
+        the fill layer IDs.
+    bound_box : BBox
+        the fill area.
+    max_workers : int
+        maximum number of worker processes.
+    density_pixel : Optional[int]
+        If given, existing metal density is computed from the snapshot with this pixel size,
+        and it counts towards the target density of each density window.
+    window : Optional[WinType]
+        the density window size.  See get_window_fill2_wires() for details.
+
+    Returns
+    -------
+    wire_list : List[np.ndarray]
+        fill wires of each layer.  See get_max_space_fill2_wires() for details.
+    """
+    num_layers = len(layer_list)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_max_space_fill2_worker, [grid] * num_layers,
+                                 [tracks_fname] * num_layers, layer_list,
+                                 [bound_box] * num_layers, [density_pixel] * num_layers,
+                                 [window] * num_layers))
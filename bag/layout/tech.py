@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from typing import List, Tuple, Union, Optional, Callable, TYPE_CHECKING
+from typing import List, Tuple, Union, Optional, Callable, Dict, Any, Sequence, TYPE_CHECKING
 
+import os
 import abc
+import pickle
+from bisect import bisect_left
 
+from bag.io import read_yaml
 from .core import TechInfo
 
 if TYPE_CHECKING:
@@ -11,13 +15,286 @@ if TYPE_CHECKING:
     from bag.layout.template import TemplateBase
 
 
+def _get_breakpoints(w_list, val_list):
+    # type: (Sequence[Any], Sequence[Any]) -> Tuple[List[Any], List[Any]]
+    """Compile a width breakpoint table for bisection.
+
+    Width rules are looked up by returning the value of the first breakpoint greater than or
+    equal to the width.  This method removes breakpoints that can never be selected, so the
+    returned breakpoints are strictly increasing and can be searched with bisect_left().
+    """
+    bp_list, bp_vals = [], []
+    for w, val in zip(w_list, val_list):
+        if not bp_list or w > bp_list[-1]:
+            bp_list.append(w)
+            bp_vals.append(val)
+    return bp_list, bp_vals
+
+
+def _lookup_breakpoints(table, w, default=None):
+    # type: (Tuple[List[Any], List[Any]], Any, Any) -> Any
+    """Returns value of the first breakpoint greater than or equal to w."""
+    bp_list, bp_vals = table
+    idx = bisect_left(bp_list, w)
+    return bp_vals[idx] if idx < len(bp_vals) else default
+
+
+def _get_file_stamp(fname):
+    # type: (str) -> Tuple[int, int]
+    stat = os.stat(fname)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TechRules(object):
+    """Technology rule tables compiled from a technology configuration dictionary.
+
+    Width dependent rules are compiled to breakpoint tables that are searched by bisection,
+    and via rules are compiled per via type, with vertical rectangle vias derived from
+    horizontal ones already rotated.  TechRules objects can be saved to and loaded from a
+    pickle file, so the technology file does not have to be parsed and compiled at startup.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        the technology configuration dictionary.
+    source : Optional[str]
+        the technology configuration file name.  Used to check whether a saved TechRules
+        object is up to date.
+    """
+
+    version = 1
+
+    def __init__(self, config, source=None):
+        # type: (Dict[str, Any], Optional[str]) -> None
+        self.config = config
+        self._source_stamp = None if source is None else _get_file_stamp(source)
+        self._layer_id = {}  # type: Dict[str, int]
+        for lay_id, lay_name in config.get('layer_name', {}).items():
+            self._layer_id.setdefault(lay_name, lay_id)
+
+        self._space = {}  # type: Dict[str, Dict[str, Tuple[List[Any], List[Any]]]]
+        for config_name in ('sp_min', 'sp_sc_min', 'sp_le_min'):
+            if config_name in config:
+                self._space[config_name] = {
+                    lay_type: _get_breakpoints(info['w_list'], info['sp_list'])
+                    for lay_type, info in config[config_name].items()}
+
+        self._len_min = {}  # type: Dict[str, Tuple[Tuple[List[Any], List[Any]], List[Any]]]
+        for lay_type, info in config.get('len_min', {}).items():
+            md_list = list(zip(reversed(info['md_list']), reversed(info['md_al_list'])))
+            self._len_min[lay_type] = _get_breakpoints(info['w_list'], info['w_al_list']), md_list
+
+        self._idc_scale = {mtype: (_get_breakpoints(info['temp'], info['scale']),
+                                   info['scale'][-1])
+                           for mtype, info in config.get('idc_em_scale', {}).items()}
+
+        self._via = {}  # type: Dict[str, Dict[str, Any]]
+        for vname, via_config in config.get('via', {}).items():
+            vtable = {vtype: self._compile_via(via_config[vtype], False) for vtype in via_config}
+            if 'vrect' not in via_config and 'hrect' in via_config:
+                vtable['vrect'] = self._compile_via(via_config['hrect'], True)
+            self._via[vname] = vtable
+
+    @classmethod
+    def _compile_via(cls, via_config, rotate):
+        # type: (Dict[str, Any], bool) -> Tuple[Any, ...]
+        """Compile via rules of a via type, optionally rotated by 90 degrees."""
+        dim = via_config['dim']
+        sp = via_config['sp']
+        sp2_list = via_config.get('sp2', None)
+        sp3_list = via_config.get('sp3', None)
+        top_enc = via_config['top_enc']
+        bot_enc = via_config['bot_enc']
+        if bot_enc is None:
+            bot_enc = top_enc
+        enc_tables = []
+        for enc_data in (bot_enc, top_enc):
+            enc_list = enc_data['enc_list']
+            if rotate:
+                enc_list = [[(yv, xv) for xv, yv in enc] for enc in enc_list]
+            enc_tables.append(_get_breakpoints(enc_data['w_list'], enc_list))
+
+        if rotate:
+            sp = sp[1], sp[0]
+            dim = dim[1], dim[0]
+            if sp2_list is not None:
+                sp2_list = [(spy, spx) for spx, spy in sp2_list]
+            if sp3_list is not None:
+                sp3_list = [(spy, spx) for spx, spy in sp3_list]
+
+        return rotate, sp, sp2_list, sp3_list, dim, enc_tables[0], enc_tables[1]
+
+    @classmethod
+    def load(cls, fname, source=None):
+        # type: (str, Optional[str]) -> Optional[TechRules]
+        """Load a saved TechRules object.
+
+        Parameters
+        ----------
+        fname : str
+            the saved file name.
+        source : Optional[str]
+            if given, the technology configuration file name the saved object must be
+            compiled from.
+
+        Returns
+        -------
+        rules : Optional[TechRules]
+            the saved TechRules object.  None if the file cannot be read, was saved by a
+            different version, or is out of date.
+        """
+        try:
+            with open(fname, 'rb') as f:
+                version, rules = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return None
+        if version != cls.version or not isinstance(rules, cls):
+            return None
+        if source is not None and rules._source_stamp != _get_file_stamp(source):
+            return None
+        return rules
+
+    @classmethod
+    def from_file(cls, config_fname, cache_fname=None):
+        # type: (str, Optional[str]) -> TechRules
+        """Read and compile the given technology configuration file.
+
+        Parameters
+        ----------
+        config_fname : str
+            the technology configuration file name.
+        cache_fname : Optional[str]
+            if given, the compiled rules are loaded from this file if it is up to date, and
+            saved to this file otherwise.
+
+        Returns
+        -------
+        rules : TechRules
+            the compiled rules.
+        """
+        if cache_fname is not None:
+            rules = cls.load(cache_fname, source=config_fname)
+            if rules is not None:
+                return rules
+
+        rules = cls(read_yaml(config_fname), source=config_fname)
+        if cache_fname is not None:
+            rules.save(cache_fname)
+        return rules
+
+    def save(self, fname):
+        # type: (str) -> None
+        """Save this object to the given file.
+
+        Parameters
+        ----------
+        fname : str
+            the file name.
+        """
+        tmp_fname = fname + '.tmp'
+        with open(tmp_fname, 'wb') as f:
+            pickle.dump((self.version, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, fname)
+
+    def get_layer_id(self, layer_name):
+        # type: (str) -> int
+        try:
+            return self._layer_id[layer_name]
+        except KeyError:
+            raise ValueError('Unknown layer: %s' % layer_name)
+
+    def get_space(self, config_name, layer_type, width):
+        # type: (str, str, int) -> Optional[int]
+        """Returns the space rule of the given layer type and width.  None if width is too large."""
+        sp_config = self._space[config_name]
+        if layer_type not in sp_config:
+            raise ValueError('Unsupported layer type: %s' % layer_type)
+        return _lookup_breakpoints(sp_config[layer_type], width)
+
+    def get_min_length(self, layer_type, w_unit):
+        # type: (str, int) -> int
+        """Returns the minimum length of a wire with the given layer type and width."""
+        if layer_type not in self._len_min:
+            raise ValueError('Unsupported layer type: %s' % layer_type)
+
+        w_table, md_list = self._len_min[layer_type]
+
+        # get minimum length from width spec
+        l_unit = 0
+        al_info = _lookup_breakpoints(w_table, w_unit)
+        if al_info is not None:
+            area, len_min = al_info
+            l_unit = max(len_min, -(-area // w_unit))
+
+        # check maximum dimension spec
+        for max_dim, (area, len_min) in md_list:
+            if max(w_unit, l_unit) > max_dim:
+                return l_unit
+            l_unit = max(l_unit, len_min, -(-area // w_unit))
+
+        return -(-l_unit // 2) * 2
+
+    def get_idc_scale_factor(self, temp, mtype):
+        # type: (float, str) -> float
+        """Returns the DC current EM scale factor of the given metal type at temperature temp."""
+        info = self._idc_scale.get(mtype, None)
+        if info is None:
+            info = self._idc_scale['default']
+        table, scale_max = info
+        return _lookup_breakpoints(table, temp, default=scale_max)
+
+    def get_via_rules(self, vname, vtype, mw_unit, is_bot):
+        # type: (str, str, int, bool) -> Tuple[Any, ...]
+        """Returns the via rules of the given via type and metal width.
+
+        Returns
+        -------
+        rotate : bool
+            True if the via rules are rotated from horizontal rectangle via rules.
+        sp : Tuple[int, int]
+            the via spacing.
+        sp2_list : Optional[List[Tuple[int, int]]]
+            the via spacing with 2 neighbors.
+        sp3_list : Optional[List[Tuple[int, int]]]
+            the via spacing with 3 neighbors.
+        dim : Tuple[int, int]
+            the via dimension.
+        enc : List[Tuple[int, int]]
+            the list of valid enclosures.  Empty if the metal is too wide.
+        """
+        vtable = self._via.get(vname, None)
+        if vtable is None:
+            raise ValueError('Unsupported vname %s' % vname)
+        info = vtable.get(vtype, None)
+        if info is None:
+            raise ValueError('Unsupported vtype %s' % ('hrect' if vtype == 'vrect' else vtype))
+
+        rotate, sp, sp2_list, sp3_list, dim, bot_table, top_table = info
+        enc_cur = _lookup_breakpoints(bot_table if is_bot else top_table, mw_unit, default=[])
+        return rotate, sp, sp2_list, sp3_list, dim, enc_cur
+
+
 class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
-    """An implementation of TechInfo that implements most methods with a technology file."""
-    def __init__(self, config, tech_params, mos_entry_name='mos'):
+    """An implementation of TechInfo that implements most methods with a technology file.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        the technology configuration dictionary.
+    tech_params : Dict[str, Any]
+        the technology parameters dictionary.
+    mos_entry_name : str
+        the transistor configuration entry name.
+    rules : Optional[TechRules]
+        the compiled technology rules.  If None, they will be compiled from config.  Use
+        TechRules.from_file() to load compiled rules saved on disk.
+    """
+    def __init__(self, config, tech_params, mos_entry_name='mos', rules=None):
         TechInfo.__init__(self, config['resolution'], config['layout_unit'],
                           config['tech_lib'], tech_params)
 
         self.config = config
+        self.rules = TechRules(config) if rules is None else rules
         self._mos_entry_name = mos_entry_name
         self.idc_temp = tech_params['layout']['em']['dc_temp']
         self.irms_dt = tech_params['layout']['em']['rms_dt']
@@ -111,10 +388,7 @@ class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
 
     def get_layer_id(self, layer_name):
         # type: (str) -> int
-        for key, val in self.config['layer_name'].items():
-            if val == layer_name:
-                return key
-        raise ValueError('Unknown layer: %s' % layer_name)
+        return self.rules.get_layer_id(layer_name)
 
     def get_layer_type(self, layer_name):
         # type: (str) -> str
@@ -125,19 +399,7 @@ class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
         # type: (float, str, bool) -> float
         if is_res:
             mtype = 'res'
-        idc_em_scale = self.config['idc_em_scale']
-        if mtype in idc_em_scale:
-            idc_params = idc_em_scale[mtype]
-        else:
-            idc_params = idc_em_scale['default']
-
-        temp_list = idc_params['temp']
-        scale_list = idc_params['scale']
-
-        for temp_test, scale in zip(temp_list, scale_list):
-            if temp <= temp_test:
-                return scale
-        return scale_list[-1]
+        return self.rules.get_idc_scale_factor(temp, mtype)
 
     def get_via_name(self, bot_layer_id):
         # type: (int) -> str
@@ -148,54 +410,14 @@ class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
         return self.config['via_id'][(bot_layer, top_layer)]
 
     def get_via_drc_info(self, vname, vtype, mtype, mw_unit, is_bot):
-        via_config = self.config['via']
-        if vname not in via_config:
-            raise ValueError('Unsupported vname %s' % vname)
-
-        via_config = via_config[vname]
-        if vtype == 'vrect' and vtype not in via_config:
-            # trying vertical rectangle via, but it does not exist,
-            # so try rotating horizontal rectangle instead
-            rotate = True
-            vtype2 = 'hrect'
-        else:
-            rotate = False
-            vtype2 = vtype
-        if vtype2 not in via_config:
-            raise ValueError('Unsupported vtype %s' % vtype2)
-
-        via_config = via_config[vtype2]
-
-        dim = via_config['dim']
-        sp = via_config['sp']
-        sp2_list = via_config.get('sp2', None)
-        sp3_list = via_config.get('sp3', None)
-
-        if not is_bot or via_config['bot_enc'] is None:
-            enc_data = via_config['top_enc']
-        else:
-            enc_data = via_config['bot_enc']
-
-        enc_w_list = enc_data['w_list']
-        enc_list = enc_data['enc_list']
-
-        enc_cur = []
-        for mw_max, enc in zip(enc_w_list, enc_list):
-            if mw_unit <= mw_max:
-                enc_cur = enc
-                break
+        rotate, sp, sp2_list, sp3_list, dim, enc_cur = self.rules.get_via_rules(vname, vtype,
+                                                                                 mw_unit, is_bot)
 
         arr_enc, arr_test_tmp = self.get_via_arr_enc(vname, vtype, mtype, mw_unit, is_bot)
         arr_test = arr_test_tmp
 
         if rotate:
-            sp = sp[1], sp[0]
-            dim = dim[1], dim[0]
-            enc_cur = [(yv, xv) for xv, yv in enc_cur]
-            if sp2_list is not None:
-                sp2_list = [(spy, spx) for spx, spy in sp2_list]
-            if sp3_list is not None:
-                sp3_list = [(spy, spx) for spx, spy in sp3_list]
+            # vertical rectangle via rules are rotated from horizontal rectangle via rules.
             if arr_enc is not None:
                 arr_enc = [(yv, xv) for xv, yv in arr_enc]
             if arr_test_tmp is not None:
@@ -205,18 +427,7 @@ class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
         return sp, sp2_list, sp3_list, dim, enc_cur, arr_enc, arr_test
 
     def _space_helper(self, config_name, layer_type, width):
-        sp_min_config = self.config[config_name]
-        if layer_type not in sp_min_config:
-            raise ValueError('Unsupported layer type: %s' % layer_type)
-
-        sp_min_config = sp_min_config[layer_type]
-        w_list = sp_min_config['w_list']
-        sp_list = sp_min_config['sp_list']
-
-        for w, sp in zip(w_list, sp_list):
-            if width <= w:
-                return sp
-        return None
+        return self.rules.get_space(config_name, layer_type, width)
 
     def get_min_space_unit(self, layer_type, w_unit, same_color=False):
         # type: (str, int, bool) -> int
@@ -260,29 +471,7 @@ class TechInfoConfig(TechInfo, metaclass=abc.ABCMeta):
         return type_dict[name_dict[layer_id]]
 
     def get_min_length_unit(self, layer_type, w_unit):
-        len_min_config = self.config['len_min']
-        if layer_type not in len_min_config:
-            raise ValueError('Unsupported layer type: %s' % layer_type)
-
-        w_list = len_min_config[layer_type]['w_list']
-        w_al_list = len_min_config[layer_type]['w_al_list']
-        md_list = len_min_config[layer_type]['md_list']
-        md_al_list = len_min_config[layer_type]['md_al_list']
-
-        # get minimum length from width spec
-        l_unit = 0
-        for w, (area, len_min) in zip(w_list, w_al_list):
-            if w_unit <= w:
-                l_unit = max(len_min, -(-area // w_unit))
-                break
-
-        # check maximum dimension spec
-        for max_dim, (area, len_min) in zip(reversed(md_list), reversed(md_al_list)):
-            if max(w_unit, l_unit) > max_dim:
-                return l_unit
-            l_unit = max(l_unit, len_min, -(-area // w_unit))
-
-        return -(-l_unit // 2) * 2
+        return self.rules.get_min_length(layer_type, w_unit)
 
     def get_min_length(self, layer_type, width):
         res = self.resolution
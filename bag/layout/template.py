@@ -12,9 +12,12 @@ import copy
 import time
 import bisect
 import pickle
+import tempfile
+import multiprocessing
 from itertools import islice, product, chain
 
 import yaml
+import numpy as np
 import shapely.ops as shops
 import shapely.geometry as shgeo
 
@@ -24,8 +27,9 @@ from .core import BagLayout
 from .util import BBox, BBoxArray, tuple2_to_int, tuple2_to_float_int
 from ..io import get_encoding, open_file
 from .routing import Port, TrackID, WireArray
-from .routing.fill import UsedTracks, fill_symmetric_max_num_info, fill_symmetric_interval, \
-    NoFillChoiceError
+from .routing.fill import UsedTracks, TrackIntervalIndex, save_packed_tracks, fill_solver_cache, \
+    get_window_fill2_wires, get_max_space_fill2_wires_parallel
+from .routing.density import DensityMap, WinType
 from .objects import Instance, Rect, Via, Path
 
 if TYPE_CHECKING:
@@ -48,6 +52,79 @@ except ImportError:
 TemplateType = TypeVar('TemplateType', bound='TemplateBase')
 
 
+def _get_shared_via_info(tech_info, via_cache, bbox, bot_layer, top_layer, bot_dir):
+    # type: (Any, Dict[Tuple, Any], BBox, str, str, str) -> Optional[Dict[str, Any]]
+    """Returns via information of the given via bounding box.
+
+    Via information is computed once for each via bounding box size and layers, assuming it is
+    translation invariant, and stored in via_cache.  Returns a new dictionary owned by the caller.
+    """
+    key = (bbox.width_unit, bbox.height_unit, bot_layer, top_layer, bot_dir)
+    entry = via_cache.get(key, None)
+    if entry is None:
+        entry = (bbox.xc_unit, bbox.yc_unit,
+                 tech_info.get_via_info(bbox, bot_layer, top_layer, bot_dir))
+        via_cache[key] = entry
+
+    xc0, yc0, info = entry
+    if info is None:
+        return None
+
+    res = tech_info.resolution
+    xc, yc = bbox.xc_unit, bbox.yc_unit
+    params = dict(info['params'])
+    params['loc'] = (xc * res, yc * res)
+    params['enc1'] = list(params['enc1'])
+    params['enc2'] = list(params['enc2'])
+    ans = dict(info)
+    ans['params'] = params
+    ans['top_box'] = info['top_box'].move_by(dx=xc - xc0, dy=yc - yc0, unit_mode=True)
+    ans['bot_box'] = info['bot_box'].move_by(dx=xc - xc0, dy=yc - yc0, unit_mode=True)
+    return ans
+
+
+def _get_arithmetic_runs(vals):
+    # type: (List[int]) -> List[Tuple[int, int, int]]
+    """Split the given sorted distinct values into runs of evenly spaced values.
+
+    Returns a list of (start, num, pitch) tuples.  Runs are found greedily from the start.
+    """
+    ans = []
+    idx, num_vals = 0, len(vals)
+    while idx < num_vals:
+        if idx + 1 == num_vals:
+            ans.append((vals[idx], 1, 0))
+            break
+        pitch = vals[idx + 1] - vals[idx]
+        stop = idx + 2
+        while stop < num_vals and vals[stop] - vals[stop - 1] == pitch:
+            stop += 1
+        ans.append((vals[idx], stop - idx, pitch))
+        idx = stop
+    return ans
+
+
+def _get_lattices(loc_list):
+    # type: (Iterable[Tuple[int, int]]) -> List[Tuple[int, int, int, int, int, int]]
+    """Group the given points into regular 2D lattices.
+
+    Points in each row are first split into evenly spaced runs, then rows with identical runs
+    are split into evenly spaced runs.  Returns a list of (x, y, nx, ny, spx, spy) tuples.
+    """
+    rows = {}  # type: Dict[int, List[int]]
+    for x, y in set(loc_list):
+        rows.setdefault(y, []).append(x)
+    cols = {}  # type: Dict[Tuple[int, int, int], List[int]]
+    for y, x_list in rows.items():
+        for x_run in _get_arithmetic_runs(sorted(x_list)):
+            cols.setdefault(x_run, []).append(y)
+    ans = []
+    for (x0, nx, spx), y_list in cols.items():
+        for y0, ny, spy in _get_arithmetic_runs(sorted(y_list)):
+            ans.append((x0, y0, nx, ny, spx, spy))
+    return ans
+
+
 class TemplateDB(MasterDB):
     """A database of all templates.
 
@@ -126,6 +203,7 @@ class TemplateDB(MasterDB):
                 master.finalize()
                 self.register_master(key, master)
                 self.register_master(master.key, master)
+            fill_solver_cache.load(os.path.join(cache_dir, 'fill_cache.pickle'))
             end = time.time()
             print('cache loading took %.5g seconds.' % (end - start))
 
@@ -328,6 +406,7 @@ class TemplateDB(MasterDB):
 
         with open(os.path.join(dir_name, 'db_mapping.pickle'), 'wb') as f:
             pickle.dump(info, f, protocol=-1)
+        fill_solver_cache.save(os.path.join(dir_name, 'fill_cache.pickle'))
 
     def _create_gds(self, lib_name, content_list, debug=False):
         # type: (str, Sequence[Any], bool) -> None
@@ -544,6 +623,10 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         self._used_tracks = UsedTracks()
         self._track_boxes = {}  # type: Dict[int, BBox]
         self._merge_used_tracks = False
+        self._track_intv_table = {}  # type: Dict[Tuple[int, int, int, int], TrackIntervalIndex]
+        self._track_intv_stamp = None  # type: Optional[Tuple[int, int]]
+        # number of times an instance of this template was added or changed
+        self._inst_changes = [0]
 
         # add hidden parameters
         if 'hidden_params' in kwargs:
@@ -815,13 +898,39 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
             for inst in self._layout.inst_iter():
                 yield from inst.blockage_iter(layer_id, test_box, spx=spx, spy=spy)
 
-    def all_rect_iter(self):
-        # type: () -> Generator[Tuple[int, BBox, int, int], None, None]
-        """Returns all rectangle objects in this """
-        yield from self._used_tracks.all_rect_iter()
+    def all_rect_iter(self, layer_id=None):
+        # type: (Optional[int]) -> Generator[Tuple[int, BBox, int, int], None, None]
+        """Returns all rectangle objects in this template, optionally only on the given layer."""
+        yield from self._used_tracks.all_rect_iter(layer_id=layer_id)
         if not self._merge_used_tracks:
             for inst in self._layout.inst_iter():
-                yield from inst.all_rect_iter()
+                yield from inst.all_rect_iter(layer_id=layer_id)
+
+    def get_density_map(self, layer_id, pixel, bound_box=None):
+        # type: (int, int, Optional[BBox]) -> DensityMap
+        """Rasterize all rectangles on the given layer into a density map.
+
+        Parameters
+        ----------
+        layer_id : int
+            the layer ID.
+        pixel : int
+            the pixel size, in resolution units.
+        bound_box : Optional[BBox]
+            the area to rasterize.  Defaults to the bounding box of this template.
+
+        Returns
+        -------
+        density_map : DensityMap
+            the metal density map of the given layer.
+        """
+        if bound_box is None:
+            if self.bound_box is None:
+                raise ValueError("bound_box is not set")
+            bound_box = self.bound_box
+
+        return DensityMap.from_boxes(bound_box, pixel,
+                                     (box for _, box, _, _ in self.all_rect_iter(layer_id)))
 
     def intersection_rect_iter(self, layer_id, box):
         # type: (int, BBox) -> Generator[BBox, None, None]
@@ -840,24 +949,13 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
                            ):
         # type: (...) -> Generator[Tuple[int, int], None, None]
 
-        res = self.grid.resolution
         layer_id = track_id.layer_id
         width = track_id.width
-        intv_dir = self.grid.get_direction(layer_id)
-        warr = WireArray(track_id, lower, upper, res=res, unit_mode=True)
-        test_box = warr.get_bbox_array(self.grid).base
         sp = max(sp, int(self.grid.get_space(layer_id, width, unit_mode=True)))
         sp_le = max(sp_le, int(self.grid.get_line_end_space(layer_id, width, unit_mode=True)))
-        if intv_dir == 'x':
-            spx, spy = sp_le, sp
-        else:
-            spx, spy = sp, sp_le
-
-        intv_set = IntervalSet()
-        for box in self.blockage_iter(layer_id, test_box, spx=spx, spy=spy):
-            bl, bu = tuple2_to_int(box.get_interval(intv_dir, unit_mode=True))
-            intv_set.add((max(bl, lower), min(bu, upper)), merge=True, abut=True)
 
+        track_index = self._get_track_interval_index(layer_id, width, sp, sp_le)
+        intv_set = track_index.get_blocked_intervals(track_id.base_index, lower, upper)
         for intv in intv_set.complement_iter((lower, upper)):
             if intv[1] - intv[0] >= min_len:
                 yield intv
@@ -885,22 +983,41 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
             sp = int(sp)
             sp_le = int(sp_le)
 
-        intv_dir = self.grid.get_direction(layer_id)
-        track_id = TrackID(layer_id, tr_idx, width=width)
-        warr = WireArray(track_id, lower, upper, res=res, unit_mode=True)
-        test_box = warr.get_bbox_array(self.grid).base
         sp = max(sp, int(self.grid.get_space(layer_id, width, unit_mode=True)))
         sp_le = max(sp_le, int(self.grid.get_line_end_space(layer_id, width, unit_mode=True)))
-        if intv_dir == 'x':
-            spx, spy = sp_le, sp
-        else:
-            spx, spy = sp, sp_le
 
-        try:
-            next(self.blockage_iter(layer_id, test_box, spx=spx, spy=spy))
-        except StopIteration:
-            return True
-        return False
+        track_index = self._get_track_interval_index(layer_id, width, sp, sp_le)
+        return not track_index.is_blocked(tr_idx, lower, upper)
+
+    def _get_track_interval_index(self, layer_id, width, sp, sp_le):
+        # type: (int, int, int, int) -> TrackIntervalIndex
+        """Returns the TrackIntervalIndex of the given layer, wire width, and spacing.
+
+        Indices are cached.  Rectangles added to this template after an index is built are
+        added to the index incrementally, and all indices are rebuilt if any instance changed.
+        """
+        if self._merge_used_tracks:
+            stamp = (id(self._used_tracks), 0)
+        else:
+            stamp = (id(self._used_tracks), self._inst_changes[0])
+        new_records = self._used_tracks.pop_new_records()
+        if stamp != self._track_intv_stamp:
+            self._track_intv_table.clear()
+            self._track_intv_stamp = stamp
+        elif new_records:
+            for track_index in self._track_intv_table.values():
+                cur_layer = track_index.layer_id
+                for rec_layer, box, dx, dy in new_records:
+                    if rec_layer == cur_layer:
+                        track_index.record_box(box, dx, dy)
+
+        key = (layer_id, width, sp, sp_le)
+        track_index = self._track_intv_table.get(key, None)
+        if track_index is None:
+            rect_iter = ((box, dx, dy) for _, box, dx, dy in self.all_rect_iter(layer_id=layer_id))
+            track_index = TrackIntervalIndex(self.grid, layer_id, width, sp, sp_le, rect_iter)
+            self._track_intv_table[key] = track_index
+        return track_index
 
     def get_rect_bbox(self, layer):
         # type: (Union[str, Tuple[str, str]]) -> BBox
@@ -1058,11 +1175,7 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         start = time.time()
         prop_dict = {key: getattr(self, key) for key in self.get_cache_properties()}
 
-        res = self.grid.resolution
-        save_tracks = UsedTracks(fname, overwrite=True)
-        for layer_id, box, dx, dy in self.all_rect_iter():
-            save_tracks.record_box(layer_id, box, dx, dy, res)
-        save_tracks.close()
+        save_packed_tracks(fname + '_tracks.bin', self.all_rect_iter())
 
         template_info = dict(
             lib_name=lib_name,
@@ -1279,6 +1392,8 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
                         name=inst_name, nx=nx, ny=ny, spx=spx, spy=spy, unit_mode=True)
 
         self._layout.add_instance(inst)
+        inst.set_change_counter(self._inst_changes)
+        self._inst_changes[0] += 1
         return inst
 
     def add_instance_primitive(self,  # type: TemplateBase
@@ -2971,6 +3086,215 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         else:
             return result
 
+    def connect_to_tracks_batch(self,  # type: TemplateBase
+                                conn_list,  # type: Sequence[Tuple[Any, ...]]
+                                wire_lower=None,  # type: Optional[Union[float, int]]
+                                wire_upper=None,  # type: Optional[Union[float, int]]
+                                track_lower=None,  # type: Optional[Union[float, int]]
+                                track_upper=None,  # type: Optional[Union[float, int]]
+                                unit_mode=False,  # type: bool
+                                min_len_mode=None,  # type: Optional[int]
+                                return_wires=False,  # type: bool
+                                debug=False,  # type: bool
+                                ):
+        # type: (...) -> List[Any]
+        """Connect many groups of WireArrays to tracks.
+
+        This method gives the same results as calling connect_to_tracks() on each connection,
+        but vias are drawn grouped by layer pair, via information is shared between vias with
+        the same size, and track extents are computed for all connections at once.
+
+        Parameters
+        ----------
+        conn_list : Sequence[Tuple[Any, ...]]
+            list of connections.  Each connection is a tuple of (wire_arr_list, track_id), or
+            (wire_arr_list, track_id, options), where options is a dictionary that overrides
+            wire_lower, wire_upper, track_lower, track_upper, or min_len_mode for that connection.
+        wire_lower : Optional[Union[float, int]]
+            if given, extend wire(s) to this lower coordinate.
+        wire_upper : Optional[Union[float, int]]
+            if given, extend wire(s) to this upper coordinate.
+        track_lower : Optional[Union[float, int]]
+            if given, extend track(s) to this lower coordinate.
+        track_upper : Optional[Union[float, int]]
+            if given, extend track(s) to this upper coordinate.
+        unit_mode : bool
+            True if all coordinates are given in resolution units.
+        min_len_mode : Optional[int]
+            If not None, will extend track so it satisfy minimum length requirement.
+            Use -1 to extend lower bound, 1 to extend upper bound, 0 to extend both equally.
+        return_wires : bool
+            True to return the extended wires.
+        debug : bool
+            True to print debug messages.
+
+        Returns
+        -------
+        results : List[Any]
+            the connect_to_tracks() return value of each connection.
+        """
+        grid = self.grid
+        res = grid.resolution
+        tech_info = grid.tech_info
+
+        defaults = dict(wire_lower=wire_lower, wire_upper=wire_upper, track_lower=track_lower,
+                        track_upper=track_upper, min_len_mode=min_len_mode)
+        num_conn = len(conn_list)
+        track_list = [None] * num_conn  # type: List[Optional[TrackID]]
+        wires_list = [[] for _ in range(num_conn)]  # type: List[List[WireArray]]
+        len_mode_list = [None] * num_conn  # type: List[Optional[int]]
+        # track bounds of each connection, using sentinel values if not given
+        tr_lower = np.full(num_conn, np.iinfo(np.int64).max, dtype=np.int64)
+        tr_upper = np.full(num_conn, np.iinfo(np.int64).min, dtype=np.int64)
+
+        # connect wires together, and group wires to draw vias on by layer pair
+        via_groups = {}  # type: Dict[Tuple[int, int], List[Tuple[int, str, BBoxArray]]]
+        for conn_idx, conn in enumerate(conn_list):
+            wire_arr_list, track_id = conn[0], conn[1]
+            opts = defaults if len(conn) < 3 else dict(defaults, **conn[2])
+            if isinstance(wire_arr_list, WireArray):
+                wire_arr_list = [wire_arr_list]
+            if not wire_arr_list:
+                continue
+
+            bnds = []
+            for key in ('wire_lower', 'wire_upper', 'track_lower', 'track_upper'):
+                val = opts[key]
+                if val is not None:
+                    val = int(val) if unit_mode else int(round(val / res))
+                bnds.append(val)
+            cur_wl, cur_wu, cur_tl, cur_tu = bnds
+
+            tr_layer_id = track_id.layer_id
+            wl, wu = tuple2_to_int(track_id.get_bounds(grid, unit_mode=True))
+            if cur_wl is not None:
+                wl = min(cur_wl, wl)
+            if cur_wu is not None:
+                wu = max(cur_wu, wu)
+            if cur_tl is not None:
+                tr_lower[conn_idx] = cur_tl
+            if cur_tu is not None:
+                tr_upper[conn_idx] = cur_tu
+
+            top_list = []
+            bot_list = []
+            for wire_arr in wire_arr_list:
+                cur_layer_id = wire_arr.layer_id
+                if cur_layer_id == tr_layer_id + 1:
+                    top_list.append(wire_arr)
+                elif cur_layer_id == tr_layer_id - 1:
+                    bot_list.append(wire_arr)
+                else:
+                    raise ValueError('WireArray layer %d cannot connect to layer %d' %
+                                     (cur_layer_id, tr_layer_id))
+
+            top_wire_list = self.connect_wires(top_list, lower=wl, upper=wu, unit_mode=True,
+                                               debug=debug)
+            bot_wire_list = self.connect_wires(bot_list, lower=wl, upper=wu, unit_mode=True,
+                                               debug=debug)
+            for w_layer_id, wire_list in ((tr_layer_id + 1, top_wire_list),
+                                          (tr_layer_id - 1, bot_wire_list)):
+                if wire_list:
+                    via_list = via_groups.setdefault((w_layer_id, tr_layer_id), [])
+                    for wire_arr in wire_list:
+                        for wlayer, box_arr in wire_arr.wire_arr_iter(grid):
+                            via_list.append((conn_idx, wlayer, box_arr))
+
+            top_wire_list.extend(bot_wire_list)
+            track_list[conn_idx] = track_id
+            wires_list[conn_idx] = top_wire_list
+            len_mode_list[conn_idx] = opts['min_len_mode']
+
+        # draw vias, and record the via extents along the track
+        via_cache = {}  # type: Dict[Tuple, Any]
+        via_conn, via_lower, via_upper = [], [], []
+        for (w_layer_id, tr_layer_id), via_list in sorted(via_groups.items()):
+            tr_dir = grid.get_direction(tr_layer_id)
+            tr_pitch = grid.get_track_pitch(tr_layer_id)
+            is_top = w_layer_id > tr_layer_id
+            bot_dir = tr_dir if is_top else ('x' if tr_dir == 'y' else 'y')
+            for conn_idx, wlayer, box_arr in via_list:
+                track_id = track_list[conn_idx]
+                tr_width = track_id.width
+                wbase = box_arr.base
+                for sub_track_id in track_id.sub_tracks_iter(grid):
+                    base_idx = sub_track_id.base_index
+                    tr_layer = grid.get_layer_name(tr_layer_id, base_idx)
+                    bot_layer, top_layer = (tr_layer, wlayer) if is_top else (wlayer, tr_layer)
+                    tl, tu = tuple2_to_int(grid.get_wire_bounds(tr_layer_id, base_idx,
+                                                                width=tr_width, unit_mode=True))
+                    if tr_dir == 'x':
+                        via_box = BBox(wbase.left_unit, tl, wbase.right_unit, tu, res,
+                                       unit_mode=True)
+                        nx, ny = box_arr.nx, sub_track_id.num
+                        spx, spy = box_arr.spx, sub_track_id.pitch * tr_pitch
+                    else:
+                        via_box = BBox(tl, wbase.bottom_unit, tu, wbase.top_unit, res,
+                                       unit_mode=True)
+                        nx, ny = sub_track_id.num, box_arr.ny
+                        spx, spy = sub_track_id.pitch * tr_pitch, box_arr.spy
+                    info = _get_shared_via_info(tech_info, via_cache, via_box, bot_layer,
+                                                top_layer, bot_dir)
+                    via = Via(tech_info, via_box, bot_layer, top_layer, bot_dir,
+                              nx=nx, ny=ny, spx=spx, spy=spy, info=info)
+                    self._layout.add_via(via)
+
+                    vtbox = via.bottom_box if is_top else via.top_box
+                    via_conn.append(conn_idx)
+                    if tr_dir == 'x':
+                        via_lower.append(vtbox.left_unit)
+                        via_upper.append(vtbox.right_unit + (nx - 1) * box_arr.spx_unit)
+                    else:
+                        via_lower.append(vtbox.bottom_unit)
+                        via_upper.append(vtbox.top_unit + (ny - 1) * box_arr.spy_unit)
+
+        # compute track extents
+        if via_conn:
+            np.minimum.at(tr_lower, via_conn, via_lower)
+            np.maximum.at(tr_upper, via_conn, via_upper)
+
+        # extend tracks to meet minimum length
+        min_len_idx = [idx for idx, mode in enumerate(len_mode_list) if mode is not None]
+        if min_len_idx:
+            min_len_table = {}  # type: Dict[Tuple[int, int], int]
+            min_len = np.empty(len(min_len_idx), dtype=np.int64)
+            for idx, conn_idx in enumerate(min_len_idx):
+                track_id = track_list[conn_idx]
+                key = (track_id.layer_id, track_id.width)
+                if key not in min_len_table:
+                    cur_len = int(grid.get_min_length(key[0], key[1], unit_mode=True))
+                    # make sure minimum length is even so that middle coordinate exists
+                    min_len_table[key] = -(-cur_len // 2) * 2
+                min_len[idx] = min_len_table[key]
+
+            mode = np.array([len_mode_list[idx] for idx in min_len_idx])
+            lower = tr_lower[min_len_idx]
+            upper = tr_upper[min_len_idx]
+            ext = np.maximum(min_len - (upper - lower), 0)
+            lower_mid = lower - ext // 2
+            upper_mid = np.where(ext > 0, lower_mid + min_len, upper)
+            tr_lower[min_len_idx] = np.where(mode < 0, lower - ext,
+                                             np.where(mode > 0, lower, lower_mid))
+            tr_upper[min_len_idx] = np.where(mode < 0, upper,
+                                             np.where(mode > 0, upper + ext, upper_mid))
+
+        # draw tracks
+        results = []  # type: List[Any]
+        for conn_idx, track_id in enumerate(track_list):
+            if track_id is None:
+                result = None
+            else:
+                result = WireArray(track_id, int(tr_lower[conn_idx]), int(tr_upper[conn_idx]),
+                                   res=res, unit_mode=True)
+                for layer_name, bbox_arr in result.wire_arr_iter(grid):
+                    self.add_rect(layer_name, bbox_arr)
+            if return_wires:
+                results.append((result, wires_list[conn_idx]))
+            else:
+                results.append(result)
+
+        return results
+
     def connect_to_track_wires(self,  # type: TemplateBase
                                wire_arr_list,  # type: Union[WireArray, List[WireArray]]
                                track_wires,  # type: Union[WireArray, List[WireArray]]
@@ -3546,16 +3870,22 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
 
         return track_list
 
-    def draw_vias_on_intersections(self, bot_warr_list, top_warr_list):
-        # type: (Union[WireArray, List[WireArray]], Union[WireArray, List[WireArray]]) -> None
+    def draw_vias_on_intersections(self, bot_warr_list, top_warr_list, array_vias=True):
+        # type: (Union[WireArray, List[WireArray]], Union[WireArray, List[WireArray]], bool) -> None
         """Draw vias on all intersections of the two given wire groups.
 
+        Top wires are sorted by location, so the top wires crossing each bottom wire are
+        found by bisection.
+
         Parameters
         ----------
         bot_warr_list : Union[WireArray, List[WireArray]]
             the bottom wires.
         top_warr_list : Union[WireArray, List[WireArray]]
             the top wires.
+        array_vias : bool
+            True to draw intersections that form a regular lattice as a single arrayed via.
+            Otherwise, draw one via per intersection.
         """
         if isinstance(bot_warr_list, WireArray):
             bot_warr_list = [bot_warr_list]
@@ -3569,39 +3899,74 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         grid = self.grid
         res = grid.resolution
 
+        # get bottom tracks, grouped by layer
+        bot_tracks = {}  # type: Dict[int, List[Tuple[str, int, int, int, int]]]
         for bwarr in bot_warr_list:
-            bot_tl = bwarr.lower_unit
-            bot_tu = bwarr.upper_unit
             bot_track_idx = bwarr.track_id
             bot_layer_id = bot_track_idx.layer_id
-            top_layer_id = bot_layer_id + 1
             bot_width = bot_track_idx.width
-            bot_dir = self.grid.get_direction(bot_layer_id)
-            bot_horizontal = (bot_dir == 'x')
+            track_list = bot_tracks.setdefault(bot_layer_id, [])
             for bot_index in bot_track_idx:
-                bot_lay_name = self.grid.get_layer_name(bot_layer_id, bot_index)
                 btl, btu = tuple2_to_int(
                     grid.get_wire_bounds(bot_layer_id, bot_index, width=bot_width,
                                          unit_mode=True))
-                for twarr in top_warr_list:
-                    top_tl = twarr.lower_unit
-                    top_tu = twarr.upper_unit
-                    top_track_idx = twarr.track_id
-                    top_width = top_track_idx.width
-                    if top_tu >= btu and top_tl <= btl:
-                        # top wire cuts bottom wire, possible intersection
-                        for top_index in top_track_idx:
-                            ttl, ttu = tuple2_to_int(grid.get_wire_bounds(top_layer_id, top_index,
-                                                                          width=top_width,
-                                                                          unit_mode=True))
-                            if bot_tu >= ttu and bot_tl <= ttl:
-                                # bottom wire cuts top wire, we have intersection.  Make bbox
-                                if bot_horizontal:
-                                    box = BBox(ttl, btl, ttu, btu, res, unit_mode=True)
-                                else:
-                                    box = BBox(btl, ttl, btu, ttu, res, unit_mode=True)
-                                top_lay_name = self.grid.get_layer_name(top_layer_id, top_index)
-                                self.add_via(box, bot_lay_name, top_lay_name, bot_dir)
+                track_list.append((grid.get_layer_name(bot_layer_id, bot_index), btl, btu,
+                                   bwarr.lower_unit, bwarr.upper_unit))
+
+        # find intersections, grouped by via size and layers
+        via_locs = {}  # type: Dict[Tuple[str, str, str, int, int], List[Tuple[int, int]]]
+        for bot_layer_id, track_list in bot_tracks.items():
+            top_layer_id = bot_layer_id + 1
+            bot_dir = grid.get_direction(bot_layer_id)
+            bot_horizontal = (bot_dir == 'x')
+
+            # get top tracks, sorted by location
+            top_names = []
+            top_bnds = []
+            for twarr in top_warr_list:
+                top_track_idx = twarr.track_id
+                top_width = top_track_idx.width
+                for top_index in top_track_idx:
+                    ttl, ttu = tuple2_to_int(grid.get_wire_bounds(top_layer_id, top_index,
+                                                                  width=top_width,
+                                                                  unit_mode=True))
+                    top_names.append(grid.get_layer_name(top_layer_id, top_index))
+                    top_bnds.append((ttl, ttu, twarr.lower_unit, twarr.upper_unit))
+            if not top_bnds:
+                continue
+            top_bnds = np.array(top_bnds, dtype=np.int64)
+            order = np.argsort(top_bnds[:, 0], kind='mergesort')
+            top_bnds = top_bnds[order]
+            top_names = [top_names[idx] for idx in order]
+
+            for bot_lay_name, btl, btu, bot_tl, bot_tu in track_list:
+                # bottom wire cuts top wire if the top wire is between bot_tl and bot_tu
+                start = int(np.searchsorted(top_bnds[:, 0], bot_tl, side='left'))
+                stop = int(np.searchsorted(top_bnds[:, 0], bot_tu, side='right'))
+                cand = top_bnds[start:stop]
+                # top wire cuts bottom wire
+                idx_arr = np.nonzero((cand[:, 1] <= bot_tu) & (cand[:, 2] <= btl) &
+                                     (cand[:, 3] >= btu))[0]
+                for idx in idx_arr + start:
+                    ttl, ttu = int(top_bnds[idx, 0]), int(top_bnds[idx, 1])
+                    if bot_horizontal:
+                        key = (bot_lay_name, top_names[idx], bot_dir, ttu - ttl, btu - btl)
+                        loc = (ttl, btl)
+                    else:
+                        key = (bot_lay_name, top_names[idx], bot_dir, btu - btl, ttu - ttl)
+                        loc = (btl, ttl)
+                    via_locs.setdefault(key, []).append(loc)
+
+        # draw vias
+        for (bot_lay_name, top_lay_name, bot_dir, w, h), loc_list in via_locs.items():
+            if array_vias:
+                arr_list = _get_lattices(loc_list)
+            else:
+                arr_list = [(xl, yb, 1, 1, 0, 0) for xl, yb in loc_list]
+            for xl, yb, nx, ny, spx, spy in arr_list:
+                box = BBox(xl, yb, xl + w, yb + h, res, unit_mode=True)
+                self.add_via(box, bot_lay_name, top_lay_name, bot_dir, nx=nx, ny=ny,
+                             spx=spx, spy=spy, unit_mode=True)
 
     def mark_bbox_used(self, layer_id, bbox):
         # type: (int, BBox) -> None
@@ -3713,179 +4078,125 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
     def do_max_space_fill2(self,  # type: TemplateBase
                            layer_id,  # type: int
                            bound_box=None,  # type: Optional[BBox]
+                           density_map=None,  # type: Optional[DensityMap]
+                           window=None,  # type: Optional[WinType]
                            ):
         # type: (...) -> None
-        """Draw density fill on the given layer."""
-        grid = self.grid
-        tech_info = grid.tech_info
-
-        fill_config = tech_info.tech_params['layout']['dummy_fill'][layer_id]
-        density = fill_config['density']
-        sp_max = fill_config['sp_max']
-        sp_le_max = fill_config['sp_le_max']
-        ip_margin = fill_config['margin']
-        ip_margin_le = fill_config['margin_le']
-        sp_max2 = sp_max // 2
-        sp_le_max2 = sp_le_max // 2
-        margin = sp_max2 // 2
-        margin_le = sp_le_max2 // 2
+        """Draw density fill on the given layer.
 
+        If density_map is given, the bounding box is divided into density windows, and the
+        metal already present in each window counts towards the target density, so only the
+        remaining density of each window is filled.  The window size defaults to the
+        'density_window' entry of the dummy fill configuration.  Maximum space rules are
+        always satisfied.
+        """
+        grid = self.grid
         if bound_box is None:
             if self.bound_box is None:
                 raise ValueError("bound_box is not set")
             bound_box = self.bound_box
 
-        # get tracks information
-        long_dir = grid.get_direction(layer_id)
-        if long_dir == 'y':
-            tran_dir = 'x'
-            spx = sp_max2
-            spy = sp_le_max2
-        else:
-            tran_dir = 'y'
-            spx = sp_le_max2
-            spy = sp_max2
-        dim_tran0, dim_tran1 = tuple2_to_int(bound_box.get_interval(tran_dir, unit_mode=True))
-        dim_long0, dim_long1 = tuple2_to_int(bound_box.get_interval(long_dir, unit_mode=True))
-        dim_tranl = min(dim_tran1, dim_tran0 + sp_max2)
-        dim_tranu = max(dim_tran0, dim_tran1 - sp_max2)
-        dim_longl = min(dim_long1, dim_long0 + sp_le_max2)
-        dim_longu = max(dim_long0, dim_long1 - sp_le_max2)
-        dim_tran = dim_tran1 - dim_tran0
-        dim_long = dim_long1 - dim_long0
+        self.add_rect(grid.tech_info.get_exclude_layer(layer_id), bound_box)
+        wires = get_window_fill2_wires(grid, self.blockage_iter, layer_id, bound_box,
+                                       density_map=density_map, window=window)
+        self._add_fill_wires(layer_id, wires)
+
+    def do_max_space_fill2_layers(self,  # type: TemplateBase
+                                  layer_list,  # type: Sequence[int]
+                                  bound_box=None,  # type: Optional[BBox]
+                                  density_pixel=None,  # type: Optional[int]
+                                  max_workers=None,  # type: Optional[int]
+                                  window=None,  # type: Optional[WinType]
+                                  ):
+        # type: (...) -> Dict[int, np.ndarray]
+        """Draw density fill on several layers in parallel.
+
+        Fill on different layers is independent, so the fill geometry of each layer is
+        computed by do_max_space_fill2() in a separate worker process.  Workers read a
+        memory-mapped snapshot of the blockages in this template, and the resulting wires
+        are added to this template afterwards.
 
-        self.add_rect(tech_info.get_exclude_layer(layer_id), bound_box)
-        if dim_tran <= ip_margin or dim_long <= ip_margin_le:
-            return
-
-        min_len = int(grid.get_min_length(layer_id, 1, unit_mode=True))
-        htr0 = int(self.grid.coord_to_nearest_track(layer_id, dim_tranl, half_track=True,
-                                                    mode=-1, unit_mode=True))
-        htr1 = int(self.grid.coord_to_nearest_track(layer_id, dim_tranu, half_track=True,
-                                                    mode=1, unit_mode=True))
-        htr0 = int(round(htr0 * 2 + 1))
-        htr1 = int(round(htr1 * 2 + 1))
-        num_htr_tot = htr1 - htr0 + 1
+        Parameters
+        ----------
+        layer_list : Sequence[int]
+            the layers to fill.
+        bound_box : Optional[BBox]
+            the fill area.  Defaults to the bounding box of this template.
+        density_pixel : Optional[int]
+            If given, existing metal density is computed with this pixel size (in resolution
+            units) and counts towards the target density of each density window.
+        max_workers : Optional[int]
+            maximum number of worker processes.  Defaults to the number of CPUs.  If 1,
+            fill is computed in this process.
+        window : Optional[WinType]
+            the density window size, in resolution units.  See do_max_space_fill2().
 
-        # calculate track pitch based on density/max space
-        tr_w, tr_sp = tuple2_to_int(grid.get_track_info(layer_id, unit_mode=True))
-        sp_le = int(grid.get_line_end_space(layer_id, 1, unit_mode=True))
-        tr_pitch2 = int(grid.get_track_pitch(layer_id, unit_mode=True)) // 2
-        num_tracks = int(round(-(-(dim_tran * density) // tr_w)))
-        num_tracks = min(max(num_tracks, -(-num_htr_tot // ((sp_max - tr_sp) // tr_pitch2 + 2))),
-                         num_htr_tot // 2)
+        Returns
+        -------
+        wire_table : Dict[int, np.ndarray]
+            a dictionary from layer ID to the added fill wires, as an integer array of
+            (htr, lower, upper) rows.  See get_max_space_fill2_wires() for details.
+        """
+        grid = self.grid
+        if bound_box is None:
+            if self.bound_box is None:
+                raise ValueError("bound_box is not set")
+            bound_box = self.bound_box
 
-        fill_info = None
-        invert = False
-        for _ in range(100):
-            try:
-                fill_info, invert = fill_symmetric_max_num_info(num_htr_tot, num_tracks, 1, 1, 1,
-                                                                fill_on_edge=True, cyclic=False)
-            except NoFillChoiceError:
-                num_tracks -= 1
-        if fill_info is None:
-            raise ValueError('no fill solution.')
-
-        intv_list = fill_symmetric_interval(*fill_info[1], offset=htr0, invert=invert)[0]
-
-        # create interval sets
-        intv_tran0 = IntervalSet()
-        intv_tran1 = IntervalSet()
-        htr_list = [intv[0] for intv in intv_list]
-        num_htr = len(htr_list)
-        set_long0 = set(htr_list)
-        set_long1 = set_long0.copy()
-        intv_list = [IntervalSet() for _ in range(num_htr)]
-
-        # handle blockages
-        for blk_box in self.blockage_iter(layer_id, bound_box, spx=spx, spy=spy):
-            b_tran0, b_tran1 = tuple2_to_int(blk_box.get_interval(tran_dir, unit_mode=True))
-            b_long0, b_long1 = tuple2_to_int(blk_box.get_interval(long_dir, unit_mode=True))
-            b_long0_lim = max(b_long0, dim_longl)
-            b_long1_lim = min(b_long1, dim_longu)
-            blk_intv = (b_long0_lim, b_long1_lim)
-            if b_long0_lim < b_long1_lim:
-                # handle lower/upper transverse edges
-                if b_tran0 <= dim_tran0 and dim_tranl <= b_tran1:
-                    intv_tran0.add(blk_intv, merge=True, abut=True)
-                if b_tran0 <= dim_tranu and dim_tran1 <= b_tran1:
-                    intv_tran1.add(blk_intv, merge=True, abut=True)
-            cur_htr0 = int(self.grid.find_next_track(layer_id, b_tran0, half_track=True, mode=1,
-                                                     unit_mode=True))
-            cur_htr1 = int(self.grid.find_next_track(layer_id, b_tran1, half_track=True, mode=-1,
-                                                     unit_mode=True))
-            cur_htr0 = max(htr0, int(round(cur_htr0 * 2 + 1)))
-            cur_htr1 = min(htr1, int(round(cur_htr1 * 2 + 1)))
-            htr_idx0 = bisect.bisect_left(htr_list, cur_htr0)
-            if htr_idx0 < num_htr and htr_list[htr_idx0] <= cur_htr1:
-                htr_idx1 = min(num_htr - 1, bisect.bisect_right(htr_list, cur_htr1, lo=htr_idx0))
-                for htr_idx in range(htr_idx0, htr_idx1 + 1):
-                    htr = htr_list[htr_idx]
-                    # handle lower/upper longitudinal edges
-                    if b_long0 <= dim_long0 and dim_longl <= b_long1:
-                        set_long0.discard(htr)
-                    if b_long0 <= dim_longu and dim_long1 <= b_long1:
-                        set_long1.discard(htr)
-                    if b_long0_lim < b_long1_lim:
-                        intv_list[htr_idx].add(blk_intv, merge=True, abut=True)
-
-        # add fill in edges on transverse sides
-        trl = int(self.grid.coord_to_nearest_track(layer_id, dim_tran0 + margin, half_track=True,
-                                                   mode=-1, unit_mode=True))
-        trr = int(self.grid.coord_to_nearest_track(layer_id, dim_tran1 - margin, half_track=True,
-                                                   mode=1, unit_mode=True))
-        if trr < trl + 1:
-            # handle cases where the given bounding box is small
-            dim_mid = (dim_tran0 + dim_tran1) // 2
-            trl = int(self.grid.coord_to_nearest_track(layer_id, dim_mid, half_track=True,
-                                                       mode=0, unit_mode=True))
-            tran_edge_iter = ((intv_tran0, trl),)
+        for layer_id in layer_list:
+            self.add_rect(grid.tech_info.get_exclude_layer(layer_id), bound_box)
+
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        max_workers = min(max_workers, len(layer_list))
+
+        if max_workers <= 1:
+            wire_list = []
+            for layer_id in layer_list:
+                dmap = None
+                if density_pixel is not None:
+                    dmap = self.get_density_map(layer_id, density_pixel, bound_box=bound_box)
+                wire_list.append(get_window_fill2_wires(grid, self.blockage_iter, layer_id,
+                                                        bound_box, density_map=dmap,
+                                                        window=window))
         else:
-            tran_edge_iter = ((intv_tran0, trl), (intv_tran1, trr))
-
-        intv_long = (dim_longl, dim_longu)
-        for intv_set, tidx in tran_edge_iter:
-            for long0, long1 in intv_set.complement_iter(intv_long):
-                if long1 - long0 < min_len:
-                    long0 = (long0 + long1 - min_len) // 2
-                    long1 = long0 + min_len
-                self.add_wires(layer_id, tidx, long0, long1, unit_mode=True)
-
-        # add fill in edges on longitude sides
-        if dim_long0 + 2 * (margin_le + min_len) + sp_le > dim_long1:
-            # handle cases where the giving bounding box is small
-            long_lower = min(dim_long0 + margin_le, (dim_long0 + dim_long1 - min_len) // 2)
-            long_upper = max(dim_long1 - margin_le, long_lower + min_len)
-            long_edge_iter = ((set_long0, long_lower, long_upper),)
-        else:
-            long_lower = dim_long0 + margin_le - min_len // 2
-            long_upper = dim_long1 - margin_le + min_len // 2
-            long_edge_iter = ((set_long0, long_lower, long_lower + min_len),
-                              (set_long1, long_upper - min_len, long_upper))
-
-        for set_long_edge, lower, upper in long_edge_iter:
-            intv_mark = (max(dim_longl, lower - sp_le_max2), min(dim_longu, upper + sp_le_max2))
-            for htr in set_long_edge:
-                htr_idx = bisect.bisect_left(htr_list, htr)
-                intv_list[htr_idx].add(intv_mark, merge=True, abut=True)
-                self.add_wires(layer_id, (htr - 1) / 2, lower, upper, unit_mode=True)
-
-        # add rest of fill
-        for htr, intv_set in zip(htr_list, intv_list):
-            tidx = (htr - 1) / 2
-            for long0, long1 in intv_set.complement_iter(intv_long):
-                if long1 - long0 < min_len:
-                    long0 = (long0 + long1 - min_len) // 2
-                    long1 = long0 + min_len
-                self.add_wires(layer_id, tidx, long0, long1, unit_mode=True)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                fname = os.path.join(tmp_dir, 'tracks.bin')
+                save_packed_tracks(fname, chain.from_iterable(
+                    self.all_rect_iter(layer_id=layer_id) for layer_id in layer_list))
+                wire_list = get_max_space_fill2_wires_parallel(grid, fname, layer_list,
+                                                               bound_box, max_workers,
+                                                               density_pixel=density_pixel,
+                                                               window=window)
+
+        wire_table = {}
+        for layer_id, wires in zip(layer_list, wire_list):
+            self._add_fill_wires(layer_id, wires)
+            wire_table[layer_id] = wires
+        return wire_table
+
+    def _add_fill_wires(self, layer_id, wires):
+        # type: (int, np.ndarray) -> None
+        """Add fill wires computed by get_max_space_fill2_wires()."""
+        for htr, lower, upper in wires.tolist():
+            self.add_wires(layer_id, (htr - 1) / 2, lower, upper, unit_mode=True)
 
     def do_max_space_fill(self,  # type: TemplateBase
                           layer_id,  # type: int
                           bound_box=None,  # type: Optional[BBox]
                           fill_pitch=1,  # type: Union[float, int]
+                          density_map=None,  # type: Optional[DensityMap]
+                          window=None,  # type: Optional[WinType]
                           ):
         # type: (...) -> None
-        """Draw density fill on the given layer."""
+        """Draw density fill on the given layer.
+
+        If density_map is given and the fill configuration specifies a target density,
+        the interior of each density window is filled with the largest fill pitch that the
+        target density and maximum space rule allow, given the metal already in that window.
+        The window size defaults to the 'density_window' entry of the dummy fill
+        configuration, or the whole bounding box if that is not given.
+        """
 
         grid = self.grid
         tech_info = grid.tech_info
@@ -3936,9 +4247,24 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         if dim_tran <= ip_margin or dim_long <= ip_margin_le:
             return
 
+        # interior fill pitch of each density window
+        density = fill_config.get('density', None)
+        if density_map is not None and density is not None:
+            if window is None:
+                window = fill_config.get('density_window', None)
+            if window is None:
+                tile_list = [(bound_box_resolved, density_map.get_density(bound_box_resolved))]
+            else:
+                tile_list = density_map.tile_density(window, bound_box_resolved)
+            tile_list = [(tile, self._get_density_fill_pitch(layer_id, fill_pitch, density,
+                                                             sp_max, cur_density))
+                         for tile, cur_density in tile_list]
+        else:
+            tile_list = [(bound_box_resolved, fill_pitch)]
+
         box_list = [shgeo.box(*box.get_bounds(unit_mode=True))
                     for box in self.intersection_rect_iter(layer_id, bound_box_resolved)]
-        tot_geo = shops.cascaded_union(box_list)  # type: shgeo.Polygon
+        tot_geo = shops.unary_union(box_list)  # type: shgeo.Polygon
         tot_geo = tot_geo.buffer(sp_max2, cap_style=2, join_style=2)
 
         # fill transverse edges
@@ -3965,7 +4291,7 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
                                         min_len, sp_max2, new_polys)
 
         new_polys.append(tot_geo)
-        tot_geo = shops.cascaded_union(new_polys)
+        tot_geo = shops.unary_union(new_polys)
 
         # fill longitudinal edges
         new_polys.clear()
@@ -3987,7 +4313,7 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
                                         min_len, sp_max2, new_polys, mode=1)
 
         new_polys.append(tot_geo)
-        tot_geo = shops.cascaded_union(new_polys)
+        tot_geo = shops.unary_union(new_polys)
 
         # fill interior
         min_len2 = -(-min_len // 2)
@@ -3995,9 +4321,50 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         geo = tot_box.difference(tot_geo)
         for poly in self._get_flat_poly_iter(geo):
             if not poly.is_empty:
-                self._fill_poly_bounds(poly, layer_id, is_horiz, min_len2, fill_pitch)
+                if len(tile_list) == 1:
+                    self._fill_poly_bounds(poly, layer_id, is_horiz, min_len2, tile_list[0][1])
+                else:
+                    self._fill_poly_tiles(poly, layer_id, is_horiz, min_len2, fill_pitch,
+                                          tile_list)
 
-    def _fill_poly_bounds(self, poly, layer_id, is_horiz, min_len2, fill_pitch):
+    def _get_density_fill_pitch(self, layer_id, fill_pitch, density, sp_max, cur_density):
+        # type: (int, Union[float, int], float, int, float) -> Union[float, int]
+        """Returns the largest interior fill pitch that meets density and maximum space rules.
+
+        Fill on every fill_pitch track over the open area gives a density of about
+        tr_w / (pitch * fill_pitch) * (1 - cur_density).
+        """
+        grid = self.grid
+        tr_w, tr_sp = tuple2_to_int(grid.get_track_info(layer_id, unit_mode=True))
+        tr_pitch2 = int(grid.get_track_pitch(layer_id, unit_mode=True)) // 2
+        # maximum number of half pitches between fill tracks
+        num_htr_max = (sp_max + tr_w) // tr_pitch2
+        need = density - cur_density
+        if need > 0:
+            num_htr_max = min(num_htr_max, int(tr_w * (1 - cur_density) // (tr_pitch2 * need)))
+        return max(fill_pitch, num_htr_max / 2)
+
+    def _fill_poly_tiles(self, poly, layer_id, is_horiz, min_len2, fill_pitch, tile_list):
+        # type: (shgeo.Polygon, int, bool, int, Union[float, int], List[Tuple[BBox, Any]]) -> None
+        """Fill the given polygon, using the fill pitch of each density window inside it.
+
+        Fill tracks of all windows start from the same track, and window fill pitches are
+        rounded down to multiples of fill_pitch, so fill in adjacent windows is on the same
+        track lattice, and has the same spacing as fill inside a window.
+        """
+        bounds = poly.bounds
+        lower = int(round(bounds[1] if is_horiz else bounds[0]))
+        tr0 = self.grid.coord_to_nearest_track(layer_id, lower, half_track=True, mode=-1,
+                                               unit_mode=True)
+        for tile, tile_pitch in tile_list:
+            tile_pitch = fill_pitch * max(1, int(tile_pitch / fill_pitch))
+            geo = poly.intersection(shgeo.box(*tile.get_bounds(unit_mode=True)))
+            for tile_poly in self._get_flat_poly_iter(geo):
+                if not tile_poly.is_empty and tile_poly.area > 0:
+                    self._fill_poly_bounds(tile_poly, layer_id, is_horiz, min_len2, tile_pitch,
+                                           tr0=tr0)
+
+    def _fill_poly_bounds(self, poly, layer_id, is_horiz, min_len2, fill_pitch, tr0=None):
         grid = self.grid
         bounds = poly.bounds
         xl = int(round(bounds[0]))
@@ -4007,8 +4374,9 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         tr_p2 = grid.get_track_pitch(layer_id, unit_mode=True) // 2
         fill_htr = int(round(2 * fill_pitch))
         if is_horiz:
-            tr0 = grid.coord_to_nearest_track(layer_id, yb, half_track=True,
-                                              mode=-1, unit_mode=True)
+            if tr0 is None:
+                tr0 = grid.coord_to_nearest_track(layer_id, yb, half_track=True,
+                                                  mode=-1, unit_mode=True)
             tr1 = grid.coord_to_nearest_track(layer_id, yt, half_track=True,
                                               mode=1, unit_mode=True)
             wl, wu = tuple2_to_int(grid.get_wire_bounds(layer_id, tr0, width=1, unit_mode=True))
@@ -4016,8 +4384,9 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
                                        for idx in range(0, int(round(2 * (tr1 - tr0))) + 2,
                                                         fill_htr)])
         else:
-            tr0 = grid.coord_to_nearest_track(layer_id, xl, half_track=True,
-                                              mode=-1, unit_mode=True)
+            if tr0 is None:
+                tr0 = grid.coord_to_nearest_track(layer_id, xl, half_track=True,
+                                                  mode=-1, unit_mode=True)
             tr1 = grid.coord_to_nearest_track(layer_id, xr, half_track=True,
                                               mode=1, unit_mode=True)
             wl, wu = tuple2_to_int(grid.get_wire_bounds(layer_id, tr0, width=1, unit_mode=True))
@@ -4029,7 +4398,7 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         pitch = fill_htr * tr_p2
         for p in self._get_flat_poly_iter(poly.intersection(comb)):
             p_bnds = p.bounds
-            if p_bnds:
+            if not p.is_empty:
                 if is_horiz:
                     htr = htr0 + (int(round(p_bnds[1])) - wl) // pitch * fill_htr
                     pl = int(round(p_bnds[0]))
@@ -4048,7 +4417,7 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
         if (isinstance(poly, shgeo.MultiPolygon) or
                 isinstance(poly, shgeo.MultiLineString) or
                 isinstance(poly, shgeo.GeometryCollection)):
-            yield from poly
+            yield from poly.geoms
         else:
             yield poly
 
@@ -4062,11 +4431,9 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
             clower = coord_mid - min_len
         cupper = clower + min_len
         geo = long_box.difference(tot_geo)
-        if isinstance(geo, shgeo.Polygon):
-            geo = [geo]
-        for poly in geo:
+        for poly in self._get_flat_poly_iter(geo):
             poly_bnds = poly.bounds
-            if poly_bnds:
+            if not poly.is_empty:
                 if is_horiz:
                     lower = poly_bnds[1]
                     upper = poly_bnds[3]
@@ -4087,11 +4454,9 @@ class TemplateBase(DesignMaster, metaclass=abc.ABCMeta):
     def _fill_tran_edge_helper(self, layer_id, grid, tot_geo, tran_box, tr, is_horiz, min_len,
                                sp_max2, new_polys):
         geo = tran_box.difference(tot_geo)
-        if isinstance(geo, shgeo.Polygon):
-            geo = [geo]
-        for poly in geo:
+        for poly in self._get_flat_poly_iter(geo):
             poly_bnds = poly.bounds
-            if poly_bnds:
+            if not poly.is_empty:
                 if is_horiz:
                     lower = int(round(poly_bnds[0]))
                     upper = int(round(poly_bnds[2]))
@@ -4132,7 +4497,12 @@ class CachedTemplate(TemplateBase):
         self.array_box = info['array_box']
 
         self._merge_used_tracks = True
-        self._used_tracks = UsedTracks(fname, overwrite=False)
+        packed_fname = fname + '_tracks.bin'
+        if os.path.isfile(packed_fname):
+            self._used_tracks = UsedTracks.from_packed_file(packed_fname, self.grid.resolution)
+        else:
+            # cache written by older versions, with one R-tree file per layer
+            self._used_tracks = UsedTracks(fname, overwrite=False)
 
         prop_dict = info['properties']
         for key, val in prop_dict.items():
@@ -73,6 +73,24 @@ class TestbenchManager(object, metaclass=abc.ABCMeta):
 
     async def setup_and_simulate(self, prj: BagProject,
                                  sch_params: Dict[str, Any]) -> Dict[str, Any]:
+        if prj.impl_db is None:
+            raise Exception('BAG Server is not set up.')
+
+        # testbench creation accesses the CAD database, run it without blocking other tasks.
+        tb_db = prj.impl_db_pool.get_db(self.impl_lib)
+        tb = await tb_db.async_call(self._setup_tb, prj, sch_params)
+
+        # run simulation and save/return raw result
+        print('Simulating %s' % self.tb_name)
+        save_dir = await tb.async_run_simulation()
+        print('Finished simulating %s' % self.tb_name)
+        results = load_sim_results(save_dir)
+        save_sim_results(results, self.data_fname)
+        return results
+
+    def _setup_tb(self, prj, sch_params):
+        # type: (BagProject, Optional[Dict[str, Any]]) -> Testbench
+        """Create or load the testbench, then configure it for simulation."""
         if sch_params is None:
             print('loading testbench %s' % self.tb_name)
             tb = prj.load_testbench(self.impl_lib, self.tb_name)
@@ -86,14 +104,7 @@ class TestbenchManager(object, metaclass=abc.ABCMeta):
         for cell_name, view_name in self.sim_view_list:
             tb.set_simulation_view(self.impl_lib, cell_name, view_name)
         tb.update_testbench()
-
-        # run simulation and save/return raw result
-        print('Simulating %s' % self.tb_name)
-        save_dir = await tb.async_run_simulation()
-        print('Finished simulating %s' % self.tb_name)
-        results = load_sim_results(save_dir)
-        save_sim_results(results, self.data_fname)
-        return results
+        return tb
 
     @classmethod
     def record_array(cls, output_dict, data_dict, arr, arr_name, sweep_params):
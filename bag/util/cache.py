@@ -652,6 +652,7 @@ class MasterDB(abc.ABC):
                             lib_name='',  # type: str
                             debug=False,  # type: bool
                             rename_dict=None,  # type: Optional[Dict[str, str]]
+                            **kwargs  # type: Any
                             ):
         # type: (...) -> None
         """create all given masters in the database.
@@ -668,6 +669,8 @@ class MasterDB(abc.ABC):
             True to print debugging messages
         rename_dict : Optional[Dict[str, str]]
             optional master cell renaming dictionary.
+        **kwargs : Any
+            additional arguments for create_masters_in_db().
         """
         if name_list is None:
             name_list = [None] * len(master_list)  # type: Sequence[Optional[str]]
@@ -724,7 +727,7 @@ class MasterDB(abc.ABC):
         if debug:
             print('master content retrieval took %.4g seconds' % (end - start))
 
-        self.create_masters_in_db(lib_name, content_list, debug=debug)
+        self.create_masters_in_db(lib_name, content_list, debug=debug, **kwargs)
 
     def _instantiate_master_helper(self, info_dict, master):
         # type: (Dict[str, DesignMaster], DesignMaster) -> None
@@ -6,6 +6,12 @@
 from typing import List, Optional, Tuple, Any, Iterable, Generator
 
 import bisect
+from itertools import chain
+
+import numpy as np
+
+# a location in IntervalSet, as (chunk index, index in chunk).
+Loc = Tuple[int, int]
 
 
 class IntervalSet(object):
@@ -13,6 +19,9 @@ class IntervalSet(object):
 
     Each interval has a value associated with it.  If not specified, the value defaults to None.
 
+    Intervals are stored in sorted chunks of at most 2 * _load elements, so adding or
+    removing an interval costs O(log(n) + _load) instead of O(n).
+
     Parameters
     ----------
     intv_list : Optional[Iterable[Tuple[int, int]]]
@@ -21,20 +30,228 @@ class IntervalSet(object):
         the initial values list.
     """
 
+    # the nominal chunk size.
+    _load = 256
+
+    # use numpy for intersection if total number of intervals exceeds this value.
+    _vec_threshold = 64
+
     def __init__(self, intv_list=None, val_list=None):
         # type: (Optional[Iterable[Tuple[int, int]]], Optional[Iterable[Any]]) -> None
-        self._start_list = []  # type: List[int]
-        self._end_list = []  # type: List[int]
+        start_list = []  # type: List[int]
+        end_list = []  # type: List[int]
         if intv_list is None:
-            self._val_list = []  # type: List[Any]
+            val_list = []
         else:
             for v0, v1 in intv_list:
-                self._start_list.append(v0)
-                self._end_list.append(v1)
+                start_list.append(v0)
+                end_list.append(v1)
             if val_list is None:
-                self._val_list = [None] * len(self._start_list)
+                val_list = [None] * len(start_list)
             else:
-                self._val_list = list(val_list)
+                val_list = list(val_list)
+
+        self._starts = []  # type: List[List[int]]
+        self._ends = []  # type: List[List[int]]
+        self._vals = []  # type: List[List[Any]]
+        self._firsts = []  # type: List[int]
+        self._len = 0
+        self._offsets = None  # type: Optional[List[int]]
+        self._set_flat(start_list, end_list, val_list)
+
+    @classmethod
+    def from_arrays(cls, starts, ends, vals=None):
+        # type: (np.ndarray, np.ndarray, Optional[Iterable[Any]]) -> IntervalSet
+        """Create a new IntervalSet from sorted arrays of interval bounds.
+
+        Parameters
+        ----------
+        starts : np.ndarray
+            the interval start coordinates, in increasing order.
+        ends : np.ndarray
+            the interval end coordinates.
+        vals : Optional[Iterable[Any]]
+            the interval values.  Defaults to None.
+
+        Returns
+        -------
+        intv_set : IntervalSet
+            the new IntervalSet.
+        """
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        if starts.shape != ends.shape or starts.ndim != 1:
+            raise ValueError('starts and ends must be 1D arrays with the same length.')
+        if np.any(ends < starts) or np.any(starts[1:] < ends[:-1]):
+            raise ValueError('Intervals are not sorted and disjoint.')
+
+        num = starts.shape[0]
+        val_list = [None] * num if vals is None else list(vals)
+        if len(val_list) != num:
+            raise ValueError('vals length = %d != %d' % (len(val_list), num))
+
+        result = cls.__new__(cls)
+        result._set_flat(starts.tolist(), ends.tolist(), val_list)
+        return result
+
+    def to_arrays(self):
+        # type: () -> Tuple[np.ndarray, np.ndarray]
+        """Returns the interval start and end coordinates as numpy arrays.
+
+        Returns
+        -------
+        starts : np.ndarray
+            the interval start coordinates.
+        ends : np.ndarray
+            the interval end coordinates.
+        """
+        starts = np.fromiter(chain.from_iterable(self._starts), dtype=np.int64, count=self._len)
+        ends = np.fromiter(chain.from_iterable(self._ends), dtype=np.int64, count=self._len)
+        return starts, ends
+
+    def _set_flat(self, start_list, end_list, val_list):
+        # type: (List[int], List[int], List[Any]) -> None
+        """Set the content of this IntervalSet from flat lists."""
+        load = self._load
+        num = len(start_list)
+        idx_list = range(0, num, load)
+        self._starts = [start_list[idx:idx + load] for idx in idx_list]
+        self._ends = [end_list[idx:idx + load] for idx in idx_list]
+        self._vals = [val_list[idx:idx + load] for idx in idx_list]
+        self._firsts = [chunk[0] for chunk in self._starts]
+        self._len = num
+        self._offsets = None
+
+    def _get_flat(self):
+        # type: () -> Tuple[List[int], List[int], List[Any]]
+        """Returns the content of this IntervalSet as flat lists."""
+        return (list(chain.from_iterable(self._starts)), list(chain.from_iterable(self._ends)),
+                list(chain.from_iterable(self._vals)))
+
+    def _index_to_loc(self, idx):
+        # type: (int) -> Loc
+        """Converts a positional index to a location."""
+        if self._offsets is None:
+            offsets = [0]
+            for chunk in self._starts:
+                offsets.append(offsets[-1] + len(chunk))
+            self._offsets = offsets
+        ci = bisect.bisect_right(self._offsets, idx) - 1
+        return ci, idx - self._offsets[ci]
+
+    def _next_loc(self, loc):
+        # type: (Loc) -> Loc
+        """Returns the location after the given one."""
+        ci, i = loc
+        if i + 1 < len(self._starts[ci]):
+            return ci, i + 1
+        return ci + 1, 0
+
+    def _prev_loc(self, loc):
+        # type: (Loc) -> Loc
+        """Returns the location before the given one.  The given location must not be first."""
+        ci, i = loc
+        if i > 0:
+            return ci, i - 1
+        return ci - 1, len(self._starts[ci - 1]) - 1
+
+    def _bisect_right(self, val):
+        # type: (int) -> Loc
+        """Returns the location of the first interval with start greater than val."""
+        ci = bisect.bisect_right(self._firsts, val) - 1
+        if ci < 0:
+            return 0, 0
+        i = bisect.bisect_right(self._starts[ci], val)
+        if i == len(self._starts[ci]):
+            return ci + 1, 0
+        return ci, i
+
+    def _loc_iter(self, loc0, loc1):
+        # type: (Loc, Loc) -> Generator[Loc, None, None]
+        """Iterates over all locations from loc0 to loc1, inclusive."""
+        ci0, i0 = loc0
+        ci1, i1 = loc1
+        for ci in range(ci0, ci1 + 1):
+            start = i0 if ci == ci0 else 0
+            stop = i1 + 1 if ci == ci1 else len(self._starts[ci])
+            for i in range(start, stop):
+                yield ci, i
+
+    def _insert(self, loc, start, end, val):
+        # type: (Loc, int, int, Any) -> None
+        """Insert the given interval at the given location."""
+        ci, i = loc
+        if not self._starts:
+            self._starts.append([start])
+            self._ends.append([end])
+            self._vals.append([val])
+            self._firsts.append(start)
+        else:
+            if ci == len(self._starts):
+                ci -= 1
+                i = len(self._starts[ci])
+            self._starts[ci].insert(i, start)
+            self._ends[ci].insert(i, end)
+            self._vals[ci].insert(i, val)
+            if i == 0:
+                self._firsts[ci] = start
+            if len(self._starts[ci]) > 2 * self._load:
+                self._split(ci)
+        self._len += 1
+        self._offsets = None
+
+    def _split(self, ci):
+        # type: (int) -> None
+        """Split the given chunk in half."""
+        load = self._load
+        for lists in (self._starts, self._ends, self._vals):
+            chunk = lists[ci]
+            lists[ci:ci + 1] = [chunk[:load], chunk[load:]]
+        self._firsts.insert(ci + 1, self._starts[ci + 1][0])
+
+    def _delete(self, loc0, loc1):
+        # type: (Loc, Loc) -> None
+        """Delete all intervals from loc0 to loc1, inclusive."""
+        ci0, i0 = loc0
+        ci1, i1 = loc1
+        if ci0 == ci1:
+            num = i1 + 1 - i0
+            for lists in (self._starts, self._ends, self._vals):
+                del lists[ci0][i0:i1 + 1]
+        else:
+            num = len(self._starts[ci0]) - i0 + i1 + 1
+            num += sum((len(self._starts[ci]) for ci in range(ci0 + 1, ci1)))
+            for lists in (self._starts, self._ends, self._vals):
+                del lists[ci1][:i1 + 1]
+                del lists[ci0][i0:]
+                del lists[ci0 + 1:ci1]
+            del self._firsts[ci0 + 1:ci1]
+            self._clean_chunk(ci0 + 1)
+        self._clean_chunk(ci0)
+        self._len -= num
+        self._offsets = None
+
+    def _clean_chunk(self, ci):
+        # type: (int) -> None
+        """Update the given chunk after deletion.
+
+        Empty chunks are removed, and small chunks are merged into the previous chunk.
+        """
+        if ci >= len(self._starts):
+            return
+        size = len(self._starts[ci])
+        if size == 0:
+            for lists in (self._starts, self._ends, self._vals, self._firsts):
+                del lists[ci]
+        elif ci > 0 and size < self._load // 2:
+            for lists in (self._starts, self._ends, self._vals):
+                lists[ci - 1].extend(lists[ci])
+                del lists[ci]
+            del self._firsts[ci]
+            if len(self._starts[ci - 1]) > 2 * self._load:
+                self._split(ci - 1)
+        else:
+            self._firsts[ci] = self._starts[ci][0]
 
     def __contains__(self, key):
         # type: (Tuple[int, int]) -> bool
@@ -50,8 +267,8 @@ class IntervalSet(object):
         contains : bool
             True if this IntervalSet contains the given interval.
         """
-        idx = self._get_first_overlap_idx(key)
-        return idx >= 0 and key[0] == self._start_list[idx] and key[1] == self._end_list[idx]
+        found, (ci, i) = self._get_first_overlap_loc(key)
+        return found and key[0] == self._starts[ci][i] and key[1] == self._ends[ci][i]
 
     def __getitem__(self, intv):
         # type: (Tuple[int, int]) -> Any
@@ -69,10 +286,10 @@ class IntervalSet(object):
         val : Any
             the value associated with the given interval.
         """
-        idx = self._get_first_overlap_idx(intv)
-        if idx < 0 or intv[0] != self._start_list[idx] or intv[1] != self._end_list[idx]:
+        found, (ci, i) = self._get_first_overlap_loc(intv)
+        if not found or intv[0] != self._starts[ci][i] or intv[1] != self._ends[ci][i]:
             raise KeyError('Invalid interval: %s' % repr(intv))
-        return self._val_list[idx]
+        return self._vals[ci][i]
 
     def __setitem__(self, intv, value):
         # type: (Tuple[int, int], Any) -> None
@@ -87,13 +304,13 @@ class IntervalSet(object):
         value : Any
             the new value.
         """
-        idx = self._get_first_overlap_idx(intv)
-        if idx < 0:
+        found, (ci, i) = self._get_first_overlap_loc(intv)
+        if not found:
             self.add(intv, value)
-        elif intv[0] != self._start_list[idx] or intv[1] != self._end_list[idx]:
+        elif intv[0] != self._starts[ci][i] or intv[1] != self._ends[ci][i]:
             raise KeyError('Invalid interval: %s' % repr(intv))
         else:
-            self._val_list[idx] = value
+            self._vals[ci][i] = value
 
     def __iter__(self):
         # type: () -> Iterable[Tuple[int, int]]
@@ -104,7 +321,7 @@ class IntervalSet(object):
         intv : Tuple[int, int]
             the next interval.
         """
-        return zip(self._start_list, self._end_list)
+        return chain.from_iterable(zip(s, e) for s, e in zip(self._starts, self._ends))
 
     def __len__(self):
         # type: () -> int
@@ -115,7 +332,7 @@ class IntervalSet(object):
         length : int
             number of intervals in this set.
         """
-        return len(self._start_list)
+        return self._len
 
     def get_start(self):
         # type: () -> int
@@ -126,7 +343,9 @@ class IntervalSet(object):
         start : int
             the start of the first interval.
         """
-        return self._start_list[0]
+        if not self._starts:
+            raise IndexError('list index out of range')
+        return self._starts[0][0]
 
     def get_end(self):
         # type: () -> int
@@ -137,18 +356,21 @@ class IntervalSet(object):
         end : int
             the end of the last interval.
         """
-        return self._end_list[-1]
+        if not self._ends:
+            raise IndexError('list index out of range')
+        return self._ends[-1][-1]
 
     def get_interval(self, idx):
         # type: (int) -> Tuple[int, int]
         if idx < 0:
-            idx += len(self._start_list)
+            idx += self._len
         if idx < 0:
             raise IndexError('Invalid index: %d' % idx)
-        if idx >= len(self._start_list):
+        if idx >= self._len:
             raise IndexError('Invalid index: %d' % idx)
 
-        return self._start_list[idx], self._end_list[idx]
+        ci, i = self._index_to_loc(idx)
+        return self._starts[ci][i], self._ends[ci][i]
 
     def copy(self):
         # type: () -> IntervalSet
@@ -159,12 +381,13 @@ class IntervalSet(object):
         intv_set : IntervalSet
             a copy of this IntervalSet.
         """
-        return IntervalSet(intv_list=list(zip(self._start_list, self._end_list)),
-                           val_list=self._val_list)
+        result = self.__class__.__new__(self.__class__)
+        result._set_flat(*self._get_flat())
+        return result
 
-    def _get_first_overlap_idx(self, intv, abut=False):
-        # type: (Tuple[int, int], bool) -> int
-        """Returns the index of the first interval that overlaps with the given interval.
+    def _get_first_overlap_loc(self, intv, abut=False):
+        # type: (Tuple[int, int], bool) -> Tuple[bool, Loc]
+        """Returns the location of the first interval that overlaps with the given interval.
 
         Parameters
         ----------
@@ -175,37 +398,40 @@ class IntervalSet(object):
 
         Returns
         -------
-        idx : int
-            the index of the overlapping interval.  If no overlapping intervals are
-            found, -(idx + 1) is returned, where idx is the index to insert the interval.
+        found : bool
+            True if an overlapping interval is found.
+        loc : Loc
+            the location of the overlapping interval.  If no overlapping intervals are
+            found, this is the location to insert the interval.
         """
         start, end = intv
-        if not self._start_list:
-            return -1
+        if not self._starts:
+            return False, (0, 0)
         # find the smallest start index greater than start
-        idx = bisect.bisect_right(self._start_list, start)
-        if idx == 0:
+        loc = self._bisect_right(start)
+        if loc == (0, 0):
             # all interval's starting point is greater than start
-            test = self._start_list[0]
-            return 0 if test < end or (abut and test == end) else -1
+            test = self._starts[0][0]
+            return test < end or (abut and test == end), loc
 
         # interval where start index is less than or equal to start
-        test_idx = idx - 1
-        test = self._end_list[test_idx]
+        tci, ti = self._prev_loc(loc)
+        test = self._ends[tci][ti]
         if start < test or (abut and start == test):
             # start is covered by the interval; overlaps.
-            return test_idx
-        elif idx < len(self._start_list) and \
-                (self._start_list[idx] < end or (abut and self._start_list[idx] == end)):
-            # _start_list[idx] covered by interval.
-            return idx
-        else:
-            # no overlap interval found
-            return -(idx + 1)
-
-    def _get_last_overlap_idx(self, intv, abut=False):
-        # type: (Tuple[int, int], bool) -> int
-        """Returns the index of the last interval that overlaps with the given interval.
+            return True, (tci, ti)
+        ci, i = loc
+        if ci < len(self._starts):
+            test = self._starts[ci][i]
+            if test < end or (abut and test == end):
+                # start of next interval covered by interval.
+                return True, loc
+        # no overlap interval found
+        return False, loc
+
+    def _get_last_overlap_loc(self, intv, abut=False):
+        # type: (Tuple[int, int], bool) -> Tuple[bool, Loc]
+        """Returns the location of the last interval that overlaps with the given interval.
 
         Parameters
         ----------
@@ -216,25 +442,26 @@ class IntervalSet(object):
 
         Returns
         -------
-        idx : int
-            the index of the overlapping interval.  If no overlapping intervals are
-            found, -(idx + 1) is returned, where idx is the index to insert the interval.
+        found : bool
+            True if an overlapping interval is found.
+        loc : Loc
+            the location of the overlapping interval.
         """
         start, end = intv
-        if not self._start_list:
-            return -1
+        if not self._starts:
+            return False, (0, 0)
         # find the smallest start index greater than end
-        idx = bisect.bisect_right(self._start_list, end)
-        if idx == 0:
+        loc = self._bisect_right(end)
+        if loc == (0, 0):
             # all interval's starting point is greater than end
-            return -1
+            return False, loc
 
         # interval where start index is less than or equal to end
-        test_idx = idx - 1
-        test = self._end_list[test_idx]
+        tci, ti = self._prev_loc(loc)
+        test = self._ends[tci][ti]
         if test > start or (abut and test == start):
-            return test_idx
-        return -(idx + 1)
+            return True, (tci, ti)
+        return False, loc
 
     def has_overlap(self, intv):
         # type: (Tuple[int, int]) -> bool
@@ -250,15 +477,15 @@ class IntervalSet(object):
         has_overlap : bool
             True if there is at least one interval in this set that overlaps with the given one.
         """
-        return self._get_first_overlap_idx(intv) >= 0
+        return self._get_first_overlap_loc(intv)[0]
 
     def has_single_cover(self, intv):
         # type: (Tuple[int, int]) -> bool
         """Returns True if the given interval is completed covered by a single interval."""
-        idx = self._get_first_overlap_idx(intv)
-        if idx < 0:
+        found, (ci, i) = self._get_first_overlap_loc(intv)
+        if not found:
             return False
-        return self._start_list[idx] <= intv[0] and self._end_list[idx] >= intv[1]
+        return self._starts[ci][i] <= intv[0] and self._ends[ci][i] >= intv[1]
 
     def remove(self, intv):
         # type: (Tuple[int, int]) -> bool
@@ -274,13 +501,12 @@ class IntervalSet(object):
         success : bool
             True if the given interval is found and removed.  False otherwise.
         """
-        idx = self._get_first_overlap_idx(intv)
-        if idx < 0:
+        found, loc = self._get_first_overlap_loc(intv)
+        if not found:
             return False
-        if intv[0] == self._start_list[idx] and intv[1] == self._end_list[idx]:
-            del self._start_list[idx]
-            del self._end_list[idx]
-            del self._val_list[idx]
+        ci, i = loc
+        if intv[0] == self._starts[ci][i] and intv[1] == self._ends[ci][i]:
+            self._delete(loc, loc)
             return True
         return False
 
@@ -300,25 +526,41 @@ class IntervalSet(object):
         intersection : IntervalSet
             a new IntervalSet containing all intervals present in both sets.
         """
-        idx1 = idx2 = 0
-        len1 = len(self._start_list)
-        len2 = len(other._start_list)
-        intvs = []
-        while idx1 < len1 and idx2 < len2:
-            intv1 = self._start_list[idx1], self._end_list[idx1]
-            intv2 = other._start_list[idx2], other._end_list[idx2]
+        if self._len + other._len <= self._vec_threshold:
+            return IntervalSet(intv_list=self._intersection_iter(other))
+
+        s1, e1 = self.to_arrays()
+        s2, e2 = other.to_arrays()
+        # for each interval in this set, find the range of overlapping intervals in other set
+        idx0 = np.searchsorted(e2, s1, side='right')
+        idx1 = np.searchsorted(s2, e1, side='left')
+        counts = np.maximum(idx1 - idx0, 0)
+        num_tot = int(counts.sum())
+        idx1_rep = np.repeat(np.arange(s1.shape[0]), counts)
+        idx2_rep = np.repeat(idx0 - np.cumsum(counts) + counts, counts) + np.arange(num_tot)
+        starts = np.maximum(s1[idx1_rep], s2[idx2_rep])
+        ends = np.minimum(e1[idx1_rep], e2[idx2_rep])
+        keep = ends > starts
+        return IntervalSet.from_arrays(starts[keep], ends[keep])
+
+    def _intersection_iter(self, other):
+        # type: (IntervalSet) -> Generator[Tuple[int, int], None, None]
+        """Iterates over the intersection of two IntervalSets."""
+        iter1 = iter(self)
+        iter2 = iter(other)
+        intv1 = next(iter1, None)
+        intv2 = next(iter2, None)
+        while intv1 is not None and intv2 is not None:
             test = max(intv1[0], intv2[0]), min(intv1[1], intv2[1])
             if test[1] > test[0]:
-                intvs.append(test)
+                yield test
             if intv1[1] < intv2[1]:
-                idx1 += 1
+                intv1 = next(iter1, None)
             elif intv2[1] < intv1[1]:
-                idx2 += 1
+                intv2 = next(iter2, None)
             else:
-                idx1 += 1
-                idx2 += 1
-
-        return IntervalSet(intv_list=intvs)
+                intv1 = next(iter1, None)
+                intv2 = next(iter2, None)
 
     def get_complement(self, total_intv):
         # type: (Tuple[int, int]) -> IntervalSet
@@ -337,19 +579,31 @@ class IntervalSet(object):
         complement : IntervalSet
             the complement of this IntervalSet.
         """
-        return IntervalSet(intv_list=self.complement_iter(total_intv))
+        if self._len <= self._vec_threshold:
+            return IntervalSet(intv_list=self.complement_iter(total_intv))
+
+        self._check_universal_interval(total_intv)
+        starts, ends = self.to_arrays()
+        lower = np.concatenate(([total_intv[0]], ends))
+        upper = np.concatenate((starts, [total_intv[1]]))
+        keep = lower < upper
+        return IntervalSet.from_arrays(lower[keep], upper[keep])
+
+    def _check_universal_interval(self, total_intv):
+        # type: (Tuple[int, int]) -> None
+        if self._starts[0][0] < total_intv[0] or total_intv[1] < self._ends[-1][-1]:
+            raise ValueError('The given interval [{0}, {1}) is '
+                             'not a valid universal interval'.format(*total_intv))
 
     def complement_iter(self, total_intv):
         # type: (Tuple[int, int]) -> Generator[Tuple[int, int], None, None]
         """Iterate over all intervals that;s the complement of this one."""
-        if not self._start_list:
+        if not self._starts:
             yield total_intv
-        elif self._start_list[0] < total_intv[0] or total_intv[1] < self._end_list[-1]:
-            raise ValueError('The given interval [{0}, {1}) is '
-                             'not a valid universal interval'.format(*total_intv))
         else:
+            self._check_universal_interval(total_intv)
             marker = total_intv[0]
-            for start, end in zip(self._start_list, self._end_list):
+            for start, end in self:
                 if marker < start:
                     yield marker, start
                 marker = end
@@ -366,12 +620,10 @@ class IntervalSet(object):
         intv : Tuple[int, int]
             the given interval
         """
-        sidx = self._get_first_overlap_idx(intv)
-        if sidx >= 0:
-            eidx = self._get_last_overlap_idx(intv) + 1
-            del self._start_list[sidx:eidx]
-            del self._end_list[sidx:eidx]
-            del self._val_list[sidx:eidx]
+        found, bloc = self._get_first_overlap_loc(intv)
+        if found:
+            eloc = self._get_last_overlap_loc(intv)[1]
+            self._delete(bloc, eloc)
 
     def add(self, intv, val=None, merge=False, abut=False):
         # type: (Tuple[int, int], Any, bool, bool) -> bool
@@ -397,27 +649,20 @@ class IntervalSet(object):
             True if the given interval is added.
         """
         abut = abut and merge
-        bidx = self._get_first_overlap_idx(intv, abut=abut)
-        if bidx >= 0:
+        found, bloc = self._get_first_overlap_loc(intv, abut=abut)
+        if found:
             if not merge:
                 return False
-            eidx = self._get_last_overlap_idx(intv, abut=abut)
-            new_start = min(self._start_list[bidx], intv[0])
-            new_end = max(self._end_list[eidx], intv[1])
-            del self._start_list[bidx:eidx + 1]
-            del self._end_list[bidx:eidx + 1]
-            del self._val_list[bidx:eidx + 1]
-            self._start_list.insert(bidx, new_start)
-            self._end_list.insert(bidx, new_end)
-            self._val_list.insert(bidx, val)
-            return True
+            eloc = self._get_last_overlap_loc(intv, abut=abut)[1]
+            new_start = min(self._starts[bloc[0]][bloc[1]], intv[0])
+            new_end = max(self._ends[eloc[0]][eloc[1]], intv[1])
+            self._delete(bloc, eloc)
+            new_intv = (new_start, new_end)
+            self._insert(self._get_first_overlap_loc(new_intv)[1], new_start, new_end, val)
         else:
             # insert interval
-            idx = -bidx - 1
-            self._start_list.insert(idx, intv[0])
-            self._end_list.insert(idx, intv[1])
-            self._val_list.insert(idx, val)
-            return True
+            self._insert(bloc, intv[0], intv[1], val)
+        return True
 
     def subtract(self, intv):
         # type: (Tuple[int, int]) -> List[Tuple[int, int]]
@@ -433,26 +678,23 @@ class IntervalSet(object):
         remaining_intvs : List[Tuple[int, int]]
             intervals created from subtraction.
         """
-        bidx = self._get_first_overlap_idx(intv)
+        found, bloc = self._get_first_overlap_loc(intv)
         insert_intv = []
-        if bidx >= 0:
-            eidx = self._get_last_overlap_idx(intv)
+        if found:
+            eloc = self._get_last_overlap_loc(intv)[1]
+            bci, bi = bloc
+            eci, ei = eloc
             insert_val = []
-            if self._start_list[bidx] < intv[0]:
-                insert_intv.append((self._start_list[bidx], intv[0]))
-                insert_val.append(self._val_list[bidx])
-            if intv[1] < self._end_list[eidx]:
-                insert_intv.append((intv[1], self._end_list[eidx]))
-                insert_val.append(self._val_list[eidx])
-            del self._start_list[bidx:eidx + 1]
-            del self._end_list[bidx:eidx + 1]
-            del self._val_list[bidx:eidx + 1]
-            insert_idx = bidx
+            if self._starts[bci][bi] < intv[0]:
+                insert_intv.append((self._starts[bci][bi], intv[0]))
+                insert_val.append(self._vals[bci][bi])
+            if intv[1] < self._ends[eci][ei]:
+                insert_intv.append((intv[1], self._ends[eci][ei]))
+                insert_val.append(self._vals[eci][ei])
+            self._delete(bloc, eloc)
             for (new_start, new_end), val in zip(insert_intv, insert_val):
-                self._start_list.insert(insert_idx, new_start)
-                self._end_list.insert(insert_idx, new_end)
-                self._val_list.insert(insert_idx, val)
-                insert_idx += 1
+                insert_loc = self._get_first_overlap_loc((new_start, new_end))[1]
+                self._insert(insert_loc, new_start, new_end, val)
 
         return insert_intv
 
@@ -469,7 +711,7 @@ class IntervalSet(object):
         val : Any
             the value associated with the interval.
         """
-        return zip(self.__iter__(), self._val_list)
+        return zip(self.__iter__(), self.values())
 
     def intervals(self):
         # type: () -> Iterable[Tuple[int, int]]
@@ -495,7 +737,15 @@ class IntervalSet(object):
         val : Any
             the value.
         """
-        return self._val_list.__iter__()
+        return chain.from_iterable(self._vals)
+
+    def _overlap_loc_iter(self, intv):
+        # type: (Tuple[int, int]) -> Generator[Loc, None, None]
+        """Iterates over locations of intervals overlapping the given interval."""
+        found, bloc = self._get_first_overlap_loc(intv)
+        if found:
+            eloc = self._get_last_overlap_loc(intv)[1]
+            yield from self._loc_iter(bloc, eloc)
 
     def overlap_items(self, intv):
         # type: (Tuple[int, int]) -> Generator[Tuple[Tuple[int, int], Any], None, None]
@@ -513,11 +763,8 @@ class IntervalSet(object):
         val : Any
             value associated with ovl_intv.
         """
-        sidx = self._get_first_overlap_idx(intv)
-        if sidx >= 0:
-            eidx = self._get_last_overlap_idx(intv) + 1
-            for idx in range(sidx, eidx):
-                yield (self._start_list[idx], self._end_list[idx]), self._val_list[idx]
+        for ci, i in self._overlap_loc_iter(intv):
+            yield (self._starts[ci][i], self._ends[ci][i]), self._vals[ci][i]
 
     def overlap_intervals(self, intv):
         # type: (Tuple[int, int]) -> Generator[Tuple[int, int], None, None]
@@ -533,11 +780,8 @@ class IntervalSet(object):
         ovl_intv : Tuple[int, int]
             the overlapping interval.
         """
-        sidx = self._get_first_overlap_idx(intv)
-        if sidx >= 0:
-            eidx = self._get_last_overlap_idx(intv) + 1
-            for idx in range(sidx, eidx):
-                yield self._start_list[idx], self._end_list[idx]
+        for ci, i in self._overlap_loc_iter(intv):
+            yield self._starts[ci][i], self._ends[ci][i]
 
     def overlap_values(self, intv):
         # type: (Tuple[int, int]) -> Generator[Any, None, None]
@@ -553,19 +797,16 @@ class IntervalSet(object):
         ovl_intv : Tuple[int, int]
             the overlapping interval.
         """
-        sidx = self._get_first_overlap_idx(intv)
-        if sidx >= 0:
-            eidx = self._get_last_overlap_idx(intv) + 1
-            for idx in range(sidx, eidx):
-                yield self._val_list[idx]
+        for ci, i in self._overlap_loc_iter(intv):
+            yield self._vals[ci][i]
 
     def get_first_overlap_item(self, intv):
         # type: (Tuple[int, int]) -> Optional[Tuple[Tuple[int, int], Any]]
         """Returns the first item with interval that overlaps the given one."""
-        idx = self._get_first_overlap_idx(intv)
-        if idx < 0:
+        found, (ci, i) = self._get_first_overlap_loc(intv)
+        if not found:
             return None
-        return (self._start_list[idx], self._end_list[idx]), self._val_list[idx]
+        return (self._starts[ci][i], self._ends[ci][i]), self._vals[ci][i]
 
     def transform(self, scale=1, shift=0):
         # type: (int, int) -> IntervalSet
@@ -583,18 +824,16 @@ class IntervalSet(object):
         intv_set : IntervalSet
             the transformed IntervalSet.
         """
+        start_list, end_list, val_list = self._get_flat()
         if scale < 0:
-            new_start = [-v + shift for v in reversed(self._end_list)]
-            new_end = [-v + shift for v in reversed(self._start_list)]
-            new_val = list(reversed(self._val_list))
+            new_start = [-v + shift for v in reversed(end_list)]
+            new_end = [-v + shift for v in reversed(start_list)]
+            new_val = list(reversed(val_list))
         else:
-            new_start = [v + shift for v in self._start_list]
-            new_end = [v + shift for v in self._end_list]
-            new_val = list(self._val_list)
+            new_start = [v + shift for v in start_list]
+            new_end = [v + shift for v in end_list]
+            new_val = val_list
 
         result = self.__class__.__new__(self.__class__)
-        result._start_list = new_start
-        result._end_list = new_end
-        result._val_list = new_val
-
+        result._set_flat(new_start, new_end, new_val)
         return result
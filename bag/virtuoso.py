@@ -12,9 +12,25 @@ import argparse
 import bag.interface
 import bag.io
 
+# RAM-backed temporary directory
+_ram_dir = '/dev/shm'
+
 
 def run_skill_server(args):
     """Run the BAG/Virtuoso server."""
+    _run_server(args, sys.stdout, sys.stdin)
+
+
+def run_standin_server(args):
+    """Run the BAG server with a local stand-in for Virtuoso."""
+    from bag.interface.standin import StandInVirtuoso
+
+    virt = StandInVirtuoso(latency=args.latency)
+    _run_server(args, virt, virt)
+
+
+def _run_server(args, virt_in, virt_out):
+    """Run the BAG server with the given Virtuoso input and output files."""
     error_msg = ''
     server = None
     port_file = None
@@ -48,7 +64,9 @@ def run_skill_server(args):
 
         # determine temp directory
         tmp_dir = None
-        if 'BAG_TEMP_DIR' in os.environ:
+        if args.ram_dir and os.path.isdir(_ram_dir):
+            tmp_dir = _ram_dir
+        elif 'BAG_TEMP_DIR' in os.environ:
             tmp_dir = os.environ['BAG_TEMP_DIR']
             if not os.path.isdir(tmp_dir):
                 if os.path.exists(tmp_dir):
@@ -58,7 +76,8 @@ def run_skill_server(args):
 
         # attempt to open port and start server
         router = bag.interface.ZMQRouter(min_port=min_port, max_port=max_port, log_file=log_file)
-        server = bag.interface.SkillServer(router, sys.stdout, sys.stdin, tmpdir=tmp_dir)
+        server = bag.interface.SkillServer(router, virt_in, virt_out, tmpdir=tmp_dir,
+                                           inline_threshold=args.inline_threshold)
         port_number = router.get_port()
     except Exception as ex:
         error_msg = 'bag server process error:\n%s\n' % str(ex)
@@ -87,6 +106,21 @@ def run_skill_server(args):
         sys.stderr.flush()
 
 
+def _add_server_arguments(parser):
+    """Add command line arguments common to all server commands."""
+    parser.add_argument('min_port', type=int, help='minimum socket port number.')
+    parser.add_argument('max_port', type=int, help='maximum socket port number.')
+    parser.add_argument('port_file', type=str, help='file to write the port number to.')
+    parser.add_argument('log_file', type=str, nargs='?', default=None,
+                        help='log file name.')
+    parser.add_argument('-i', '--inline-threshold', type=int, default=0,
+                        help='inline skill input files up to this many characters in skill '
+                             'expressions.  0 to disable.')
+    parser.add_argument('-r', '--ram-dir', action='store_true', default=False,
+                        help='save temporary files to %s if it exists, instead of '
+                             '$BAG_TEMP_DIR.' % _ram_dir)
+
+
 def parse_command_line_arguments():
     """Parse command line arguments, then run the corresponding function."""
 
@@ -98,13 +132,17 @@ def parse_command_line_arguments():
     desc = 'Run BAG skill server.'
     par2 = sub_parsers.add_parser('run_skill_server', description=desc, help=desc)
 
-    par2.add_argument('min_port', type=int, help='minimum socket port number.')
-    par2.add_argument('max_port', type=int, help='maximum socket port number.')
-    par2.add_argument('port_file', type=str, help='file to write the port number to.')
-    par2.add_argument('log_file', type=str, nargs='?', default=None,
-                      help='log file name.')
+    _add_server_arguments(par2)
     par2.set_defaults(func=run_skill_server)
 
+    desc = 'Run BAG server with a local stand-in for Virtuoso.'
+    par3 = sub_parsers.add_parser('run_standin_server', description=desc, help=desc)
+
+    _add_server_arguments(par3)
+    par3.add_argument('-l', '--latency', type=float, default=0.0,
+                      help='skill expression evaluation time in seconds.')
+    par3.set_defaults(func=run_standin_server)
+
     args = parser.parse_args()
     args.func(args)
 
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark chunked IntervalSet against the single flat list implementation.
+
+Run with::
+
+    python benchmarks/bench_interval.py [num_intv ...]
+"""
+
+import sys
+import time
+import random
+
+from bag.util.interval import IntervalSet
+
+
+class FlatIntervalSet(IntervalSet):
+    """IntervalSet stored in a single chunk, equivalent to the original flat list version."""
+    _load = sys.maxsize
+    _vec_threshold = sys.maxsize
+
+
+def _time(fun, *args):
+    t0 = time.perf_counter()
+    ans = fun(*args)
+    return time.perf_counter() - t0, ans
+
+
+def _build(cls, intv_list):
+    intv_set = cls()
+    for intv in intv_list:
+        intv_set.add(intv, merge=True)
+    return intv_set
+
+
+def _query(intv_set, intv_list):
+    return sum((1 for intv in intv_list if intv_set.has_overlap(intv)))
+
+
+def _subtract(intv_set, intv_list):
+    for intv in intv_list:
+        intv_set.subtract(intv)
+
+
+def run(num_intv):
+    rng = random.Random(num_intv)
+    span = num_intv * 20
+    add_list = [(x, x + rng.randint(1, 10)) for x in (rng.randrange(span) for _ in range(num_intv))]
+    other_list = [(x, x + rng.randint(1, 10)) for x in (rng.randrange(span) for _ in range(num_intv))]
+    sub_list = [(x, x + 2) for x in (rng.randrange(span) for _ in range(num_intv // 4))]
+
+    print('num_intv = %d' % num_intv)
+    print('%-16s %12s %12s' % ('operation', 'flat (s)', 'chunked (s)'))
+    results = {}
+    for cls in (FlatIntervalSet, IntervalSet):
+        t_build, intv_set = _time(_build, cls, add_list)
+        other = _build(cls, other_list)
+        t_query = _time(_query, intv_set, other_list)[0]
+        t_intersect = _time(intv_set.get_intersection, other)[0]
+        t_complement = _time(intv_set.get_complement, (-1, span + 20))[0]
+        t_subtract = _time(_subtract, intv_set, sub_list)[0]
+        results[cls] = [('add', t_build), ('has_overlap', t_query),
+                        ('get_intersection', t_intersect), ('get_complement', t_complement),
+                        ('subtract', t_subtract)]
+
+    for (name, t_flat), (_, t_chunk) in zip(results[FlatIntervalSet], results[IntervalSet]):
+        print('%-16s %12.4f %12.4f' % (name, t_flat, t_chunk))
+    print('')
+
+
+if __name__ == '__main__':
+    for arg in (sys.argv[1:] or ['10000', '100000', '400000']):
+        run(int(arg))
@@ -0,0 +1,684 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite for fill and routing primitives.
+
+Every scenario runs on a synthetic RoutingGrid built from DummyTechInfo, so no process
+technology is needed.  For each scenario the suite records wall time, net allocated memory
+blocks/bytes and peak traced memory, and writes the results as JSON.
+
+Run with::
+
+    python benchmarks/run_benchmarks.py -o results.json
+
+and compare against a saved baseline with::
+
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.2
+
+which exits with status 1 if any scenario regresses by more than the given tolerance.
+"""
+
+from typing import Dict, Any, Callable, List, Tuple, Optional
+
+import os
+import re
+import gc
+import sys
+import json
+import time
+import atexit
+import random
+import argparse
+import threading
+import platform
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+
+import yaml
+
+from bag.interface.codec import get_codec, decode_message, get_available_codecs
+from bag.interface import ZMQDealer, ZMQRouter, SkillServer
+from bag.interface.server import object_to_skill_file
+from bag.interface.skill import SkillInterface
+from bag.interface.standin import StandInVirtuoso
+from bag.io.file import open_temp
+from bag.layout.core import DummyTechInfo
+from bag.layout.digital import StdCellBase
+from bag.layout.routing import RoutingGrid, TrackID, WireArray
+from bag.layout.routing.fill import fill_solver_cache, fill_symmetric_max_density_info
+from bag.layout.template import TemplateDB, TemplateBase
+from bag.layout.util import BBox
+from bag.util.interval import IntervalSet
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# a scenario is a function that takes the scale factor, does all setup work, and returns
+# the function to measure.
+Scenario = Callable[[int], Callable[[], Any]]
+
+_scenarios = OrderedDict()  # type: Dict[str, Scenario]
+
+# temporary directory of all scenarios, removed at exit
+_tmp_dir = None  # type: Optional[tempfile.TemporaryDirectory]
+
+
+def scenario(fun):
+    # type: (Scenario) -> Scenario
+    """Register a benchmark scenario."""
+    _scenarios[fun.__name__[len('bench_'):]] = fun
+    return fun
+
+
+def get_tmp_dir():
+    # type: () -> str
+    """Returns a temporary directory for scenario files.  It is removed at exit."""
+    global _tmp_dir
+    if _tmp_dir is None:
+        _tmp_dir = tempfile.TemporaryDirectory(prefix='bag_bench')
+        atexit.register(_tmp_dir.cleanup)
+    return _tmp_dir.name
+
+
+class BenchTechInfo(DummyTechInfo):
+    """A DummyTechInfo with metal layers M1-M4, a single square via, and dummy fill rules."""
+
+    def __init__(self):
+        fill_config = dict(density=0.3, sp_max=600, sp_le_max=800, margin=100, margin_le=100)
+        tech_params = {'layout': {'dummy_fill': {lay_id: fill_config for lay_id in range(1, 5)}}}
+        DummyTechInfo.__init__(self, tech_params)
+
+    def get_layer_id(self, layer_name):
+        return int(layer_name[1:])
+
+    def get_layer_name(self, layer_id):
+        return 'M%d' % layer_id
+
+    def get_layer_type(self, layer_name):
+        return layer_name
+
+    def get_via_name(self, bot_layer_id):
+        return 'V%d' % bot_layer_id
+
+    def get_exclude_layer(self, layer_id):
+        return 'M%d' % layer_id, 'exclude'
+
+    def get_min_space(self, layer_type, width, unit_mode=False, same_color=False):
+        return 30 if unit_mode else 0.03
+
+    def get_min_line_end_space(self, layer_type, width, unit_mode=False):
+        return 50 if unit_mode else 0.05
+
+    def get_min_length(self, layer_type, w_unit):
+        return 120
+
+    def get_via_drc_info(self, vname, vtype, mtype, mw_unit, is_bot):
+        if vtype != 'square':
+            raise ValueError('Unsupported via type: %s' % vtype)
+        return (38, 38), [(42, 42)], [(46, 46)], (32, 32), [(10, 20), (20, 10)], None, None
+
+    def finalize_template(self, template):
+        pass
+
+
+def make_grid():
+    # type: () -> RoutingGrid
+    return RoutingGrid(BenchTechInfo(), [1, 2, 3, 4], [0.1, 0.1, 0.2, 0.2],
+                       [0.1, 0.1, 0.2, 0.2], 'x')
+
+
+class BenchTemplate(TemplateBase):
+    """An empty template that scenarios draw into."""
+
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        pass
+
+
+class BenchHierTemplate(TemplateBase):
+    """A template with two copies of the template one level below, plus some wires."""
+
+    @classmethod
+    def get_params_info(cls):
+        return dict(depth='hierarchy depth.', num_wires='number of wires per level.')
+
+    def draw_layout(self):
+        depth = self.params['depth']
+        num_wires = self.params['num_wires']
+        rng = random.Random(depth)
+        size = 2000 * (depth + 1)
+        if depth > 0:
+            child = self.new_template(params=dict(depth=depth - 1, num_wires=num_wires),
+                                      temp_cls=BenchHierTemplate)
+            self.add_instance(child, loc=(0, 0), unit_mode=True)
+            self.add_instance(child, loc=(size, 0), orient='MY', unit_mode=True)
+        for _ in range(num_wires):
+            lower = rng.randint(0, size)
+            self.add_wires(rng.randint(1, 4), rng.randint(0, size // 200), lower,
+                           lower + rng.randint(200, 2000), unit_mode=True)
+        self.prim_top_layer = 4
+        self.prim_bound_box = BBox(0, 0, 2 * size, 2 * size, self.grid.resolution,
+                                   unit_mode=True)
+
+
+class BenchPinTemplate(TemplateBase):
+    """A template with a few pins on each routing layer."""
+
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        for layer_id in range(1, 5):
+            for idx in range(4):
+                warr = self.add_wires(layer_id, 2 * idx, 0, 1000, unit_mode=True)
+                self.add_pin('P%d' % idx, warr, show=False)
+        self.prim_top_layer = 4
+        self.prim_bound_box = BBox(0, 0, 2000, 2000, self.grid.resolution, unit_mode=True)
+
+
+class BenchStdCell(StdCellBase):
+    """A standard cell with the given number of columns."""
+
+    @classmethod
+    def get_params_info(cls):
+        return dict(config_file='standard cell configuration file name.',
+                    num_col='number of columns.')
+
+    def draw_layout(self):
+        self.set_std_size((self.params['num_col'], 1))
+
+
+class BenchStdCellTop(StdCellBase):
+    """Randomly places standard cells in free slots, then fills the remaining space."""
+
+    @classmethod
+    def get_params_info(cls):
+        return dict(config_file='standard cell configuration file name.',
+                    num_row='number of rows.', num_col='number of columns.',
+                    num_inst='number of instances to place.')
+
+    def draw_layout(self):
+        config_file = self.params['config_file']
+        num_row = self.params['num_row']
+        num_col = self.params['num_col']
+        rng = random.Random(0)
+        masters = [self.new_template(params=dict(config_file=config_file, num_col=ncol),
+                                     temp_cls=BenchStdCell) for ncol in (1, 2, 4, 8)]
+        for _ in range(self.params['num_inst']):
+            master = rng.choice(masters)
+            loc = (rng.randint(0, num_col - master.std_size[0]), rng.randint(0, num_row - 1))
+            try:
+                self.add_std_instance(master, loc=loc)
+            except ValueError:
+                # location already occupied
+                pass
+        self.set_std_size((num_col, num_row))
+        self.fill_space()
+
+
+def _make_template(grid):
+    # type: (RoutingGrid) -> BenchTemplate
+    return BenchTemplate(TemplateDB('', grid, 'bench'), 'bench', {}, set())
+
+
+@scenario
+def bench_fill_solvers(scale):
+    fill_solver_cache.clear()
+
+    def run():
+        for area in range(200, 200 + 400 * scale):
+            fill_symmetric_max_density_info(area, area // 3, 2, 30, 3, sp_max=40)
+
+    return run
+
+
+@scenario
+def bench_interval_set(scale):
+    rng = random.Random(0)
+    span = 400000 * scale
+    ops = [(rng.random() < 0.8, rng.randrange(span), rng.randint(1, 20))
+           for _ in range(20000 * scale)]
+
+    def run():
+        intv_set = IntervalSet()
+        for is_add, start, length in ops:
+            if is_add:
+                intv_set.add((start, start + length), merge=True, abut=True)
+            else:
+                intv_set.subtract((start, start + length))
+        intv_set.get_complement((-1, span + 30))
+
+    return run
+
+
+@scenario
+def bench_grid_queries(scale):
+    grid = make_grid()
+    rng = random.Random(0)
+    queries = [(rng.randint(1, 4), rng.randint(-10000, 100000)) for _ in range(20000 * scale)]
+
+    def run():
+        for layer_id, coord in queries:
+            tr_idx = grid.coord_to_nearest_track(layer_id, coord, half_track=True,
+                                                 unit_mode=True)
+            grid.track_to_coord(layer_id, tr_idx, unit_mode=True)
+            grid.get_wire_bounds(layer_id, tr_idx, width=2, unit_mode=True)
+
+    return run
+
+
+def _add_power_wires(template, num_wires, size):
+    # type: (TemplateBase, int, int) -> None
+    rng = random.Random(0)
+    for _ in range(num_wires):
+        lower = rng.randint(0, size)
+        template.add_wires(rng.randint(1, 4), rng.randint(0, size // 200), lower,
+                           min(size, lower + rng.randint(500, 5000)), unit_mode=True)
+    template.prim_top_layer = 4
+    template.prim_bound_box = BBox(0, 0, size, size, template.grid.resolution, unit_mode=True)
+
+
+@scenario
+def bench_power_fill(scale):
+    template = _make_template(make_grid())
+    _add_power_wires(template, 2000 * scale, 80000 * scale)
+
+    def run():
+        for layer_id in range(1, 5):
+            template.do_max_space_fill2(layer_id)
+
+    return run
+
+
+@scenario
+def bench_power_fill_parallel(scale):
+    template = _make_template(make_grid())
+    _add_power_wires(template, 2000 * scale, 80000 * scale)
+
+    def run():
+        template.do_max_space_fill2_layers(list(range(1, 5)))
+
+    return run
+
+
+@scenario
+def bench_connect_wires(scale):
+    template = _make_template(make_grid())
+    rng = random.Random(0)
+    wire_pairs = []
+    for _ in range(2000 * scale):
+        tid = TrackID(rng.randint(1, 4), rng.randint(0, 500))
+        lower = rng.randint(0, 100000)
+        wire_pairs.append([WireArray(tid, lower, lower + 400, res=0.001, unit_mode=True),
+                           WireArray(tid, lower + 300, lower + 900, res=0.001, unit_mode=True)])
+
+    def run():
+        for wire_list in wire_pairs:
+            template.connect_wires(wire_list)
+
+    return run
+
+
+def _make_track_connections(scale):
+    # type: (int) -> List[Tuple[WireArray, TrackID]]
+    rng = random.Random(0)
+    conn_list = []
+    for _ in range(500 * scale):
+        bot_layer = rng.randint(1, 3)
+        tr_idx = rng.randint(0, 200)
+        top_idx = rng.randint(0, 200)
+        warr = WireArray(TrackID(bot_layer, tr_idx, width=rng.randint(1, 3)), 0, 50000,
+                         res=0.001, unit_mode=True)
+        conn_list.append((warr, TrackID(bot_layer + 1, top_idx, width=rng.randint(1, 3))))
+    return conn_list
+
+
+@scenario
+def bench_connect_to_tracks(scale):
+    template = _make_template(make_grid())
+    conn_list = _make_track_connections(scale)
+
+    def run():
+        for warr, tid in conn_list:
+            template.connect_to_tracks(warr, tid)
+
+    return run
+
+
+@scenario
+def bench_connect_to_tracks_batch(scale):
+    template = _make_template(make_grid())
+    conn_list = _make_track_connections(scale)
+
+    def run():
+        template.connect_to_tracks_batch(conn_list)
+
+    return run
+
+
+@scenario
+def bench_vias_on_intersections(scale):
+    template = _make_template(make_grid())
+    num = 100 * scale
+    bot_warr = WireArray(TrackID(3, 0, width=2, num=num, pitch=4), 0, 1000 * num,
+                         res=0.001, unit_mode=True)
+    top_warr = WireArray(TrackID(4, 0, width=2, num=num, pitch=4), 0, 1000 * num,
+                         res=0.001, unit_mode=True)
+
+    def run():
+        template.draw_vias_on_intersections(bot_warr, top_warr)
+
+    return run
+
+
+@scenario
+def bench_instance_port_pins(scale):
+    temp_db = TemplateDB('', make_grid(), 'bench')
+    master = temp_db.new_template(params={}, temp_cls=BenchPinTemplate)
+    template = _make_template(temp_db.grid)
+    inst = template.add_instance(master, loc=(0, 0), nx=20 * scale, ny=20, spx=2000, spy=2000,
+                                 unit_mode=True)
+
+    def run():
+        for _ in range(5):
+            for idx in range(4):
+                for layer_id in range(1, 5):
+                    inst.get_all_port_pins('P%d' % idx, layer=layer_id)
+
+    return run
+
+
+@scenario
+def bench_stdcell_placement(scale):
+    config_file = os.path.join(get_tmp_dir(), 'stdcell.yaml')
+    config = dict(
+        tech_params=dict(col_pitch=0.2, height=1.2, layers=[1, 2], widths=[0.1, 0.1],
+                         spaces=[0.1, 0.1], directions=['y', 'x']),
+        cells={},
+        spaces=[dict(lib_name='bench', cell_name='space4', num_col=4),
+                dict(lib_name='bench', cell_name='space1', num_col=1)],
+        boundaries=dict(lib_name='bench', lr_width=1, tb_height=1),
+    )
+    with open(config_file, 'w') as f:
+        yaml.dump(config, f)
+    temp_db = TemplateDB('', make_grid(), 'bench')
+    params = dict(config_file=config_file, num_row=20 * scale, num_col=200, num_inst=1000 * scale)
+
+    def run():
+        temp_db.new_template(params=params, temp_cls=BenchStdCellTop)
+
+    return run
+
+
+@scenario
+def bench_deep_hierarchy(scale):
+    grid = make_grid()
+    rng = random.Random(0)
+    depth = 6 + scale
+    size = 2000 * (depth + 1)
+    queries = [(TrackID(rng.randint(1, 4), rng.randint(0, size // 200)), rng.randint(0, size))
+               for _ in range(500 * scale)]
+
+    def run():
+        temp_db = TemplateDB('', grid, 'bench')
+        top = temp_db.new_template(params=dict(depth=depth, num_wires=20),
+                                   temp_cls=BenchHierTemplate)
+        for tid, lower in queries:
+            list(top.open_interval_iter(tid, lower, lower + 5000))
+            top.is_track_available(tid.layer_id, tid.base_index, lower, lower + 1000)
+
+    return run
+
+
+class BenchLayoutDB(TemplateDB):
+    """A TemplateDB that records layout contents instead of creating them."""
+
+    def __init__(self, grid):
+        TemplateDB.__init__(self, '', grid, 'bench')
+        self.content_list = []  # type: List[Any]
+
+    def create_masters_in_db(self, lib_name, content_list, debug=False):
+        self.content_list = content_list
+
+
+def _make_layout_request(scale):
+    # type: (int) -> Dict[str, Any]
+    """Returns a create_layout() skill request with realistic layout contents."""
+    temp_db = BenchLayoutDB(make_grid())
+    top = temp_db.new_template(params=dict(depth=4 + scale, num_wires=200),
+                               temp_cls=BenchHierTemplate)
+    temp_db.instantiate_masters([top])
+    return dict(type='skill', expr='create_layout( "bench" "layout" "tech" {layout_list} )',
+                input_files=dict(layout_list=temp_db.content_list), out_file=None)
+
+
+def _make_codec_scenario(codec_name):
+    # type: (str) -> Scenario
+    """Returns a scenario that encodes and decodes a create_layout() request."""
+
+    def bench_codec(scale):
+        request = _make_layout_request(scale)
+        codec = get_codec(codec_name)
+
+        def run():
+            data = codec.encode(request)
+            decode_message(data)
+            return data
+
+        # measure() reports throughput in terms of the pickled payload size
+        run.num_bytes = len(get_codec('pickle').encode(request))
+        return run
+
+    return bench_codec
+
+
+for _codec_name in get_available_codecs():
+    _scenarios['codec_' + _codec_name.replace('+', '_')] = _make_codec_scenario(_codec_name)
+
+
+def _recursive_object_to_skill_file(py_obj, file_obj):
+    """The recursive SKILL file writer used before the streaming writer, as a baseline."""
+    if isinstance(py_obj, str):
+        file_obj.write(py_obj)
+    elif isinstance(py_obj, float):
+        file_obj.write('#float {:f}'.format(py_obj))
+    elif isinstance(py_obj, bool):
+        file_obj.write('#bool {:d}'.format(1 if py_obj else 0))
+    elif isinstance(py_obj, int):
+        file_obj.write('#int {:d}'.format(py_obj))
+    elif isinstance(py_obj, list) or isinstance(py_obj, tuple):
+        file_obj.write('#list\n')
+        for val in py_obj:
+            _recursive_object_to_skill_file(val, file_obj)
+            file_obj.write('\n')
+        file_obj.write('#end')
+    elif isinstance(py_obj, dict):
+        file_obj.write('#prop_list\n')
+        for key, val in py_obj.items():
+            file_obj.write('{}\n'.format(key))
+            _recursive_object_to_skill_file(val, file_obj)
+            file_obj.write('\n')
+        file_obj.write('#end')
+    else:
+        raise Exception('Unsupported python data type: %s' % type(py_obj))
+
+
+def _make_skill_file_scenario(writer):
+    # type: (Callable[[Any, Any], None]) -> Scenario
+    """Returns a scenario that writes create_layout() input files with the given writer."""
+
+    def bench_skill_file(scale):
+        layout_list = _make_layout_request(scale)['input_files']['layout_list']
+
+        def run():
+            with open_temp(prefix='layout_list') as f:
+                writer(layout_list, f)
+
+        return run
+
+    return bench_skill_file
+
+
+_scenarios['skill_file'] = _make_skill_file_scenario(object_to_skill_file)
+_scenarios['skill_file_recursive'] = _make_skill_file_scenario(_recursive_object_to_skill_file)
+
+
+# stand-in Virtuoso skill expression evaluation time, in seconds
+_standin_latency = 1e-3
+_standin_db = None  # type: SkillInterface
+
+
+def _get_standin_db():
+    # type: () -> SkillInterface
+    """Returns a SkillInterface connected to a stand-in Virtuoso server thread."""
+    global _standin_db
+    if _standin_db is None:
+        tmp_dir = get_tmp_dir()
+        virt = StandInVirtuoso(latency=_standin_latency)
+        router = ZMQRouter(min_port=20000, max_port=30000)
+        server = SkillServer(router, virt, virt, tmpdir=tmp_dir)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        _standin_db = SkillInterface(ZMQDealer(router.get_port()), tmp_dir,
+                                     dict(schematic=dict(exclude_libraries=[])))
+    return _standin_db
+
+
+@scenario
+def bench_standin_sequential(scale):
+    """Query libraries one skill request at a time."""
+    skill_db = _get_standin_db()
+    lib_list = ['lib_%d' % idx for idx in range(50 * scale)]
+
+    def run():
+        return [skill_db.get_cells_in_library(lib_name) for lib_name in lib_list]
+
+    return run
+
+
+@scenario
+def bench_standin_batch(scale):
+    """Query libraries with one batched skill request."""
+    skill_db = _get_standin_db()
+    lib_list = ['lib_%d' % idx for idx in range(50 * scale)]
+
+    def run():
+        return skill_db.get_cells_in_libraries(lib_list)
+
+    return run
+
+
+def measure(setup, scale, repeat):
+    # type: (Scenario, int, int) -> Dict[str, Any]
+    """Measure the given scenario.
+
+    Wall time is measured repeat times without tracing.  Memory is measured on one extra
+    run with tracemalloc enabled.  If the measured function has a num_bytes attribute,
+    the throughput in MB/s is also reported.
+    """
+    times = []  # type: List[float]
+    for _ in range(repeat):
+        run = setup(scale)
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+
+    run = setup(scale)
+    gc.collect()
+    tracemalloc.start()
+    blocks0 = sys.getallocatedblocks()
+    bytes0 = tracemalloc.get_traced_memory()[0]
+    run()
+    blocks1 = sys.getallocatedblocks()
+    bytes1, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ans = dict(
+        wall_s=min(times),
+        wall_s_mean=sum(times) / len(times),
+        repeat=repeat,
+        alloc_blocks=blocks1 - blocks0,
+        alloc_bytes=bytes1 - bytes0,
+        peak_bytes=peak - bytes0,
+    )
+    num_bytes = getattr(run, 'num_bytes', None)
+    if num_bytes is not None:
+        ans['throughput_mb_s'] = num_bytes / ans['wall_s'] / 1e6
+    return ans
+
+
+def compare(results, baseline, tolerance):
+    # type: (Dict[str, Any], Dict[str, Any], float) -> List[str]
+    """Returns a list of regressions of results compared to the baseline."""
+    ans = []
+    base_table = baseline['results']
+    for name, res in results['results'].items():
+        base = base_table.get(name, None)
+        if base is None:
+            continue
+        for key in ('wall_s', 'peak_bytes'):
+            if res[key] > base[key] * (1 + tolerance):
+                ans.append('%s: %s = %.4g > %.4g (baseline)' % (name, key, res[key], base[key]))
+    return ans
+
+
+def run_main():
+    # type: () -> int
+    parser = argparse.ArgumentParser(description='Run BAG layout benchmarks.')
+    parser.add_argument('-o', '--output', default=None, help='JSON output file name.')
+    parser.add_argument('-k', '--select', default=None,
+                        help='only run scenarios matching this regular expression.')
+    parser.add_argument('--scale', type=int, default=1, help='problem size scale factor.')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timing runs.')
+    parser.add_argument('--baseline', default=None, help='baseline JSON file to compare to.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression over baseline.')
+    parser.add_argument('--list', action='store_true', help='list scenarios and exit.')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(_scenarios.keys()))
+        return 0
+
+    results = dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        scale=args.scale,
+        results=OrderedDict(),
+    )  # type: Dict[str, Any]
+    pattern = None if args.select is None else re.compile(args.select)
+    for name, setup in _scenarios.items():
+        if pattern is not None and not pattern.search(name):
+            continue
+        res = measure(setup, args.scale, args.repeat)
+        results['results'][name] = res
+        print('%-24s %10.4f s %12d blocks %14d peak bytes' % (name, res['wall_s'],
+                                                               res['alloc_blocks'],
+                                                               res['peak_bytes']))
+    if resource is not None:
+        results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for msg in regressions:
+            print('REGRESSION: ' + msg)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_main())
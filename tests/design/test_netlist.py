@@ -0,0 +1,179 @@
+import os
+
+import yaml
+import pytest
+
+import bag.design.netlist_info
+from bag.design import Module, ModuleDB, MosModuleBase, SchInstance
+from bag.design.netlist import expand_bus_name
+from bag.design.netlist_info import clear_netlist_info_cache
+
+
+def _inst(lib_name, cell_name, **conns):
+    instpins = {term: dict(direction='', net_name=net, num_bits=len(expand_bus_name(net)))
+                for term, net in conns.items()}
+    return dict(lib_name=lib_name, cell_name=cell_name, instpins=instpins)
+
+
+_mos_conns = dict(B='b', D='d', G='g', S='s')
+_netlist_info = {
+    ('BAG_prim', 'nmos4_standard'): dict(pins=['B', 'D', 'G', 'S'], instances={}),
+    ('BAG_prim', 'pmos4_standard'): dict(pins=['B', 'D', 'G', 'S'], instances={}),
+    ('demo', 'inv'): dict(
+        pins=['in', 'out', 'VDD', 'VSS'],
+        instances=dict(
+            XP=_inst('BAG_prim', 'pmos4_standard', B='VDD', D='out', G='in', S='VDD'),
+            XN=_inst('BAG_prim', 'nmos4_standard', B='VSS', D='out', G='in', S='VSS'),
+        )),
+    ('demo', 'buf'): dict(
+        pins=['in', 'out<1:0>', 'VDD', 'VSS'],
+        instances=dict(
+            XI0=_inst('demo', 'inv', VDD='VDD', VSS='VSS', out='mid', **{'in': 'in'}),
+            XI1=_inst('demo', 'inv', VDD='VDD', VSS='VSS', out='out<0>', **{'in': 'mid'}),
+            XBUS=_inst('demo', 'inv', VDD='VDD', VSS='VSS', out='out<1>', **{'in': 'mid'}),
+            XC=_inst('analogLib', 'cap', PLUS='mid', MINUS='VSS'),
+        )),
+}
+
+
+class InvModule(Module):
+    def __init__(self, database, **kwargs):
+        Module.__init__(self, database, kwargs.pop('yaml_fname'), **kwargs)
+
+    @classmethod
+    def get_params_info(cls):
+        return dict(nf='number of fingers.')
+
+    def design(self, nf=1):
+        self.instances['XP'].design(w=4, l=20e-9, nf=nf, intent='lvt')
+        self.instances['XN'].design(w=2, l=20e-9, nf=nf, intent='standard')
+
+
+class BufModule(InvModule):
+    @classmethod
+    def get_params_info(cls):
+        return dict(nbus='bus width.')
+
+    def design(self, nbus=2):
+        self.instances['XI0'].design(nf=1)
+        self.instances['XI1'].design(nf=2)
+        self.rename_pin('out<1:0>', 'out<%d:0>' % (nbus - 1))
+        # array the last inverter to drive the upper bits of the output bus
+        self.array_instance('XBUS', ['XBUS<%d:1>' % (nbus - 1)],
+                            term_list=[{'out': 'out<%d:1>' % (nbus - 1)}])
+        self.instances['XBUS'][0].design(nf=4)
+        self.instances['XC'].parameters['c'] = '10f'
+
+
+class MosModule(MosModuleBase):
+    def __init__(self, database, **kwargs):
+        MosModuleBase.__init__(self, database, kwargs.pop('yaml_fname'), **kwargs)
+
+
+class DummyTechInfo(object):
+    tech_params = dict(mos=dict(width_resolution=1, length_resolution=1e-9))
+
+
+class NetlistModuleDB(ModuleDB):
+    def __init__(self, root_dir):
+        ModuleDB.__init__(self, '', DummyTechInfo(), ['analogLib'])
+        self._root_dir = root_dir
+
+    def get_generator_class(self, lib_name, cell_name):
+        if lib_name == 'BAG_prim':
+            gen_cls = MosModule
+        else:
+            gen_cls = BufModule if cell_name == 'buf' else InvModule
+        yaml_fname = os.path.join(self._root_dir, lib_name, 'netlist_info', cell_name + '.yaml')
+
+        def gen_fun(database, **kwargs):
+            return gen_cls(database, yaml_fname=yaml_fname, **kwargs)
+
+        gen_fun.get_params_info = gen_cls.get_params_info
+        return gen_fun
+
+
+@pytest.fixture
+def module_db(tmpdir, monkeypatch):
+    def read_yaml(fname):
+        with open(fname, 'r') as f:
+            return yaml.safe_load(f)
+
+    monkeypatch.setattr(bag.design.netlist_info, 'read_yaml', read_yaml)
+    clear_netlist_info_cache()
+    for (lib_name, cell_name), info in _netlist_info.items():
+        fname = tmpdir.join(lib_name, 'netlist_info', cell_name + '.yaml')
+        fname.write(yaml.safe_dump(dict(lib_name=lib_name, cell_name=cell_name, **info)),
+                    ensure=True)
+    yield NetlistModuleDB(str(tmpdir))
+    clear_netlist_info_cache()
+
+
+def test_expand_bus_name():
+    assert expand_bus_name('a') == ['a']
+    assert expand_bus_name('a<2:0>') == ['a<2>', 'a<1>', 'a<0>']
+    assert expand_bus_name('a<0:4:2>,b') == ['a<0>', 'a<2>', 'a<4>', 'b']
+    assert expand_bus_name('<*2>a<1:0>') == ['a<1>', 'a<0>', 'a<1>', 'a<0>']
+    assert expand_bus_name('a<3>') == ['a<3>']
+
+
+# netlist information files are dumped with sorted keys, so instances are in sorted order
+_expected_cdl = """* Generated by BAG
+
+.SUBCKT inv_2 in out VDD VSS
+MXN out in VSS VSS nmos4_standard w=2 l=20n nf=4
+MXP out in VDD VDD pmos4_lvt w=4 l=20n nf=4
+.ENDS
+
+.SUBCKT inv in out VDD VSS
+MXN out in VSS VSS nmos4_standard w=2 l=20n nf=1
+MXP out in VDD VDD pmos4_lvt w=4 l=20n nf=1
+.ENDS
+
+.SUBCKT inv_1 in out VDD VSS
+MXN out in VSS VSS nmos4_standard w=2 l=20n nf=2
+MXP out in VDD VDD pmos4_lvt w=4 l=20n nf=2
+.ENDS
+
+.SUBCKT TOP in out<2> out<1> out<0> VDD VSS
+XBUS<2> mid out<2> VDD VSS / inv_2
+XBUS<1> mid out<1> VDD VSS / inv_2
+XC VSS mid / cap c=10f
+XI0 in mid VDD VSS / inv
+XI1 mid out<0> VDD VSS / inv_1
+.ENDS
+"""
+
+
+def test_netlist_cdl(module_db, tmpdir):
+    dsn = SchInstance(module_db, 'demo', 'buf', 'XTOP')
+    dsn.design(nbus=3)
+    fname = str(tmpdir.join('netlist.cdl'))
+    dsn.write_netlist(fname, top_cell_name='TOP')
+    with open(fname, 'r') as f:
+        content = f.read()
+    assert content == _expected_cdl
+
+
+def test_netlist_spectre(module_db, tmpdir):
+    dsn = SchInstance(module_db, 'demo', 'buf', 'XTOP')
+    dsn.design(nbus=3)
+    fname = str(tmpdir.join('netlist.scs'))
+    dsn.write_netlist(fname, prefix='P_', fmt='spectre',
+                      prim_table=dict(cap=dict(terms=['MINUS', 'PLUS'], model='capacitor')))
+    with open(fname, 'r') as f:
+        lines = f.read().splitlines()
+    assert 'subckt P_buf ( in out\\<2\\> out\\<1\\> out\\<0\\> VDD VSS )' in lines
+    assert 'XBUS\\<2\\> ( mid out\\<2\\> VDD VSS ) P_inv_2' in lines
+    assert 'XC ( VSS mid ) capacitor c=10f' in lines
+    assert lines[-1] == 'ends P_buf'
+    assert sum(1 for line in lines if line.startswith('subckt')) == 4
+
+
+def test_netlist_bus_mismatch(module_db, tmpdir):
+    dsn = SchInstance(module_db, 'demo', 'buf', 'XTOP')
+    dsn.design(nbus=2)
+    # 3 bit net cannot connect to the output terminals of 2 instances
+    dsn.master.array_instance('XI0', ['XI0<1:0>'], term_list=[{'out': 'x<2:0>'}])
+    with pytest.raises(ValueError):
+        dsn.write_netlist(str(tmpdir.join('netlist.cdl')))
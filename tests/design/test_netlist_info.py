@@ -0,0 +1,149 @@
+import os
+
+import yaml
+import pytest
+
+import bag.design.netlist_info
+from bag.design import Module, ModuleDB
+from bag.design.netlist_info import (NetlistInfo, get_netlist_info, get_sidecar_fname,
+                                     clear_netlist_info_cache)
+
+_netlist_info = dict(
+    lib_name='demo',
+    cell_name='inv',
+    pins=['in', 'out', 'VDD', 'VSS'],
+    instances=dict(
+        XP=dict(lib_name='BAG_prim', cell_name='pmos4_standard'),
+        XN=dict(lib_name='BAG_prim', cell_name='nmos4_standard'),
+        XBUF=dict(lib_name='demo', cell_name='buf'),
+    ),
+)
+
+
+@pytest.fixture
+def num_reads(monkeypatch):
+    ans = [0]
+
+    def read_yaml(fname):
+        ans[0] += 1
+        with open(fname, 'r') as f:
+            return yaml.safe_load(f)
+
+    monkeypatch.setattr(bag.design.netlist_info, 'read_yaml', read_yaml)
+    clear_netlist_info_cache()
+    yield ans
+    clear_netlist_info_cache()
+
+
+@pytest.fixture
+def yaml_fname(tmpdir):
+    fname = str(tmpdir.join('netlist_info', 'inv.yaml'))
+    os.makedirs(os.path.dirname(fname))
+    with open(fname, 'w') as f:
+        yaml.safe_dump(_netlist_info, f)
+    return fname
+
+
+def _touch(fname, content):
+    stat = os.stat(fname)
+    with open(fname, 'w') as f:
+        yaml.safe_dump(content, f)
+    os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_netlist_info_cache(num_reads, yaml_fname):
+    info = get_netlist_info(yaml_fname)
+    assert num_reads[0] == 1
+    assert info.content == _netlist_info
+    assert (info.lib_name, info.cell_name) == ('demo', 'inv')
+    assert sorted(info.instances) == [('XBUF', 'demo', 'buf'),
+                                      ('XN', 'BAG_prim', 'nmos4_standard'),
+                                      ('XP', 'BAG_prim', 'pmos4_standard')]
+    assert info.pins == _netlist_info['pins']
+    assert get_netlist_info(yaml_fname) is info
+    assert num_reads[0] == 1
+
+    # sidecar is used by a new process
+    assert os.path.isfile(get_sidecar_fname(yaml_fname))
+    clear_netlist_info_cache()
+    assert get_netlist_info(yaml_fname).content == _netlist_info
+    assert num_reads[0] == 1
+
+    # file is parsed again if it changes
+    new_info = dict(_netlist_info, pins=['in', 'out'])
+    _touch(yaml_fname, new_info)
+    assert get_netlist_info(yaml_fname).pins == ['in', 'out']
+    assert num_reads[0] == 2
+    assert NetlistInfo.load(get_sidecar_fname(yaml_fname)).pins == ['in', 'out']
+
+    # sidecar is not used or written if disabled
+    clear_netlist_info_cache()
+    os.remove(get_sidecar_fname(yaml_fname))
+    get_netlist_info(yaml_fname, use_sidecar=False)
+    assert num_reads[0] == 3
+    assert not os.path.exists(get_sidecar_fname(yaml_fname))
+
+
+@pytest.mark.parametrize('corrupt', ['truncated', 'missing_class'])
+def test_netlist_info_bad_sidecar(num_reads, yaml_fname, corrupt):
+    get_netlist_info(yaml_fname)
+    sidecar = get_sidecar_fname(yaml_fname)
+    with open(sidecar, 'rb') as f:
+        data = f.read()
+    with open(sidecar, 'wb') as f:
+        if corrupt == 'truncated':
+            f.write(data[:len(data) // 2])
+        else:
+            # a pickled object of a class in a module that no longer exists
+            f.write(b'cno_such_module\nNetlistInfo\n.')
+
+    clear_netlist_info_cache()
+    assert NetlistInfo.load(sidecar) is None
+    assert get_netlist_info(yaml_fname).content == _netlist_info
+    assert num_reads[0] == 2
+
+
+class InvModule(Module):
+    def __init__(self, database, yaml_fname, **kwargs):
+        Module.__init__(self, database, yaml_fname, **kwargs)
+
+    @classmethod
+    def get_params_info(cls):
+        return dict(nf='number of fingers.')
+
+    def design(self, nf=1):
+        self.delete_instance('XBUF')
+
+
+def test_module_no_file_io(num_reads, yaml_fname):
+    db = ModuleDB('', None, ['BAG_prim'])
+    for nf in range(5):
+        master = db.new_master(gen_cls=InvModule, params=dict(nf=nf), yaml_fname=yaml_fname,
+                               design_fun='design', design_args=None)
+        assert master.lib_name == db.lib_name
+        assert master.instances['XBUF'] == []
+        assert master.instances['XP'].is_primitive
+        assert master.pin_map == {pin: pin for pin in _netlist_info['pins']}
+    assert num_reads[0] == 1
+    # the shared netlist information is not modified
+    assert get_netlist_info(yaml_fname).content == _netlist_info
+
+
+class FakeProject(object):
+    """Records instantiate_schematic() calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def instantiate_schematic(self, lib_name, content_list, lib_path='', force=False):
+        self.calls.append((lib_name, [content[2] for content in content_list], force))
+
+
+def test_module_implement_force(num_reads, yaml_fname):
+    prj = FakeProject()
+    db = ModuleDB('', None, ['BAG_prim'], prj=prj)
+    master = db.new_master(gen_cls=InvModule, params=dict(nf=2), yaml_fname=yaml_fname,
+                           design_fun='design', design_args=None)
+    db.instantiate_masters([master], ['inv'], lib_name='lib')
+    db.instantiate_masters([master], ['inv'], lib_name='lib', force=True)
+    assert prj.calls == [('lib', ['inv'], False), ('lib', ['inv'], True)]
@@ -0,0 +1,54 @@
+import pytest
+import numpy as np
+
+from bag.interface import ZMQDealer, ZMQRouter
+from bag.interface.codec import get_codec, decode_message, get_available_codecs
+
+_layout_list = [['cell',
+                 [dict(lib='lib', cell='sub', loc=[0.5, 1.0], orient='R0', num_rows=1)],
+                 [dict(layer=['M1', 'drawing'], bbox=[[0.0, 0.1], [1.5, 0.2]])]]]
+_payload = dict(type='skill', expr='create_layout( "lib" "layout" "tech" {layout_list} )',
+                input_files=dict(layout_list=_layout_list), out_file=None)
+
+
+@pytest.mark.parametrize('name', get_available_codecs())
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    data = codec.encode(_payload)
+    obj, dec_codec = decode_message(data)
+    assert obj == _payload
+    assert dec_codec is codec
+
+
+def test_codec_names():
+    # legacy messages have no header
+    assert get_codec(None) is get_codec('yaml+zlib')
+    assert get_codec(None).encode(_payload)[:1] == b'x'
+    assert get_codec('pickle').name == 'pickle'
+    for name in ('json', 'pickle+bz2', 'pickle+zlib+zlib'):
+        with pytest.raises(ValueError):
+            get_codec(name)
+
+
+def test_zmq_codec_negotiation():
+    router = ZMQRouter(min_port=20000, max_port=30000)
+    dealers = [ZMQDealer(router.get_port()), ZMQDealer(router.get_port(), codec='pickle+zlib')]
+    try:
+        for dealer in dealers:
+            dealer.send_obj(dict(val=np.arange(3).tolist(), codec=dealer.codec_name))
+        for _ in dealers:
+            assert router.poll_for_read(5000)
+            obj = router.recv_obj()
+            assert obj['val'] == [0, 1, 2]
+            router.send_obj(dict(reply=obj['codec']))
+
+        for dealer in dealers:
+            # replies are encoded with the codec of the request
+            data = dealer.socket.recv()
+            obj, codec = decode_message(data)
+            assert obj == dict(reply=dealer.codec_name)
+            assert codec.name == dealer.codec_name
+    finally:
+        for dealer in dealers:
+            dealer.close()
+        router.close()
@@ -0,0 +1,85 @@
+import pytest
+
+from bag.interface.skill import SkillInterface
+from bag.interface.database import get_schematic_fingerprint
+
+
+class FakeDealer(object):
+    """A ZMQDealer stand-in that records SKILL requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def send_obj(self, obj):
+        self.requests.append(obj)
+
+    def recv_obj(self):
+        return dict(type='value', data='t')
+
+
+@pytest.fixture
+def skill_db(tmpdir):
+    db_config = dict(schematic=dict(exclude_libraries=[], tech_lib='tech', sympin=[],
+                                    ipin=[], opin=[], iopin=[], simulators=[]))
+    return SkillInterface(FakeDealer(), str(tmpdir), db_config)
+
+
+def _make_content(cell_name, nf=1):
+    inst_map = dict(XN=[dict(name='XN', lib_name='BAG_prim', cell_name='nmos4_standard',
+                             params=dict(nf=nf, l=20e-9), term_mapping={})])
+    return 'demo', 'inv', cell_name, dict(VDD='VDD', VSS='VSS'), inst_map, []
+
+
+def _get_impl_cells(dealer):
+    ans = []
+    for request in dealer.requests:
+        ans.append([cell for _, _, cell in request['input_files']['template_list']])
+    dealer.requests = []
+    return ans
+
+
+def test_fingerprint_canonical():
+    content = _make_content('inv')
+    content2 = list(content)
+    content2[3] = dict(VSS='VSS', VDD='VDD')
+    assert get_schematic_fingerprint(content) == get_schematic_fingerprint(tuple(content2))
+    assert get_schematic_fingerprint(content) != get_schematic_fingerprint(_make_content('inv', 2))
+
+
+def test_instantiate_schematic_incremental(skill_db):
+    dealer = skill_db.handler
+    content_list = [_make_content('inv'), None, _make_content('inv_1', nf=2)]
+    skill_db.instantiate_schematic('lib', content_list)
+    assert _get_impl_cells(dealer) == [['inv', 'inv_1']]
+
+    # nothing changed
+    skill_db.instantiate_schematic('lib', content_list)
+    assert _get_impl_cells(dealer) == []
+
+    # only changed cells are sent
+    skill_db.instantiate_schematic('lib', [_make_content('inv'), _make_content('inv_1', nf=4)])
+    assert _get_impl_cells(dealer) == [['inv_1']]
+
+    # fingerprints are per library
+    skill_db.instantiate_schematic('lib2', [_make_content('inv')])
+    assert _get_impl_cells(dealer) == [['inv']]
+
+    skill_db.instantiate_schematic('lib', [_make_content('inv')], force=True)
+    assert _get_impl_cells(dealer) == [['inv']]
+    skill_db.clear_schematic_fingerprints('lib')
+    skill_db.instantiate_schematic('lib', content_list)
+    assert _get_impl_cells(dealer) == [['inv', 'inv_1']]
+
+
+def test_instantiate_schematic_error(skill_db):
+    dealer = skill_db.handler
+    skill_db.instantiate_schematic('lib', [_make_content('inv')])
+    dealer.recv_obj = lambda: dict(type='error', data='failed')
+    with pytest.raises(Exception):
+        skill_db.instantiate_schematic('lib', [_make_content('inv', nf=2)])
+    del dealer.recv_obj
+    _get_impl_cells(dealer)
+
+    # failed implementations are not recorded
+    skill_db.instantiate_schematic('lib', [_make_content('inv', nf=2)])
+    assert _get_impl_cells(dealer) == [['inv']]
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from bag.core import BagProject
+from bag.interface.database import DbAccess
+from bag.interface.pool import DbAccessPool
+
+
+class FakeDb(object):
+    """Records database operations and the threads they ran in."""
+
+    def __init__(self, log, delay=0.1):
+        self.log = log
+        self.delay = delay
+        self.closed = False
+
+    def instantiate_layout(self, lib_name, cell_name):
+        time.sleep(self.delay)
+        if cell_name == 'bad':
+            raise ValueError('bad layout')
+        self.log.append((self, lib_name, cell_name, threading.current_thread()))
+
+    def get_cells_in_library(self, lib_name):
+        return [cell for db, lib, cell, _ in self.log if db is self and lib == lib_name]
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_sharding():
+    log = []
+    db_list = [FakeDb(log) for _ in range(3)]
+    pool = DbAccessPool(db_list)
+    # new libraries go to the server with the fewest libraries
+    assert [pool.get_server_index(lib) for lib in 'abcdea'] == [0, 1, 2, 0, 1, 0]
+    assert pool.get_db('b') is db_list[1]
+
+    pool.call('a', 'instantiate_layout', 'a', 'cell0')
+    assert pool.call('a', 'get_cells_in_library', 'a') == ['cell0']
+    pool.close()
+    assert all(db.closed for db in db_list)
+
+
+def test_pool_parallel():
+    log = []
+    pool = DbAccessPool([FakeDb(log) for _ in range(3)])
+    start = time.time()
+    with pool.parallel():
+        for cell_name in ('x', 'y'):
+            for lib_name in ('a', 'b', 'c'):
+                assert pool.call(lib_name, 'instantiate_layout', lib_name, cell_name) is None
+        # reads wait for earlier operations on the same library
+        assert pool.call('a', 'get_cells_in_library', 'a') == ['x', 'y']
+    # libraries on different servers run in parallel
+    assert time.time() - start < 0.5
+    assert len(log) == 6
+    for lib_name in ('a', 'b', 'c'):
+        entries = [entry for entry in log if entry[1] == lib_name]
+        assert [entry[2] for entry in entries] == ['x', 'y']
+        assert entries[0][3] is entries[1][3]
+    assert len(set(entry[3] for entry in log)) == 3
+
+
+def test_pool_errors():
+    log = []
+    pool = DbAccessPool([FakeDb(log, delay=0), FakeDb(log, delay=0)])
+    with pytest.raises(ValueError):
+        with pool.parallel():
+            pool.call('a', 'instantiate_layout', 'a', 'bad')
+            pool.call('b', 'instantiate_layout', 'b', 'good')
+    # other operations still finish
+    assert [entry[2] for entry in log] == ['good']
+    with pytest.raises(ValueError):
+        pool.call('a', 'instantiate_layout', 'a', 'bad')
+    with pytest.raises(ValueError):
+        DbAccessPool([])
+
+
+def test_pool_lib_db():
+    log = []
+    db_list = [FakeDb(log, delay=0), FakeDb(log, delay=0)]
+    pool = DbAccessPool(db_list)
+    pool.get_server_index('a')
+    lib_db = pool.get_lib_db('b')
+    assert lib_db.lib_name == 'b'
+    # attributes come from the server of the library
+    assert lib_db.delay == 0 and not lib_db.closed
+    # methods run on the worker thread of the server of the library
+    lib_db.instantiate_layout('b', 'cell0')
+    pool.call('b', 'instantiate_layout', 'b', 'cell1')
+    assert [entry[0] for entry in log] == [db_list[1], db_list[1]]
+    assert log[0][3] is log[1][3]
+    assert log[0][3] is not threading.current_thread()
+    assert lib_db.get_cells_in_library('b') == ['cell0', 'cell1']
+    pool.close()
+
+
+class FakeRcxDb(FakeDb):
+    """Records the threads extracted schematics are created in."""
+
+    _process_rcx_output = DbAccess._process_rcx_output
+
+    async def async_run_rcx(self, lib_name, cell_name, create_schematic=True, **kwargs):
+        return self._process_rcx_output('%s.sp' % cell_name, 'rcx.log', lib_name, cell_name,
+                                        create_schematic)
+
+    def create_schematic_from_netlist(self, netlist, lib_name, cell_name, **kwargs):
+        self.instantiate_layout(lib_name, netlist)
+
+
+def test_pool_rcx():
+    log = []
+    db_list = [FakeRcxDb(log, delay=0), FakeRcxDb(log, delay=0)]
+    prj = BagProject.__new__(BagProject)
+    prj.impl_db_pool = DbAccessPool(db_list)
+    prj.impl_db = db_list[0]
+    prj.impl_db_pool.get_server_index('a')
+
+    # extracted schematics are created by the worker thread of the library's server
+    loop = asyncio.new_event_loop()
+    try:
+        result = loop.run_until_complete(prj.async_run_rcx('b', 'inv'))
+        assert result == (True, 'rcx.log')
+        result = loop.run_until_complete(prj.async_run_rcx('b', 'buf', create_schematic=False))
+        assert result == ('buf.sp', 'rcx.log')
+    finally:
+        loop.close()
+    prj.impl_db_pool.call('b', 'instantiate_layout', 'b', 'cell0')
+    assert [entry[:3] for entry in log] == [(db_list[1], 'b', 'inv.sp'),
+                                            (db_list[1], 'b', 'cell0')]
+    assert log[0][3] is log[1][3]
+    prj.impl_db_pool.close()
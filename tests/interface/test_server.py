@@ -0,0 +1,115 @@
+import io
+import os
+import random
+
+import pytest
+
+from bag.interface.server import object_to_skill_file, to_skill_str, SkillServer
+
+
+def _ref_helper(py_obj, file_obj):
+    """The original recursive writer."""
+    if isinstance(py_obj, bytes):
+        py_obj = py_obj.decode('utf-8')
+    if isinstance(py_obj, str):
+        file_obj.write(py_obj)
+    elif isinstance(py_obj, float):
+        file_obj.write('#float {:f}'.format(py_obj))
+    elif isinstance(py_obj, bool):
+        file_obj.write('#bool {:d}'.format(1 if py_obj else 0))
+    elif isinstance(py_obj, int):
+        file_obj.write('#int {:d}'.format(py_obj))
+    elif isinstance(py_obj, list) or isinstance(py_obj, tuple):
+        file_obj.write('#list\n')
+        for val in py_obj:
+            _ref_helper(val, file_obj)
+            file_obj.write('\n')
+        file_obj.write('#end')
+    elif isinstance(py_obj, dict):
+        file_obj.write('#prop_list\n')
+        for key, val in py_obj.items():
+            file_obj.write('{}\n'.format(key))
+            _ref_helper(val, file_obj)
+            file_obj.write('\n')
+        file_obj.write('#end')
+    else:
+        raise Exception('Unsupported python data type: %s' % type(py_obj))
+
+
+def _random_obj(rng, depth):
+    choice = rng.randint(0, 9 if depth > 0 else 5)
+    if choice == 0:
+        return rng.choice(['', 'abc', b'raw', 'M1'])
+    if choice == 1:
+        return rng.uniform(-1e3, 1e3)
+    if choice == 2:
+        return rng.choice([True, False])
+    if choice == 3:
+        return rng.randint(-100, 100)
+    if choice == 4:
+        return [rng.uniform(0, 1) for _ in range(rng.randint(0, 5))]
+    if choice == 5:
+        return tuple(rng.randint(0, 9) for _ in range(rng.randint(1, 5)))
+    if choice in (6, 7):
+        return [_random_obj(rng, depth - 1) for _ in range(rng.randint(0, 4))]
+    return {'k%d' % idx: _random_obj(rng, depth - 1) for idx in range(rng.randint(0, 4))}
+
+
+def _to_str(writer, obj):
+    f = io.StringIO()
+    writer(obj, f)
+    return f.getvalue()
+
+
+def _ref_writer(obj, f):
+    _ref_helper(obj, f)
+    f.write('\n')
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_object_to_skill_file(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        obj = _random_obj(rng, 4)
+        assert _to_str(object_to_skill_file, obj) == _to_str(_ref_writer, obj)
+
+    # mixed numeric types are not written as homogeneous lists
+    obj = [1, 2.0, True, [1.5, 2], (3, 4)]
+    assert _to_str(object_to_skill_file, obj) == _to_str(_ref_writer, obj)
+    with pytest.raises(Exception):
+        _to_str(object_to_skill_file, [1, {'a': set()}])
+
+
+def test_object_to_skill_file_deep():
+    obj = 'leaf'
+    for _ in range(5000):
+        obj = [obj]
+    content = _to_str(object_to_skill_file, obj)
+    assert content == '#list\n' * 5000 + 'leaf\n' + '#end\n' * 5000
+
+
+class _FakeRouter(object):
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize('reuse_files', [True, False])
+def test_skill_server_files(tmpdir, reuse_files):
+    server = SkillServer(_FakeRouter(), None, None, tmpdir=str(tmpdir), inline_threshold=20,
+                         reuse_files=reuse_files)
+    req = dict(expr='f( {small} {big} {out} )', input_files=dict(small=['a"b'], big=['c'] * 20),
+               out_file='out')
+    expr_list = []
+    for _ in range(3):
+        expr, out_file, reply = server._get_skill_expr(req)
+        assert reply is None
+        assert os.path.isfile(out_file)
+        expr_list.append(expr)
+
+    small_arg = to_skill_str('#inline\n#list\na"b\n#end\n')
+    assert expr_list[0].startswith('f( %s "' % small_arg)
+    assert len(os.listdir(server.dtmp)) == (2 if reuse_files else 6)
+    assert (expr_list[0] == expr_list[2]) == reuse_files
+
+    server.close()
+    assert os.path.isdir(server.dtmp) != reuse_files
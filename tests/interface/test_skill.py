@@ -0,0 +1,151 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from bag.interface import ZMQDealer, ZMQRouter, SkillServer
+from bag.interface.skill import SkillInterface, AsyncSkillInterface, VirtuosoException
+
+
+class FakeVirtuoso(object):
+    """Stands in for the Virtuoso input and output streams of SkillServer.
+
+    Evaluates expressions of the form 'echo <value>', 'fail <message>',
+    'sleep <seconds>', and 'write <file> <value>'.
+    """
+
+    def __init__(self):
+        self.expr_list = []
+        self._result = ''
+
+    def write(self, expr):
+        self.expr_list.append(expr)
+        cmd, arg = expr.split(' ', 1)
+        if cmd == 'echo':
+            self._result = arg
+        elif cmd == 'fail':
+            self._result = '*Error* %s' % arg
+        elif cmd == 'sleep':
+            time.sleep(float(arg))
+            self._result = 't'
+        else:
+            fname, value = arg.split(' ', 1)
+            with open(fname.strip('"'), 'w') as f:
+                f.write(value)
+            self._result = 't'
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        return '%d\n' % (len(self._result) + 1)
+
+    def read(self, num_bytes):
+        return (self._result + '\n')[:num_bytes]
+
+
+class CountingServer(SkillServer):
+    def __init__(self, router, virt, tmpdir):
+        SkillServer.__init__(self, router, virt, virt, tmpdir=tmpdir)
+        self.num_requests = 0
+
+    def run(self):
+        recv_obj = self.handler.recv_obj
+
+        def counting_recv():
+            self.num_requests += 1
+            return recv_obj()
+
+        self.handler.recv_obj = counting_recv
+        SkillServer.run(self)
+
+
+@pytest.fixture(params=[SkillInterface, AsyncSkillInterface])
+def skill_setup(tmpdir, request):
+    virt = FakeVirtuoso()
+    router = ZMQRouter(min_port=20000, max_port=30000)
+    server = CountingServer(router, virt, str(tmpdir))
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    db_config = dict(schematic=dict(exclude_libraries=[]))
+    skill_db = request.param(ZMQDealer(router.get_port()), str(tmpdir), db_config)
+    yield skill_db, server, virt
+    skill_db.close()
+    thread.join()
+
+
+def test_skill_batch(skill_setup):
+    skill_db, server, virt = skill_setup
+    req_list = ['echo a', 'fail oops', dict(expr='write {out} b', out_file='out'), 'echo c']
+    results = skill_db.eval_skill_batch(req_list, return_exceptions=True)
+    assert server.num_requests == 1
+    assert results[0] == 'a'
+    assert isinstance(results[1], VirtuosoException)
+    assert results[2:] == ['b', 'c']
+
+    with pytest.raises(VirtuosoException):
+        skill_db.eval_skill_batch(req_list)
+    num_expr = len(virt.expr_list)
+    results = skill_db.eval_skill_batch(req_list, stop_on_error=True, return_exceptions=True)
+    assert len(virt.expr_list) == num_expr + 2
+    assert all(isinstance(val, VirtuosoException) for val in results[1:])
+
+
+def test_skill_batch_pipelined(skill_setup):
+    skill_db, server, virt = skill_setup
+    batch_ids = [skill_db.send_skill_batch(['echo %d' % (2 * idx), 'echo %d' % (2 * idx + 1)])
+                 for idx in range(5)]
+    # plain requests still work with batches in flight
+    assert skill_db._eval_skill('echo single') == 'single'
+    for idx in reversed(range(5)):
+        assert skill_db.recv_skill_batch(batch_ids[idx]) == [str(2 * idx), str(2 * idx + 1)]
+    assert server.num_requests == 6
+    with pytest.raises(ValueError):
+        skill_db.recv_skill_batch(batch_ids[0])
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize('skill_setup', [AsyncSkillInterface], indirect=True)
+def test_async_skill(skill_setup):
+    skill_db, server, virt = skill_setup
+
+    async def ticker(ticks):
+        while True:
+            await asyncio.sleep(0.01)
+            ticks.append(None)
+
+    def db_fun(name):
+        # synchronous code that accesses the database runs in the worker thread
+        return skill_db._eval_skill('echo %s' % name), skill_db.eval_skill_batch(['sleep 0.2'])
+
+    async def main():
+        ticks = []
+        tick_task = asyncio.ensure_future(ticker(ticks))
+        results = await asyncio.gather(
+            skill_db.async_eval_skill('echo a'),
+            skill_db.async_eval_skill_batch(['echo b', 'fail c'], return_exceptions=True),
+            skill_db.async_call(db_fun, 'd'),
+            skill_db.async_eval_skill('sleep 0.2'),
+        )
+        tick_task.cancel()
+        return results, len(ticks)
+
+    results, num_ticks = _run(main())
+    assert results[0] == 'a'
+    assert results[1][0] == 'b' and isinstance(results[1][1], VirtuosoException)
+    assert results[2] == ('d', ['t'])
+    # the event loop is not blocked while Virtuoso is busy
+    assert num_ticks >= 10
+
+    with pytest.raises(VirtuosoException):
+        _run(skill_db.async_eval_skill('fail e'))
+    # synchronous calls still work
+    assert skill_db._eval_skill('echo f') == 'f'
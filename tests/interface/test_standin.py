@@ -0,0 +1,63 @@
+import time
+import threading
+
+import pytest
+
+from bag.io import open_temp
+from bag.interface import ZMQDealer, ZMQRouter, SkillServer
+from bag.interface.server import object_to_skill_file
+from bag.interface.skill import SkillInterface, VirtuosoException
+from bag.interface.standin import StandInVirtuoso, skill_file_to_object
+
+
+@pytest.fixture(params=[0, 1000])
+def standin_setup(tmpdir, request):
+    virt = StandInVirtuoso(latency_table=dict(create_layout=0.05))
+    router = ZMQRouter(min_port=20000, max_port=30000)
+    server = SkillServer(router, virt, virt, tmpdir=str(tmpdir), inline_threshold=request.param)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    db_config = dict(schematic=dict(exclude_libraries=[], tech_lib='tech', sympin=[], ipin=[],
+                                    opin=[], iopin=[], simulators=[]))
+    skill_db = SkillInterface(ZMQDealer(router.get_port()), str(tmpdir), db_config)
+    yield skill_db, virt
+    skill_db.close()
+    thread.join()
+
+
+def test_skill_file_round_trip(tmpdir):
+    obj = ['a', 1, 2.5, True, [1, 2, 3], [], {'x': [0.5, 1.5], 'y': {'z': 'w'}}]
+    with open_temp(prefix='obj', delete=False, dir=str(tmpdir)) as f:
+        object_to_skill_file(obj, f)
+        fname = f.name
+    assert skill_file_to_object(fname) == obj
+
+
+def test_standin_layout(standin_setup):
+    skill_db, virt = standin_setup
+    layout_list = [['cell_a', [], [], [], [], [], [], []],
+                   ['cell_b', [dict(lib='lib', cell='cell_a', params={'w': 1})], [], [], [], [],
+                    [], []]]
+    t0 = time.perf_counter()
+    skill_db.instantiate_layout('test_lib', 'layout', 'tech', layout_list)
+    assert time.perf_counter() - t0 >= 0.05
+    skill_db.create_implementation('test_lib', [['lib', 'temp', 'cell_c']], [{}])
+    assert skill_db.get_cells_in_library('test_lib') == ['cell_a', 'cell_b', 'cell_c']
+    assert skill_db.get_cells_in_library('other_lib') == []
+    assert [fun_name for fun_name, _ in virt.calls] == [
+        'create_or_erase_library', 'create_layout', 'create_concrete_schematic',
+        'get_cells_in_library_file', 'get_cells_in_library_file']
+
+
+def test_standin_error(standin_setup):
+    skill_db, virt = standin_setup
+    with pytest.raises(VirtuosoException):
+        # template list file is missing
+        skill_db._eval_skill('create_concrete_schematic( "lib" "tech" "" nil nil )')
+
+
+def test_standin_testbench_info(standin_setup):
+    skill_db, virt = standin_setup
+    assert skill_db.get_testbench_info('tb_lib', 'tb_cell') == ([], [], {}, {})
+    fun_name, args = virt.calls[-1]
+    assert (fun_name, args[:2]) == ('get_testbench_info', ['tb_lib', 'tb_cell'])
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import pytest
+
+from bag.layout.util import BBox
+from bag.layout.routing.density import DensityMap
+
+
+def _make_box(xl, yb, xr, yt):
+    return BBox(xl, yb, xr, yt, 0.001, unit_mode=True)
+
+
+@pytest.mark.parametrize('seed, pixel', [(0, 1), (1, 4), (2, 7)])
+def test_window_density(seed, pixel):
+    rng = random.Random(seed)
+    x0, y0 = -50, 20
+    bound_box = _make_box(x0, y0, 353, 271)
+    rects = []
+    for _ in range(50):
+        x = rng.randint(-100, 350)
+        y = rng.randint(0, 270)
+        rects.append(_make_box(x, y, x + rng.randint(0, 60), y + rng.randint(0, 60)))
+    density_map = DensityMap.from_boxes(bound_box, pixel, rects)
+
+    # pixel is occupied if its center is inside a rectangle
+    ny, nx = density_map.shape
+    occ = np.zeros((ny, nx), dtype=bool)
+    for row in range(ny):
+        cy = y0 + row * pixel + pixel / 2
+        for col in range(nx):
+            cx = x0 + col * pixel + pixel / 2
+            occ[row, col] = any(r.left_unit <= cx < r.right_unit and
+                                r.bottom_unit <= cy < r.top_unit for r in rects)
+    np.testing.assert_array_equal(density_map.get_occupancy(), occ)
+
+    win, step, targ = (70, 42), 21, 0.4
+    density = density_map.window_density(win, step)
+    fill_area = density_map.fill_target(win, targ, step)
+    bounds = density_map.get_window_boxes(win, step)
+    assert density.shape == fill_area.shape == bounds.shape[:2]
+    # windows cover the whole map
+    assert bounds[0, 0, 0] == x0 and bounds[0, 0, 1] == y0
+    assert bounds[-1, -1, 2] == x0 + nx * pixel and bounds[-1, -1, 3] == y0 + ny * pixel
+    for row in range(density.shape[0]):
+        for col in range(density.shape[1]):
+            xl, yb, xr, yt = bounds[row, col]
+            sub = occ[(yb - y0) // pixel:(yt - y0) // pixel, (xl - x0) // pixel:(xr - x0) // pixel]
+            assert density[row, col] == pytest.approx(sub.mean())
+            assert density_map.get_density(_make_box(xl, yb, xr, yt)) == \
+                pytest.approx(sub.mean())
+            num_need = max(0, int(np.ceil(targ * sub.size)) - int(sub.sum()))
+            assert fill_area[row, col] == num_need * pixel * pixel
+
+
+def test_tile_density():
+    bound_box = _make_box(0, 0, 100, 60)
+    density_map = DensityMap.from_boxes(bound_box, 1, [_make_box(0, 0, 40, 60)])
+    tile_list = density_map.tile_density(40)
+    assert [tile.get_bounds(unit_mode=True) for tile, _ in tile_list] == [
+        (0, 0, 40, 40), (40, 0, 80, 40), (80, 0, 100, 40),
+        (0, 40, 40, 60), (40, 40, 80, 60), (80, 40, 100, 60)]
+    assert [density for _, density in tile_list] == [1, 0, 0, 1, 0, 0]
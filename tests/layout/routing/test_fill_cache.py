@@ -0,0 +1,74 @@
+from itertools import product
+
+import pytest
+
+from bag.layout.routing.fill import fill_solver_cache, FillSolverCache, \
+    fill_symmetric_helper, fill_symmetric_const_space, fill_symmetric_max_num_info, \
+    fill_symmetric_max_density_info, fill_symmetric_min_density_info
+
+
+def _call(fun, *args, **kwargs):
+    try:
+        return fun(*args, **kwargs)
+    except ValueError as ex:
+        return ex.__class__, ex.args
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    fill_solver_cache.clear()
+    yield
+    fill_solver_cache.clear()
+
+
+def test_cached_results():
+    # call each solver twice, so second call comes from cache
+    for _ in range(2):
+        for area, nfill, n_min, n_max, sp_min in product(range(5, 40, 3), range(0, 5),
+                                                         (1, 2), (2, 5), (1, 3)):
+            for fun in (fill_symmetric_max_num_info, fill_symmetric_max_density_info,
+                        fill_symmetric_min_density_info):
+                if fun is fill_symmetric_max_num_info:
+                    args = (area, nfill, n_min, n_max, sp_min)
+                else:
+                    args = (area, nfill * 4, n_min, n_max, sp_min)
+                for fill_on_edge, cyclic in product((True, False), (True, False)):
+                    assert (_call(fun, *args, fill_on_edge=fill_on_edge, cyclic=cyclic) ==
+                            _call(fun.uncached, *args, fill_on_edge=fill_on_edge, cyclic=cyclic))
+
+    stats = fill_solver_cache.stats()
+    assert stats['hits'] > 0 and stats['size'] > 0
+
+
+def test_offset_shift():
+    for offset in (0, -7, 13):
+        for area, nblk, sp in product(range(10, 30), range(1, 4), range(1, 4)):
+            for inc_sp, invert, fill_on_edge, cyclic in product((True, False), repeat=4):
+                kwargs = dict(inc_sp=inc_sp, invert=invert, fill_on_edge=fill_on_edge,
+                              cyclic=cyclic)
+                expect = _call(fill_symmetric_helper.uncached, area, nblk, sp, offset=offset,
+                               **kwargs)
+                assert _call(fill_symmetric_helper, area, nblk, sp, offset, **kwargs) == expect
+        for area, sp_max in product(range(10, 60, 7), range(2, 6)):
+            assert (_call(fill_symmetric_const_space, area, sp_max, 1, 3, offset=offset) ==
+                    _call(fill_symmetric_const_space.uncached, area, sp_max, 1, 3, offset))
+
+
+def test_lru_and_persist(tmpdir):
+    cache = FillSolverCache(maxsize=2)
+    for idx in range(3):
+        assert cache.lookup(lambda: idx * 2, ('f', idx)) == idx * 2
+    assert len(cache) == 2
+    # key 0 is evicted
+    assert cache.lookup(lambda: -1, ('f', 0)) == -1
+    assert cache.stats()['hits'] == 0
+
+    with pytest.raises(KeyError):
+        cache.lookup(lambda: {}['a'], ('g',))
+
+    fname = str(tmpdir.join('fill_cache.pickle'))
+    cache.save(fname)
+    cache2 = FillSolverCache()
+    assert cache2.load(fname)
+    assert cache2.lookup(lambda: None, ('f', 0)) == -1
+    assert cache2.stats()['hits'] == 1
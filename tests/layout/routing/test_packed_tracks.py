@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from bag.layout.util import BBox
+from bag.layout.routing.fill import UsedTracks, save_packed_tracks
+
+RES = 0.001
+
+
+def _random_box(rng, max_dim):
+    x = rng.randint(-5000, 5000)
+    y = rng.randint(-5000, 5000)
+    return BBox(x, y, x + rng.randint(0, max_dim), y + rng.randint(0, max_dim), RES,
+                unit_mode=True)
+
+
+def _key(box):
+    return box.get_bounds(unit_mode=True)
+
+
+@pytest.fixture(scope='module')
+def track_pair(tmpdir_factory):
+    rng = random.Random(0)
+    rect_list = [(rng.choice([1, 2, 3]), _random_box(rng, 300), rng.randint(0, 30),
+                  rng.randint(0, 30)) for _ in range(2000)]
+    rtree_tracks = UsedTracks()
+    for layer_id, box, dx, dy in rect_list:
+        rtree_tracks.record_box(layer_id, box, dx, dy, RES)
+
+    fname = str(tmpdir_factory.mktemp('packed').join('test_tracks.bin'))
+    save_packed_tracks(fname, rect_list)
+    return rtree_tracks, UsedTracks.from_packed_file(fname, RES)
+
+
+def test_track_bbox(track_pair):
+    rtree_tracks, packed_tracks = track_pair
+    for layer_id in range(5):
+        assert _key(rtree_tracks.get_track_bbox(layer_id)) == \
+            _key(packed_tracks.get_track_bbox(layer_id))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_queries(track_pair, seed):
+    rtree_tracks, packed_tracks = track_pair
+    rng = random.Random(seed)
+    for _ in range(50):
+        layer_id = rng.choice([1, 2, 3])
+        test_box = _random_box(rng, 800)
+        spx, spy = rng.randint(0, 40), rng.randint(0, 40)
+        expect = sorted(_key(b) for b in rtree_tracks.blockage_iter(layer_id, test_box, spx, spy))
+        actual = sorted(_key(b) for b in packed_tracks.blockage_iter(layer_id, test_box, spx, spy))
+        assert expect == actual
+        expect = sorted(_key(b) for b in rtree_tracks.intersection_rect_iter(layer_id, test_box))
+        actual = sorted(_key(b) for b in packed_tracks.intersection_rect_iter(layer_id, test_box))
+        assert expect == actual
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.util import BBox
+from bag.layout.routing import RoutingGrid, TrackManager, UsedTracks
+from bag.layout.routing.fill import TrackIntervalIndex
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return RoutingGrid(DummyTechInfo({}), [1, 2], [0.1, 0.2], [0.1, 0.2], 'x')
+
+
+def _random_nets(rng, num, types):
+    ans = []
+    for idx in range(num):
+        lower = rng.randint(0, 20000)
+        ans.append(('net%d' % idx, rng.choice(types), lower, lower + rng.randint(100, 4000)))
+    return ans
+
+
+def _check_assignment(tr_manager, layer_id, net_list, sp_le, ans):
+    grid = tr_manager.grid
+    assert set(ans.keys()) == set(net[0] for net in net_list)
+    for idx, (name, wtype, lower, upper) in enumerate(net_list):
+        w = tr_manager.get_width(layer_id, wtype)
+        le = max(sp_le, grid.get_line_end_space(layer_id, w, unit_mode=True))
+        for name2, wtype2, lower2, upper2 in net_list[idx + 1:]:
+            w2 = tr_manager.get_width(layer_id, wtype2)
+            cur_le = max(le, sp_le, grid.get_line_end_space(layer_id, w2, unit_mode=True))
+            if upper + cur_le > lower2 and upper2 + cur_le > lower:
+                space = tr_manager.get_space(layer_id, (wtype, wtype2))
+                assert 2 * abs(ans[name] - ans[name2]) >= 2 * space + w + w2
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3])
+def test_assign_tracks_min_tracks(grid, seed):
+    rng = random.Random(seed)
+    sp_le = rng.choice([0, 200])
+    tr_manager = TrackManager(grid, {'sig': {1: 1}}, {'sig': {1: 1}})
+    net_list = _random_nets(rng, 60, ['sig'])
+    ans = tr_manager.assign_tracks(1, net_list, start_idx=2, sp_le=sp_le, unit_mode=True)
+    _check_assignment(tr_manager, 1, net_list, sp_le, ans)
+
+    # number of tracks used is the maximum number of overlapping nets
+    le = max(sp_le, grid.get_line_end_space(1, 1, unit_mode=True))
+    max_overlap = max(sum(1 for _, _, lower, upper in net_list if lower <= x < upper + le)
+                      for _, _, x, _ in net_list)
+    assert len(set(ans.values())) == max_overlap
+    assert min(ans.values()) == 2
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_assign_tracks_mixed_types(grid, seed):
+    rng = random.Random(seed)
+    tr_manager = TrackManager(grid, {'sig': {1: 1}, 'clk': {1: 2}, 'pwr': {1: 3}},
+                              {'sig': {1: 0}, 'clk': {1: 1}, ('clk', 'pwr'): {1: 2}},
+                              half_space=True)
+    net_list = _random_nets(rng, 60, ['sig', 'clk', 'pwr', 1])
+    ans = tr_manager.assign_tracks(1, net_list, start_idx=0.5, sp_le=100, unit_mode=True)
+    _check_assignment(tr_manager, 1, net_list, 100, ans)
+    for name, wtype, _, _ in net_list:
+        w = tr_manager.get_width(1, wtype)
+        # wires are within the channel
+        assert 2 * ans[name] - (w - 1) >= 1
+
+
+def test_assign_tracks_blockages(grid):
+    rng = random.Random(0)
+    res = grid.resolution
+    used_tracks = UsedTracks()
+    for _ in range(100):
+        xl = rng.randint(0, 20000)
+        yb = rng.randint(0, 6000)
+        box = BBox(xl, yb, xl + rng.randint(100, 2000), yb + 100, res, unit_mode=True)
+        used_tracks.record_box(1, box, 0, 0, res)
+
+    tr_manager = TrackManager(grid, {}, {})
+    net_list = _random_nets(rng, 40, [1, 2])
+    ans = tr_manager.assign_tracks(1, net_list, used_tracks=used_tracks, unit_mode=True)
+    _check_assignment(tr_manager, 1, net_list, 0, ans)
+    for name, width, lower, upper in net_list:
+        sp = grid.get_space(1, width, unit_mode=True)
+        sp_le = grid.get_line_end_space(1, width, unit_mode=True)
+        rect_iter = ((box, dx, dy) for _, box, dx, dy in used_tracks.all_rect_iter(layer_id=1))
+        track_index = TrackIntervalIndex(grid, 1, width, sp, sp_le, rect_iter)
+        assert not track_index.is_blocked(ans[name], lower, upper)
+
+
+def test_assign_tracks_errors(grid):
+    tr_manager = TrackManager(grid, {}, {})
+    net_list = [('a', 1, 0, 1000), ('b', 1, 500, 1500), ('c', 1, 800, 900)]
+    with pytest.raises(ValueError):
+        tr_manager.assign_tracks(1, net_list, num_tracks=2, unit_mode=True)
+    assert len(tr_manager.assign_tracks(1, net_list, num_tracks=3, unit_mode=True)) == 3
+    with pytest.raises(ValueError):
+        tr_manager.assign_tracks(1, net_list + [('a', 1, 0, 10)], unit_mode=True)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.util import BBox
+from bag.layout.routing import RoutingGrid, TrackID, WireArray
+from bag.layout.routing.fill import RectIndex, TrackIntervalIndex
+from bag.util.interval import IntervalSet
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return RoutingGrid(DummyTechInfo({}), [1, 2], [0.1, 0.2], [0.1, 0.2], 'x')
+
+
+def _random_rects(rng, num):
+    ans = []
+    for _ in range(num):
+        x = rng.randint(-3000, 3000)
+        y = rng.randint(-3000, 3000)
+        box = BBox(x, y, x + rng.randint(0, 400), y + rng.randint(0, 400), 0.001, unit_mode=True)
+        ans.append((box, rng.randint(0, 120), rng.randint(0, 120)))
+    return ans
+
+
+def _check_queries(rng, grid, layer_id, width, sp, sp_le, rect_index, track_index):
+    res = grid.resolution
+    intv_dir = grid.get_direction(layer_id)
+    spx, spy = (sp_le, sp) if intv_dir == 'x' else (sp, sp_le)
+    for _ in range(100):
+        tr_idx = rng.randint(-40, 40) / 2
+        lower = rng.randint(-3500, 3000)
+        upper = lower + rng.randint(1, 3000)
+        warr = WireArray(TrackID(layer_id, tr_idx, width=width), lower, upper, res=res,
+                         unit_mode=True)
+        expect = IntervalSet()
+        for box in rect_index.intersection_iter(warr.get_bbox_array(grid).base, spx, spy):
+            bl, bu = box.get_interval(intv_dir, unit_mode=True)
+            expect.add((max(bl, lower), min(bu, upper)), merge=True, abut=True)
+        actual = track_index.get_blocked_intervals(tr_idx, lower, upper)
+        assert list(expect) == list(actual)
+        assert (len(expect) > 0) == track_index.is_blocked(tr_idx, lower, upper)
+
+
+@pytest.mark.parametrize('layer_id', [1, 2])
+@pytest.mark.parametrize('width', [1, 2])
+@pytest.mark.parametrize('sp, sp_le', [(0, 0), (50, 100), (100, 10)])
+def test_rect_index_equivalence(grid, layer_id, width, sp, sp_le):
+    rng = random.Random(layer_id * 100 + width * 10 + sp)
+    rect_list = _random_rects(rng, 600)
+    rect_index = RectIndex(grid.resolution)
+    for box, dx, dy in rect_list[:400]:
+        rect_index.record_box(box, dx, dy)
+    track_index = TrackIntervalIndex(grid, layer_id, width, sp, sp_le, rect_list[:400])
+    _check_queries(rng, grid, layer_id, width, sp, sp_le, rect_index, track_index)
+
+    # check incremental updates
+    for box, dx, dy in rect_list[400:]:
+        rect_index.record_box(box, dx, dy)
+        track_index.record_box(box, dx, dy)
+    _check_queries(rng, grid, layer_id, width, sp, sp_le, rect_index, track_index)
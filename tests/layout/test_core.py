@@ -0,0 +1,125 @@
+import random
+from itertools import product, chain
+
+import bag.layout.core
+from bag.layout.core import DummyTechInfo, _check_via_array, _search_via_array
+
+
+class ViaTechInfo(DummyTechInfo):
+    """A DummyTechInfo with square and rectangular vias."""
+
+    def __init__(self):
+        DummyTechInfo.__init__(self, {})
+
+    def get_via_drc_info(self, vname, vtype, mtype, mw_unit, is_bot):
+        if vtype == 'square':
+            return (38, 38), [(42, 42)], [(46, 46)], (32, 32), [(10, 20), (20, 10)], None, None
+        if vtype == 'vrect':
+            return (40, 50), None, None, (32, 64), [(8, 24), (24, 8)], None, None
+        raise ValueError('Unsupported via type: %s' % vtype)
+
+
+def test_via_cache():
+    tech = ViaTechInfo()
+    args_list = [('V1', 'M1', 'M2', bdir, tdir, w, h, extend)
+                 for bdir, tdir, w, h, extend in product('xy', 'xy', (0.05, 0.1, 0.3),
+                                                         (0.1, 0.25), (True, False))]
+
+    expected = [tech._get_best_via_array_unit(*args[:5], int(round(args[5] / tech.resolution)),
+                                              int(round(args[6] / tech.resolution)), args[7])
+                for args in args_list]
+    for _ in range(2):
+        for args, ans in zip(args_list, expected):
+            assert tech.get_best_via_array(*args) == ans
+
+    stats = tech.get_via_cache_stats()
+    assert stats['misses'] == len(args_list)
+    assert stats['hits'] == len(args_list)
+    assert stats['size'] == len(args_list)
+
+    # cached results cannot be modified by caller
+    result = tech.get_best_via_array(*args_list[-1])
+    result[1][0][0] = -1
+    assert tech.get_best_via_array(*args_list[-1]) == expected[-1]
+
+    # same size in resolution units share cache entry
+    tech.clear_via_cache()
+    tech.get_best_via_array('V1', 'M1', 'M2', 'x', 'y', 0.1, 0.1, True)
+    tech.get_best_via_array('V1', 'M1', 'M2', 'x', 'y', 0.1 + tech.resolution / 4, 0.1, True)
+    assert tech.get_via_cache_stats()['hits'] == 1
+
+    # cache size is bounded
+    tech.set_via_cache_size(3)
+    for args in args_list:
+        tech.get_best_via_array(*args)
+    assert tech.get_via_cache_stats()['size'] == 3
+    tech.set_via_cache_size(0)
+    tech.get_best_via_array(*args_list[0])
+    assert tech.get_via_cache_stats()['size'] == 0
+
+
+def _brute_force_search(w, h, dim, sp, sp2_list, sp3_list, enc_info, extend, nx_max, ny_max):
+    """Reference implementation of _search_via_array() that checks every via array size."""
+    nxy_list = [(a * b, a, b) for a in range(1, nx_max + 1) for b in range(1, ny_max + 1)]
+    for _, nx, ny in sorted(nxy_list, reverse=True):
+        if nx == 2 and ny == 2:
+            sp_combo = sp2_list
+        elif nx > 1 and ny > 1:
+            sp_combo = sp3_list
+        else:
+            sp_combo = [sp]
+        result = _check_via_array(nx, ny, w, h, dim, sp_combo, enc_info, extend)
+        if result is not None:
+            mdim_list, adim, opt_sp = result
+            return (nx, ny), mdim_list, adim, opt_sp
+    return None, None, None, None
+
+
+def _random_enc_list(rng, num):
+    return [(rng.randint(0, 40), rng.randint(0, 40)) for _ in range(num)]
+
+
+def _random_arr_test(rng):
+    if rng.random() < 0.5:
+        return None, None
+    nx_min = rng.randint(1, 4)
+    ny_min = rng.randint(1, 4)
+    return _random_enc_list(rng, rng.randint(1, 2)), lambda ny, nx: nx >= nx_min and ny >= ny_min
+
+
+def test_via_array_search_random():
+    rng = random.Random(0)
+    for _ in range(500):
+        dim = (rng.randint(10, 60), rng.randint(10, 60))
+        sp = (rng.randint(10, 60), rng.randint(10, 60))
+        sp2_list = [(rng.randint(10, 60), rng.randint(10, 60)) for _ in range(rng.randint(1, 2))]
+        sp3_list = [(rng.randint(10, 60), rng.randint(10, 60)) for _ in range(rng.randint(1, 2))]
+        enc_info = []
+        for _ in range(2):
+            arr_enc, arr_test = _random_arr_test(rng)
+            enc_info.append((rng.choice('xy'), _random_enc_list(rng, rng.randint(1, 3)),
+                             arr_enc, arr_test))
+        w = rng.randint(20, 1500)
+        h = rng.randint(20, 1500)
+        extend = rng.random() < 0.5
+        spx_min = min(s[0] for s in chain([sp], sp2_list, sp3_list))
+        spy_min = min(s[1] for s in chain([sp], sp2_list, sp3_list))
+        nx_max = (w + spx_min) // (dim[0] + spx_min)
+        ny_max = (h + spy_min) // (dim[1] + spy_min)
+        args = (w, h, dim, sp, sp2_list, sp3_list, enc_info, extend, nx_max, ny_max)
+        assert _search_via_array(*args) == _brute_force_search(*args)
+
+
+def test_via_array_search_pruned(monkeypatch):
+    num_checks = [0]
+
+    def count_check(*args):
+        num_checks[0] += 1
+        return _check_via_array(*args)
+
+    monkeypatch.setattr(bag.layout.core, '_check_via_array', count_check)
+    tech = ViaTechInfo()
+    result = tech.get_best_via_array('V1', 'M1', 'M2', 'x', 'y', 10.0, 10.0, False)
+    assert result is not None
+    # only a handful of via array sizes should be checked for each via type.
+    assert num_checks[0] < 10
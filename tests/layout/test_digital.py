@@ -0,0 +1,148 @@
+import random
+
+import yaml
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.routing import RoutingGrid
+from bag.layout.template import TemplateDB
+from bag.layout.digital import OccupancyGrid, StdCellBase, _read_std_config
+
+
+def _ref_add(used, loc, size, nx, ny, spx, spy):
+    """Reference implementation of OccupancyGrid.add() using a set of used slots."""
+    slots = set()
+    for col_off in range(nx):
+        for row_off in range(ny):
+            for col in range(loc[0] + col_off * spx, loc[0] + col_off * spx + size[0]):
+                for row in range(loc[1] + row_off * spy, loc[1] + row_off * spy + size[1]):
+                    if (col, row) in used or (col, row) in slots:
+                        return False
+                    slots.add((col, row))
+    used.update(slots)
+    return True
+
+
+def _ref_find_free(used, size, num_cols, num_rows):
+    for row in range(num_rows - size[1] + 1):
+        for col in range(num_cols - size[0] + 1):
+            if all((c, r) not in used for c in range(col, col + size[0])
+                   for r in range(row, row + size[1])):
+                return col, row
+    return None
+
+
+def test_occupancy_grid():
+    rng = random.Random(0)
+    for _ in range(20):
+        grid = OccupancyGrid()
+        used = set()
+        for _ in range(30):
+            loc = rng.randint(0, 30), rng.randint(0, 10)
+            size = rng.randint(1, 6), rng.randint(1, 3)
+            nx, ny = rng.randint(1, 3), rng.randint(1, 3)
+            spx, spy = rng.randint(0, 8), rng.randint(0, 4)
+            success = grid.add(loc, size, nx=nx, ny=ny, spx=spx, spy=spy)
+            assert success == _ref_add(used, loc, size, nx, ny, spx, spy)
+            if not success:
+                conflict = grid.get_conflict(loc, size, nx=nx, ny=ny, spx=spx, spy=spy)
+                assert (conflict[0] - loc[0]) % max(spx, 1) == 0
+                assert (conflict[1] - loc[1]) % max(spy, 1) == 0
+
+        num_cols, num_rows = grid.num_cols, grid.num_rows
+        used_arr = grid.get_used()
+        assert set(zip(*used_arr.nonzero()[::-1])) == used
+        for size in [(1, 1), (2, 1), (3, 2), (5, 3)]:
+            assert grid.find_free(size, num_cols=num_cols, num_rows=num_rows) == _ref_find_free(
+                used, size, num_cols, num_rows)
+            loc = grid.find_free(size)
+            assert grid.get_conflict(loc, size) is None
+
+        free_slots = set()
+        for row, start, stop in grid.free_intervals_iter(num_cols):
+            assert start < stop
+            free_slots.update((col, row) for col in range(start, stop))
+        all_slots = set((col, row) for col in range(num_cols) for row in range(num_rows))
+        assert free_slots == all_slots - used
+
+
+class StdTechInfo(DummyTechInfo):
+    def __init__(self):
+        DummyTechInfo.__init__(self, {})
+
+    def get_layer_id(self, layer_name):
+        return int(layer_name[1:])
+
+    def get_layer_name(self, layer_id):
+        return 'M%d' % layer_id
+
+    def get_layer_type(self, layer_name):
+        return layer_name
+
+    def finalize_template(self, template):
+        pass
+
+
+class StdCell(StdCellBase):
+    @classmethod
+    def get_params_info(cls):
+        return dict(config_file='config file.', std_size='cell size.')
+
+    def draw_layout(self):
+        self.set_std_size(self.params['std_size'])
+
+
+class StdCellTop(StdCellBase):
+    @classmethod
+    def get_params_info(cls):
+        return dict(config_file='config file.')
+
+    def draw_layout(self):
+        config_file = self.params['config_file']
+        inv = self.new_template(params=dict(config_file=config_file, std_size=(2, 1)),
+                                temp_cls=StdCell)
+        dff = self.new_template(params=dict(config_file=config_file, std_size=(6, 2)),
+                                temp_cls=StdCell)
+        self.add_std_instance(inv, loc=(0, 0), nx=4, spx=3)
+        with pytest.raises(ValueError):
+            self.add_std_instance(inv, loc=(4, 0))
+        with pytest.raises(ValueError):
+            self.add_std_instance(inv, loc=(20, 0), nx=2, spx=1)
+        self.dff_locs = []
+        for _ in range(5):
+            loc = self.find_std_loc((6, 2), num_cols=20)
+            self.add_std_instance(dff, loc=loc)
+            self.dff_locs.append(loc)
+        assert self.find_std_loc((6, 2), num_cols=20, num_rows=5) is None
+        self.set_std_size((20, 6))
+        self.fill_space()
+
+
+def test_std_cell_placement(tmpdir):
+    config_file = str(tmpdir.join('stdcell.yaml'))
+    config = dict(
+        tech_params=dict(col_pitch=0.2, height=1.2, layers=[1, 2], widths=[0.1, 0.1],
+                         spaces=[0.1, 0.1], directions=['y', 'x']),
+        cells={},
+        spaces=[dict(lib_name='lib', cell_name='space4', num_col=4),
+                dict(lib_name='lib', cell_name='space1', num_col=1)],
+        boundaries=dict(lib_name='lib', lr_width=1, tb_height=1),
+    )
+    with open(config_file, 'w') as f:
+        yaml.dump(config, f)
+
+    grid = RoutingGrid(StdTechInfo(), [1, 2], [0.1, 0.1], [0.1, 0.1], 'x')
+    temp_db = TemplateDB('', grid, 'lib')
+    top = temp_db.new_template(params=dict(config_file=config_file), temp_cls=StdCellTop)
+    assert top.dff_locs == [(11, 0), (0, 1), (6, 2), (12, 2), (0, 3)]
+    assert top._used_blocks.get_used().sum() == 4 * 2 + 5 * 12
+
+
+def test_std_config_cache(tmpdir):
+    config_file = tmpdir.join('stdcell.yaml')
+    config_file.write('cells: {}\n')
+    config = _read_std_config(str(config_file))
+    assert _read_std_config(str(config_file)) is config
+    config_file.write('cells: {inv: {}}\n')
+    config_file.setmtime(config_file.mtime() + 10)
+    assert _read_std_config(str(config_file)) == dict(cells=dict(inv={}))
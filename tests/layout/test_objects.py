@@ -0,0 +1,171 @@
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.util import BBox
+from bag.layout.routing import RoutingGrid, TrackID, WireArray
+from bag.layout.template import TemplateDB, TemplateBase
+
+
+class PinTechInfo(DummyTechInfo):
+    """A DummyTechInfo with metal layers M1-M4."""
+
+    def __init__(self):
+        DummyTechInfo.__init__(self, {})
+
+    def get_layer_id(self, layer_name):
+        return int(layer_name[1:])
+
+    def get_layer_name(self, layer_id):
+        return 'M%d' % layer_id
+
+    def get_layer_type(self, layer_name):
+        return layer_name
+
+    def use_flip_parity(self):
+        return False
+
+    def finalize_template(self, template):
+        pass
+
+
+class PinTemplate(TemplateBase):
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        res = self.grid.resolution
+        self.add_pin('A', [WireArray(TrackID(2, 3, width=2, num=2, pitch=3), 100, 900, res=res,
+                                     unit_mode=True),
+                           WireArray(TrackID(2, 6.5), 0, 500, res=res, unit_mode=True)],
+                     show=False)
+        self.add_pin('B', WireArray(TrackID(3, 1.5), 200, 1800, res=res, unit_mode=True),
+                     show=False)
+        self.add_pin_primitive('C', 'M1', BBox(10, 20, 110, 70, res, unit_mode=True),
+                               show=False)
+
+
+class TopTemplate(TemplateBase):
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        pass
+
+
+@pytest.fixture(scope='module')
+def temp_db():
+    grid = RoutingGrid(PinTechInfo(), [1, 2, 3, 4], [0.1, 0.1, 0.2, 0.2], [0.1, 0.1, 0.2, 0.2],
+                       'x')
+    return TemplateDB('', grid, 'lib')
+
+
+def _make_instance(temp_db, orient='R0', nx=3, ny=4):
+    master = temp_db.new_template(params={}, temp_cls=PinTemplate)
+    top = TopTemplate(temp_db, 'lib', {}, set())
+    return top.add_instance(master, loc=(2000, 4000), orient=orient, nx=nx, ny=ny,
+                            spx=1200, spy=1600, unit_mode=True)
+
+
+def _ref_port(inst, name, row, col):
+    dx, dy = inst.get_item_location(row=row, col=col, unit_mode=True)
+    loc = inst.location_unit[0] + dx, inst.location_unit[1] + dy
+    return inst.master.get_port(name).transform(inst._parent_grid, loc=loc,
+                                                orient=inst.orientation, unit_mode=True)
+
+
+def _port_repr(port):
+    return repr(sorted((str(lay), repr(port.get_pins(lay))) for lay in port._pin_dict))
+
+
+def test_port_cache(temp_db):
+    inst = _make_instance(temp_db)
+    port = inst.get_port('A', 2, 1)
+    assert inst.get_port('A', 2, 1) is port
+    assert _port_repr(port) == _port_repr(_ref_port(inst, 'A', 2, 1))
+
+    # cache is invalidated when the instance moves
+    inst.move_by(dx=400, dy=-800, unit_mode=True)
+    assert _port_repr(inst.get_port('A', 2, 1)) == _port_repr(_ref_port(inst, 'A', 2, 1))
+    inst.transform(loc=(1000, 1000), orient='MX', unit_mode=True)
+    assert _port_repr(inst.get_port('A', 2, 1)) == _port_repr(_ref_port(inst, 'A', 2, 1))
+    inst.orientation = 'R180'
+    assert _port_repr(inst.get_port('B', 3, 2)) == _port_repr(_ref_port(inst, 'B', 3, 2))
+    inst.location_unit = (0, 0)
+    assert _port_repr(inst.get_port('B', 3, 2)) == _port_repr(_ref_port(inst, 'B', 3, 2))
+    inst.spy_unit = 3200
+    assert _port_repr(inst.get_port('B', 3, 2)) == _port_repr(_ref_port(inst, 'B', 3, 2))
+
+
+@pytest.mark.parametrize('orient', ['R0', 'MX', 'MY', 'R180'])
+def test_port_pin_arrays(temp_db, orient):
+    inst = _make_instance(temp_db, orient=orient)
+    for name, layer in (('A', -1), ('B', 3)):
+        pin_arr = inst.get_port_pin_arrays(name, layer=layer)
+        pin_list = inst.get_all_port_pins(name, layer=layer)
+        num_pins = len(inst.master.get_port(name).get_pins(layer))
+        assert len(pin_arr['track']) == len(pin_list) == 3 * 4 * num_pins
+        for idx, warr in enumerate(pin_list):
+            tid = warr.track_id
+            assert pin_arr['track'][idx] == tid.base_index
+            assert pin_arr['width'][idx] == tid.width
+            assert pin_arr['num'][idx] == tid.num
+            assert pin_arr['pitch'][idx] == tid.pitch
+            assert pin_arr['lower'][idx] == warr.lower_unit
+            assert pin_arr['upper'][idx] == warr.upper_unit
+            row, col = pin_arr['row'][idx], pin_arr['col'][idx]
+            ref_pins = _ref_port(inst, name, row, col).get_pins(layer)
+            assert repr(warr) in [repr(ref_warr) for ref_warr in ref_pins]
+
+    pin_arr = inst.get_port_pin_arrays('C')
+    pin_list = inst.get_all_port_pins('C')
+    bnds = [(pin_arr['xl'][idx], pin_arr['yb'][idx], pin_arr['xr'][idx], pin_arr['yt'][idx])
+            for idx in range(len(pin_list))]
+    assert bnds == [box.get_bounds(unit_mode=True) for box in pin_list]
+
+
+class WireTemplate(TemplateBase):
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        self.add_wires(2, 0, 0, 1000, unit_mode=True)
+
+
+def test_track_index_instance_change(temp_db):
+    master = temp_db.new_template(params={}, temp_cls=WireTemplate)
+    top = TopTemplate(temp_db, 'lib', {}, set())
+    inst = top.add_instance(master, loc=(0, 0), unit_mode=True)
+    assert not top.is_track_available(2, 0, 200, 800, unit_mode=True)
+    assert top.is_track_available(2, 0, 5000, 6000, unit_mode=True)
+
+    # track index is rebuilt when the instance moves
+    inst.move_by(dy=5000, unit_mode=True)
+    assert top.is_track_available(2, 0, 200, 800, unit_mode=True)
+    assert not top.is_track_available(2, 0, 5000, 6000, unit_mode=True)
+    inst.ny = 2
+    inst.spy_unit = 2000
+    assert not top.is_track_available(2, 0, 7200, 7800, unit_mode=True)
+
+
+def test_track_index_interleaved(temp_db):
+    master = temp_db.new_template(params={}, temp_cls=WireTemplate)
+    top = TopTemplate(temp_db, 'lib', {}, set())
+    other = TopTemplate(temp_db, 'lib', {}, set())
+    top.add_instance(master, loc=(0, 0), unit_mode=True)
+    assert not top.is_track_available(2, 0, 200, 800, unit_mode=True)
+    index = top._get_track_interval_index(2, 1, 0, 0)
+
+    # instances of other templates do not invalidate the track index
+    for idx in range(3):
+        other_inst = other.add_instance(master, loc=(0, 2000 * idx), unit_mode=True)
+        other_inst.move_by(dy=100, unit_mode=True)
+        assert top.is_track_available(2, 0, 2000, 3000, unit_mode=True)
+        assert top._get_track_interval_index(2, 1, 0, 0) is index
+
+    # new instances of this template do
+    top.add_instance(master, loc=(0, 2000), unit_mode=True)
+    assert not top.is_track_available(2, 0, 2000, 3000, unit_mode=True)
+    assert top._get_track_interval_index(2, 1, 0, 0) is not index
@@ -0,0 +1,194 @@
+import os
+import random
+
+import yaml
+import pytest
+
+import bag.layout.tech
+from bag.layout.tech import TechRules, TechInfoConfig
+
+
+class ConfigTechInfo(TechInfoConfig):
+    """A TechInfoConfig with a fixed array enclosure rule."""
+
+    def get_metal_em_specs(self, layer_name, w, l=-1, vertical=False, **kwargs):
+        return float('inf'), float('inf'), float('inf')
+
+    def get_via_em_specs(self, via_name, bm_layer, tm_layer, via_type='square',
+                         bm_dim=(-1, -1), tm_dim=(-1, -1), array=False, **kwargs):
+        return float('inf'), float('inf'), float('inf')
+
+    def get_res_em_specs(self, res_type, w, l=-1, **kwargs):
+        return float('inf'), float('inf'), float('inf')
+
+    def add_cell_boundary(self, template, box):
+        pass
+
+    def draw_device_blockage(self, template):
+        pass
+
+    def get_via_arr_enc(self, vname, vtype, mtype, mw_unit, is_bot):
+        return [(1, 2)], lambda nrow, ncol: nrow > ncol
+
+
+def _rand_table(rng, num, key, val_fun):
+    # breakpoints are usually increasing, but may contain redundant entries.
+    w_list = sorted(rng.randint(10, 500) for _ in range(num))
+    if rng.random() < 0.3:
+        w_list.append(rng.randint(10, 500))
+    return dict(w_list=w_list, **{key: [val_fun() for _ in w_list]})
+
+
+def _rand_via(rng):
+    def rand_enc():
+        return [(rng.randint(0, 30), rng.randint(0, 30)) for _ in range(rng.randint(1, 3))]
+
+    def rand_sp():
+        return [(rng.randint(10, 60), rng.randint(10, 60)) for _ in range(rng.randint(1, 2))]
+
+    return dict(
+        dim=(rng.randint(10, 60), rng.randint(10, 60)),
+        sp=(rng.randint(10, 60), rng.randint(10, 60)),
+        sp2=rand_sp() if rng.random() < 0.5 else None,
+        sp3=rand_sp(),
+        top_enc=_rand_table(rng, 3, 'enc_list', rand_enc),
+        bot_enc=_rand_table(rng, 3, 'enc_list', rand_enc) if rng.random() < 0.7 else None,
+    )
+
+
+def _rand_config(rng):
+    def rand_sp():
+        return rng.randint(10, 100)
+
+    def rand_al():
+        return rng.randint(0, 20000), rng.randint(0, 200)
+
+    lay_types = ['1x', '2x', '4x']
+    via = {'V1': dict(square=_rand_via(rng), hrect=_rand_via(rng)),
+           'V2': dict(square=_rand_via(rng), vrect=_rand_via(rng), hrect=_rand_via(rng))}
+    return dict(
+        resolution=0.001, layout_unit=1e-6, tech_lib='tech',
+        layer_name={1: 'M1', 2: 'M2', 3: 'M3'},
+        layer_type={'M1': '1x', 'M2': '2x', 'M3': '4x'},
+        sp_min={lay: _rand_table(rng, 4, 'sp_list', rand_sp) for lay in lay_types},
+        sp_le_min={lay: _rand_table(rng, 4, 'sp_list', rand_sp) for lay in lay_types},
+        len_min={lay: dict(md_list=[400, 200], md_al_list=[rand_al(), rand_al()],
+                           **_rand_table(rng, 3, 'w_al_list', rand_al)) for lay in lay_types},
+        idc_em_scale=dict(default=dict(temp=[25, 85, 105], scale=[2.0, 1.0, 0.5]),
+                          res=dict(temp=[85, 50], scale=[1.5, 0.8])),
+        via=via,
+    )
+
+
+def _ref_breakpoint(w_list, val_list, w, default=None):
+    for w_max, val in zip(w_list, val_list):
+        if w <= w_max:
+            return val
+    return default
+
+
+def _ref_min_length(info, w_unit):
+    l_unit = 0
+    for w, (area, len_min) in zip(info['w_list'], info['w_al_list']):
+        if w_unit <= w:
+            l_unit = max(len_min, -(-area // w_unit))
+            break
+    for max_dim, (area, len_min) in zip(reversed(info['md_list']),
+                                        reversed(info['md_al_list'])):
+        if max(w_unit, l_unit) > max_dim:
+            return l_unit
+        l_unit = max(l_unit, len_min, -(-area // w_unit))
+    return -(-l_unit // 2) * 2
+
+
+def _ref_via_drc_info(config, vname, vtype, mw_unit, is_bot):
+    via_config = config['via'][vname]
+    rotate = vtype == 'vrect' and vtype not in via_config
+    via_config = via_config['hrect' if rotate else vtype]
+    if not is_bot or via_config['bot_enc'] is None:
+        enc_data = via_config['top_enc']
+    else:
+        enc_data = via_config['bot_enc']
+    sp = via_config['sp']
+    dim = via_config['dim']
+    sp2_list = via_config['sp2']
+    sp3_list = via_config['sp3']
+    enc_cur = _ref_breakpoint(enc_data['w_list'], enc_data['enc_list'], mw_unit, default=[])
+    arr_enc = [(1, 2)]
+    if rotate:
+        sp = sp[1], sp[0]
+        dim = dim[1], dim[0]
+        enc_cur = [(yv, xv) for xv, yv in enc_cur]
+        if sp2_list is not None:
+            sp2_list = [(spy, spx) for spx, spy in sp2_list]
+        sp3_list = [(spy, spx) for spx, spy in sp3_list]
+        arr_enc = [(2, 1)]
+    return sp, sp2_list, sp3_list, dim, enc_cur, arr_enc
+
+
+def _make_tech(config, rules=None):
+    tech_params = {'layout': {'em': {'dc_temp': 105, 'rms_dt': 10}}}
+    return ConfigTechInfo(config, tech_params, rules=rules)
+
+
+def test_rule_tables():
+    rng = random.Random(0)
+    for _ in range(20):
+        config = _rand_config(rng)
+        tech = _make_tech(config)
+        assert tech.get_layer_id('M2') == 2
+        for w in range(0, 520, 7):
+            for lay in ('1x', '2x', '4x'):
+                if w > 0:
+                    assert (tech.get_min_length_unit(lay, w) ==
+                            _ref_min_length(config['len_min'][lay], w))
+                for name in ('sp_min', 'sp_le_min'):
+                    info = config[name][lay]
+                    assert (tech._space_helper(name, lay, w) ==
+                            _ref_breakpoint(info['w_list'], info['sp_list'], w))
+            for vname, vtype, is_bot in [('V1', 'square', True), ('V1', 'vrect', False),
+                                         ('V1', 'hrect', True), ('V2', 'vrect', True)]:
+                ans = tech.get_via_drc_info(vname, vtype, '1x', w, is_bot)
+                assert ans[:6] == _ref_via_drc_info(config, vname, vtype, w, is_bot)
+                assert ans[6](1, 2) == (vtype == 'vrect' and vname == 'V1')
+        for temp in range(0, 120, 5):
+            assert tech.get_idc_scale_factor(temp, '1x') == _ref_breakpoint(
+                [25, 85, 105], [2.0, 1.0, 0.5], temp, default=0.5)
+            assert tech.get_idc_scale_factor(temp, '1x', is_res=True) == _ref_breakpoint(
+                [85, 50], [1.5, 0.8], temp, default=0.8)
+
+
+def test_rule_errors():
+    tech = _make_tech(_rand_config(random.Random(1)))
+    for args in [('V3', 'square', '1x', 10, True), ('V1', 'rect', '1x', 10, True)]:
+        with pytest.raises(ValueError):
+            tech.get_via_drc_info(*args)
+    with pytest.raises(ValueError):
+        tech.get_layer_id('M5')
+
+
+def test_rules_file(tmpdir, monkeypatch):
+    def read_yaml(fname):
+        with open(fname, 'r') as f:
+            return yaml.safe_load(f)
+
+    monkeypatch.setattr(bag.layout.tech, 'read_yaml', read_yaml)
+    config = _rand_config(random.Random(2))
+    config_fname = str(tmpdir.join('tech_config.yaml'))
+    cache_fname = str(tmpdir.join('tech_config.pickle'))
+    with open(config_fname, 'w') as f:
+        yaml.safe_dump(config, f)
+
+    rules = TechRules.from_file(config_fname, cache_fname=cache_fname)
+    assert os.path.isfile(cache_fname)
+    rules2 = TechRules.load(cache_fname, source=config_fname)
+    assert rules2 is not None
+    assert rules2.config == rules.config
+    assert rules2.get_min_length('2x', 30) == rules.get_min_length('2x', 30)
+    assert _make_tech(rules2.config, rules=rules2).get_layer_id('M3') == 3
+
+    # cache is out of date if the configuration file changes
+    with open(config_fname, 'a') as f:
+        f.write('\n\n')
+    assert TechRules.load(cache_fname, source=config_fname) is None
+    assert TechRules.load(str(tmpdir.join('missing.pickle'))) is None
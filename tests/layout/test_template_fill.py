@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.routing import RoutingGrid
+from bag.layout.template import TemplateDB, TemplateBase
+from bag.layout.util import BBox
+
+
+class FillTechInfo(DummyTechInfo):
+    """A TechInfo with metal layers M1-M3 and dummy fill rules."""
+
+    def __init__(self):
+        fill_config = dict(density=0.3, sp_max=600, sp_le_max=800, margin=100, margin_le=100)
+        DummyTechInfo.__init__(self, {'layout': {'dummy_fill': {1: fill_config, 2: fill_config,
+                                                                3: fill_config}}})
+
+    def get_layer_id(self, layer_name):
+        return int(layer_name[1:])
+
+    def get_layer_name(self, layer_id):
+        return 'M%d' % layer_id
+
+    def get_layer_type(self, layer_name):
+        return layer_name
+
+    def get_exclude_layer(self, layer_id):
+        return 'M%d' % layer_id, 'exclude'
+
+    def get_min_space(self, layer_type, width, unit_mode=False, same_color=False):
+        return 30
+
+    def get_min_line_end_space(self, layer_type, width, unit_mode=False):
+        return 50
+
+    def get_min_length(self, layer_type, w_unit):
+        return 120
+
+    def finalize_template(self, template):
+        pass
+
+
+class FillTemplate(TemplateBase):
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        pass
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return RoutingGrid(FillTechInfo(), [1, 2, 3], [0.1, 0.1, 0.2], [0.1, 0.1, 0.2], 'x')
+
+
+def _make_template(grid):
+    temp_db = TemplateDB('', grid, 'lib')
+    template = FillTemplate(temp_db, 'lib', {}, set())
+    rng = random.Random(3)
+    for _ in range(60):
+        template.add_wires(rng.choice([1, 2, 3]), rng.randint(0, 100), rng.randint(0, 9000),
+                           rng.randint(9100, 12000), unit_mode=True)
+    template.prim_top_layer = 3
+    template.prim_bound_box = BBox(0, 0, 14000, 14000, grid.resolution, unit_mode=True)
+    return template
+
+
+def _get_rects(template):
+    return sorted((lay_id, box.get_bounds(unit_mode=True))
+                  for lay_id, box, _, _ in template.all_rect_iter())
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_parallel_fill(grid, max_workers):
+    layer_list = [1, 2, 3]
+    for density_pixel in (None, 10):
+        expect = _make_template(grid)
+        for layer_id in layer_list:
+            dmap = None if density_pixel is None else expect.get_density_map(layer_id,
+                                                                             density_pixel)
+            expect.do_max_space_fill2(layer_id, density_map=dmap)
+
+        template = _make_template(grid)
+        wire_table = template.do_max_space_fill2_layers(layer_list, density_pixel=density_pixel,
+                                                        max_workers=max_workers)
+        assert all(wire_table[layer_id].shape[0] > 0 for layer_id in layer_list)
+        assert _get_rects(template) == _get_rects(expect)
+
+
+class WindowFillTechInfo(FillTechInfo):
+    def get_min_length(self, layer_type, w_unit):
+        return 0.12
+
+
+def test_window_fill():
+    grid = RoutingGrid(WindowFillTechInfo(), [1, 2, 3], [0.1, 0.1, 0.2], [0.1, 0.1, 0.2], 'x')
+    box = BBox(0, 0, 14000, 14000, grid.resolution, unit_mode=True)
+
+    def get_tile_density(window):
+        template = FillTemplate(TemplateDB('', grid, 'lib'), 'lib', {}, set())
+        # left half has 50% density, right half is empty
+        for tr_idx in range(70):
+            template.add_wires(1, tr_idx, 0, 7000, unit_mode=True)
+        dmap = template.get_density_map(1, 10, bound_box=box)
+        template.do_max_space_fill2(1, bound_box=box, density_map=dmap, window=window)
+        return [density for _, density in
+                template.get_density_map(1, 10, bound_box=box).tile_density((7000, 14000))]
+
+    left0, right0 = get_tile_density(None)
+    left1, right1 = get_tile_density((7000, 14000))
+    # the average density of the box is 0.25, so the empty half is under-filled if the
+    # whole box is one window.
+    assert right0 < 0.2
+    assert right1 > 0.25
+    assert left0 == left1 == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize('window', [4250, 5000, 6900, (7000, 14000)])
+def test_window_fill_spacing(window):
+    grid = RoutingGrid(WindowFillTechInfo(), [1, 2, 3], [0.1, 0.1, 0.2], [0.1, 0.1, 0.2], 'x')
+    box = BBox(0, 0, 14000, 14000, grid.resolution, unit_mode=True)
+    template = FillTemplate(TemplateDB('', grid, 'lib'), 'lib', {}, set())
+    for tr_idx in range(70):
+        template.add_wires(1, tr_idx, 0, 7000, unit_mode=True)
+    dmap = template.get_density_map(1, 10, bound_box=box)
+    template.do_max_space_fill(1, bound_box=box, density_map=dmap, window=window)
+
+    rects = [box.get_bounds(unit_mode=True) for lay_id, box, _, _ in template.all_rect_iter()
+             if lay_id == 1]
+    # fill in adjacent windows must not violate minimum space
+    for idx, (xl, yb, xr, yt) in enumerate(rects):
+        for xl2, yb2, xr2, yt2 in rects[idx + 1:]:
+            if min(xr, xr2) > max(xl, xl2):
+                assert not 0 <= max(yb2 - yt, yb - yt2) < 30
+    right = BBox(7000, 0, 14000, 14000, grid.resolution, unit_mode=True)
+    assert template.get_density_map(1, 10, bound_box=box).get_density(right) > 0.25
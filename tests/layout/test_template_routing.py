@@ -0,0 +1,198 @@
+import random
+
+import pytest
+
+from bag.layout.core import DummyTechInfo
+from bag.layout.routing import RoutingGrid, TrackID, WireArray
+from bag.layout.template import TemplateDB, TemplateBase
+
+
+class RoutingTechInfo(DummyTechInfo):
+    """A TechInfo with metal layers M1-M4 and a square via."""
+
+    def __init__(self):
+        DummyTechInfo.__init__(self, {})
+
+    def get_layer_id(self, layer_name):
+        return int(layer_name[1:])
+
+    def get_layer_name(self, layer_id):
+        return 'M%d' % layer_id
+
+    def get_layer_type(self, layer_name):
+        return layer_name
+
+    def get_via_name(self, bot_layer_id):
+        return 'V%d' % bot_layer_id
+
+    def get_min_space(self, layer_type, width, unit_mode=False, same_color=False):
+        return 30 if unit_mode else 0.03
+
+    def get_min_line_end_space(self, layer_type, width, unit_mode=False):
+        return 50 if unit_mode else 0.05
+
+    def get_min_length(self, layer_type, w_unit):
+        return 0.7
+
+    def get_via_drc_info(self, vname, vtype, mtype, mw_unit, is_bot):
+        if vtype != 'square':
+            raise ValueError('Unsupported via type: %s' % vtype)
+        return (38, 38), [(42, 42)], [(46, 46)], (32, 32), [(10, 20), (20, 10)], None, None
+
+    def finalize_template(self, template):
+        pass
+
+
+class RoutingTemplate(TemplateBase):
+    @classmethod
+    def get_params_info(cls):
+        return {}
+
+    def draw_layout(self):
+        pass
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return RoutingGrid(RoutingTechInfo(), [1, 2, 3, 4], [0.1, 0.1, 0.2, 0.2],
+                       [0.1, 0.1, 0.2, 0.2], 'x')
+
+
+def _make_template(grid):
+    return RoutingTemplate(TemplateDB('', grid, 'lib'), 'lib', {}, set())
+
+
+def _random_connections(grid, rng, num_conn):
+    conn_list = []
+    for conn_idx in range(num_conn):
+        tr_layer = rng.choice([2, 3])
+        tr_width = rng.choice([1, 2])
+        num = rng.choice([1, 1, 2])
+        tr_idx = 8 * conn_idx + rng.choice([0, 0.5, 1])
+        track_id = TrackID(tr_layer, tr_idx, width=tr_width, num=num, pitch=3)
+        tr_coord = int(grid.track_to_coord(tr_layer, tr_idx, unit_mode=True))
+        warr_list = []
+        for w_layer in (tr_layer - 1, tr_layer + 1):
+            for _ in range(rng.randint(0, 2)):
+                w_idx = rng.choice(range(0, 40, 4))
+                if any(warr.layer_id == w_layer and warr.track_id.base_index == w_idx
+                       for warr in warr_list):
+                    continue
+                lower = tr_coord - rng.randint(50, 800)
+                upper = tr_coord + rng.randint(800, 2000)
+                w_tid = TrackID(w_layer, w_idx, num=rng.choice([1, 2]), pitch=2)
+                warr_list.append(WireArray(w_tid, lower, upper, res=grid.resolution,
+                                           unit_mode=True))
+        if rng.random() < 0.3:
+            opts = dict(track_lower=tr_coord - rng.randint(0, 3000),
+                        min_len_mode=rng.choice([None, -1, 0, 1]))
+            conn_list.append((warr_list, track_id, opts))
+        else:
+            conn_list.append((warr_list, track_id))
+    return conn_list
+
+
+def _get_shapes(template):
+    layout = template._layout
+    rects = sorted((rect.layer, rect.bbox.get_bounds(unit_mode=True), rect.nx, rect.ny,
+                    rect.spx_unit, rect.spy_unit) for rect in layout._rect_list)
+    vias = sorted((via.bot_layer, via.top_layer, via.bbox.get_bounds(unit_mode=True), via.nx,
+                   via.ny, via.spx_unit, via.spy_unit, repr(sorted(via._info['params'].items())),
+                   via.bottom_box.get_bounds(unit_mode=True),
+                   via.top_box.get_bounds(unit_mode=True)) for via in layout._via_list)
+    return rects, vias
+
+
+@pytest.mark.parametrize('min_len_mode', [None, -1, 0, 1])
+@pytest.mark.parametrize('return_wires', [False, True])
+def test_connect_to_tracks_batch(grid, min_len_mode, return_wires):
+    conn_list = _random_connections(grid, random.Random(min_len_mode), 30)
+
+    temp_seq = _make_template(grid)
+    expected = []
+    for conn in conn_list:
+        kwargs = dict(min_len_mode=min_len_mode)
+        if len(conn) > 2:
+            kwargs.update(conn[2])
+        expected.append(temp_seq.connect_to_tracks(conn[0], conn[1], return_wires=return_wires,
+                                                   unit_mode=True, **kwargs))
+
+    temp_batch = _make_template(grid)
+    results = temp_batch.connect_to_tracks_batch(conn_list, min_len_mode=min_len_mode,
+                                                 return_wires=return_wires, unit_mode=True)
+    assert repr(results) == repr(expected)
+    assert _get_shapes(temp_batch) == _get_shapes(temp_seq)
+
+
+def _ref_via_boxes(grid, bot_warr_list, top_warr_list):
+    """Reference implementation that checks every pair of bottom and top tracks."""
+    ans = []
+    for bwarr in bot_warr_list:
+        bot_layer_id = bwarr.layer_id
+        for bot_index in bwarr.track_id:
+            btl, btu = grid.get_wire_bounds(bot_layer_id, bot_index, width=bwarr.width,
+                                            unit_mode=True)
+            for twarr in top_warr_list:
+                for top_index in twarr.track_id:
+                    ttl, ttu = grid.get_wire_bounds(bot_layer_id + 1, top_index,
+                                                    width=twarr.width, unit_mode=True)
+                    if (twarr.lower_unit <= btl and btu <= twarr.upper_unit and
+                            bwarr.lower_unit <= ttl and ttu <= bwarr.upper_unit):
+                        if grid.get_direction(bot_layer_id) == 'x':
+                            ans.append((ttl, btl, ttu, btu))
+                        else:
+                            ans.append((btl, ttl, btu, ttu))
+    return sorted(ans)
+
+
+def _get_via_boxes(template):
+    ans = []
+    for via in template._layout._via_list:
+        xl, yb, xr, yt = via.bbox.get_bounds(unit_mode=True)
+        for xidx in range(via.nx):
+            for yidx in range(via.ny):
+                dx = xidx * via.spx_unit
+                dy = yidx * via.spy_unit
+                ans.append((xl + dx, yb + dy, xr + dx, yt + dy))
+    return sorted(ans)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_draw_vias_on_intersections(grid, seed):
+    rng = random.Random(seed)
+    warr_lists = []
+    for layer_id in (2, 3):
+        warr_list = []
+        for _ in range(20):
+            lower = rng.randint(0, 20000)
+            tid = TrackID(layer_id, rng.randint(0, 100), width=rng.choice([1, 2]),
+                          num=rng.choice([1, 3]), pitch=rng.choice([2, 3]))
+            warr_list.append(WireArray(tid, lower, lower + rng.randint(2000, 30000),
+                                       res=grid.resolution, unit_mode=True))
+        warr_lists.append(warr_list)
+
+    expected = _ref_via_boxes(grid, warr_lists[0], warr_lists[1])
+    assert expected
+    for array_vias in (False, True):
+        template = _make_template(grid)
+        template.draw_vias_on_intersections(warr_lists[0], warr_lists[1], array_vias=array_vias)
+        via_boxes = _get_via_boxes(template)
+        if array_vias:
+            assert via_boxes == sorted(set(expected))
+        else:
+            assert via_boxes == expected
+
+
+def test_draw_vias_on_intersections_lattice(grid):
+    # a power grid should be drawn with one via array.
+    res = grid.resolution
+    bot_warr = WireArray(TrackID(2, 10, width=2, num=20, pitch=4), 0, 40000, res=res,
+                         unit_mode=True)
+    top_warr = WireArray(TrackID(3, 5, width=2, num=15, pitch=6), 0, 40000, res=res,
+                         unit_mode=True)
+    template = _make_template(grid)
+    template.draw_vias_on_intersections(bot_warr, top_warr)
+    via_list = template._layout._via_list
+    assert len(via_list) == 1
+    assert (via_list[0].nx, via_list[0].ny) == (20, 15)
+    assert _get_via_boxes(template) == _ref_via_boxes(grid, [bot_warr], [top_warr])
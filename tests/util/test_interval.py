@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from bag.util.interval import IntervalSet
+
+
+class ListIntervalSet(IntervalSet):
+    """An IntervalSet stored in a single chunk, equivalent to the flat list implementation."""
+    _load = 1 << 30
+    _vec_threshold = 1 << 30
+
+
+class SmallIntervalSet(IntervalSet):
+    """An IntervalSet with tiny chunks, to exercise chunk split and merge."""
+    _load = 2
+    _vec_threshold = 4
+
+
+def _random_intv(rng):
+    start = rng.randint(0, 300)
+    return start, start + rng.randint(0, 30)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_ops(seed):
+    rng = random.Random(seed)
+    ref = ListIntervalSet()
+    test = SmallIntervalSet()
+    for _ in range(300):
+        intv = _random_intv(rng)
+        op = rng.random()
+        if op < 0.4:
+            merge = rng.random() < 0.5
+            abut = rng.random() < 0.5
+            val = rng.randint(0, 9)
+            assert ref.add(intv, val, merge=merge, abut=abut) == \
+                test.add(intv, val, merge=merge, abut=abut)
+        elif op < 0.55:
+            assert ref.subtract(intv) == test.subtract(intv)
+        elif op < 0.65:
+            ref.remove_all_overlaps(intv)
+            test.remove_all_overlaps(intv)
+        else:
+            assert ref.has_overlap(intv) == test.has_overlap(intv)
+            assert ref.has_single_cover(intv) == test.has_single_cover(intv)
+            assert list(ref.overlap_items(intv)) == list(test.overlap_items(intv))
+
+        assert list(ref.items()) == list(test.items())
+        assert [test.get_interval(idx) for idx in range(len(test))] == list(ref)
+
+    other_ref = ListIntervalSet()
+    other_test = SmallIntervalSet()
+    for _ in range(40):
+        intv = _random_intv(rng)
+        other_ref.add(intv, merge=True)
+        other_test.add(intv, merge=True)
+
+    assert list(ref.get_intersection(other_ref)) == list(test.get_intersection(other_test))
+    assert list(ref.get_complement((-5, 400))) == list(test.get_complement((-5, 400)))
+    assert list(ref.transform(-1, 7).items()) == list(test.transform(-1, 7).items())
+
+
+def test_arrays():
+    starts = np.array([0, 10, 25, 40])
+    ends = np.array([5, 20, 40, 41])
+    intv_set = IntervalSet.from_arrays(starts, ends, vals='abcd')
+    assert list(intv_set.items()) == [((0, 5), 'a'), ((10, 20), 'b'), ((25, 40), 'c'),
+                                      ((40, 41), 'd')]
+    s_arr, e_arr = intv_set.to_arrays()
+    np.testing.assert_array_equal(s_arr, starts)
+    np.testing.assert_array_equal(e_arr, ends)
+
+    with pytest.raises(ValueError):
+        IntervalSet.from_arrays(np.array([0, 3]), np.array([5, 8]))